@@ -0,0 +1,82 @@
+"""
+WordPress REST batch requests (/wp-json/batch/v1).
+
+Operations are split into chunks of at most `batch_size` sub-requests (25 is
+the WordPress default limit), and chunks are sent concurrently. Results come
+back per operation, in the order the operations were given.
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+DEFAULT_BATCH_SIZE = 25
+DEFAULT_CONCURRENCY = 4
+
+
+def batch_request(method: str, endpoint: str, body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Build one sub-request for a wp/v2 endpoint (e.g. "posts/12")"""
+    request = {"method": method.upper(), "path": f"/wp/v2/{endpoint}"}
+    if body is not None:
+        request["body"] = body
+    return request
+
+
+def _result(index: int, response: Dict[str, Any]) -> Dict[str, Any]:
+    status = response.get("status", 500)
+    body = response.get("body")
+    if 200 <= status < 300:
+        return {"index": index, "success": True, "status": status, "data": body}
+    message = body.get("message", f"HTTP {status}") if isinstance(body, dict) else f"HTTP {status}"
+    return {"index": index, "success": False, "status": status, "message": message}
+
+
+async def run_batch(
+    client,
+    requests: List[Dict[str, Any]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    concurrency: int = DEFAULT_CONCURRENCY
+) -> List[Dict[str, Any]]:
+    """Execute sub-requests through /batch/v1
+
+    Args:
+        client: WordPressClient to send the batches with
+        requests: Sub-requests built with batch_request()
+        batch_size: Sub-requests per batch call
+        concurrency: Maximum number of batch calls in flight
+
+    Returns:
+        One result per sub-request: index, success, status and data/message
+    """
+    batch_size = max(1, batch_size)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def send(offset: int, chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        async with semaphore:
+            try:
+                data = await client.request("POST", "", namespace="batch/v1", json={"requests": chunk})
+                responses = data.get("responses", [])
+            except Exception as e:
+                return [
+                    {"index": offset + i, "success": False, "status": None, "message": str(e)}
+                    for i in range(len(chunk))
+                ]
+            finally:
+                for request in chunk:
+                    client.invalidate(request["path"])
+        results = [_result(offset + i, r) for i, r in enumerate(responses)]
+        for request, result in zip(chunk, results):
+            if result["success"]:
+                client.notify_write(request["method"], request["path"], result["data"])
+        # WordPress answers every sub-request; guard against short responses anyway
+        for i in range(len(responses), len(chunk)):
+            results.append({"index": offset + i, "success": False, "status": None, "message": "No response"})
+        return results
+
+    chunks = [
+        send(offset, requests[offset:offset + batch_size])
+        for offset in range(0, len(requests), batch_size)
+    ]
+    results: List[Dict[str, Any]] = []
+    for chunk_results in await asyncio.gather(*chunks):
+        results.extend(chunk_results)
+    return results
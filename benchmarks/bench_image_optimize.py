@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark image_optimize.ImageOptimizer throughput against worker count.
+
+Generates synthetic camera-sized JPEGs and encodes them with a cold cache for
+each worker count, then once more with a warm cache. Usage:
+
+    python benchmarks/bench_image_optimize.py [--images 24] [--workers 1,2,4] [--format webp]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_optimize import ImageOptimizer, OptimizeOptions, available
+
+
+def make_photo(path: str, rng: random.Random, size=(4000, 3000)) -> None:
+    """Noisy gradient with some shapes: compresses like a real photo, not a flat fill"""
+    from PIL import Image, ImageDraw, ImageFilter
+
+    image = Image.effect_noise(size, rng.randint(20, 60)).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        r = rng.randint(50, 600)
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=tuple(rng.randrange(256) for _ in range(3)))
+    image.filter(ImageFilter.GaussianBlur(2)).save(path, "JPEG", quality=92)
+
+
+async def run(sources, cache_dir: str, workers: int, options: OptimizeOptions, repeat: bool):
+    optimizer = ImageOptimizer(cache_dir, workers)
+    try:
+        # Start the pool outside the timed section
+        await asyncio.get_running_loop().run_in_executor(optimizer._executor(), abs, 0)
+        started = time.perf_counter()
+        results = await asyncio.gather(*(optimizer.optimize(s, options) for s in sources))
+        elapsed = time.perf_counter() - started
+        warm = None
+        if repeat:
+            started = time.perf_counter()
+            await asyncio.gather(*(optimizer.optimize(s, options) for s in sources))
+            warm = time.perf_counter() - started
+    finally:
+        optimizer.close()
+    return elapsed, warm, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=24)
+    parser.add_argument("--workers", default=",".join(str(w) for w in sorted({1, 2, 4, os.cpu_count() or 1})))
+    parser.add_argument("--format", default="webp", choices=["webp", "avif", "jpeg"])
+    parser.add_argument("--quality", type=int, default=82)
+    parser.add_argument("--max-size", type=int, default=2560)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if not available():
+        sys.exit("Pillow is not installed")
+
+    options = OptimizeOptions(args.format, args.quality, args.max_size)
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = []
+        for i in range(args.images):
+            path = os.path.join(tmp, f"photo-{i}.jpg")
+            make_photo(path, rng)
+            sources.append(path)
+        source_mb = sum(os.path.getsize(p) for p in sources) / 1e6
+        print(f"{args.images} images, {source_mb:.1f} MB, {os.cpu_count()} CPUs, "
+              f"{options.format} q{options.quality} max {options.max_size}px")
+
+        workers = [int(w) for w in args.workers.split(",")]
+        baseline = None
+        for count in workers:
+            cache_dir = os.path.join(tmp, f"cache-{count}")
+            elapsed, warm, results = asyncio.run(run(sources, cache_dir, count, options, count == workers[-1]))
+            rate = len(sources) / elapsed
+            baseline = baseline or rate
+            out_mb = sum(r.bytes for r in results) / 1e6
+            print(f"workers={count:<3} {rate:8.2f} images/s  speedup x{rate / baseline:.2f}  output {out_mb:.1f} MB")
+            if warm is not None:
+                print(f"warm cache  {len(sources) / warm:8.2f} images/s")
+
+
+if __name__ == "__main__":
+    main()
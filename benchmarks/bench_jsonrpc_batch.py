@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Throughput of JSON-RPC batches on mcp_sse_server's /mcp versus single calls.
+
+The app runs in-process behind httpx.ASGITransport; WordPress is
+fake_wordpress with --latency seconds per upstream request, and --rtt adds
+a simulated network round trip to every HTTP request to /mcp. The same
+--calls get_posts/tools/call requests are sent:
+
+- single: one request per call, one after another (what clients do today)
+- single x C: one request per call, C in flight at a time
+- batch B: arrays of B calls, one after another (the server runs up to
+  MCP_BATCH_CONCURRENCY of each batch at once)
+
+Usage:
+
+    python benchmarks/bench_jsonrpc_batch.py [--calls 200] [--batch 10] [--latency 0.02] [--rtt 0.03]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mcp_sse_server
+from fake_wordpress import FakeWordPress
+
+
+def call(i: int) -> dict:
+    page = i % 5 + 1
+    return {"jsonrpc": "2.0", "id": i, "method": "tools/call",
+            "params": {"name": "get_posts", "arguments": {"per_page": 10, "page": page}}}
+
+
+class Runner:
+    def __init__(self, client: httpx.AsyncClient, rtt: float):
+        self.client = client
+        self.rtt = rtt
+        self.requests = 0
+        self.errors = 0
+
+    async def post(self, body) -> list:
+        self.requests += 1
+        if self.rtt:
+            await asyncio.sleep(self.rtt)
+        response = await self.client.post("/mcp", content=json.dumps(body))
+        answers = response.json()
+        answers = answers if isinstance(answers, list) else [answers]
+        for answer in answers:
+            text = answer.get("result", {}).get("content", [{}])[0].get("text", "")
+            if "error" in answer or '"success":false' in text.replace(" ", ""):
+                self.errors += 1
+        return answers
+
+
+async def single(runner: Runner, calls: int) -> int:
+    done = 0
+    for i in range(calls):
+        done += len(await runner.post(call(i)))
+    return done
+
+
+async def single_concurrent(runner: Runner, calls: int, concurrency: int) -> int:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            return len(await runner.post(call(i)))
+
+    return sum(await asyncio.gather(*(one(i) for i in range(calls))))
+
+
+async def batched(runner: Runner, calls: int, size: int) -> int:
+    done = 0
+    for start in range(0, calls, size):
+        done += len(await runner.post([call(i) for i in range(start, min(calls, start + size))]))
+    return done
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=10, help="Calls per batch")
+    parser.add_argument("--concurrency", type=int, default=mcp_sse_server.MCP_BATCH_CONCURRENCY,
+                        help="Requests in flight for 'single x C' and calls in flight per batch")
+    parser.add_argument("--latency", type=float, default=0.02, help="Upstream WordPress latency, seconds")
+    parser.add_argument("--rtt", type=float, default=0.03, help="Client <-> server round trip, seconds")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    mcp_sse_server.MCP_BATCH_CONCURRENCY = args.concurrency
+    fake = FakeWordPress(posts=100)
+    fake.configure("*", latency=args.latency)
+    wordpress = mcp_sse_server.WordPressMCP(fake.base_url, fake.username, fake.password)
+    await wordpress.client.aclose()
+    wordpress.client = httpx.AsyncClient(auth=(fake.username, fake.password), transport=fake.transport(),
+                                         headers={"Content-Type": "application/json"})
+    mcp_sse_server.wordpress_mcp = wordpress
+
+    scenarios = [
+        ("single", lambda r: single(r, args.calls)),
+        (f"single x {args.concurrency}", lambda r: single_concurrent(r, args.calls, args.concurrency)),
+        (f"batch {args.batch}", lambda r: batched(r, args.calls, args.batch)),
+    ]
+    print(f"{args.calls} get_posts calls, upstream latency {args.latency * 1000:.0f} ms, "
+          f"rtt {args.rtt * 1000:.0f} ms, concurrency {args.concurrency}\n")
+    print(f"{'scenario':<14} {'seconds':>8} {'calls/s':>9} {'http reqs':>10} {'errors':>7}")
+    transport = httpx.ASGITransport(app=mcp_sse_server.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await single(Runner(client, 0), 5)  # warm-up
+            for name, scenario in scenarios:
+                runner = Runner(client, args.rtt)
+                started = time.perf_counter()
+                done = await scenario(runner)
+                elapsed = time.perf_counter() - started
+                print(f"{name:<14} {elapsed:>8.2f} {done / elapsed:>9.1f} {runner.requests:>10} {runner.errors:>7}")
+    finally:
+        await wordpress.client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
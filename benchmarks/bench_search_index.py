@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark BM25 query latency of search_index.SearchIndex.
+
+Builds an index over synthetic Russian travel posts and times a mix of
+queries. Usage:
+
+    python benchmarks/bench_search_index.py [--docs 50000] [--queries 500]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import SearchIndex
+
+WORDS = (
+    "путешествие отель море пляж горы озеро маршрут экскурсия гостиница билет самолёт поезд "
+    "автобус город деревня музей храм крепость парк заповедник остров река набережная ресторан "
+    "кухня вино сыр рынок сувенир виза граница таможня погода зима лето осень весна снег дождь "
+    "солнце жара тропа вершина перевал водопад пещера каньон лес степь пустыня байкал алтай "
+    "камчатка крым сочи карелия кавказ урал сибирь тур отдых семья дети бюджет цена скидка"
+).split()
+ENDINGS = ("", "а", "ы", "е", "ом", "ами", "ах", "ой", "ий", "ая", "ие", "ю")
+SYLLABLES = "ка ло ми ну ра се ти во да жу зе пи ро ст ба ле мо ны ко ре".split()
+
+
+def vocabulary(rng: random.Random, size: int = 20000):
+    """Real travel words first, then synthetic ones, with Zipf weights"""
+    words = list(WORDS)
+    while len(words) < size:
+        words.append("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    cum_weights, total = [], 0.0
+    for rank in range(1, len(words) + 1):
+        total += 1.0 / rank
+        cum_weights.append(total)
+    return words, cum_weights
+
+
+def sentence(rng: random.Random, n: int, vocab) -> str:
+    words, cum_weights = vocab
+    return " ".join(w + rng.choice(ENDINGS) for w in rng.choices(words, cum_weights=cum_weights, k=n))
+
+
+def make_post(rng: random.Random, i: int, vocab) -> dict:
+    paragraphs = "".join(f"<p>{sentence(rng, rng.randint(20, 60), vocab)}.</p>" for _ in range(rng.randint(3, 12)))
+    return {
+        "id": i,
+        "title": {"rendered": sentence(rng, rng.randint(3, 8), vocab).capitalize()},
+        "excerpt": {"rendered": f"<p>{sentence(rng, 25, vocab)}</p>"},
+        "content": {"rendered": paragraphs},
+        "status": "publish",
+        "date": f"20{rng.randint(15, 24)}-{rng.randint(1, 12):02d}-01T00:00:00",
+        "link": f"https://example.com/?p={i}",
+        "categories": [rng.randint(1, 30)],
+        "tags": rng.sample(range(1, 200), 3),
+    }
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocab = vocabulary(rng)
+    index = SearchIndex()
+    build = 0.0
+    for start in range(1, args.docs + 1, 1000):
+        # Generate outside the timed section so only indexing is measured
+        batch = [make_post(rng, i, vocab) for i in range(start, min(start + 1000, args.docs + 1))]
+        started = time.perf_counter()
+        for post in batch:
+            index.add("posts", post)
+        build += time.perf_counter() - started
+    print(f"Indexed {len(index)} docs, {len(index.postings)} terms in {build:.1f}s "
+          f"({len(index) / build:.0f} docs/s)")
+
+    queries = [sentence(rng, rng.randint(1, 3), vocab) for _ in range(args.queries)]
+    for label, kwargs in (("plain", {"status": "any"}), ("filtered", {"categories": [5], "after": "2020-01-01"})):
+        latencies = []
+        for query in queries:
+            t0 = time.perf_counter()
+            index.search(query, limit=10, **kwargs)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        print(f"{label:>9}: p50={percentile(latencies, 0.5):.2f}ms p95={percentile(latencies, 0.95):.2f}ms "
+              f"p99={percentile(latencies, 0.99):.2f}ms mean={statistics.mean(latencies):.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON encoding and decoding of realistic post payloads.
+
+Compares the stdlib json module (as the code used it before) with the
+serialization module's backend on a page of 100 WordPress posts in view
+context (rendered Russian content, _links, yoast-style head) - the upstream
+body decoded by the client - and on the tool result built from it. Usage:
+
+    python benchmarks/bench_serialization.py [--posts 100] [--rounds 200]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serialization
+
+WORDS = (
+    "путешествие отель море пляж горы озеро маршрут экскурсия гостиница билет самолёт поезд "
+    "автобус город деревня музей храм крепость парк заповедник остров река набережная ресторан "
+    "кухня вино сыр рынок сувенир виза граница погода зима лето байкал алтай камчатка крым"
+).split()
+
+
+def sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def make_post(rng: random.Random, i: int) -> dict:
+    paragraphs = "".join(
+        f'<p class="has-text-color" style="color:#333">{sentence(rng, rng.randint(20, 60))}.</p>\n'
+        for _ in range(rng.randint(5, 15))
+    )
+    link = f"https://example.com/{i}/"
+    return {
+        "id": i,
+        "date": "2024-05-01T10:00:00",
+        "date_gmt": "2024-05-01T07:00:00",
+        "guid": {"rendered": f"https://example.com/?p={i}"},
+        "modified": "2024-05-02T12:30:00",
+        "modified_gmt": "2024-05-02T09:30:00",
+        "slug": f"post-{i}",
+        "status": "publish",
+        "type": "post",
+        "link": link,
+        "title": {"rendered": sentence(rng, 6).capitalize()},
+        "content": {"rendered": paragraphs, "protected": False},
+        "excerpt": {"rendered": f"<p>{sentence(rng, 30)} [&hellip;]</p>\n", "protected": False},
+        "author": 1,
+        "featured_media": rng.randint(1, 5000),
+        "comment_status": "open",
+        "ping_status": "open",
+        "sticky": False,
+        "template": "",
+        "format": "standard",
+        "meta": {"footnotes": ""},
+        "categories": [rng.randint(1, 30)],
+        "tags": rng.sample(range(1, 200), 4),
+        "class_list": [f"post-{i}", "post", "type-post", "status-publish", "format-standard", "hentry"],
+        "yoast_head_json": {
+            "title": sentence(rng, 6), "description": sentence(rng, 20), "canonical": link,
+            "og_locale": "ru_RU", "og_type": "article", "og_title": sentence(rng, 6),
+            "og_url": link, "og_site_name": "Example", "twitter_card": "summary_large_image",
+            "schema": {"@context": "https://schema.org", "@graph": [
+                {"@type": "Article", "@id": f"{link}#article", "headline": sentence(rng, 6),
+                 "wordCount": rng.randint(300, 2000), "inLanguage": "ru-RU"},
+                {"@type": "WebPage", "@id": link, "url": link, "name": sentence(rng, 6)},
+            ]},
+        },
+        "_links": {
+            rel: [{"href": f"https://example.com/wp-json/wp/v2/{rel}?post={i}", "embeddable": True}]
+            for rel in ("self", "collection", "about", "author", "replies", "version-history",
+                        "wp:featuredmedia", "wp:attachment", "wp:term", "curies")
+        },
+    }
+
+
+def tool_result(posts: list) -> dict:
+    """Shape of get_posts' result"""
+    return {"success": True, "count": len(posts), "posts": [
+        {"id": p["id"], "title": p["title"]["rendered"], "excerpt": p["excerpt"]["rendered"],
+         "content": p["content"]["rendered"], "link": p["link"], "status": p["status"],
+         "date": p["date"], "categories": p["categories"], "tags": p["tags"]}
+        for p in posts
+    ]}
+
+
+def timed(fn, rounds: int) -> list:
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    posts = [make_post(rng, i) for i in range(1, args.posts + 1)]
+    body = json.dumps(posts).encode("utf-8")  # WordPress escapes non-ASCII
+    result = tool_result(posts)
+    print(f"backend={serialization.BACKEND} posts={args.posts} upstream body={len(body) / 1e6:.2f} MB")
+
+    cases = (
+        ("decode upstream", lambda: json.loads(body.decode("utf-8")), lambda: serialization.loads(body)),
+        ("encode result", lambda: json.dumps(result), lambda: serialization.dumps(result)),
+        ("encode HTTP body", lambda: json.dumps(result).encode("utf-8"), lambda: serialization.dumpb(result)),
+    )
+    for label, baseline, fast in cases:
+        base_ms = statistics.median(timed(baseline, args.rounds))
+        fast_ms = statistics.median(timed(fast, args.rounds))
+        print(f"{label:>17}: stdlib {base_ms:7.2f}ms  {serialization.BACKEND} {fast_ms:7.2f}ms  "
+              f"x{base_ms / fast_ms:.1f}")
+    print(f"result size: stdlib {len(json.dumps(result).encode()) / 1e3:.0f} KB, "
+          f"{serialization.BACKEND} {len(serialization.dumpb(result)) / 1e3:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
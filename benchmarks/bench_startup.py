@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark of the stdio server, with a budget to track.
+
+Each run starts a fresh interpreter, so nothing is warm but the OS page
+cache:
+
+- `python -X importtime -c "import mcp_server"` split into the MCP SDK,
+  this repo's modules and mcp_server's own body (tool registration
+  included), plus the modules a stdio session should never import
+- `python mcp_stdio_runner.py` as an editor launches it: time until the
+  answer to `initialize` (first response) and to the following `tools/list`
+
+Medians over --runs are compared with BUDGET_MS; --check exits with status
+1 when a budget is exceeded or a deferred module got imported. Usage:
+
+    python benchmarks/bench_startup.py [--runs 5] [--check] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Medians in milliseconds; generous enough for a loaded CI machine
+BUDGET_MS = {
+    "import_total": 1500,
+    "import_repo_modules": 30,
+    "first_response": 1300,
+    "tools_list": 1400,
+}
+
+# Only needed by optional features or network transports, loaded on first use
+DEFERRED_MODULES = ("content_mirror", "search_index", "media_upload", "image_optimize", "media_index", "sqlite3")
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def repo_modules() -> set:
+    return {name[:-3] for name in os.listdir(ROOT) if name.endswith(".py")}
+
+
+def importtime(env: Dict[str, str]) -> Dict[str, float]:
+    """Import-time breakdown of `import mcp_server`, in milliseconds"""
+    code = "import sys, mcp_server; print(','.join(m for m in %r if m in sys.modules))" % (DEFERRED_MODULES,)
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    wall = (time.perf_counter() - started) * 1000
+    local = repo_modules()
+    sdk = repo = body = 0.0
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        # Direct imports of mcp_server are one level below it; count each subtree once
+        if len(indent) != 3:
+            if len(indent) == 1 and name == "mcp_server":
+                body = int(self_us) / 1000
+            continue
+        if name.split(".")[0] in local:
+            repo += int(cumulative_us) / 1000
+        elif name.split(".")[0] == "mcp":
+            sdk += int(cumulative_us) / 1000
+    return {
+        "import_total": wall,
+        "import_sdk": sdk,
+        "import_repo_modules": repo,
+        "import_body": body,
+        "deferred_imported": proc.stdout.strip(),
+    }
+
+
+def rpc(proc: subprocess.Popen, message: dict, wait: bool = True) -> float:
+    """Send a JSON-RPC message; return ms until its response (0 for notifications)"""
+    started = time.perf_counter()
+    proc.stdin.write(json.dumps(message) + "\n")
+    proc.stdin.flush()
+    if not wait:
+        return 0.0
+    while True:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError("server exited before answering")
+        if json.loads(line).get("id") == message["id"]:
+            return (time.perf_counter() - started) * 1000
+
+
+def first_response(env: Dict[str, str]) -> Dict[str, float]:
+    """Spawn the stdio runner; time initialize and tools/list from process start"""
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "mcp_stdio_runner.py")], cwd=ROOT, env=env,
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        rpc(proc, {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+            "protocolVersion": "2025-06-18", "capabilities": {},
+            "clientInfo": {"name": "bench_startup", "version": "1"}}})
+        initialized = (time.perf_counter() - started) * 1000
+        rpc(proc, {"jsonrpc": "2.0", "method": "notifications/initialized"}, wait=False)
+        rpc(proc, {"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+        listed = (time.perf_counter() - started) * 1000
+    finally:
+        proc.stdin.close()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+    return {"first_response": initialized, "tools_list": listed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--check", action="store_true", help="exit with status 1 when over budget")
+    parser.add_argument("--json", help="write the medians to this file")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    runs: List[Dict[str, float]] = []
+    deferred = set()
+    for _ in range(args.runs):
+        sample = importtime(env)
+        deferred.update(filter(None, sample.pop("deferred_imported").split(",")))
+        sample.update(first_response(env))
+        runs.append(sample)
+
+    medians = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+    over = []
+    print(f"python {sys.version.split()[0]}, median of {args.runs} cold starts")
+    for key, value in medians.items():
+        budget = BUDGET_MS.get(key)
+        status = ""
+        if budget is not None:
+            status = f"budget {budget:>5} ms" + ("  OVER" if value > budget else "")
+            if value > budget:
+                over.append(key)
+        print(f"{key:>20}: {value:8.1f} ms  {status}")
+    if deferred:
+        print(f"imported at startup but should be deferred: {', '.join(sorted(deferred))}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"medians": medians, "budget": BUDGET_MS, "deferred_imported": sorted(deferred)}, f, indent=2)
+    if args.check and (over or deferred):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
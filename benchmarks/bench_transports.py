@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+End-to-end load benchmark of mcp_server.py over stdio, SSE and streamable-HTTP.
+
+WordPress is replaced by fake_wordpress served by uvicorn in its own process
+(with configurable latency); the MCP server runs in another process, exactly
+as mcp_server.network_app() / mcp.run("stdio") serve it. N concurrent MCP
+clients (one server process per client for stdio, as in real use) call a
+weighted mix of read tools plus a few writes for --duration seconds after a
+warm-up. Per transport it reports throughput, client-side p50/p95/p99
+latency, errors, peak RSS and CPU of the server process(es).
+
+The idle-sse scenario holds --idle initialized SSE sessions open while --hot
+clients run the mix, to see what idle sessions cost in memory and latency.
+
+Results can be saved with --json and compared with an earlier run, e.g.
+before and after a change:
+
+    python benchmarks/bench_transports.py --json before.json
+    git checkout my-branch
+    python benchmarks/bench_transports.py --compare before.json
+
+RSS and CPU are read from /proc (Linux); elsewhere they are reported as n/a.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import AsyncExitStack
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TRANSPORTS = ("stdio", "sse", "streamable-http")
+SCENARIOS = ("load", "idle-sse")
+WORDS = ("байкал", "отель", "море", "маршрут", "музей", "поезд", "горы", "виза")
+
+# (tool, weight, arguments(rng, ids))
+MIX = (
+    ("get_posts", 25, lambda rng, ids: {"per_page": 10, "page": rng.randint(1, 5)}),
+    ("get_posts", 5, lambda rng, ids: {"per_page": 10, "page": rng.randint(1, 5), "format": "markdown"}),
+    ("get_post", 25, lambda rng, ids: {"post_id": rng.choice(ids["posts"])}),
+    ("get_page", 5, lambda rng, ids: {"page_id": rng.choice(ids["pages"])}),
+    ("search_content", 10, lambda rng, ids: {"query": rng.choice(WORDS)}),
+    ("get_categories", 8, lambda rng, ids: {}),
+    ("get_tags", 5, lambda rng, ids: {}),
+    ("get_comments", 10, lambda rng, ids: {"post_id": rng.choice(ids["posts"])}),
+    ("update_post", 5, lambda rng, ids: {"post_id": rng.choice(ids["posts"]),
+                                         "title": " ".join(rng.sample(WORDS, 3))}),
+    ("get_site_info", 2, lambda rng, ids: {}),
+)
+
+
+# ==================== PROCESSES ====================
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve(args) -> None:
+    """Child process: the fake WordPress or the MCP server"""
+    import uvicorn
+
+    if args.role == "wordpress":
+        from fake_wordpress import FakeWordPress
+        fake = FakeWordPress(posts=args.posts, seed=args.seed, base_url=args.wp_url)
+        fake.configure("*", latency=args.latency, jitter=args.latency / 4)
+        uvicorn.run(fake.app, host="127.0.0.1", port=args.port, log_level="warning")
+        return
+
+    import mcp_server
+    from fake_wordpress import PASSWORD, USERNAME
+    mcp_server.WORDPRESS_URL = args.wp_url
+    mcp_server.WORDPRESS_USERNAME = USERNAME
+    mcp_server.WORDPRESS_PASSWORD = PASSWORD
+    mcp_server.start_logging(args.transport)
+    if args.transport == "stdio":
+        mcp_server.mcp.run(transport="stdio")
+    else:
+        uvicorn.run(mcp_server.network_app(args.transport), host="127.0.0.1", port=args.port, log_config=None)
+
+
+def serve_command(role: str, port: int, args, transport: str = "") -> List[str]:
+    return [sys.executable, os.path.abspath(__file__), "serve", "--role", role, "--port", str(port),
+            "--transport", transport, "--wp-url", args.wp_url, "--posts", str(args.posts),
+            "--seed", str(args.seed), "--latency", str(args.latency)]
+
+
+def server_env(args) -> Dict[str, str]:
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    if args.no_cache:
+        env["WP_CACHE_MAX_ENTRIES"] = "0"
+    return env
+
+
+def spawn(command: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(command, env=env, stdin=subprocess.DEVNULL,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_for_port(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"nothing listening on port {port}")
+            await asyncio.sleep(0.05)
+
+
+def server_pids() -> List[int]:
+    """Our child processes running the MCP server (stdio ones are spawned by the MCP client)"""
+    pids = []
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return pids
+    me = str(os.getpid())
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = f.read().rpartition(")")[2].split()[1]
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                cmdline = f.read().split(b"\0")
+        except OSError:
+            continue
+        if ppid == me and b"serve" in cmdline and b"server" in cmdline:
+            pids.append(int(entry))
+    return pids
+
+
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rpartition(")")[2].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def rss_bytes(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+class ProcessMonitor:
+    """Samples peak total RSS and CPU time of the server processes"""
+
+    def __init__(self, interval: float = 0.2):
+        self.interval = interval
+        self.supported = os.path.isdir("/proc")
+        self.peak_rss = 0
+        self.cpu_start: Dict[int, float] = {}
+        self.cpu_last: Dict[int, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def sample(self) -> None:
+        total = 0
+        for pid in server_pids():
+            try:
+                total += rss_bytes(pid)
+                cpu = cpu_seconds(pid)
+            except OSError:
+                continue
+            self.cpu_start.setdefault(pid, cpu)
+            self.cpu_last[pid] = cpu
+        self.peak_rss = max(self.peak_rss, total)
+
+    async def _run(self) -> None:
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self.supported:
+            self.sample()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self.sample()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    @property
+    def cpu(self) -> float:
+        return sum(self.cpu_last[pid] - self.cpu_start[pid] for pid in self.cpu_last)
+
+
+# ==================== CLIENTS ====================
+
+def session_factory(transport: str, port: int, args) -> Callable:
+    """Returns open(stack) -> initialized ClientSession"""
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.sse import sse_client
+    from mcp.client.stdio import stdio_client
+    from mcp.client.streamable_http import streamable_http_client
+
+    async def open_session(stack: AsyncExitStack) -> ClientSession:
+        if transport == "stdio":
+            params = StdioServerParameters(command=sys.executable, args=serve_command("server", 0, args, "stdio")[1:],
+                                           env=server_env(args))
+            read, write = await stack.enter_async_context(stdio_client(params, errlog=stack.enter_context(
+                open(os.devnull, "w"))))
+        elif transport == "sse":
+            read, write = await stack.enter_async_context(sse_client(f"http://127.0.0.1:{port}/sse"))
+        else:
+            read, write, _ = await stack.enter_async_context(
+                streamable_http_client(f"http://127.0.0.1:{port}/mcp"))
+        session = await stack.enter_async_context(ClientSession(read, write))
+        await session.initialize()
+        return session
+
+    return open_session
+
+
+def failed(result) -> bool:
+    if result.isError:
+        return True
+    text = result.content[0].text if result.content else ""
+    return text.startswith("{") and '"success":false' in text.replace(" ", "")
+
+
+class Run:
+    def __init__(self, duration: float, warmup: float):
+        self.duration = duration
+        self.warmup = warmup
+        self.ready = asyncio.Event()
+        self.start = 0.0
+        self.end = 0.0
+        self.connected = 0
+        self.latencies: List[float] = []
+        self.calls = 0
+        self.errors = 0
+        self.failures: List[str] = []
+
+
+async def hot_client(open_session, run: Run, ids: Dict[str, List[int]], seed: int) -> None:
+    rng = random.Random(seed)
+    tools = [tool for tool, _, _ in MIX]
+    weights = [weight for _, weight, _ in MIX]
+    builders = [build for _, _, build in MIX]
+    async with AsyncExitStack() as stack:
+        session = await open_session(stack)
+        run.connected += 1
+        await run.ready.wait()
+        while time.perf_counter() < run.end:
+            i = rng.choices(range(len(tools)), weights)[0]
+            t0 = time.perf_counter()
+            try:
+                result = await session.call_tool(tools[i], builders[i](rng, ids))
+                error = failed(result)
+            except Exception as e:
+                error = True
+                if len(run.failures) < 5:
+                    run.failures.append(f"{tools[i]}: {e!r}")
+            t1 = time.perf_counter()
+            if run.start <= t0 and t1 <= run.end:
+                run.latencies.append((t1 - t0) * 1000)
+                run.calls += 1
+                run.errors += error
+
+
+async def idle_client(open_session, run: Run) -> None:
+    async with AsyncExitStack() as stack:
+        await open_session(stack)
+        run.connected += 1
+        await run.ready.wait()
+        await asyncio.sleep(max(0.0, run.end - time.perf_counter()))
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def measure(transport: str, scenario: str, args, ids: Dict[str, List[int]]) -> Dict[str, Any]:
+    env = server_env(args)
+    port = free_port()
+    server = None
+    if transport != "stdio":
+        server = spawn(serve_command("server", port, args, transport), env)
+    try:
+        if server is not None:
+            await wait_for_port(port)
+        open_session = session_factory(transport, port, args)
+        run = Run(args.duration, args.warmup)
+        hot = args.hot if scenario == "idle-sse" else args.clients
+        idle = args.idle if scenario == "idle-sse" else 0
+        tasks = [asyncio.create_task(hot_client(open_session, run, ids, args.seed * 1000 + i)) for i in range(hot)]
+        # Open idle sessions in waves so the listen backlog is not the bottleneck
+        for i in range(0, idle, 50):
+            tasks += [asyncio.create_task(idle_client(open_session, run)) for _ in range(min(50, idle - i))]
+            await asyncio.sleep(0.1)
+
+        monitor = ProcessMonitor()
+        monitor.start()
+        deadline = time.monotonic() + args.connect_timeout
+        while run.connected < hot + idle and time.monotonic() < deadline and not any(t.done() for t in tasks):
+            await asyncio.sleep(0.05)
+        connected = run.connected
+        run.start = time.perf_counter() + args.warmup
+        run.end = run.start + args.duration
+        run.ready.set()
+
+        await asyncio.sleep(args.warmup)
+        monitor.sample()
+        monitor.cpu_start = dict(monitor.cpu_last)
+        # Stop sampling before the clients disconnect (and stdio servers exit)
+        await asyncio.sleep(max(0.0, run.end - time.perf_counter()))
+        await monitor.stop()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        broken = [r for r in results if isinstance(r, BaseException)]
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    latencies = run.latencies
+    return {
+        "transport": transport,
+        "scenario": scenario,
+        "clients": hot,
+        "idle": max(0, connected - hot),
+        "calls": run.calls,
+        "errors": run.errors,
+        "broken_clients": len(broken),
+        "first_failure": (run.failures or [repr(b) for b in broken] or [None])[0],
+        "throughput": run.calls / args.duration,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "mean_ms": statistics.fmean(latencies) if latencies else float("nan"),
+        "peak_rss_mb": monitor.peak_rss / 1e6 if monitor.supported else None,
+        "cpu_percent": monitor.cpu / args.duration * 100 if monitor.supported else None,
+    }
+
+
+# ==================== REPORT ====================
+
+COLUMNS = (("throughput", "calls/s", "{:9.1f}"), ("p50_ms", "p50 ms", "{:8.1f}"), ("p95_ms", "p95 ms", "{:8.1f}"),
+           ("p99_ms", "p99 ms", "{:8.1f}"), ("peak_rss_mb", "RSS MB", "{:8.1f}"), ("cpu_percent", "CPU %", "{:7.1f}"))
+
+
+def fmt(spec: str, value) -> str:
+    width = int(spec[2:].split(".")[0])
+    return spec.format(value) if value is not None else "n/a".rjust(width)
+
+
+def report(results: List[Dict[str, Any]], baseline: Optional[List[Dict[str, Any]]] = None) -> None:
+    previous = {(r["transport"], r["scenario"]): r for r in baseline or []}
+    header = f"{'transport':<16}{'scenario':<10}{'clients':>8}{'idle':>6}{'calls':>7}{'errors':>7}"
+    print(header + "".join(f"{label:>{len(spec.format(0.0))}}" for _, label, spec in COLUMNS))
+    for r in results:
+        line = (f"{r['transport']:<16}{r['scenario']:<10}{r['clients']:>8}{r['idle']:>6}"
+                f"{r['calls']:>7}{r['errors']:>7}")
+        print(line + "".join(fmt(spec, r[key]) for key, _, spec in COLUMNS))
+        before = previous.get((r["transport"], r["scenario"]))
+        if before is not None:
+            deltas = []
+            for key, _, spec in COLUMNS:
+                if r[key] is None or before.get(key) in (None, 0) or math.isnan(r[key] / before[key]):
+                    deltas.append("".rjust(len(spec.format(0.0))))
+                else:
+                    deltas.append(f"{(r[key] / before[key] - 1) * 100:+.0f}%".rjust(len(spec.format(0.0))))
+            print(f"{'  vs baseline':<54}" + "".join(deltas))
+        if r["first_failure"]:
+            print(f"  first failure: {r['first_failure']}")
+
+
+async def bench(args) -> List[Dict[str, Any]]:
+    from fake_wordpress import FakeWordPress
+
+    # Same seed, same dataset as the fake WordPress process
+    fake = FakeWordPress(posts=args.posts, seed=args.seed)
+    ids = {kind: [i for i, item in fake.data[kind].items() if item["status"] == "publish"]
+           for kind in ("posts", "pages")}
+
+    wp_port = free_port()
+    args.wp_url = f"http://127.0.0.1:{wp_port}"
+    wordpress = spawn(serve_command("wordpress", wp_port, args), dict(os.environ, PYTHONPATH=ROOT))
+    results = []
+    try:
+        await wait_for_port(wp_port)
+        for scenario in args.scenarios:
+            transports = ["sse"] if scenario == "idle-sse" else args.transports
+            for transport in transports:
+                print(f"running {scenario} over {transport}...", file=sys.stderr)
+                results.append(await measure(transport, scenario, args, ids))
+    finally:
+        wordpress.terminate()
+        wordpress.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command")
+    child = sub.add_parser("serve", help="internal: run the fake WordPress or the MCP server")
+    child.add_argument("--role", choices=("wordpress", "server"), required=True)
+    child.add_argument("--transport", default="")
+    for p in (parser, child):
+        p.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+        p.add_argument("--wp-url", default="", help=argparse.SUPPRESS)
+        p.add_argument("--posts", type=int, default=200, help="posts on the fake site")
+        p.add_argument("--seed", type=int, default=1)
+        p.add_argument("--latency", type=float, default=0.02, help="fake WordPress latency, seconds")
+    parser.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=list(TRANSPORTS))
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--clients", type=int, default=8, help="concurrent clients in the load scenario")
+    parser.add_argument("--idle", type=int, default=200, help="idle SSE sessions in the idle-sse scenario")
+    parser.add_argument("--hot", type=int, default=4, help="busy clients in the idle-sse scenario")
+    parser.add_argument("--duration", type=float, default=15.0, help="measured seconds per run")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds before each run")
+    parser.add_argument("--connect-timeout", type=float, default=60.0)
+    parser.add_argument("--no-cache", action="store_true", help="disable the server's response cache")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="results file of an earlier run to compare with")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args)
+        return
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    results = asyncio.run(bench(args))
+    print(f"posts={args.posts} latency={args.latency * 1000:.0f}ms duration={args.duration:.0f}s "
+          f"cache={'off' if args.no_cache else 'on'}")
+    report(results, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k not in ("json", "compare", "command")},
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
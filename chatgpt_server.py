@@ -11,6 +11,8 @@ from typing import Optional, List
 import httpx
 import logging
 
+from serialization import JSONResponse, decode
+
 # ==================== CONFIGURATION ====================
 WORDPRESS_URL = "https://04travel.ru"
 WORDPRESS_USERNAME = "oasis"
@@ -24,7 +26,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="WordPress API for ChatGPT",
     description="REST API for managing WordPress content",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=JSONResponse
 )
 
 # CORS
@@ -91,7 +94,7 @@ async def get_posts(per_page: int = 10, page: int = 1, search: Optional[str] = N
             params=params
         )
         response.raise_for_status()
-        posts = response.json()
+        posts = decode(response)
         
         return {
             "success": True,
@@ -127,7 +130,7 @@ async def create_post(request: CreatePostRequest):
             json=payload
         )
         response.raise_for_status()
-        data = response.json()
+        data = decode(response)
         
         return {
             "success": True,
@@ -157,7 +160,7 @@ async def update_post(post_id: int, request: UpdatePostRequest):
             json=payload
         )
         response.raise_for_status()
-        data = response.json()
+        data = decode(response)
         
         return {
             "success": True,
@@ -194,7 +197,7 @@ async def get_categories():
             f"{WORDPRESS_URL}/wp-json/wp/v2/categories?per_page=100"
         )
         response.raise_for_status()
-        categories = response.json()
+        categories = decode(response)
         
         return {
             "success": True,
@@ -217,7 +220,7 @@ async def get_site_info():
     try:
         response = await client.get(f"{WORDPRESS_URL}/wp-json")
         response.raise_for_status()
-        data = response.json()
+        data = decode(response)
         
         return {
             "success": True,
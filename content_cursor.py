@@ -0,0 +1,189 @@
+"""
+Slicing of large post/page bodies into continuation-token pages.
+
+A long body is split on block boundaries (top-level HTML block elements,
+Gutenberg block comments, blank lines in text) and packed into slices of at
+most `max_bytes` UTF-8 bytes. The first slice is returned right away; the
+rest wait in a short-lived in-memory store and are handed out by opaque
+tokens, so following a cursor never goes back to WordPress.
+"""
+
+import re
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+DEFAULT_TTL = 300.0
+DEFAULT_MAX_ENTRIES = 64
+MIN_SLICE_BYTES = 1024
+
+BLOCK_TAGS = {
+    "p", "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "dl", "figure", "blockquote",
+    "table", "pre", "div", "section", "article", "aside", "header", "footer", "nav",
+    "details", "form", "hr", "video", "audio", "iframe", "script", "style",
+}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+TOKEN_RE = re.compile(r"<!--.*?-->|<(/?)([a-zA-Z][a-zA-Z0-9-]*)[^>]*?(/?)>", re.S)
+BLANK_LINES_RE = re.compile(r"\n\s*\n")
+
+
+def _utf8_len(text: str) -> int:
+    return len(text.encode("utf-8"))
+
+
+def split_blocks(content: str, html: bool = True) -> List[str]:
+    """Split content into top-level blocks; joining them gives the content back"""
+    if not html:
+        cuts = [m.end() for m in BLANK_LINES_RE.finditer(content)]
+    else:
+        # Inside a Gutenberg block (raw content) only its closing comment is a boundary
+        cuts, stack, blocks_open = [], [], 0
+        for m in TOKEN_RE.finditer(content):
+            token = m.group(0)
+            if token.startswith("<!--"):
+                if token.startswith("<!-- wp:"):
+                    if token.endswith("/-->"):
+                        if not blocks_open and not stack:
+                            cuts.append(m.end())
+                    else:
+                        blocks_open += 1
+                elif token.startswith("<!-- /wp:") and blocks_open:
+                    blocks_open -= 1
+                    if not blocks_open and not stack:
+                        cuts.append(m.end())
+                continue
+            closing, name, self_closing = m.group(1), m.group(2).lower(), m.group(3)
+            if closing:
+                if name in stack:
+                    while stack.pop() != name:
+                        pass
+                    if not stack and not blocks_open and name in BLOCK_TAGS:
+                        cuts.append(m.end())
+            elif name in VOID_TAGS or self_closing:
+                if not stack and not blocks_open and name in BLOCK_TAGS:
+                    cuts.append(m.end())
+            else:
+                if name == "p" and stack and stack[-1] == "p":
+                    stack.pop()  # <p> implicitly closes an open <p>
+                stack.append(name)
+    blocks, start = [], 0
+    for cut in cuts:
+        # Keep the whitespace after a boundary with the block before it
+        while cut < len(content) and content[cut] in " \t\r\n":
+            cut += 1
+        if cut > start:
+            blocks.append(content[start:cut])
+            start = cut
+    if start < len(content):
+        blocks.append(content[start:])
+    return blocks
+
+
+def _hard_split(block: str, max_bytes: int) -> List[str]:
+    """Split a block larger than max_bytes at whitespace, never inside a tag"""
+    pieces = []
+    while _utf8_len(block) > max_bytes:
+        # Characters that fit, measured in bytes
+        cut = len(block.encode("utf-8")[:max_bytes].decode("utf-8", "ignore"))
+        head = block[:cut]
+        if head.rfind("<") > head.rfind(">"):
+            cut = head.rfind("<")
+        space = max(block.rfind(" ", 0, cut), block.rfind("\n", 0, cut))
+        if space > cut // 2:
+            cut = space + 1
+        cut = max(cut, 1)
+        pieces.append(block[:cut])
+        block = block[cut:]
+    pieces.append(block)
+    return pieces
+
+
+def make_slices(content: str, max_bytes: int, html: bool = True) -> List[str]:
+    """Pack blocks greedily into slices of at most max_bytes"""
+    max_bytes = max(MIN_SLICE_BYTES, max_bytes)
+    slices, current, size = [], [], 0
+    for block in split_blocks(content, html):
+        block_size = _utf8_len(block)
+        if block_size > max_bytes:
+            parts = _hard_split(block, max_bytes)
+        else:
+            parts = [block]
+        for part in parts:
+            part_size = _utf8_len(part)
+            if current and size + part_size > max_bytes:
+                slices.append("".join(current))
+                current, size = [], 0
+            current.append(part)
+            size += part_size
+    if current or not slices:
+        slices.append("".join(current))
+    return slices
+
+
+class ContentCursors:
+    """Short-lived store of remaining slices, addressed by continuation tokens"""
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.served = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, e in self._entries.items() if e["expires"] <= now]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def open(self, content: str, max_bytes: int, html: bool = True, **meta) -> Dict[str, Any]:
+        """Slice content; returns the first slice and, if more remain, a cursor"""
+        slices = make_slices(content, max_bytes, html)
+        key = None
+        if len(slices) > 1:
+            key = secrets.token_urlsafe(12)
+            self._entries[key] = {
+                "slices": slices, "meta": meta,
+                "total_bytes": _utf8_len(content), "expires": time.monotonic() + self.ttl,
+            }
+            self._purge()
+        return self._page(key, slices, 0, _utf8_len(content), meta)
+
+    def next(self, cursor: str) -> Dict[str, Any]:
+        """Slice addressed by a continuation token
+
+        Raises:
+            LookupError: The token is unknown or has expired
+        """
+        key, _, index = cursor.rpartition(".")
+        self._purge()
+        entry = self._entries.get(key)
+        if entry is None or not index.isdigit() or not 0 < int(index) < len(entry["slices"]):
+            self.expired += 1
+            raise LookupError("Continuation cursor is invalid or expired; fetch the content again")
+        # Each access extends the lifetime, so slow readers can finish
+        entry["expires"] = time.monotonic() + self.ttl
+        self._entries.move_to_end(key)
+        self.served += 1
+        return self._page(key, entry["slices"], int(index), entry["total_bytes"], entry["meta"])
+
+    @staticmethod
+    def _page(key: Optional[str], slices: List[str], index: int, total_bytes: int,
+              meta: Dict[str, Any]) -> Dict[str, Any]:
+        more = key is not None and index + 1 < len(slices)
+        return {
+            "content": slices[index],
+            "slice": index,
+            "slices": len(slices),
+            "total_bytes": total_bytes,
+            "next_cursor": f"{key}.{index + 1}" if more else None,
+            **meta,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {"open": len(self), "served": self.served, "expired": self.expired}
@@ -0,0 +1,285 @@
+"""
+Local SQLite mirror of WordPress content.
+
+Posts, pages and media are synced incrementally with `modified_after` +
+`orderby=modified` cursors; deletions are detected by periodically
+reconciling the full ID set. Terms and users are small and are refreshed
+wholesale. Writes made through the same WordPressClient are applied to the
+mirror immediately, so reads stay consistent with our own changes.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from pagination import fetch_all
+
+logger = logging.getLogger(__name__)
+
+# Kinds synced with a modified_after cursor (the rest are refreshed wholesale)
+INCREMENTAL_KINDS = ("posts", "pages", "media")
+FULL_KINDS = ("categories", "tags", "users")
+KINDS = INCREMENTAL_KINDS + FULL_KINDS
+
+# Post statuses to mirror; `any` would skip private posts for some roles
+POST_STATUSES = "publish,future,draft,pending,private"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    kind TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    slug TEXT,
+    status TEXT,
+    date TEXT,
+    modified TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (kind, id)
+);
+CREATE INDEX IF NOT EXISTS objects_slug ON objects (kind, slug);
+CREATE INDEX IF NOT EXISTS objects_date ON objects (kind, date);
+CREATE TABLE IF NOT EXISTS sync_state (
+    kind TEXT PRIMARY KEY,
+    cursor TEXT,
+    last_sync REAL,
+    last_reconcile REAL
+);
+"""
+
+
+def _row(kind: str, item: Dict[str, Any]) -> Tuple:
+    return (
+        kind,
+        item["id"],
+        item.get("slug"),
+        item.get("status"),
+        item.get("date"),
+        item.get("modified"),
+        json.dumps(item, ensure_ascii=False),
+    )
+
+
+class ContentMirror:
+    """SQLite-backed copy of site content kept current by a sync loop"""
+
+    def __init__(
+        self,
+        path: str,
+        client,
+        interval: float = 60.0,
+        reconcile_interval: float = 900.0
+    ):
+        """
+        Args:
+            path: SQLite database file (":memory:" for a throwaway mirror)
+            client: WordPressClient used for syncing
+            interval: Seconds between incremental syncs
+            reconcile_interval: Seconds between deletion reconciliations
+        """
+        self.path = path
+        self.client = client
+        self.interval = interval
+        self.reconcile_interval = reconcile_interval
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        client.on_write(self.apply_write)
+
+    # ---------- sync state ----------
+
+    def _state(self, kind: str) -> Dict[str, Any]:
+        row = self.db.execute(
+            "SELECT cursor, last_sync, last_reconcile FROM sync_state WHERE kind = ?", (kind,)
+        ).fetchone()
+        if row is None:
+            return {"cursor": None, "last_sync": 0.0, "last_reconcile": 0.0}
+        return {"cursor": row[0], "last_sync": row[1] or 0.0, "last_reconcile": row[2] or 0.0}
+
+    def _save_state(self, kind: str, **changes) -> None:
+        state = {**self._state(kind), **changes}
+        self.db.execute(
+            "INSERT OR REPLACE INTO sync_state (kind, cursor, last_sync, last_reconcile) VALUES (?, ?, ?, ?)",
+            (kind, state["cursor"], state["last_sync"], state["last_reconcile"])
+        )
+        self.db.commit()
+
+    def is_fresh(self, kind: str, max_age: float) -> bool:
+        """True if `kind` was synced within the last max_age seconds"""
+        return time.time() - self._state(kind)["last_sync"] <= max_age
+
+    # ---------- writes ----------
+
+    def upsert(self, kind: str, items: List[Dict[str, Any]]) -> None:
+        self.db.executemany(
+            "INSERT OR REPLACE INTO objects (kind, id, slug, status, date, modified, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [_row(kind, item) for item in items if "id" in item]
+        )
+        self.db.commit()
+
+    def delete(self, kind: str, ids: List[int]) -> None:
+        self.db.executemany("DELETE FROM objects WHERE kind = ? AND id = ?", [(kind, i) for i in ids])
+        self.db.commit()
+
+    def apply_write(self, method: str, resource: str, data: Any) -> None:
+        """Client write listener: mirror the object WordPress returned"""
+        kind = resource.rsplit("/", 1)[-1]
+        if not resource.startswith("wp/v2/") or kind not in KINDS or not isinstance(data, dict):
+            return
+        if method == "DELETE" and data.get("deleted"):
+            previous = data.get("previous") or {}
+            if "id" in previous:
+                self.delete(kind, [previous["id"]])
+        elif "id" in data:
+            self.upsert(kind, [data])
+
+    # ---------- sync ----------
+
+    async def _sync_incremental(self, kind: str) -> int:
+        state = self._state(kind)
+        params: Dict[str, Any] = {"orderby": "modified", "order": "asc"}
+        if kind != "media":
+            params["status"] = POST_STATUSES
+        if state["cursor"]:
+            # modified_after is exclusive and second-granular; step back one
+            # second so items sharing the cursor timestamp are not skipped
+            after = datetime.fromisoformat(state["cursor"]) - timedelta(seconds=1)
+            params["modified_after"] = after.isoformat()
+
+        cursor = state["cursor"]
+        count = 0
+        buffer: List[Dict[str, Any]] = []
+        async for item in self.client.paginate(kind, params):
+            buffer.append(item)
+            if item.get("modified") and (cursor is None or item["modified"] > cursor):
+                cursor = item["modified"]
+            if len(buffer) >= 200:
+                self.upsert(kind, buffer)
+                count += len(buffer)
+                buffer = []
+        self.upsert(kind, buffer)
+        count += len(buffer)
+        self._save_state(kind, cursor=cursor, last_sync=time.time())
+        return count
+
+    async def _sync_full(self, kind: str) -> int:
+        items = await fetch_all(self.client, kind)
+        self.db.execute("DELETE FROM objects WHERE kind = ?", (kind,))
+        self.upsert(kind, items)
+        now = time.time()
+        self._save_state(kind, last_sync=now, last_reconcile=now)
+        return len(items)
+
+    async def reconcile(self, kind: str) -> int:
+        """Remove mirrored objects that no longer exist upstream"""
+        params: Dict[str, Any] = {"_fields": "id"}
+        if kind != "media":
+            params["status"] = POST_STATUSES
+        remote = {item["id"] for item in await fetch_all(self.client, kind, params)}
+        local = {row[0] for row in self.db.execute("SELECT id FROM objects WHERE kind = ?", (kind,))}
+        gone = sorted(local - remote)
+        self.delete(kind, gone)
+        self._save_state(kind, last_reconcile=time.time())
+        return len(gone)
+
+    async def sync(self, kinds: Optional[List[str]] = None, reconcile: bool = False) -> Dict[str, Any]:
+        """Run one sync pass
+
+        Args:
+            kinds: Kinds to sync (default: all)
+            reconcile: Force deletion reconciliation for incremental kinds
+        """
+        report = {}
+        async with self._lock:
+            for kind in kinds or KINDS:
+                try:
+                    if kind in FULL_KINDS:
+                        report[kind] = {"synced": await self._sync_full(kind)}
+                        continue
+                    report[kind] = {"synced": await self._sync_incremental(kind)}
+                    due = time.time() - self._state(kind)["last_reconcile"] >= self.reconcile_interval
+                    if reconcile or due:
+                        report[kind]["removed"] = await self.reconcile(kind)
+                except Exception as e:
+                    logger.error(f"Mirror sync of {kind} failed: {e}")
+                    report[kind] = {"error": str(e)}
+        return report
+
+    async def run(self) -> None:
+        """Sync forever, every `interval` seconds"""
+        while True:
+            await self.sync()
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start the background sync loop (needs a running event loop)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    # ---------- reads ----------
+
+    def get(self, kind: str, object_id: Optional[int] = None, slug: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Look up one object by ID or slug"""
+        if object_id is not None:
+            row = self.db.execute("SELECT data FROM objects WHERE kind = ? AND id = ?", (kind, object_id)).fetchone()
+        else:
+            row = self.db.execute("SELECT data FROM objects WHERE kind = ? AND slug = ?", (kind, slug)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list(
+        self,
+        kind: str,
+        status: Optional[str] = None,
+        page: int = 1,
+        per_page: Optional[int] = 10
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """List objects newest first, like the REST collection default
+
+        Args:
+            kind: Object kind
+            status: Status filter ("any" or None for all)
+            page: Page number
+            per_page: Page size (None returns everything)
+
+        Returns:
+            (items, total matching)
+        """
+        where, args = "kind = ?", [kind]
+        if status and status != "any":
+            where += " AND status = ?"
+            args.append(status)
+        total = self.db.execute(f"SELECT COUNT(*) FROM objects WHERE {where}", args).fetchone()[0]
+        query = f"SELECT data FROM objects WHERE {where} ORDER BY date DESC, id DESC"
+        if per_page is not None:
+            query += " LIMIT ? OFFSET ?"
+            args += [per_page, (max(1, page) - 1) * per_page]
+        return [json.loads(row[0]) for row in self.db.execute(query, args)], total
+
+    def stats(self) -> Dict[str, Any]:
+        counts = dict(self.db.execute("SELECT kind, COUNT(*) FROM objects GROUP BY kind"))
+        now = time.time()
+        return {
+            "path": self.path,
+            "running": self._task is not None and not self._task.done(),
+            "kinds": {
+                kind: {
+                    "objects": counts.get(kind, 0),
+                    "age": round(now - self._state(kind)["last_sync"], 1) if self._state(kind)["last_sync"] else None,
+                    "cursor": self._state(kind)["cursor"],
+                }
+                for kind in KINDS
+            }
+        }
+
+    def close(self) -> None:
+        self.db.close()
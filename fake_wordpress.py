@@ -0,0 +1,753 @@
+"""
+In-process fake of the WordPress REST API for offline tests and benchmarks.
+
+A Starlette app with a generated dataset that behaves like /wp-json on a
+real site where it matters to this project:
+
+- wp/v2 posts, pages, categories, tags, media, users and comments: listing
+  with paging (X-WP-Total / X-WP-TotalPages / Link), the usual filters
+  (search, status, include/exclude, slug, categories, tags, post, parent,
+  after/before, modified_after/modified_before, orderby/order), `_fields`
+  with dotted paths, view/edit contexts, create/update/delete with trash,
+  term_exists errors and raw-body media uploads served back from
+  /wp-content/uploads
+- the /wp-json index and batch/v1
+- ETag / If-None-Match on every GET
+- Basic auth for writes and context=edit
+
+Latency, jitter and error rates are configurable per route ("posts",
+"media", "batch", "index", "uploads" or "*"). Plug it into the client with
+an httpx transport:
+
+    fake = FakeWordPress(posts=500)
+    fake.configure("posts", latency=0.05, error_rate=0.01)
+    client = fake.client()            # WordPressClient over fake.transport()
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+BASE_URL = "https://wp.test"
+USERNAME = "admin"
+PASSWORD = "secret"
+MAX_PER_PAGE = 100
+MAX_BATCH = 25
+START_DATE = datetime(2020, 1, 1, 9, 0, 0)
+
+COLLECTIONS = ("posts", "pages", "categories", "tags", "media", "users", "comments")
+POST_TYPES = ("posts", "pages")
+TERMS = ("categories", "tags")
+# Fields written through the API (others are read-only)
+WRITABLE = {
+    "posts": {"title", "content", "excerpt", "status", "slug", "date", "author", "featured_media",
+              "comment_status", "ping_status", "sticky", "categories", "tags", "meta", "format", "template"},
+    "pages": {"title", "content", "excerpt", "status", "slug", "date", "author", "featured_media",
+              "comment_status", "parent", "menu_order", "meta", "template"},
+    "categories": {"name", "slug", "description", "parent", "meta"},
+    "tags": {"name", "slug", "description", "meta"},
+    "media": {"title", "alt_text", "caption", "description", "post", "slug", "status"},
+    "users": {"name", "description", "url", "email", "roles", "slug"},
+    "comments": {"content", "status", "post", "parent", "author_name", "author_email"},
+}
+RENDERED = ("title", "content", "excerpt", "caption", "description", "guid")
+
+WORDS = (
+    "путешествие отель море пляж горы озеро маршрут экскурсия гостиница билет самолёт поезд "
+    "автобус город деревня музей храм крепость парк заповедник остров река набережная ресторан "
+    "кухня вино сыр рынок сувенир виза погода зима лето осень весна байкал алтай камчатка крым "
+    "сочи карелия кавказ урал сибирь тур отдых семья дети бюджет цена скидка"
+).split()
+
+
+@dataclass
+class RouteBehavior:
+    """Injected behaviour of one route
+
+    latency: Seconds added to every response
+    jitter: Extra uniformly random seconds (0..jitter)
+    error_rate: Probability of answering with error_status instead
+    error_status: Status of injected errors
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 500
+
+
+class WPError(Exception):
+    def __init__(self, status: int, code: str, message: str, **data):
+        super().__init__(message)
+        self.status = status
+        self.body = {"code": code, "message": message, "data": {"status": status, **data}}
+
+
+def _iso(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _slugify(text: str) -> str:
+    return re.sub(r"[^\w]+", "-", text.lower()).strip("-") or "item"
+
+
+def _int_list(value: Any) -> List[int]:
+    if isinstance(value, list):
+        return [int(v) for v in value]
+    return [int(v) for v in str(value).split(",") if v.strip()]
+
+
+def _str_list(value: Any) -> List[str]:
+    return value if isinstance(value, list) else [v for v in str(value).split(",") if v]
+
+
+def _strip_blocks(raw: str) -> str:
+    """Rendered content: Gutenberg block comments removed"""
+    return re.sub(r"<!-- /?wp:[^>]*-->\n?", "", raw)
+
+
+def filter_fields(item: Dict[str, Any], fields: str) -> Dict[str, Any]:
+    """Apply `_fields`, including dotted paths such as title.raw"""
+    result: Dict[str, Any] = {}
+    for path in [f.strip() for f in fields.split(",") if f.strip()]:
+        source, target, parts = item, result, path.split(".")
+        for i, part in enumerate(parts):
+            if not isinstance(source, dict) or part not in source:
+                break
+            if i == len(parts) - 1:
+                target[part] = source[part]
+            else:
+                source = source[part]
+                existing = target.get(part)
+                target = target.setdefault(part, {}) if isinstance(existing, dict) or existing is None else existing
+    return result
+
+
+class FakeWordPress:
+    """Generated WordPress site behind an ASGI app
+
+    Args:
+        posts, pages, categories, tags, media, users, comments: Dataset size
+        paragraphs: (min, max) paragraphs per post/page body
+        seed: Seed of the dataset and of injected faults
+        base_url: Site URL the client should use
+        username, password: Basic auth credentials required for writes
+        escape_unicode: Escape non-ASCII in JSON like WordPress does
+    """
+
+    def __init__(
+        self,
+        posts: int = 50,
+        pages: int = 10,
+        categories: int = 10,
+        tags: int = 30,
+        media: int = 20,
+        users: int = 3,
+        comments: int = 100,
+        paragraphs: Tuple[int, int] = (3, 10),
+        seed: int = 1,
+        base_url: str = BASE_URL,
+        username: str = USERNAME,
+        password: str = PASSWORD,
+        escape_unicode: bool = True
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.username = username
+        self.password = password
+        self.escape_unicode = escape_unicode
+        self.paragraphs = paragraphs
+        self.rng = random.Random(seed)
+        self.fault_rng = random.Random(seed + 1)
+        self.behavior: Dict[str, RouteBehavior] = {}
+        self.data: Dict[str, Dict[int, Dict[str, Any]]] = {c: {} for c in COLLECTIONS}
+        self.files: Dict[str, Tuple[bytes, str]] = {}
+        self.next_id = 1
+        self.clock = START_DATE
+        # (method, route) -> count, for assertions in tests
+        self.calls: Dict[Tuple[str, str], int] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._generate(posts, pages, categories, tags, media, users, comments)
+        self.app = Starlette(routes=[
+            Route("/wp-json", self._index_endpoint, methods=["GET"]),
+            Route("/wp-json/", self._index_endpoint, methods=["GET"]),
+            Route("/wp-json/batch/v1", self._batch_endpoint, methods=["POST"]),
+            Route("/wp-json/wp/v2/{collection}", self._rest_endpoint, methods=["GET", "POST"]),
+            Route("/wp-json/wp/v2/{collection}/{item}", self._rest_endpoint,
+                  methods=["GET", "POST", "PUT", "PATCH", "DELETE"]),
+            Route("/wp-content/uploads/{path:path}", self._file_endpoint, methods=["GET"]),
+        ])
+
+    # ---------- wiring ----------
+
+    def transport(self) -> httpx.ASGITransport:
+        return httpx.ASGITransport(app=self.app)
+
+    def client(self, **kwargs):
+        """WordPressClient talking to this site"""
+        from mcp_server import WordPressClient
+        return WordPressClient(self.base_url, self.username, self.password, transport=self.transport(), **kwargs)
+
+    def http_client(self, **kwargs) -> httpx.AsyncClient:
+        """Plain client, e.g. for downloading media files"""
+        return httpx.AsyncClient(transport=self.transport(), base_url=self.base_url, **kwargs)
+
+    def configure(self, route: str = "*", **options) -> RouteBehavior:
+        """Set latency/jitter/error_rate/error_status of a route ("*" for all)"""
+        behavior = RouteBehavior(**{**self.behavior.get(route, RouteBehavior()).__dict__, **options})
+        self.behavior[route] = behavior
+        return behavior
+
+    def reset_faults(self) -> None:
+        self.behavior.clear()
+
+    # ---------- dataset ----------
+
+    def _id(self) -> int:
+        value = self.next_id
+        self.next_id += 1
+        return value
+
+    def _tick(self) -> datetime:
+        """Writes advance a simulated clock, so every change gets a new `modified`"""
+        self.clock += timedelta(seconds=1)
+        return self.clock
+
+    def _sentence(self, n: int) -> str:
+        return " ".join(self.rng.choice(WORDS) for _ in range(n))
+
+    def _body(self) -> str:
+        count = self.rng.randint(*self.paragraphs)
+        blocks = []
+        for i in range(count):
+            if i and i % 4 == 0:
+                blocks.append(f"<!-- wp:heading -->\n<h2>{self._sentence(4).capitalize()}</h2>\n<!-- /wp:heading -->")
+            blocks.append(
+                f"<!-- wp:paragraph -->\n<p>{self._sentence(self.rng.randint(20, 60)).capitalize()}.</p>\n"
+                "<!-- /wp:paragraph -->"
+            )
+        return "\n\n".join(blocks)
+
+    def _generate(self, posts, pages, categories, tags, media, users, comments) -> None:
+        rng = self.rng
+        for i in range(users):
+            name = f"Автор {i + 1}" if i else "Администратор"
+            self._store("users", {
+                "id": self._id(), "name": name, "slug": "admin" if i == 0 else f"author-{i}",
+                "username": "admin" if i == 0 else f"author-{i}", "email": f"user{i}@wp.test",
+                "description": "", "url": "", "roles": ["administrator" if i == 0 else "author"],
+            })
+        user_ids = list(self.data["users"])
+        for taxonomy, count in (("categories", categories), ("tags", tags)):
+            for i in range(count):
+                name = f"{self._sentence(1).capitalize()} {i + 1}"
+                term = {"id": self._id(), "name": name, "slug": _slugify(name), "description": "", "meta": []}
+                if taxonomy == "categories":
+                    term["parent"] = 0
+                self._store(taxonomy, term)
+        category_ids, tag_ids = list(self.data["categories"]), list(self.data["tags"])
+        span = max(posts + pages + media, 1)
+        for kind, count in (("posts", posts), ("pages", pages)):
+            for i in range(count):
+                created = START_DATE - timedelta(hours=6 * (span - len(self.data["posts"]) - len(self.data["pages"])))
+                title = self._sentence(rng.randint(3, 8)).capitalize()
+                item = {
+                    "id": self._id(), "date": created, "modified": created + timedelta(hours=rng.randint(0, 48)),
+                    "slug": _slugify(title) + f"-{i + 1}", "status": "publish" if rng.random() > 0.1 else "draft",
+                    "title": title, "content": self._body(), "excerpt": self._sentence(25),
+                    "author": rng.choice(user_ids) if user_ids else 0, "featured_media": 0,
+                    "comment_status": "open", "ping_status": "open", "template": "", "meta": {"footnotes": ""},
+                }
+                if kind == "posts":
+                    item.update(sticky=False, format="standard",
+                                categories=rng.sample(category_ids, min(len(category_ids), rng.randint(1, 2))),
+                                tags=rng.sample(tag_ids, min(len(tag_ids), rng.randint(0, 4))))
+                else:
+                    item.update(parent=0, menu_order=i)
+                self._store(kind, item)
+        post_ids = list(self.data["posts"])
+        for i in range(media):
+            ext = rng.choice(("jpg", "png", "webp"))
+            content = hashlib.sha256(f"media-{i}".encode()).digest() * rng.randint(16, 64)
+            self._add_media(f"photo-{i + 1}.{ext}", content, f"image/{'jpeg' if ext == 'jpg' else ext}",
+                            {"title": f"Фото {i + 1}", "alt_text": self._sentence(3),
+                             "post": rng.choice(post_ids) if post_ids else 0},
+                            START_DATE - timedelta(hours=media - i))
+        for i in range(comments):
+            if not post_ids:
+                break
+            created = START_DATE - timedelta(minutes=comments - i)
+            self._store("comments", {
+                "id": self._id(), "post": rng.choice(post_ids), "parent": 0, "author": 0,
+                "author_name": f"Гость {i + 1}", "author_email": f"guest{i}@example.com",
+                "date": created, "content": self._sentence(rng.randint(5, 30)).capitalize(),
+                "status": "approved" if rng.random() > 0.2 else "hold", "type": "comment",
+            })
+        self._recount()
+
+    def _store(self, collection: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        self.data[collection][item["id"]] = item
+        return item
+
+    def _add_media(self, filename: str, content: bytes, mime_type: str,
+                   fields: Dict[str, Any], created: Optional[datetime] = None) -> Dict[str, Any]:
+        created = created or self._tick()
+        path = f"{created:%Y/%m}/{filename}"
+        while path in self.files:
+            stem, _, ext = path.rpartition(".")
+            path = f"{stem}-1.{ext}"
+        self.files[path] = (content, mime_type)
+        media_id = self._id()
+        title = fields.get("title") or filename.rsplit(".", 1)[0]
+        return self._store("media", {
+            "id": media_id, "date": created, "modified": created, "slug": _slugify(title),
+            "status": "inherit", "title": title, "author": 1, "caption": fields.get("caption", ""),
+            "alt_text": fields.get("alt_text", ""), "description": fields.get("description", ""),
+            "media_type": "image" if mime_type.startswith("image/") else "file", "mime_type": mime_type,
+            "post": int(fields.get("post") or 0) or None, "path": path,
+            "media_details": {"filesize": len(content), "file": path},
+        })
+
+    def _recount(self) -> None:
+        for taxonomy in TERMS:
+            for term in self.data[taxonomy].values():
+                term["count"] = sum(
+                    1 for post in self.data["posts"].values()
+                    if term["id"] in post.get(taxonomy, []) and post["status"] == "publish"
+                )
+
+    # ---------- representation ----------
+
+    def render(self, collection: str, item: Dict[str, Any], context: str = "view") -> Dict[str, Any]:
+        """REST representation of a stored object"""
+        edit = context == "edit"
+        out: Dict[str, Any] = {}
+        for key, value in item.items():
+            if key == "path" or (key in ("username", "email", "author_email", "roles") and not edit):
+                continue
+            if isinstance(value, datetime):
+                out[key] = _iso(value)
+                out[f"{key}_gmt"] = _iso(value - timedelta(hours=3))
+            elif key in RENDERED and collection not in ("users",) + TERMS:
+                rendered = _strip_blocks(value) if key == "content" else value
+                if key in ("excerpt", "caption", "description") or (key == "content" and collection == "comments"):
+                    rendered = f"<p>{rendered}</p>\n" if rendered else ""
+                field = {"rendered": rendered}
+                if edit:
+                    field["raw"] = value
+                if key in ("content", "excerpt") and collection in POST_TYPES:
+                    field["protected"] = False
+                out[key] = field
+            else:
+                out[key] = value
+        item_id = item["id"]
+        if collection in POST_TYPES:
+            out["type"] = collection[:-1]
+            out["link"] = f"{self.base_url}/{item['slug']}/"
+            out["guid"] = {"rendered": f"{self.base_url}/?p={item_id}"}
+        elif collection in TERMS:
+            out["taxonomy"] = "category" if collection == "categories" else "post_tag"
+            out["link"] = f"{self.base_url}/{'category' if collection == 'categories' else 'tag'}/{item['slug']}/"
+        elif collection == "media":
+            out["type"] = "attachment"
+            out["source_url"] = f"{self.base_url}/wp-content/uploads/{item['path']}"
+            out["link"] = f"{self.base_url}/{item['slug']}/"
+        elif collection == "users":
+            out["link"] = f"{self.base_url}/author/{item['slug']}/"
+            out["avatar_urls"] = {"48": f"https://secure.gravatar.com/avatar/{item_id}?s=48"}
+        elif collection == "comments":
+            out["link"] = f"{self.base_url}/?p={item['post']}#comment-{item_id}"
+        out["_links"] = {
+            "self": [{"href": f"{self.base_url}/wp-json/wp/v2/{collection}/{item_id}"}],
+            "collection": [{"href": f"{self.base_url}/wp-json/wp/v2/{collection}"}],
+        }
+        return out
+
+    def site_index(self) -> Dict[str, Any]:
+        routes = {"/": {}, "/batch/v1": {}}
+        for collection in COLLECTIONS:
+            routes[f"/wp/v2/{collection}"] = {"namespace": "wp/v2", "methods": ["GET", "POST"]}
+            routes[f"/wp/v2/{collection}/(?P<id>[\\d]+)"] = {
+                "namespace": "wp/v2", "methods": ["GET", "POST", "PUT", "PATCH", "DELETE"]
+            }
+        return {
+            "name": "Fake WordPress",
+            "description": "Путешествия по России",
+            "url": self.base_url,
+            "home": self.base_url,
+            "gmt_offset": 3,
+            "timezone_string": "Europe/Moscow",
+            "namespaces": ["wp/v2", "batch/v1"],
+            "authentication": {"application-passwords": {}},
+            "routes": routes,
+        }
+
+    # ---------- REST semantics ----------
+
+    def list_items(self, collection: str, params: Dict[str, str], authed: bool) -> Tuple[List[Dict[str, Any]], int, int]:
+        """Filtered, sorted page of a collection: (items, total, total pages)"""
+        per_page = int(params.get("per_page", 10))
+        page = int(params.get("page", 1))
+        if not 1 <= per_page <= MAX_PER_PAGE:
+            raise WPError(400, "rest_invalid_param", "Invalid parameter(s): per_page",
+                          params={"per_page": f"per_page must be between 1 ({MAX_PER_PAGE})"})
+        if page < 1:
+            raise WPError(400, "rest_invalid_param", "Invalid parameter(s): page")
+
+        items = list(self.data[collection].values())
+        if collection in POST_TYPES or collection == "comments":
+            default = "publish" if collection in POST_TYPES else "approve"
+            statuses = _str_list(params.get("status", default))
+            if statuses != [default] and not authed:
+                raise WPError(400, "rest_invalid_param", "Status is forbidden.")
+            if "any" not in statuses:
+                wanted = {"approved" if s == "approve" else s for s in statuses}
+                items = [i for i in items if i["status"] in wanted]
+            else:
+                items = [i for i in items if i["status"] != "trash"]
+        if "search" in params:
+            needle = params["search"].lower()
+            keys = ("title", "content", "excerpt") if collection in POST_TYPES else ("name", "slug", "content", "title")
+            items = [i for i in items if any(needle in str(i.get(k, "")).lower() for k in keys)]
+        if "include" in params:
+            wanted = set(_int_list(params["include"]))
+            items = [i for i in items if i["id"] in wanted]
+        if "exclude" in params:
+            unwanted = set(_int_list(params["exclude"]))
+            items = [i for i in items if i["id"] not in unwanted]
+        if "slug" in params:
+            slugs = set(_str_list(params["slug"]))
+            items = [i for i in items if i.get("slug") in slugs]
+        for key in ("categories", "tags"):
+            if key in params:
+                wanted = set(_int_list(params[key]))
+                items = [i for i in items if wanted & set(i.get(key, []))]
+        for key in ("post", "parent", "author"):
+            if key in params and collection != "users":
+                wanted = set(_int_list(params[key]))
+                items = [i for i in items if (i.get(key) or 0) in wanted]
+        if collection in TERMS and params.get("hide_empty") in ("1", "true"):
+            items = [i for i in items if i.get("count")]
+        for key, field, after in (("after", "date", True), ("before", "date", False),
+                                  ("modified_after", "modified", True), ("modified_before", "modified", False)):
+            if key in params:
+                bound = datetime.fromisoformat(params[key].replace("Z", "")[:19])
+                items = [i for i in items if field in i and ((i[field] > bound) if after else (i[field] < bound))]
+
+        orderby = params.get("orderby") or ("name" if collection in TERMS or collection == "users" else "date")
+        if orderby == "include" and "include" in params:
+            order = {v: n for n, v in enumerate(_int_list(params["include"]))}
+            items.sort(key=lambda i: order.get(i["id"], 0))
+        else:
+            key = {"title": "title", "name": "name", "slug": "slug", "modified": "modified",
+                   "id": "id", "count": "count", "date": "date"}.get(orderby, "id")
+            default_order = "asc" if collection in TERMS or collection == "users" else "desc"
+            items.sort(key=lambda i: (i.get(key) is None, i.get(key, 0), i["id"]),
+                       reverse=params.get("order", default_order) == "desc")
+
+        total = len(items)
+        pages = math.ceil(total / per_page) if total else 0
+        if page > max(pages, 1):
+            raise WPError(400, "rest_post_invalid_page_number",
+                          "The page number requested is larger than the number of pages available.")
+        return items[(page - 1) * per_page:page * per_page], total, pages
+
+    def get_item(self, collection: str, item_id: int) -> Dict[str, Any]:
+        item = self.data[collection].get(item_id)
+        if item is None:
+            singular = collection.rstrip("s") if collection not in TERMS else "term"
+            raise WPError(404, f"rest_{singular}_invalid_id", "Invalid ID.")
+        return item
+
+    def write_item(self, collection: str, item_id: Optional[int], fields: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """Create (item_id None) or update an object; returns (status, stored item)"""
+        if collection == "media" and item_id is None:
+            raise WPError(400, "rest_upload_no_data", "No data supplied.")
+        allowed = WRITABLE[collection]
+        values = {}
+        for key, value in fields.items():
+            if key not in allowed:
+                continue
+            if isinstance(value, dict) and "raw" in value:
+                value = value["raw"]
+            if key in ("categories", "tags"):
+                value = _int_list(value)
+            elif key in ("author", "featured_media", "parent", "menu_order", "post"):
+                value = int(value or 0)
+            elif key == "status" and collection == "comments":
+                value = {"approve": "approved", "1": "approved", "0": "hold"}.get(str(value), value)
+            values[key] = value
+
+        if collection in TERMS and "name" in values:
+            for term in self.data[collection].values():
+                if term["name"] == values["name"] and term["id"] != item_id and \
+                        term.get("parent", 0) == values.get("parent", term.get("parent", 0)):
+                    raise WPError(400, "term_exists", "A term with the name provided already exists in this taxonomy.",
+                                  term_id=term["id"])
+
+        now = self._tick()
+        if item_id is None:
+            if collection in POST_TYPES and not values.get("title") and not values.get("content"):
+                raise WPError(400, "empty_content", "Content, title, and excerpt are empty.")
+            if collection == "comments" and not values.get("post"):
+                raise WPError(400, "rest_comment_invalid_post_id", "Sorry, you are not allowed to create this comment without a post.")
+            item = {"id": self._id()}
+            if collection in POST_TYPES:
+                item.update(date=now, modified=now, slug="", status="draft", title="", content="", excerpt="",
+                            author=1, featured_media=0, comment_status="open", ping_status="open",
+                            template="", meta={"footnotes": ""})
+                if collection == "posts":
+                    item.update(sticky=False, format="standard", categories=[], tags=[])
+                else:
+                    item.update(parent=0, menu_order=0)
+            elif collection in TERMS:
+                item.update(name="", slug="", description="", count=0, meta=[])
+                if collection == "categories":
+                    item["parent"] = 0
+            elif collection == "comments":
+                item.update(parent=0, author=0, author_name="", author_email="", date=now,
+                            content="", status="hold", type="comment")
+            elif collection == "users":
+                item.update(name="", slug="", username="", email="", description="", url="", roles=["subscriber"])
+            item.update(values)
+            if not item.get("slug") and collection in POST_TYPES + TERMS:
+                item["slug"] = _slugify(item.get("title") or item.get("name") or str(item["id"]))
+            if collection in POST_TYPES and item["status"] == "publish" and "categories" in item and not item["categories"]:
+                item["categories"] = [min(self.data["categories"])] if self.data["categories"] else []
+            self._store(collection, item)
+            status = 201
+        else:
+            item = self.get_item(collection, item_id)
+            item.update(values)
+            status = 200
+        if "modified" in item:
+            item["modified"] = now
+        if collection in POST_TYPES:
+            self._recount()
+        return status, item
+
+    def delete_item(self, collection: str, item_id: int, force: bool) -> Dict[str, Any]:
+        item = self.get_item(collection, item_id)
+        if collection in ("posts", "pages", "comments") and not force:
+            if item["status"] == "trash":
+                raise WPError(410, "rest_already_trashed", "The item has already been deleted.")
+            item["status"] = "trash"
+            if "modified" in item:
+                item["modified"] = self._tick()
+            return self.render(collection, item, "edit")
+        if not force:
+            raise WPError(501, "rest_trash_not_supported", "Terms do not support trashing. Set 'force' to true to delete.")
+        if collection == "users":
+            raise WPError(501, "rest_user_cannot_delete", "Users need a reassign target; not supported here.")
+        previous = self.render(collection, item, "edit")
+        del self.data[collection][item_id]
+        if collection == "media":
+            self.files.pop(item["path"], None)
+        if collection in POST_TYPES:
+            self._recount()
+        return {"deleted": True, "previous": previous}
+
+    def upload(self, content: bytes, headers: Dict[str, str], params: Dict[str, str]) -> Dict[str, Any]:
+        if not content:
+            raise WPError(400, "rest_upload_no_data", "No data supplied.")
+        disposition = headers.get("content-disposition", "")
+        match = re.search(r"filename\*=UTF-8''([^;]+)", disposition) or re.search(r'filename="?([^";]+)', disposition)
+        if not match:
+            raise WPError(400, "rest_upload_no_content_disposition", "No Content-Disposition supplied.")
+        filename = unquote(match.group(1))
+        mime_type = headers.get("content-type", "application/octet-stream").split(";")[0]
+        return self._add_media(filename, content, mime_type, params)
+
+    def dispatch(self, method: str, path: str, params: Dict[str, str], body: Any,
+                 headers: Dict[str, str], authed: bool, content: bytes = b"") -> Tuple[int, Any, Dict[str, str]]:
+        """Handle one wp/v2 request (HTTP or batch sub-request): (status, body, headers)"""
+        parts = [p for p in path.split("/") if p]
+        if len(parts) < 3 or parts[:2] != ["wp", "v2"] or parts[2] not in COLLECTIONS or len(parts) > 4:
+            raise WPError(404, "rest_no_route", "No route was found matching the URL and request method.")
+        collection = parts[2]
+        item_ref = parts[3] if len(parts) == 4 else None
+        context = params.get("context", "view")
+        if method != "GET" or context == "edit":
+            if not authed:
+                raise WPError(401, "rest_forbidden_context" if method == "GET" else "rest_cannot_create",
+                              "Sorry, you are not allowed to do that.")
+        if item_ref == "me" and collection == "users":
+            item_ref = str(min(self.data["users"]))
+        if item_ref is not None and not item_ref.isdigit():
+            raise WPError(404, "rest_no_route", "No route was found matching the URL and request method.")
+        item_id = int(item_ref) if item_ref is not None else None
+
+        extra: Dict[str, str] = {}
+        if method == "GET":
+            if item_id is None:
+                items, total, pages = self.list_items(collection, params, authed)
+                data: Any = [self.render(collection, i, context) for i in items]
+                extra = {"X-WP-Total": str(total), "X-WP-TotalPages": str(pages)}
+                page = int(params.get("page", 1))
+                links = []
+                query = {k: v for k, v in params.items() if k != "page"}
+                url = f"{self.base_url}/wp-json/wp/v2/{collection}"
+                for rel, target in (("prev", page - 1), ("next", page + 1)):
+                    if 1 <= target <= pages:
+                        qs = "&".join(f"{k}={v}" for k, v in {**query, "page": target}.items())
+                        links.append(f'<{url}?{qs}>; rel="{rel}"')
+                if links:
+                    extra["Link"] = ", ".join(links)
+            else:
+                data = self.render(collection, self.get_item(collection, item_id), context)
+            status = 200
+        elif method == "DELETE":
+            if item_id is None:
+                raise WPError(404, "rest_no_route", "No route was found matching the URL and request method.")
+            data = self.delete_item(collection, item_id, params.get("force") in ("1", "true"))
+            status = 200
+        else:
+            if collection == "media" and item_id is None:
+                item = self.upload(content, headers, params)
+                status = 201
+            else:
+                fields = {k: v for k, v in params.items() if k not in ("context", "_fields", "force")}
+                if isinstance(body, dict):
+                    fields.update(body)
+                status, item = self.write_item(collection, item_id, fields)
+            data = self.render(collection, item, "edit")
+        if "_fields" in params:
+            fields_value = params["_fields"]
+            data = [filter_fields(i, fields_value) for i in data] if isinstance(data, list) \
+                else filter_fields(data, fields_value)
+        return status, data, extra
+
+    # ---------- HTTP ----------
+
+    def _authed(self, request: Request) -> Optional[bool]:
+        """True/False for valid/absent credentials, None for wrong ones"""
+        header = request.headers.get("authorization", "")
+        if not header.lower().startswith("basic "):
+            return False
+        try:
+            user, _, password = base64.b64decode(header[6:]).decode().partition(":")
+        except ValueError:
+            return None
+        return True if (user, password) == (self.username, self.password) else None
+
+    def _json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None,
+              request: Optional[Request] = None) -> Response:
+        payload = json.dumps(body, ensure_ascii=self.escape_unicode, separators=(",", ":")).encode("utf-8")
+        headers = dict(headers or {})
+        if request is not None and request.method == "GET" and status == 200:
+            etag = '"' + hashlib.blake2b(payload, digest_size=12).hexdigest() + '"'
+            headers["ETag"] = etag
+            if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+                return Response(status_code=304, headers=headers)
+        return Response(payload, status_code=status, headers=headers, media_type="application/json; charset=UTF-8")
+
+    async def _behave(self, route: str) -> Optional[Response]:
+        """Apply latency and maybe answer with an injected error"""
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        behavior = self.behavior.get(route) or self.behavior.get("*")
+        if behavior is None:
+            return None
+        delay = behavior.latency + (self.fault_rng.uniform(0, behavior.jitter) if behavior.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if behavior.error_rate and self.fault_rng.random() < behavior.error_rate:
+            return self._json(behavior.error_status, {
+                "code": "injected_error", "message": "Injected fault", "data": {"status": behavior.error_status}
+            })
+        return None
+
+    async def _serve(self, route: str, request: Request, handler) -> Response:
+        key = (request.method, route)
+        self.calls[key] = self.calls.get(key, 0) + 1
+        try:
+            fault = await self._behave(route)
+            if fault is not None:
+                return fault
+            authed = self._authed(request)
+            if authed is None:
+                raise WPError(401, "incorrect_password", "The provided password is an invalid application password.")
+            return await handler(authed)
+        except WPError as e:
+            return self._json(e.status, e.body)
+        finally:
+            self.in_flight -= 1
+
+    async def _index_endpoint(self, request: Request) -> Response:
+        async def handler(authed):
+            data = self.site_index()
+            if "_fields" in request.query_params:
+                data = filter_fields(data, request.query_params["_fields"])
+            return self._json(200, data, request=request)
+        return await self._serve("index", request, handler)
+
+    async def _rest_endpoint(self, request: Request) -> Response:
+        collection = request.path_params["collection"]
+
+        async def handler(authed):
+            params = dict(request.query_params)
+            content = await request.body()
+            body = None
+            if content and "json" in request.headers.get("content-type", "") and collection != "media":
+                try:
+                    body = json.loads(content)
+                except ValueError:
+                    raise WPError(400, "rest_invalid_json", "Invalid JSON body passed.")
+            elif content and "x-www-form-urlencoded" in request.headers.get("content-type", ""):
+                body = dict(parse_qsl(content.decode()))
+            status, data, extra = self.dispatch(
+                request.method, request.url.path[len("/wp-json"):], params, body,
+                dict(request.headers), authed, content
+            )
+            return self._json(status, data, extra, request)
+        return await self._serve(collection, request, handler)
+
+    async def _batch_endpoint(self, request: Request) -> Response:
+        async def handler(authed):
+            try:
+                payload = json.loads(await request.body())
+            except ValueError:
+                raise WPError(400, "rest_invalid_json", "Invalid JSON body passed.")
+            requests = payload.get("requests") if isinstance(payload, dict) else None
+            if not isinstance(requests, list):
+                raise WPError(400, "rest_missing_callback_param", "Missing parameter(s): requests")
+            if len(requests) > MAX_BATCH:
+                raise WPError(400, "rest_invalid_param", "Invalid parameter(s): requests",
+                              params={"requests": f"requests must contain at most {MAX_BATCH} items."})
+            responses = []
+            for sub in requests:
+                split = urlsplit(sub.get("path", ""))
+                params = dict(parse_qsl(split.query))
+                try:
+                    status, data, extra = self.dispatch(
+                        sub.get("method", "POST").upper(), split.path, params, sub.get("body"),
+                        {k.lower(): v for k, v in (sub.get("headers") or {}).items()}, authed
+                    )
+                    responses.append({"body": data, "status": status, "headers": extra})
+                except WPError as e:
+                    responses.append({"body": e.body, "status": e.status, "headers": {}})
+            return self._json(207, {"responses": responses})
+        return await self._serve("batch", request, handler)
+
+    async def _file_endpoint(self, request: Request) -> Response:
+        async def handler(authed):
+            entry = self.files.get(request.path_params["path"])
+            if entry is None:
+                return Response(b"Not Found", status_code=404, media_type="text/html")
+            content, mime_type = entry
+            return Response(content, media_type=mime_type)
+        return await self._serve("uploads", request, handler)
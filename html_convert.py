@@ -0,0 +1,281 @@
+"""
+Rendered HTML to Markdown or plain text.
+
+WordPress returns rendered HTML full of block wrappers, classes and inline
+styles; agents mostly need the words. The converter parses with the stdlib
+HTMLParser into a small tree and renders headings, paragraphs, emphasis,
+links, images, lists, quotes, code and tables, dropping everything else.
+
+Conversions are memoized in a bounded LRU keyed by (kind, id, version,
+format), where version is the object's `modified` timestamp (or a hash of
+the HTML when there is none), so an unchanged post is converted once.
+"""
+
+import hashlib
+import html as html_lib
+import re
+import threading
+from collections import OrderedDict
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+FORMATS = ("html", "markdown", "text")
+DEFAULT_MAX_ENTRIES = 1024
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "form", "button"}
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "aside", "header", "footer", "nav", "main", "figure",
+    "figcaption", "details", "summary", "dl", "dt", "dd", "address", "center",
+}
+HEADINGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+# Leading whitespace that must survive line stripping (code, list/quote indents)
+INDENT = "\x00"
+WHITESPACE_RE = re.compile(r"[ \t\r\n\f ]+")
+BLANK_RUN_RE = re.compile(r"\n{3,}")
+
+
+class Node:
+    __slots__ = ("tag", "attrs", "children")
+
+    def __init__(self, tag: str, attrs: Optional[Dict[str, str]] = None):
+        self.tag = tag
+        self.attrs = attrs or {}
+        self.children: List[Union["Node", str]] = []
+
+
+class _TreeBuilder(HTMLParser):
+    """Forgiving HTML tree builder (unclosed <p>/<li> are closed implicitly)"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node("root")
+        self.stack = [self.root]
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("p", "li", "tr", "td", "th", "dt", "dd"):
+            self._close_open(tag)
+        node = Node(tag, {k: v or "" for k, v in attrs})
+        self.stack[-1].children.append(node)
+        if tag not in VOID_TAGS:
+            self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        self.stack[-1].children.append(Node(tag, {k: v or "" for k, v in attrs}))
+
+    def handle_endtag(self, tag):
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                return
+
+    def handle_data(self, data):
+        self.stack[-1].children.append(data)
+
+    def _close_open(self, tag):
+        # A new <li> closes the previous one in the same list, <p> closes <p>, ...
+        stop = {"li": {"ul", "ol"}, "tr": {"table", "tbody", "thead"}, "td": {"tr"}, "th": {"tr"}}.get(tag, set())
+        for i in range(len(self.stack) - 1, 0, -1):
+            name = self.stack[i].tag
+            if name in stop:
+                return
+            if name == tag or (tag in ("td", "th") and name in ("td", "th")):
+                del self.stack[i:]
+                return
+            if tag == "p" and name != "p" and name not in ("b", "i", "em", "strong", "a", "span"):
+                return
+
+
+def parse(source: str) -> Node:
+    builder = _TreeBuilder()
+    builder.feed(source)
+    builder.close()
+    return builder.root
+
+
+class _Renderer:
+    def __init__(self, markdown: bool):
+        self.markdown = markdown
+
+    def render(self, node: Node) -> str:
+        """Render a subtree; indents stay as INDENT until finish()"""
+        lines = [line.strip(" \t\r\f") for line in self.children(node).split("\n")]
+        return BLANK_RUN_RE.sub("\n\n", "\n".join(lines)).strip()
+
+    def finish(self, node: Node) -> str:
+        return self.render(node).replace(INDENT, " ")
+
+    def children(self, node: Node, pre: bool = False) -> str:
+        parts = []
+        for child in node.children:
+            if isinstance(child, str):
+                parts.append(child if pre else WHITESPACE_RE.sub(" ", child))
+            else:
+                parts.append(self.element(child, pre))
+        return "".join(parts)
+
+    def inline(self, node: Node) -> str:
+        return WHITESPACE_RE.sub(" ", self.children(node)).strip()
+
+    @staticmethod
+    def block(text: str) -> str:
+        text = "\n".join(line.strip(" \t\r\f") for line in text.strip(" \t\r\f\n").split("\n"))
+        return f"\n\n{text}\n\n" if text else ""
+
+    def element(self, node: Node, pre: bool) -> str:
+        tag, md = node.tag, self.markdown
+        if tag in SKIP_TAGS:
+            return ""
+        if tag == "br":
+            return "\n"
+        if tag == "hr":
+            return "\n\n---\n\n" if md else "\n\n"
+        if tag in HEADINGS:
+            text = self.inline(node)
+            return self.block(f"{'#' * HEADINGS[tag]} {text}" if md and text else text)
+        if tag in ("strong", "b"):
+            text = self.children(node, pre)
+            return f"**{text.strip()}**" if md and text.strip() else text
+        if tag in ("em", "i"):
+            text = self.children(node, pre)
+            return f"*{text.strip()}*" if md and text.strip() else text
+        if tag == "a":
+            text = self.children(node, pre)
+            href = node.attrs.get("href", "")
+            if md and href and not href.startswith("#") and text.strip():
+                return f"[{text.strip()}]({href})"
+            return text
+        if tag == "img":
+            alt = node.attrs.get("alt", "").strip()
+            if md and node.attrs.get("src"):
+                return f"![{alt}]({node.attrs['src']})"
+            return f"[{alt}]" if alt else ""
+        if tag == "pre":
+            code = self.children(node, pre=True).strip("\n").replace("\t", "    ").replace(" ", INDENT)
+            return f"\n\n```\n{code}\n```\n\n" if md else f"\n\n{code}\n\n"
+        if tag == "code":
+            text = self.children(node, pre)
+            return text if pre or not md else f"`{text}`"
+        if tag in ("ul", "ol"):
+            return self.list(node)
+        if tag == "blockquote":
+            body = _Renderer(md).render(node)
+            prefix = "> " if md else INDENT * 4
+            return self.block("\n".join(prefix + line if line else prefix.rstrip() for line in body.split("\n")))
+        if tag == "table":
+            return self.table(node)
+        if tag == "figcaption":
+            text = self.inline(node)
+            return self.block(f"*{text}*" if md and text else text)
+        if tag in BLOCK_TAGS:
+            return self.block(self.children(node, pre))
+        return self.children(node, pre)
+
+    def list(self, node: Node) -> str:
+        items, number = [], int(node.attrs.get("start", "1") or 1) if node.tag == "ol" else 0
+        for child in node.children:
+            if not isinstance(child, Node) or child.tag != "li":
+                continue
+            marker = f"{number}. " if node.tag == "ol" else "- "
+            number += 1
+            body = _Renderer(self.markdown).render(child)
+            indent = INDENT * len(marker)
+            lines = [line for line in body.split("\n") if line.strip()] or [""]
+            items.append(marker + lines[0] + "".join(f"\n{indent}{line}" for line in lines[1:]))
+        return "\n\n" + "\n".join(items) + "\n\n" if items else ""
+
+    def table(self, node: Node) -> str:
+        rows = []
+
+        def collect(n: Node):
+            for child in n.children:
+                if isinstance(child, Node):
+                    if child.tag == "tr":
+                        rows.append([
+                            self.inline(cell).replace("|", "\\|") for cell in child.children
+                            if isinstance(cell, Node) and cell.tag in ("td", "th")
+                        ])
+                    else:
+                        collect(child)
+
+        collect(node)
+        rows = [r for r in rows if r]
+        if not rows:
+            return ""
+        if not self.markdown:
+            return self.block("\n".join("\t".join(r) for r in rows))
+        width = max(len(r) for r in rows)
+        rows = [r + [""] * (width - len(r)) for r in rows]
+        lines = ["| " + " | ".join(rows[0]) + " |", "|" + " --- |" * width]
+        lines += ["| " + " | ".join(r) + " |" for r in rows[1:]]
+        return self.block("\n".join(lines))
+
+
+def to_markdown(source: str) -> str:
+    return _Renderer(markdown=True).finish(parse(source))
+
+
+def to_text(source: str) -> str:
+    return _Renderer(markdown=False).finish(parse(source))
+
+
+def convert(source: str, fmt: str) -> str:
+    """Convert rendered HTML to "html" (unchanged), "markdown" or "text" """
+    if fmt == "html":
+        return source
+    if fmt == "markdown":
+        return to_markdown(source)
+    if fmt == "text":
+        return to_text(source)
+    raise ValueError(f"Unknown format: {fmt} (use {', '.join(FORMATS)})")
+
+
+class ConversionCache:
+    """Bounded LRU of converted bodies"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, str]" = OrderedDict()
+        # Bulk conversions run in a worker thread
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def convert(self, source: str, fmt: str, kind: str = "", object_id: Any = None,
+                version: Optional[str] = None) -> str:
+        """Convert with memoization; without an id or version the HTML itself is the key"""
+        if fmt == "html" or not source:
+            return source
+        if object_id is None or not version:
+            version = hashlib.blake2b(source.encode("utf-8"), digest_size=16).hexdigest()
+        key = (kind, object_id, version, fmt)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return result
+            self.misses += 1
+        result = convert(source, fmt)
+        with self._lock:
+            self._entries[key] = result
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+def plain_title(title: str) -> str:
+    """Rendered titles carry entities (&#8220; ...) and the odd tag"""
+    return html_lib.unescape(re.sub(r"<[^>]+>", "", title))
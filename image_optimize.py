@@ -0,0 +1,176 @@
+"""
+Pre-upload image optimization.
+
+Images are resized to a maximum edge, rotated according to their EXIF
+orientation, stripped of metadata and re-encoded as WebP, AVIF or JPEG in a
+ProcessPoolExecutor, so a batch uses every core instead of one. Results are
+kept in a disk cache keyed by the SHA-256 of the source plus the options:
+uploading the same source again reuses the encoded file.
+
+Pillow is optional; without it optimization raises RuntimeError and uploads
+can still go out unchanged.
+"""
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+# Bump when the encoding pipeline changes so cached files are rebuilt
+PIPELINE_VERSION = 1
+FORMATS = {"webp": ("WEBP", ".webp", "image/webp"),
+           "avif": ("AVIF", ".avif", "image/avif"),
+           "jpeg": ("JPEG", ".jpg", "image/jpeg")}
+# Source types worth re-encoding; GIFs are left alone to keep animations
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".tif", ".tiff", ".bmp", ".avif", ".heic"}
+HASH_CHUNK = 1024 * 1024
+
+
+def available() -> bool:
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def is_image(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+
+
+@dataclass(frozen=True)
+class OptimizeOptions:
+    """Target encoding: format (webp, avif, jpeg), quality 1-100, longest edge in pixels"""
+
+    format: str = "webp"
+    quality: int = 82
+    max_size: int = 2560
+
+    def __post_init__(self):
+        if self.format not in FORMATS:
+            raise ValueError(f"Unsupported image format: {self.format} (use {', '.join(FORMATS)})")
+        if not 1 <= self.quality <= 100:
+            raise ValueError("quality must be between 1 and 100")
+
+    @property
+    def extension(self) -> str:
+        return FORMATS[self.format][1]
+
+    @property
+    def mime_type(self) -> str:
+        return FORMATS[self.format][2]
+
+    def key(self) -> str:
+        return f"v{PIPELINE_VERSION}-{self.format}-q{self.quality}-{self.max_size}"
+
+
+@dataclass
+class OptimizedImage:
+    path: str
+    mime_type: str
+    extension: str
+    original_bytes: int
+    bytes: int
+    cached: bool
+
+
+def encode_image(source: str, target: str, image_format: str, quality: int, max_size: int) -> Tuple[int, int]:
+    """Resize, strip metadata and re-encode one image (runs in a worker process)"""
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if max_size and max(image.size) > max_size:
+            image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        pil_format = FORMATS[image_format][0]
+        if pil_format == "JPEG":
+            image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+        # Saving without exif/icc/xmp arguments drops the metadata
+        options = {"quality": quality}
+        if pil_format == "JPEG":
+            options.update(optimize=True, progressive=True)
+        elif pil_format == "WEBP":
+            options["method"] = 4
+        image.save(target, pil_format, **options)
+        return image.size
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _pool_context():
+    # Forking a process that runs an event loop and thread pools can deadlock
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class ImageOptimizer:
+    """Encode images in a process pool with a content-addressed disk cache
+
+    Args:
+        cache_dir: Directory for encoded files
+        workers: Worker processes (default: CPU count)
+    """
+
+    def __init__(self, cache_dir: str, workers: Optional[int] = None):
+        self.cache_dir = cache_dir
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.encoded = 0
+        self.cache_hits = 0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=_pool_context())
+        return self._pool
+
+    async def optimize(self, path: str, options: OptimizeOptions) -> OptimizedImage:
+        """Return the optimized version of an image, encoding it unless cached"""
+        if not available():
+            raise RuntimeError("Image optimization needs Pillow (pip install Pillow)")
+        digest = await asyncio.to_thread(file_digest, path)
+        original_bytes = os.path.getsize(path)
+        target = os.path.join(self.cache_dir, digest[:2], f"{digest}-{options.key()}{options.extension}")
+
+        cached = os.path.exists(target)
+        if cached:
+            self.cache_hits += 1
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(suffix=options.extension, dir=os.path.dirname(target))
+            os.close(fd)
+            try:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(
+                    self._executor(), encode_image, path, tmp, options.format, options.quality, options.max_size
+                )
+                os.replace(tmp, target)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+                raise
+            self.encoded += 1
+
+        return OptimizedImage(
+            target, options.mime_type, options.extension, original_bytes, os.path.getsize(target), cached
+        )
+
+    def stats(self):
+        return {"workers": self.workers, "encoded": self.encoded, "cache_hits": self.cache_hits,
+                "cache_dir": self.cache_dir}
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
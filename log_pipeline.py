@@ -0,0 +1,279 @@
+"""
+Non-blocking logging for the server processes.
+
+Handlers attached to the root logger write to stderr synchronously, so every
+log call on the request path stalls the event loop while stderr (often a
+pipe to systemd/journald) drains. setup_logging() replaces them with a
+QueueHandler: the calling thread only puts the record on a queue, and a
+QueueListener thread formats and writes it.
+
+Chatty request logs can be sampled and rate limited per key (the record's
+`path` extra, else the logger name) without losing anything that matters:
+records at WARNING and above always pass the filters, and when the bounded
+queue is full only records below WARNING are dropped; a dropped or
+suppressed count is appended to the next record that gets through.
+
+Dedicated logs that must not reach stderr (the slow-call log) get a file
+logger of their own with the same queue-and-writer-thread arrangement.
+
+    listener = setup_logging("INFO", sample={"/messages/": 0.01}, rate=20)
+    slow = file_logger("wordpress_mcp.slow_calls", "slow.jsonl")
+    ...
+    stop_logging()  # flushes the queues
+"""
+
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional, TextIO, Tuple, Union
+
+FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+QUEUE_SIZE = 10_000
+
+
+def parse_level(level: Union[int, str]) -> int:
+    """Level number from a name like "debug" or a number"""
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(level.strip().upper())
+    if not isinstance(value, int):
+        raise ValueError(f"Unknown log level: {level}")
+    return value
+
+
+def parse_sample(spec: str) -> Dict[str, float]:
+    """"/messages/=0.01,/sse=1" -> {"/messages/": 0.01, "/sse": 1.0}"""
+    rates = {}
+    for part in spec.split(","):
+        key, sep, rate = part.strip().rpartition("=")
+        if sep and key:
+            rates[key] = float(rate)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of the records per key and at most `rate` per second
+
+    Keys are matched by prefix, longest first; records at `keep_level` and
+    above are never filtered.
+    """
+
+    def __init__(
+        self,
+        sample: Optional[Dict[str, float]] = None,
+        rate: Optional[float] = None,
+        keep_level: int = logging.WARNING
+    ):
+        super().__init__()
+        self.sample = dict(sorted((sample or {}).items(), key=lambda kv: -len(kv[0])))
+        self.rate = rate
+        self.keep_level = keep_level
+        self.seen: Dict[str, int] = {}
+        self.buckets: Dict[str, list] = {}
+        self.suppressed: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def key(self, record: logging.LogRecord) -> str:
+        return getattr(record, "path", None) or record.name
+
+    def allow(self, key: str) -> bool:
+        for prefix, fraction in self.sample.items():
+            if key.startswith(prefix):
+                if fraction <= 0:
+                    return False
+                # Deterministic: every n-th record of the key
+                every = max(1, round(1 / fraction))
+                n = self.seen[prefix] = self.seen.get(prefix, 0) + 1
+                if (n - 1) % every:
+                    return False
+                break
+        if self.rate is None:
+            return True
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = [self.rate, now]
+        tokens = min(self.rate, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            return False
+        bucket[0] = tokens - 1
+        return True
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.keep_level:
+            return True
+        key = self.key(record)
+        with self.lock:
+            if not self.allow(key):
+                self.suppressed[key] = self.suppressed.get(key, 0) + 1
+                return False
+            skipped = self.suppressed.pop(key, 0)
+        if skipped:
+            record.suppressed = skipped
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler for a bounded queue that never blocks below keep_level
+
+    When the queue is full, records below keep_level are dropped (and
+    counted); more severe ones wait for room.
+    """
+
+    def __init__(self, q: queue.Queue, keep_level: int = logging.WARNING):
+        super().__init__(q)
+        self.keep_level = keep_level
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock prepare() formats the message here; the listener runs in
+        # this process, so leave formatting (and tracebacks) to its thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.dropped:
+            record.dropped, self.dropped = self.dropped, 0
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno >= self.keep_level:
+                self.queue.put(record)
+            else:
+                self.dropped += 1 + getattr(record, "dropped", 0)
+
+
+class PipelineFormatter(logging.Formatter):
+    """Adds the suppressed/dropped counts carried by a record"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        notes = []
+        if getattr(record, "suppressed", 0):
+            notes.append(f"{record.suppressed} similar suppressed")
+        if getattr(record, "dropped", 0):
+            notes.append(f"{record.dropped} dropped, queue full")
+        return text + (" (" + ", ".join(notes) + ")" if notes else "")
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[NonBlockingQueueHandler] = None
+# File loggers by name: (path, queue handler, listener)
+_file_loggers: Dict[str, Tuple[str, NonBlockingQueueHandler, logging.handlers.QueueListener]] = {}
+
+
+def setup_logging(
+    level: Union[int, str] = logging.INFO,
+    stream: Optional[TextIO] = None,
+    sample: Optional[Dict[str, float]] = None,
+    rate: Optional[float] = None,
+    queue_size: int = QUEUE_SIZE,
+    fmt: str = FORMAT
+) -> logging.handlers.QueueListener:
+    """Route the root logger through a queue to a writer thread
+
+    Replaces the root logger's handlers (and a previous pipeline). The
+    sampling filter sits on the queue handler, so dropped records are never
+    formatted.
+    """
+    _stop_root()
+    global _listener, _handler
+    output = logging.StreamHandler(stream if stream is not None else sys.stderr)
+    output.setFormatter(PipelineFormatter(fmt))
+    q: queue.Queue = queue.Queue(queue_size)
+    _handler = NonBlockingQueueHandler(q)
+    if sample or rate is not None:
+        _handler.addFilter(SamplingFilter(sample, rate))
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(_handler)
+    root.setLevel(parse_level(level))
+    _listener = logging.handlers.QueueListener(q, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def set_level(level: Union[int, str]) -> None:
+    """Change the root level of a running pipeline"""
+    logging.getLogger().setLevel(parse_level(level))
+
+
+def install_level_toggle(level: Union[int, str], signum: Optional[int] = None) -> bool:
+    """Switch between `level` and DEBUG on a signal (SIGUSR1 by default)
+
+    Returns False where the signal is unavailable (Windows) or when not
+    called from the main thread.
+    """
+    import signal
+    signum = signum if signum is not None else getattr(signal, "SIGUSR1", None)
+    if signum is None or threading.current_thread() is not threading.main_thread():
+        return False
+    base = parse_level(level)
+
+    def toggle(*_):
+        root = logging.getLogger()
+        root.setLevel(base if root.level == logging.DEBUG and base != logging.DEBUG else logging.DEBUG)
+        logging.getLogger(__name__).warning("Log level is now %s", logging.getLevelName(root.level))
+
+    signal.signal(signum, toggle)
+    return True
+
+
+def file_logger(name: str, path: str, fmt: str = "%(message)s", queue_size: int = QUEUE_SIZE) -> logging.Logger:
+    """A logger writing to a file through a queue and a writer thread of its own
+
+    The logger does not propagate, so its records stay out of the root
+    pipeline. Calling it again with the same path returns the logger as is;
+    stop_logging() flushes and detaches it.
+    """
+    path = os.path.abspath(path)
+    logger = logging.getLogger(name)
+    current = _file_loggers.get(name)
+    if current is not None:
+        if current[0] == path:
+            return logger
+        _stop_file_logger(name)
+    output = logging.FileHandler(path, encoding="utf-8", delay=True)
+    output.setFormatter(logging.Formatter(fmt))
+    q: queue.Queue = queue.Queue(queue_size)
+    handler = NonBlockingQueueHandler(q)
+    listener = logging.handlers.QueueListener(q, output)
+    listener.start()
+    logger.addHandler(handler)
+    logger.propagate = False
+    _file_loggers[name] = (path, handler, listener)
+    return logger
+
+
+def _stop_file_logger(name: str) -> None:
+    _, handler, listener = _file_loggers.pop(name)
+    logging.getLogger(name).removeHandler(handler)
+    listener.stop()
+    for output in listener.handlers:
+        output.close()
+
+
+def stop_logging() -> None:
+    """Write out queued records and stop the writer threads"""
+    _stop_root()
+    for name in list(_file_loggers):
+        _stop_file_logger(name)
+
+
+def _stop_root() -> None:
+    global _listener, _handler
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.flush()
+        _listener = None
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
@@ -4,101 +4,96 @@ WordPress MCP Server - Comprehensive WordPress & Server Management
 Built with official MCP Python SDK (FastMCP)
 """
 
-# ==================== TRANSPORT SECURITY & SSE PATCH ====================
-# The MCP SDK includes DNS rebinding protection that rejects Cloudflare Tunnel URLs.
-# We apply a definitive patch to disable security checks and ADD AGGRESSIVE LOGGING.
-try:
-    import sys
-    import logging
-    import mcp.server.transport_security as ts
-    import mcp.server.sse as mcp_sse
-    from starlette.requests import Request
-    from starlette.responses import Response
-
-    # 1. Patch TransportSecurityMiddleware (The Gatekeeper)
-    if hasattr(ts, "TransportSecurityMiddleware"):
-        async def mock_validate(self, request: Request, is_post: bool = False) -> Response | None:
-            # DEBUG: Log every validation attempt
-            # We use print to stderr because logger might be filtered
-            print(f"DEBUG: Security bypass for {request.method} {request.url.path}", file=sys.stderr)
-            return None
-        ts.TransportSecurityMiddleware.validate_request = mock_validate
-        print("DEBUG: Successfully patched TransportSecurityMiddleware.validate_request", file=sys.stderr)
-
-    # 2. Patch SseServerTransport.connect_sse (The Entrance) - This section is now handled by mcp.sse_app()
-    #    The original patching logic for SseServerTransport.connect_sse is removed
-    #    as mcp.sse_app() provides a more robust integration.
-    #    The CloudflareOptimizationMiddleware and RequestDiagnosticMiddleware will be applied directly to the sse_app.
-
-    # 3. Disable DNS rebinding in Settings
-    if hasattr(ts, "TransportSecuritySettings"):
-        try:
-            ts.TransportSecuritySettings.model_fields['enable_dns_rebinding_protection'].default = False
-        except:
-            pass
-
-    # 4. Functional ASGI Middleware (v1.3.0 Ngrok Edition)
-    def diagnostic_middleware(app):
-        async def asgi_app(scope, receive, send):
-            if scope["type"] != "http":
-                return await app(scope, receive, send)
-
-            path = scope.get("path", "")
-            method = scope.get("method", "")
-            
-            # Per-request state for padding
-            request_state = {"padded": False}
-
-            async def send_wrapper(message):
-                if message["type"] == "http.response.start":
-                    if path == "/sse":
-                        headers = list(message.get("headers", []))
-                        headers.append((b"cache-control", b"no-cache, no-transform, no-store, must-revalidate"))
-                        headers.append((b"x-accel-buffering", b"no"))
-                        headers.append((b"x-content-type-options", b"nosniff"))
-                        headers.append((b"connection", b"keep-alive"))
-                        headers.append((b"content-encoding", b"identity"))
-                        # Force chunked encoding
-                        headers = [h for h in headers if h[0].lower() != b"content-length"]
-                        message["headers"] = headers
-                    
-                    print(f"<-- {message.get('status')} {path}", file=sys.stderr)
-                
-                # PULSED PADDING: 16 chunks of 1KB to force Cloudflare to flush the buffer
-                if message["type"] == "http.response.body" and path == "/sse" and method == "GET":
-                    if not request_state["padded"]:
-                        original_body = message.get("body") or b""
-                        padding_chunk = b":" + b" " * 1024 + b"\n\n"
-                        for i in range(15):
-                            await send({"type": "http.response.body", "body": padding_chunk, "more_body": True})
-                            await asyncio.sleep(0.01)
-                        
-                        message["body"] = padding_chunk + original_body
-                        request_state["padded"] = True
-                        print(f"DEBUG: Sent 16KB pulsed padding to {method} {path}", file=sys.stderr)
-
-                await send(message)
-
-            print(f"--> {method} {path}" + (" (MCP Message)" if "/messages/" in path else ""), file=sys.stderr)
-            return await app(scope, receive, send_wrapper)
-        return asgi_app
-
-    sys.modules['mcp.server.transport_security'] = ts
-    sys.modules['mcp.server.sse'] = mcp_sse
-except Exception as e:
-    print(f"DEBUG: Critical patch failure: {e}", file=sys.stderr)
-
 import asyncio
-import json
-from typing import Any, Dict, List, Optional
+import logging
+import os
+import sys
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Union
 import httpx
 from mcp.server.fastmcp import FastMCP, Context
 
+from response_cache import ResponseCache, make_key, resource_of
+from singleflight import SingleFlight
+from pagination import fetch_all, iter_collection
+from batch import DEFAULT_BATCH_SIZE, batch_request, run_batch
+from taxonomy import TaxonomyIndex
+from post_diff import ContentHashes, diff_update
+from content_cursor import ContentCursors
+from html_convert import FORMATS, ConversionCache, plain_title
+from serialization import decode, dumpb, dumps
+from metrics import REGISTRY, TextfileWriter, asgi_middleware, cache_samples, instrument_tools, observe_upstream
+from tracing import slow_call_logger, span, trace_tools, traced, upstream_trace
+from log_pipeline import install_level_toggle, parse_sample, setup_logging, stop_logging
+from sse_padding import SsePadding
+
+# Optional features (mirror, search, uploads) import their modules on first use,
+# so starting the server for a stdio session does not pay for them
+if TYPE_CHECKING:
+    from content_mirror import ContentMirror
+    from media_index import MediaIndex
+    from media_upload import MediaUploader
+    from search_index import SearchIndex
+
+# Encoding of tool results shows up as its own span
+dumps = traced("encode", dumps)
+
 # ==================== CONFIGURATION ====================
 WORDPRESS_URL = "https://04travel.ru"
 WORDPRESS_USERNAME = "oasis"
 WORDPRESS_PASSWORD = "mfIk tKGA mJ0p gwSD KmkN N0Ve"
 
+# Response cache for GET requests (WP_CACHE_MAX_ENTRIES=0 disables it)
+CACHE_MAX_ENTRIES = int(os.getenv("WP_CACHE_MAX_ENTRIES", "512"))
+CACHE_TTL = float(os.getenv("WP_CACHE_TTL", "30"))
+
+# Optional local SQLite content mirror (empty WP_MIRROR_PATH disables it)
+MIRROR_PATH = os.getenv("WP_MIRROR_PATH", "")
+MIRROR_INTERVAL = float(os.getenv("WP_MIRROR_INTERVAL", "60"))
+MIRROR_RECONCILE_INTERVAL = float(os.getenv("WP_MIRROR_RECONCILE_INTERVAL", "900"))
+
+# Media uploads: concurrent uploads, and the directory local files must be in (unset: no local files)
+UPLOAD_CONCURRENCY = int(os.getenv("WP_UPLOAD_CONCURRENCY", "3"))
+MEDIA_ROOT = os.getenv("WP_MEDIA_ROOT", "")
+# Hosts URL sources may come from (comma-separated; empty: any public address)
+MEDIA_URL_HOSTS = [h for h in os.getenv("WP_MEDIA_URL_HOSTS", "").split(",") if h.strip()]
+
+# Pre-upload image optimization: encoded-file cache and worker processes (default: CPU count)
+IMAGE_CACHE_DIR = os.getenv("WP_IMAGE_CACHE_DIR", os.path.expanduser("~/.cache/wordpress-mcp/images"))
+IMAGE_WORKERS = int(os.getenv("WP_IMAGE_WORKERS", "0")) or None
+
+# Content-hash index of the media library used to skip duplicate uploads (empty disables it)
+MEDIA_INDEX_PATH = os.getenv(
+    "WP_MEDIA_INDEX_PATH", os.path.expanduser("~/.cache/wordpress-mcp/media-index.sqlite3")
+)
+
+# Prometheus metrics: network transports serve /metrics; stdio can dump to a file instead
+METRICS_TEXTFILE = os.getenv("WP_METRICS_TEXTFILE", "")
+METRICS_INTERVAL = float(os.getenv("WP_METRICS_INTERVAL", "15"))
+
+# Per-call timing breakdown: appended to every result with WP_DEBUG_TIMINGS=1 (or to one
+# call with a `_debug: true` argument); calls slower than WP_SLOW_CALL_MS go to WP_SLOW_CALL_LOG
+DEBUG_TIMINGS = os.getenv("WP_DEBUG_TIMINGS", "").lower() in ("1", "true", "yes")
+SLOW_CALL_MS = float(os.getenv("WP_SLOW_CALL_MS", "1000"))
+SLOW_CALL_LOG = os.getenv("WP_SLOW_CALL_LOG", "")
+
+# Server logging runs through a queue to a writer thread. Level per transport (WP_LOG_LEVEL
+# overrides all; SIGUSR1 toggles DEBUG at runtime). WP_LOG_SAMPLE keeps a fraction of request
+# logs per path or logger ("/messages/=0.01,uvicorn.access=0.1"), WP_LOG_RATE caps them per
+# second; warnings and errors always pass
+LOG_LEVEL = os.getenv("WP_LOG_LEVEL", "")
+LOG_LEVELS = {
+    "stdio": os.getenv("WP_LOG_LEVEL_STDIO", "WARNING"),
+    "sse": os.getenv("WP_LOG_LEVEL_SSE", "INFO"),
+    "streamable-http": os.getenv("WP_LOG_LEVEL_HTTP", "INFO"),
+}
+LOG_SAMPLE = parse_sample(os.getenv("WP_LOG_SAMPLE", ""))
+LOG_RATE = float(os.getenv("WP_LOG_RATE", "0")) or None
+
+# Padding in front of the first SSE event so buffering proxies flush it: WP_SSE_PADDING is
+# none, single, pulsed or auto (single block only behind Cloudflare or another proxy, the default)
+SSE_PADDING = SsePadding.from_env()
+
 # ==================== LOGGING SETUP ====================
 # Configure global logging to use stderr so it doesn't corrupt MCP stdio protocol
 logging.basicConfig(
@@ -108,7 +103,23 @@ logging.basicConfig(
     force=True
 )
 logger = logging.getLogger(__name__)
+# Per-request lines of the network transports (DEBUG; sampled with WP_LOG_SAMPLE)
+access_logger = logging.getLogger("wordpress_mcp.access")
 
+def start_logging(transport: str) -> None:
+    """Switch to the queued pipeline at the level configured for transport"""
+    level = LOG_LEVEL or LOG_LEVELS[transport]
+    setup_logging(level, sample=LOG_SAMPLE, rate=LOG_RATE)
+    install_level_toggle(level)
+
+
+def start_metrics_textfile() -> Optional[TextfileWriter]:
+    """Start writing metrics to WP_METRICS_TEXTFILE (stdio has no /metrics to scrape); None when unset"""
+    if not METRICS_TEXTFILE:
+        return None
+    writer = TextfileWriter(METRICS_TEXTFILE, METRICS_INTERVAL)
+    writer.start()
+    return writer
 
 
 
@@ -116,28 +127,176 @@ logger = logging.getLogger(__name__)
 class WordPressClient:
     """Async WordPress REST API client"""
     
-    def __init__(self, base_url: str, username: str, password: str):
+    def __init__(
+        self,
+        base_url: str,
+        username: str,
+        password: str,
+        cache: Optional[ResponseCache] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
         self.base_url = base_url.rstrip('/')
+        self.api_root = f"{self.base_url}/wp-json"
         self.client = httpx.AsyncClient(
             auth=(username, password),
             timeout=30.0,
-            headers={"Content-Type": "application/json"}
+            headers={"Content-Type": "application/json"},
+            transport=transport
         )
+        self.cache = cache if cache is not None else ResponseCache(CACHE_MAX_ENTRIES, CACHE_TTL)
+        self.flights = SingleFlight()
+        self.write_listeners: List[Callable[[str, str, Any], None]] = []
 
+    def url_for(self, endpoint: str, namespace: str = "wp/v2") -> str:
+        """Build a REST API URL; an empty namespace addresses /wp-json itself"""
+        parts = [self.api_root]
+        if namespace:
+            parts.append(namespace)
+        if endpoint:
+            parts.append(endpoint)
+        return "/".join(parts)
     
     async def request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
         """Make authenticated request to WordPress API"""
+        data, _ = await self.request_with_headers(method, endpoint, **kwargs)
+        return data
+
+    async def request_with_headers(
+        self,
+        method: str,
+        endpoint: str,
+        namespace: str = "wp/v2",
+        **kwargs
+    ) -> Tuple[Any, httpx.Headers]:
+        """Make authenticated request and return (data, response headers)
+
+        GET responses are served from the response cache when possible and
+        identical concurrent GETs share one upstream request; any other method
+        invalidates the cached entries of the resource it touches. A GET with
+        a "Cache-Control: no-cache" header always goes upstream (a cached
+        entry is still revalidated with its ETag).
+        """
+        method = method.upper()
+        url = self.url_for(endpoint, namespace)
         try:
-            url = f"{self.base_url}/wp-json/wp/v2/{endpoint}"
-            response = await self.client.request(method, url, **kwargs)
+            if method == "GET":
+                return await self._get(url, **kwargs)
+            if "json" in kwargs:
+                # Same encoder as the results; the client already sends the JSON content type
+                kwargs["content"] = dumpb(kwargs.pop("json"))
+            try:
+                response = await self._send(method, url, **kwargs)
+            finally:
+                self.invalidate(url)
             response.raise_for_status()
-            return response.json() if response.text else {}
+            data = self._decode(response)
+            self.notify_write(method, url, data)
+            return data, response.headers
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error: {e.response.status_code} - {e.response.text[:200]}")
             raise
         except Exception as e:
             logger.error(f"Request error: {e}")
             raise
+
+    async def _get(self, url: str, **kwargs) -> Tuple[Any, httpx.Headers]:
+        key = make_key("GET", url, kwargs.get("params"))
+        entry = None
+        if self.cache.enabled:
+            entry, fresh = self.cache.lookup(key)
+            no_cache = "no-cache" in kwargs.get("headers", {}).get("Cache-Control", "")
+            if entry is not None and fresh and not no_cache:
+                return entry.data, httpx.Headers(entry.headers)
+
+        if set(kwargs) - {"params"}:
+            # Custom headers/options make the request not interchangeable
+            return await self._fetch(url, key, entry, **kwargs)
+        return await self.flights.do(
+            key,
+            lambda: self._fetch(url, key, entry, **kwargs),
+            tag=resource_of(url, self.api_root)
+        )
+
+    async def _fetch(self, url: str, key: str, entry, **kwargs) -> Tuple[Any, httpx.Headers]:
+        resource = resource_of(url, self.api_root)
+        # A write completing while this GET is in flight bumps the generation:
+        # the answer may predate it, so it must not be cached
+        generation = self.cache.generation(resource)
+        if entry is not None:
+            kwargs["headers"] = {**kwargs.get("headers", {}), **entry.validators()}
+            response = await self._send("GET", url, **kwargs)
+            if response.status_code == 304:
+                entry = self.cache.revalidated(key, response.headers, generation)
+                if entry is not None:
+                    return entry.data, httpx.Headers(entry.headers)
+                # Invalidated by a write while revalidating - fetch it again
+                kwargs["headers"] = {
+                    k: v for k, v in kwargs["headers"].items()
+                    if k not in ("If-None-Match", "If-Modified-Since")
+                }
+                generation = self.cache.generation(resource)
+                response = await self._send("GET", url, **kwargs)
+        else:
+            response = await self._send("GET", url, **kwargs)
+
+        response.raise_for_status()
+        data = self._decode(response)
+        self.cache.store(key, data, response.headers, resource, generation)
+        return data, response.headers
+
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request, recording its latency (body included) by resource and status"""
+        started = time.perf_counter()
+        resource = resource_of(url, self.api_root)
+        status = "error"
+        with span("upstream", method=method, resource=resource) as upstream:
+            if upstream is not None:
+                # connect/TTFB/download phases from httpcore trace events
+                kwargs["extensions"] = {**kwargs.get("extensions", {}), "trace": upstream_trace(upstream)}
+            try:
+                response = await self.client.request(method, url, **kwargs)
+                status = response.status_code
+                return response
+            finally:
+                if upstream is not None:
+                    upstream.attrs["status"] = status
+                observe_upstream(method, resource, status, time.perf_counter() - started)
+
+    def invalidate(self, path: str) -> None:
+        """Drop cached and in-flight reads of the resource behind a URL or /wp-json path"""
+        url = path if path.startswith(("http://", "https://")) else f"{self.api_root}{path}"
+        resource = resource_of(url, self.api_root)
+        self.cache.invalidate(resource)
+        self.flights.discard(resource)
+
+    def on_write(self, callback: Callable[[str, str, Any], None]) -> None:
+        """Register callback(method, resource, data) for successful writes
+
+        resource is the REST collection (e.g. "wp/v2/posts") and data the
+        object WordPress returned. Used to keep local indexes current.
+        """
+        self.write_listeners.append(callback)
+
+    def notify_write(self, method: str, path: str, data: Any) -> None:
+        """Tell write listeners about a successful write to a URL or /wp-json path"""
+        if not self.write_listeners:
+            return
+        url = path if path.startswith(("http://", "https://")) else f"{self.api_root}{path}"
+        resource = resource_of(url, self.api_root)
+        for callback in self.write_listeners:
+            try:
+                callback(method.upper(), resource, data)
+            except Exception as e:
+                logger.error(f"Write listener failed: {e}")
+
+    def paginate(self, endpoint: str, params: Optional[Dict[str, Any]] = None, **kwargs):
+        """Iterate over every item of a collection (see pagination.iter_collection)"""
+        return iter_collection(self, endpoint, params, **kwargs)
+
+    @staticmethod
+    def _decode(response: httpx.Response) -> Any:
+        with span("decode", bytes=len(response.content)):
+            return decode(response)
     
     async def close(self):
         await self.client.aclose()
@@ -151,6 +310,241 @@ def get_wp_client():
         wp_client = WordPressClient(WORDPRESS_URL, WORDPRESS_USERNAME, WORDPRESS_PASSWORD)
     return wp_client
 
+def configure_wordpress(url: str, username: str, password: str) -> None:
+    """Use another site and credentials (mcp_sse_server serves these tools with its own)
+
+    Must run before the first tool call: the client and everything built on it
+    (mirror, indexes, uploader) are created once.
+    """
+    global WORDPRESS_URL, WORDPRESS_USERNAME, WORDPRESS_PASSWORD
+    if wp_client is not None and (url, username, password) != (WORDPRESS_URL, WORDPRESS_USERNAME, WORDPRESS_PASSWORD):
+        raise RuntimeError("The WordPress client is already in use")
+    WORDPRESS_URL, WORDPRESS_USERNAME, WORDPRESS_PASSWORD = url, username, password
+
+# content_mirror is created on first use when MIRROR_PATH is set
+content_mirror = None
+
+def get_mirror() -> Optional["ContentMirror"]:
+    """Return the content mirror with its sync loop running, or None if disabled"""
+    global content_mirror
+    if content_mirror is None and MIRROR_PATH:
+        from content_mirror import ContentMirror
+        content_mirror = ContentMirror(
+            MIRROR_PATH, get_wp_client(), MIRROR_INTERVAL, MIRROR_RECONCILE_INTERVAL
+        )
+    if content_mirror is not None:
+        content_mirror.start()
+    return content_mirror
+
+# search_index is built on the first search_content call
+search_index = None
+search_index_lock = asyncio.Lock()
+
+async def get_search_index() -> "SearchIndex":
+    """Return the full-text index, building it on first use"""
+    global search_index
+    async with search_index_lock:
+        if search_index is None:
+            from search_index import SearchIndex
+            index = SearchIndex()
+            mirror = get_mirror()
+            if mirror is not None and mirror.is_fresh("posts", MIRROR_INTERVAL * 2):
+                for kind in ("posts", "pages"):
+                    for item in mirror.list(kind, per_page=None)[0]:
+                        index.add(kind, item)
+            else:
+                await index.build(get_wp_client())
+            get_wp_client().on_write(index.apply_write)
+            search_index = index
+    return search_index
+
+# taxonomy_index loads terms on the first name lookup
+taxonomy_index = None
+
+def get_taxonomy() -> TaxonomyIndex:
+    global taxonomy_index
+    if taxonomy_index is None:
+        taxonomy_index = TaxonomyIndex(get_wp_client())
+    return taxonomy_index
+
+async def resolve_terms(
+    payload: Dict[str, Any],
+    categories: Optional[List[Union[int, str]]],
+    tags: Optional[List[Union[int, str]]],
+    create_missing: bool
+) -> None:
+    """Put category/tag IDs into a post payload, resolving names"""
+    if categories:
+        payload["categories"] = await get_taxonomy().resolve("categories", categories, create_missing)
+    if tags:
+        payload["tags"] = await get_taxonomy().resolve("tags", tags, create_missing)
+
+# content_hashes remembers field hashes of posts/pages for diff-aware updates
+content_hashes = None
+
+def get_content_hashes() -> ContentHashes:
+    global content_hashes
+    if content_hashes is None:
+        content_hashes = ContentHashes()
+        get_wp_client().on_write(content_hashes.apply_write)
+    return content_hashes
+
+async def write_changes(kind: str, object_id: int, payload: Dict[str, Any], force: bool) -> Dict[str, Any]:
+    """Send only the fields of an update that differ from the live object"""
+    if not payload:
+        raise ValueError("No fields to update")
+    if force:
+        changes, unchanged = payload, []
+    else:
+        changes, unchanged, live = await diff_update(
+            get_wp_client(), get_content_hashes(), kind, object_id, payload
+        )
+        if not changes:
+            return {"id": live.get("id", object_id), "link": live.get("link"), "written": [], "unchanged": unchanged}
+    data = await get_wp_client().request("POST", f"{kind}/{object_id}", json=changes)
+    get_content_hashes().remember(kind, data, sent=changes, replace=True)
+    return {"id": data["id"], "link": data.get("link"), "written": list(changes), "unchanged": unchanged}
+
+# media_index is opened on the first upload or duplicate scan
+media_index = None
+
+def get_media_index() -> Optional["MediaIndex"]:
+    global media_index
+    if media_index is None and MEDIA_INDEX_PATH:
+        from media_index import MediaIndex
+        if MEDIA_INDEX_PATH != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(MEDIA_INDEX_PATH)), exist_ok=True)
+        media_index = MediaIndex(MEDIA_INDEX_PATH, get_wp_client())
+    return media_index
+
+# media_uploader is shared so WP_UPLOAD_CONCURRENCY bounds all uploads together
+media_uploader = None
+
+def get_uploader() -> "MediaUploader":
+    global media_uploader
+    if media_uploader is None:
+        from image_optimize import ImageOptimizer
+        from media_upload import MediaUploader
+        media_uploader = MediaUploader(
+            get_wp_client(), UPLOAD_CONCURRENCY, root=MEDIA_ROOT, url_hosts=MEDIA_URL_HOSTS,
+            optimizer=ImageOptimizer(IMAGE_CACHE_DIR, IMAGE_WORKERS),
+            media_index=get_media_index()
+        )
+    return media_uploader
+
+def mirror_for(kind: str, max_age: Optional[float]) -> Optional["ContentMirror"]:
+    """Return the mirror if it may answer a read of `kind` within max_age seconds"""
+    if max_age is None:
+        return None
+    mirror = get_mirror()
+    if mirror is not None and mirror.is_fresh(kind, max_age):
+        return mirror
+    return None
+
+
+# ==================== FIELD PROJECTIONS ====================
+# WordPress field -> key used in tool output. Read tools send these as
+# `_fields=` so WordPress only serializes what we actually return.
+POST_FIELDS = {"id": "id", "title": "title", "status": "status", "date": "date", "link": "url"}
+POST_DETAIL_FIELDS = {"id": "id", "title": "title", "content": "content", "status": "status", "link": "url"}
+TERM_FIELDS = {"id": "id", "name": "name", "slug": "slug", "count": "count"}
+MEDIA_FIELDS = {"id": "id", "title": "title", "source_url": "url", "mime_type": "mime_type", "date": "date"}
+USER_FIELDS = {"id": "id", "name": "name", "slug": "username", "email": "email", "roles": "roles"}
+COMMENT_FIELDS = {
+    "id": "id", "post": "post_id", "author_name": "author",
+    "content": "content", "date": "date", "status": "status"
+}
+SITE_FIELDS = {
+    "name": "name", "description": "description", "url": "url",
+    "home": "home", "gmt_offset": "gmt_offset", "timezone_string": "timezone_string"
+}
+
+# Values used when WordPress omits a field (e.g. email outside context=edit)
+FIELD_DEFAULTS = {"email": "", "roles": [], "gmt_offset": 0}
+
+def fields_param(projection: Dict[str, str], fields: Optional[List[str]] = None) -> str:
+    """Value for the `_fields` query parameter"""
+    return ",".join(fields or projection)
+
+def project(item: Dict[str, Any], projection: Dict[str, str], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Format a WordPress object using a field projection
+
+    Args:
+        item: Raw WordPress REST object
+        projection: Default field mapping of the calling tool
+        fields: Caller-supplied WordPress field names (widen/narrow the default)
+    """
+    result = {}
+    for name in (fields or projection):
+        value = item.get(name, FIELD_DEFAULTS.get(name, ""))
+        if isinstance(value, dict) and "rendered" in value:
+            value = value["rendered"]
+        result[projection.get(name, name)] = value
+    return result
+
+# Converted bodies memoized by (kind, id, modified, format)
+conversion_cache = ConversionCache()
+# Listings longer than this are converted in a worker thread
+BULK_CONVERT_THRESHOLD = 8
+
+def check_format(fmt: str) -> None:
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt} (use {', '.join(FORMATS)})")
+
+def apply_format(kind: str, raw: Dict[str, Any], item: Dict[str, Any], fmt: str) -> Dict[str, Any]:
+    """Convert the content/excerpt of a projected item to markdown or text"""
+    if fmt == "html":
+        return item
+    with span("format", format=fmt):
+        return convert_item(kind, raw, item, fmt)
+
+def convert_item(kind: str, raw: Dict[str, Any], item: Dict[str, Any], fmt: str) -> Dict[str, Any]:
+    for key in ("content", "excerpt"):
+        if isinstance(item.get(key), str):
+            item[key] = conversion_cache.convert(
+                item[key], fmt, f"{kind}.{key}", raw.get("id"), raw.get("modified")
+            )
+    if isinstance(item.get("title"), str):
+        item["title"] = plain_title(item["title"])
+    return item
+
+async def format_items(
+    kind: str,
+    raws: List[Dict[str, Any]],
+    items: List[Dict[str, Any]],
+    fmt: str
+) -> List[Dict[str, Any]]:
+    """apply_format over a listing, off the event loop when it is long"""
+    if fmt == "html":
+        return items
+    convert_all = lambda: [convert_item(kind, r, i, fmt) for r, i in zip(raws, items)]
+    with span("format", format=fmt, items=len(items)):
+        if len(items) > BULK_CONVERT_THRESHOLD:
+            return await asyncio.to_thread(convert_all)
+        return convert_all()
+
+def version_fields(fields_value: str, fmt: str) -> str:
+    """Ask for `modified` as well when converted output is memoized by it"""
+    return fields_value if fmt == "html" else f"{fields_value},modified"
+
+# Remaining slices of long bodies returned with max_bytes, kept for a few minutes
+content_cursors = ContentCursors()
+
+def sliced_result(key: str, item: Dict[str, Any], max_bytes: Optional[int], html: bool = True) -> Dict[str, Any]:
+    """Tool result for a post/page, cutting content to max_bytes with a cursor"""
+    result = {"success": True, key: item}
+    if max_bytes and isinstance(item.get("content"), str):
+        page = content_cursors.open(item["content"], max_bytes, html=html, id=item.get("id"))
+        item["content"] = page.pop("content")
+        page.pop("id")
+        result["content_slice"] = page
+    return result
+
+def cursor_result(key: str, cursor: str) -> Dict[str, Any]:
+    """Tool result for the next slice of a body opened by sliced_result"""
+    page = content_cursors.next(cursor)
+    return {"success": True, key: {"id": page.pop("id"), "content": page.pop("content")}, "content_slice": page}
+
 
 # ==================== FASTMCP SERVER ====================
 mcp = FastMCP("WordPress MCP Server")
@@ -158,36 +552,49 @@ mcp = FastMCP("WordPress MCP Server")
 # ==================== POST MANAGEMENT TOOLS ====================
 
 @mcp.tool()
-async def get_post(post_id: int = None, slug: str = None) -> str:
+async def get_post(
+    post_id: int = None,
+    slug: str = None,
+    fields: List[str] = None,
+    max_age: float = None,
+    max_bytes: int = None,
+    cursor: str = None,
+    format: str = "html"
+) -> str:
     """Get a single WordPress post by ID or slug
     
     Args:
         post_id: Post ID (optional)
         slug: Post slug (optional)
+        fields: WordPress fields to return (optional, default: id, title, content, status, link)
+        max_age: Answer from the local mirror if it synced within this many seconds (optional)
+        max_bytes: Return at most this much content, split on block boundaries, with a
+            content_slice.next_cursor for the rest (optional)
+        cursor: next_cursor from a previous call; returns the next content slice (optional)
+        format: Content format: html (as rendered), markdown or text
     """
     try:
-        if post_id:
-            data = await get_wp_client().request("GET", f"posts/{post_id}")
+        if cursor:
+            return dumps(cursor_result("post", cursor))
+        check_format(format)
+        params = {"_fields": version_fields(fields_param(POST_DETAIL_FIELDS, fields), format)}
+        mirror = mirror_for("posts", max_age)
+        if mirror is not None and (post_id or slug):
+            data = mirror.get("posts", object_id=post_id or None, slug=slug)
+        elif post_id:
+            data = await get_wp_client().request("GET", f"posts/{post_id}", params=params)
         elif slug:
-            posts = await get_wp_client().request("GET", f"posts?slug={slug}")
+            posts = await get_wp_client().request("GET", "posts", params={**params, "slug": slug})
             data = posts[0] if posts else None
         else:
-            return json.dumps({"success": False, "message": "Provide post_id or slug"})
+            return dumps({"success": False, "message": "Provide post_id or slug"})
         
         if data:
-            return json.dumps({
-                "success": True,
-                "post": {
-                    "id": data["id"],
-                    "title": data["title"]["rendered"],
-                    "content": data["content"]["rendered"],
-                    "status": data["status"],
-                    "url": data["link"]
-                }
-            })
-        return json.dumps({"success": False, "message": "Post not found"})
+            item = apply_format("posts", data, project(data, POST_DETAIL_FIELDS, fields), format)
+            return dumps(sliced_result("post", item, max_bytes, html=format == "html"))
+        return dumps({"success": False, "message": "Post not found"})
     except Exception as e:
-        return json.dumps({"success": False, "message": str(e)})
+        return dumps({"success": False, "message": str(e)})
 
 @mcp.tool()
 async def create_post(
@@ -195,8 +602,9 @@ async def create_post(
     content: str,
     excerpt: str = "",
     status: str = "publish",
-    categories: List[int] = None,
-    tags: List[int] = None
+    categories: List[Union[int, str]] = None,
+    tags: List[Union[int, str]] = None,
+    create_missing_terms: bool = False
 ) -> str:
     """Create a new WordPress post
     
@@ -205,8 +613,9 @@ async def create_post(
         content: Post content (HTML)
         excerpt: Post excerpt (optional)
         status: Post status (publish, draft, private)
-        categories: List of category IDs (optional)
-        tags: List of tag IDs (optional)
+        categories: Category IDs, names, slugs or "Parent/Child" paths (optional)
+        tags: Tag IDs, names or slugs (optional)
+        create_missing_terms: Create categories/tags given by name that do not exist yet
     """
     try:
         payload = {
@@ -215,20 +624,17 @@ async def create_post(
             "excerpt": excerpt,
             "status": status
         }
-        if categories:
-            payload["categories"] = categories
-        if tags:
-            payload["tags"] = tags
+        await resolve_terms(payload, categories, tags, create_missing_terms)
         
         data = await get_wp_client().request("POST", "posts", json=payload)
-        return json.dumps({
+        return dumps({
             "success": True,
             "post_id": data["id"],
             "url": data["link"],
             "message": f"Post '{title}' created successfully"
         })
     except Exception as e:
-        return json.dumps({"success": False, "message": str(e)})
+        return dumps({"success": False, "message": str(e)})
 
 @mcp.tool()
 async def update_post(
@@ -236,9 +642,13 @@ async def update_post(
     title: str = None,
     content: str = None,
     excerpt: str = None,
-    status: str = None
+    status: str = None,
+    categories: List[Union[int, str]] = None,
+    tags: List[Union[int, str]] = None,
+    create_missing_terms: bool = False,
+    force: bool = False
 ) -> str:
-    """Update an existing WordPress post
+    """Update an existing WordPress post, sending only the fields that changed
     
     Args:
         post_id: Post ID to update
@@ -246,6 +656,10 @@ async def update_post(
         content: New content (optional)
         excerpt: New excerpt (optional)
         status: New status (optional)
+        categories: Replace categories: IDs, names, slugs or "Parent/Child" paths (optional)
+        tags: Replace tags: IDs, names or slugs (optional)
+        create_missing_terms: Create categories/tags given by name that do not exist yet
+        force: Write every given field even if it matches the live post
     """
     try:
         payload = {}
@@ -257,16 +671,19 @@ async def update_post(
             payload["excerpt"] = excerpt
         if status is not None:
             payload["status"] = status
+        await resolve_terms(payload, categories, tags, create_missing_terms)
         
-        data = await get_wp_client().request("POST", f"posts/{post_id}", json=payload)
-        return json.dumps({
+        result = await write_changes("posts", post_id, payload, force)
+        return dumps({
             "success": True,
-            "post_id": data["id"],
-            "url": data["link"],
-            "message": f"Post {post_id} updated successfully"
+            "post_id": result["id"],
+            "url": result["link"],
+            "written": result["written"],
+            "unchanged": result["unchanged"],
+            "message": f"Post {post_id} updated successfully" if result["written"] else f"Post {post_id} unchanged"
         })
     except Exception as e:
-        return json.dumps({"success": False, "message": str(e)})
+        return dumps({"success": False, "message": str(e)})
 
 @mcp.tool()
 async def delete_post(post_id: int, force: bool = True) -> str:
@@ -280,20 +697,24 @@ async def delete_post(post_id: int, force: bool = True) -> str:
         params = {"force": "true" if force else "false"}
         await get_wp_client().request("DELETE", f"posts/{post_id}", params=params)
         action = "deleted permanently" if force else "moved to trash"
-        return json.dumps({
+        return dumps({
             "success": True,
             "post_id": post_id,
             "message": f"Post {post_id} {action}"
         })
     except Exception as e:
-        return json.dumps({"success": False, "message": str(e)})
+        return dumps({"success": False, "message": str(e)})
 
 @mcp.tool()
 async def get_posts(
     per_page: int = 10,
     page: int = 1,
     status: str = "publish",
-    search: str = None
+    search: str = None,
+    fields: List[str] = None,
+    all: bool = False,
+    max_age: float = None,
+    format: str = "html"
 ) -> str:
     """Get list of WordPress posts with filters
     
@@ -302,36 +723,35 @@ async def get_posts(
         page: Page number
         status: Post status filter (publish, draft, private, any)
         search: Search term (optional)
+        fields: WordPress fields to return (optional, default: id, title, status, date, link)
+        all: Fetch every matching post, ignoring per_page and page
+        max_age: Answer from the local mirror if it synced within this many seconds (optional)
+        format: Format of title/content/excerpt: html (as rendered), markdown or text
     """
     try:
+        check_format(format)
         params = {
             "per_page": min(per_page, 100),
             "page": page,
-            "status": status
+            "status": status,
+            "_fields": version_fields(fields_param(POST_FIELDS, fields), format)
         }
         if search:
             params["search"] = search
         
-        response = await get_wp_client().client.get(
-            f"{get_wp_client().base_url}/wp-json/wp/v2/posts",
-            params=params
-        )
-        response.raise_for_status()
-        posts = response.json()
-        total = int(response.headers.get("X-WP-Total", len(posts)))
+        mirror = None if search else mirror_for("posts", max_age)
+        if mirror is not None:
+            posts, total = mirror.list("posts", status, page, None if all else params["per_page"])
+        elif all:
+            posts = await fetch_all(get_wp_client(), "posts", params)
+            total = len(posts)
+        else:
+            posts, headers = await get_wp_client().request_with_headers("GET", "posts", params=params)
+            total = int(headers.get("X-WP-Total", len(posts)))
         
-        formatted_posts = [
-            {
-                "id": p["id"],
-                "title": p["title"]["rendered"],
-                "status": p["status"],
-                "date": p["date"],
-                "url": p["link"]
-            }
-            for p in posts
-        ]
+        formatted_posts = await format_items("posts", posts, [project(p, POST_FIELDS, fields) for p in posts], format)
         
-        return json.dumps({
+        return dumps({
             "success": True,
             "posts": formatted_posts,
             "count": len(formatted_posts),
@@ -340,7 +760,7 @@ async def get_posts(
             "per_page": per_page
         })
     except Exception as e:
-        return json.dumps({"success": False, "message": str(e)})
+        return dumps({"success": False, "message": str(e)})
 
 @mcp.tool()
 async def publish_post(post_id: int) -> str:
@@ -351,14 +771,14 @@ async def publish_post(post_id: int) -> str:
     """
     try:
         data = await get_wp_client().request("POST", f"posts/{post_id}", json={"status": "publish"})
-        return json.dumps({
+        return dumps({
             "success": True,
             "post_id": data["id"],
             "url": data["link"],
             "message": f"Post {post_id} published"
         })
     except Exception as e:
-        return json.dumps({"success": False, "message": str(e)})
+        return dumps({"success": False, "message": str(e)})
 
 @mcp.tool()
 async def unpublish_post(post_id: int) -> str:
@@ -369,47 +789,175 @@ async def unpublish_post(post_id: int) -> str:
     """
     try:
         data = await get_wp_client().request("POST", f"posts/{post_id}", json={"status": "draft"})
-        return json.dumps({
+        return dumps({
             "success": True,
             "post_id": data["id"],
             "message": f"Post {post_id} moved to draft"
         })
     except Exception as e:
-        return json.dumps({"success": False, "message": str(e)})
+        return dumps({"success": False, "message": str(e)})
+
+# ==================== BULK POST TOOLS ====================
+
+def _bulk_summary(results: List[Dict[str, Any]], item_key: str) -> str:
+    """Format per-item batch results for bulk tools"""
+    items = []
+    for r in results:
+        item = {"index": r["index"], "success": r["success"], "status": r["status"]}
+        if r["success"]:
+            data = r["data"] or {}
+            # DELETE with force=true wraps the object in "previous"
+            data = data.get("previous", data) if isinstance(data, dict) else {}
+            item[item_key] = data.get("id")
+            if "link" in data:
+                item["url"] = data["link"]
+        else:
+            item["message"] = r["message"]
+        items.append(item)
+    succeeded = sum(1 for i in items if i["success"])
+    return dumps({
+        "success": succeeded == len(items),
+        "succeeded": succeeded,
+        "failed": len(items) - succeeded,
+        "results": items
+    })
+
+@mcp.tool()
+async def bulk_create_posts(posts: List[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> str:
+    """Create many WordPress posts through the batch API
+    
+    Args:
+        posts: Post payloads (title, content, excerpt, status, categories, tags)
+        batch_size: Posts per batch request (WordPress allows 25 by default)
+    """
+    try:
+        requests = [batch_request("POST", "posts", {"status": "publish", **p}) for p in posts]
+        results = await run_batch(get_wp_client(), requests, batch_size=batch_size)
+        return _bulk_summary(results, "post_id")
+    except Exception as e:
+        return dumps({"success": False, "message": str(e)})
+
+@mcp.tool()
+async def bulk_update_posts(updates: List[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> str:
+    """Update (or publish/unpublish) many WordPress posts through the batch API
+    
+    Args:
+        updates: Objects with the post "id" plus fields to change (title, content, excerpt, status, ...)
+        batch_size: Posts per batch request (WordPress allows 25 by default)
+    """
+    try:
+        requests = []
+        for update in updates:
+            fields = {k: v for k, v in update.items() if k != "id"}
+            requests.append(batch_request("POST", f"posts/{update['id']}", fields))
+        results = await run_batch(get_wp_client(), requests, batch_size=batch_size)
+        return _bulk_summary(results, "post_id")
+    except KeyError as e:
+        return dumps({"success": False, "message": f"Missing required field: {e}"})
+    except Exception as e:
+        return dumps({"success": False, "message": str(e)})
+
+@mcp.tool()
+async def bulk_delete_posts(post_ids: List[int], force: bool = True, batch_size: int = DEFAULT_BATCH_SIZE) -> str:
+    """Delete many WordPress posts through the batch API
+    
+    Args:
+        post_ids: Post IDs to delete
+        force: If True, delete permanently. If False, move to trash
+        batch_size: Posts per batch request (WordPress allows 25 by default)
+    """
+    try:
+        suffix = "?force=true" if force else ""
+        requests = [batch_request("DELETE", f"posts/{post_id}{suffix}") for post_id in post_ids]
+        results = await run_batch(get_wp_client(), requests, batch_size=batch_size)
+        return _bulk_summary(results, "post_id")
+    except Exception as e:
+        return dumps({"success": False, "message": str(e)})
+
+@mcp.tool()
+async def search_content(
+    query: str,
+    limit: int = 10,
+    kind: str = None,
+    status: str = "publish",
+    categories: List[int] = None,
+    tags: List[int] = None,
+    after: str = None,
+    before: str = None
+) -> str:
+    """Full-text search over posts and pages with BM25 ranking and highlighting
+    
+    Args:
+        query: Search query (Russian words are matched by stem)
+        limit: Maximum number of results
+        kind: Restrict to "posts" or "pages" (optional)
+        status: Post status filter (publish, draft, private, any)
+        categories: Only posts in any of these category IDs (optional)
+        tags: Only posts with any of these tag IDs (optional)
+        after: Only content dated on/after this ISO date (optional)
+        before: Only content dated before this ISO date (optional)
+    """
+    try:
+        index = await get_search_index()
+        results = index.search(
+            query, limit=limit, kind=kind, status=status,
+            categories=categories, tags=tags, after=after, before=before
+        )
+        return dumps({
+            "success": True,
+            "results": results,
+            "count": len(results),
+            "indexed": len(index)
+        })
+    except Exception as e:
+        return dumps({"success": False, "message": str(e)})
 
 # ==================== PAGE MANAGEMENT TOOLS ====================
 
 @mcp.tool()
-async def get_page(page_id: int = None, slug: str = None) -> str:
+async def get_page(
+    page_id: int = None,
+    slug: str = None,
+    fields: List[str] = None,
+    max_age: float = None,
+    max_bytes: int = None,
+    cursor: str = None,
+    format: str = "html"
+) -> str:
     """Get a single WordPress page by ID or slug
     
     Args:
         page_id: Page ID (optional)
         slug: Page slug (optional)
+        fields: WordPress fields to return (optional, default: id, title, content, status, link)
+        max_age: Answer from the local mirror if it synced within this many seconds (optional)
+        max_bytes: Return at most this much content, split on block boundaries, with a
+            content_slice.next_cursor for the rest (optional)
+        cursor: next_cursor from a previous call; returns the next content slice (optional)
+        format: Content format: html (as rendered), markdown or text
     """
     try:
-        if page_id:
-            data = await get_wp_client().request("GET", f"pages/{page_id}")
+        if cursor:
+            return dumps(cursor_result("page", cursor))
+        check_format(format)
+        params = {"_fields": version_fields(fields_param(POST_DETAIL_FIELDS, fields), format)}
+        mirror = mirror_for("pages", max_age)
+        if mirror is not None and (page_id or slug):
+            data = mirror.get("pages", object_id=page_id or None, slug=slug)
+        elif page_id:
+            data = await get_wp_client().request("GET", f"pages/{page_id}", params=params)
         elif slug:
-            pages = await get_wp_client().request("GET", f"pages?slug={slug}")
+            pages = await get_wp_client().request("GET", "pages", params={**params, "slug": slug})
             data = pages[0] if pages else None
         else:
-            return json.dumps({"success": False, "message": "Provide page_id or slug"})
+            return dumps({"success": False, "message": "Provide page_id or slug"})
         
         if data:
-            return json.dumps({
-                "success": True,
-                "page": {
-                    "id": data["id"],
-                    "title": data["title"]["rendered"],
-                    "content": data["content"]["rendered"],
-                    "status": data["status"],
-                    "url": data["link"]
-                }
-            })
-        return json.dumps({"success": False, "message": "Page not found"})
+            item = apply_format("pages", data, project(data, POST_DETAIL_FIELDS, fields), format)
+            return dumps(sliced_result("page", item, max_bytes, html=format == "html"))
+        return dumps({"success": False, "message": "Page not found"})
     except Exception as e:
-        return json.dumps({"success": False, "message": str(e)})
+        return dumps({"success": False, "message": str(e)})
 
 @mcp.tool()
 async def create_page(
@@ -435,29 +983,31 @@ async def create_page(
         }
         
         data = await get_wp_client().request("POST", "pages", json=payload)
-        return json.dumps({
+        return dumps({
             "success": True,
             "page_id": data["id"],
             "url": data["link"],
             "message": f"Page '{title}' created successfully"
         })
     except Exception as e:
-        return json.dumps({"success": False, "message": str(e)})
+        return dumps({"success": False, "message": str(e)})
 
 @mcp.tool()
 async def update_page(
     page_id: int,
     title: str = None,
     content: str = None,
-    status: str = None
+    status: str = None,
+    force: bool = False
 ) -> str:
-    """Update an existing WordPress page
+    """Update an existing WordPress page, sending only the fields that changed
     
     Args:
         page_id: Page ID to update
         title: New title (optional)
         content: New content (optional)
         status: New status (optional)
+        force: Write every given field even if it matches the live page
     """
     try:
         payload = {}
@@ -468,15 +1018,17 @@ async def update_page(
         if status is not None:
             payload["status"] = status
         
-        data = await get_wp_client().request("POST", f"pages/{page_id}", json=payload)
-        return json.dumps({
+        result = await write_changes("pages", page_id, payload, force)
+        return dumps({
             "success": True,
-            "page_id": data["id"],
-            "url": data["link"],
-            "message": f"Page {page_id} updated successfully"
+            "page_id": result["id"],
+            "url": result["link"],
+            "written": result["written"],
+            "unchanged": result["unchanged"],
+            "message": f"Page {page_id} updated successfully" if result["written"] else f"Page {page_id} unchanged"
         })
     except Exception as e:
-        return json.dumps({"success": False, "message": str(e)})
+        return dumps({"success": False, "message": str(e)})
 
 @mcp.tool()
 async def delete_page(page_id: int, force: bool = True) -> str:
@@ -490,37 +1042,44 @@ async def delete_page(page_id: int, force: bool = True) -> str:
         params = {"force": "true" if force else "false"}
         await get_wp_client().request("DELETE", f"pages/{page_id}", params=params)
         action = "deleted permanently" if force else "moved to trash"
-        return json.dumps({
+        return dumps({
             "success": True,
             "page_id": page_id,
             "message": f"Page {page_id} {action}"
         })
     except Exception as e:
-        return json.dumps({"success": False, "message": str(e)})
+        return dumps({"success": False, "message": str(e)})
 
 # ==================== CATEGORY & TAG MANAGEMENT ====================
 
 @mcp.tool()
-async def get_categories(per_page: int = 100) -> str:
+async def get_categories(
+    per_page: int = 100,
+    fields: List[str] = None,
+    all: bool = False,
+    max_age: float = None
+) -> str:
     """Get list of WordPress categories
     
     Args:
         per_page: Number of categories to retrieve
+        fields: WordPress fields to return (optional, default: id, name, slug, count)
+        all: Fetch every category, ignoring per_page
+        max_age: Answer from the local mirror if it synced within this many seconds (optional)
     """
     try:
-        data = await get_wp_client().request("GET", f"categories?per_page={per_page}")
-        categories = [
-            {
-                "id": cat["id"],
-                "name": cat["name"],
-                "slug": cat["slug"],
-                "count": cat["count"]
-            }
-            for cat in data
-        ]
-        return json.dumps({"success": True, "categories": categories})
+        params = {"per_page": per_page, "_fields": fields_param(TERM_FIELDS, fields)}
+        mirror = mirror_for("categories", max_age)
+        if mirror is not None:
+            data, _ = mirror.list("categories", per_page=None if all else per_page)
+        elif all:
+            data = await fetch_all(get_wp_client(), "categories", params)
+        else:
+            data = await get_wp_client().request("GET", "categories", params=params)
+        categories = [project(cat, TERM_FIELDS, fields) for cat in data]
+        return dumps({"success": True, "categories": categories})
     except Exception as e:
-        return json.dumps({"success": False, "message": str(e)})
+        return dumps({"success": False, "message": str(e)})
 
 @mcp.tool()
 async def create_category(name: str, description: str = "", parent: int = 0) -> str:
@@ -538,36 +1097,43 @@ async def create_category(name: str, description: str = "", parent: int = 0) ->
             "parent": parent
         }
         data = await get_wp_client().request("POST", "categories", json=payload)
-        return json.dumps({
+        return dumps({
             "success": True,
             "category_id": data["id"],
             "name": data["name"],
             "slug": data["slug"]
         })
     except Exception as e:
-        return json.dumps({"success": False, "message": str(e)})
+        return dumps({"success": False, "message": str(e)})
 
 @mcp.tool()
-async def get_tags(per_page: int = 100) -> str:
+async def get_tags(
+    per_page: int = 100,
+    fields: List[str] = None,
+    all: bool = False,
+    max_age: float = None
+) -> str:
     """Get list of WordPress tags
     
     Args:
         per_page: Number of tags to retrieve
+        fields: WordPress fields to return (optional, default: id, name, slug, count)
+        all: Fetch every tag, ignoring per_page
+        max_age: Answer from the local mirror if it synced within this many seconds (optional)
     """
     try:
-        data = await get_wp_client().request("GET", f"tags?per_page={per_page}")
-        tags = [
-            {
-                "id": tag["id"],
-                "name": tag["name"],
-                "slug": tag["slug"],
-                "count": tag["count"]
-            }
-            for tag in data
-        ]
-        return json.dumps({"success": True, "tags": tags})
+        params = {"per_page": per_page, "_fields": fields_param(TERM_FIELDS, fields)}
+        mirror = mirror_for("tags", max_age)
+        if mirror is not None:
+            data, _ = mirror.list("tags", per_page=None if all else per_page)
+        elif all:
+            data = await fetch_all(get_wp_client(), "tags", params)
+        else:
+            data = await get_wp_client().request("GET", "tags", params=params)
+        tags = [project(tag, TERM_FIELDS, fields) for tag in data]
+        return dumps({"success": True, "tags": tags})
     except Exception as e:
-        return json.dumps({"success": False, "message": str(e)})
+        return dumps({"success": False, "message": str(e)})
 
 @mcp.tool()
 async def create_tag(name: str, description: str = "") -> str:
@@ -583,108 +1149,201 @@ async def create_tag(name: str, description: str = "") -> str:
             "description": description
         }
         data = await get_wp_client().request("POST", "tags", json=payload)
-        return json.dumps({
+        return dumps({
             "success": True,
             "tag_id": data["id"],
             "name": data["name"],
             "slug": data["slug"]
         })
     except Exception as e:
-        return json.dumps({"success": False, "message": str(e)})
+        return dumps({"success": False, "message": str(e)})
 
 # ==================== MEDIA MANAGEMENT ====================
 
 @mcp.tool()
-async def get_media(per_page: int = 10, page: int = 1) -> str:
+async def get_media(
+    per_page: int = 10,
+    page: int = 1,
+    fields: List[str] = None,
+    all: bool = False,
+    max_age: float = None
+) -> str:
     """Get list of media files
     
     Args:
         per_page: Number of media items per page
         page: Page number
+        fields: WordPress fields to return (optional, default: id, title, source_url, mime_type, date)
+        all: Fetch every media item, ignoring per_page and page
+        max_age: Answer from the local mirror if it synced within this many seconds (optional)
     """
     try:
-        params = {"per_page": per_page, "page": page}
-        response = await get_wp_client().client.get(
-            f"{get_wp_client().base_url}/wp-json/wp/v2/media",
-            params=params
-        )
-        response.raise_for_status()
-        media = response.json()
+        params = {"per_page": per_page, "page": page, "_fields": fields_param(MEDIA_FIELDS, fields)}
+        mirror = mirror_for("media", max_age)
+        if mirror is not None:
+            media, _ = mirror.list("media", page=page, per_page=None if all else per_page)
+        elif all:
+            media = await fetch_all(get_wp_client(), "media", params)
+        else:
+            media = await get_wp_client().request("GET", "media", params=params)
         
-        formatted_media = [
-            {
-                "id": m["id"],
-                "title": m["title"]["rendered"],
-                "url": m["source_url"],
-                "mime_type": m["mime_type"],
-                "date": m["date"]
-            }
-            for m in media
-        ]
+        formatted_media = [project(m, MEDIA_FIELDS, fields) for m in media]
         
-        return json.dumps({
+        return dumps({
             "success": True,
             "media": formatted_media,
             "count": len(formatted_media)
         })
     except Exception as e:
-        return json.dumps({"success": False, "message": str(e)})
+        return dumps({"success": False, "message": str(e)})
+
+@mcp.tool()
+async def upload_media(
+    source: str,
+    filename: str = None,
+    title: str = None,
+    alt_text: str = None,
+    caption: str = None,
+    description: str = None,
+    post_id: int = None,
+    optimize: bool = False,
+    image_format: str = "webp",
+    quality: int = 82,
+    max_size: int = 2560,
+    dedupe: bool = True
+) -> str:
+    """Upload a file to the media library, streaming it from disk or a URL
+    
+    Args:
+        source: Local file path or http(s) URL
+        filename: File name to store (optional, default: taken from the source)
+        title: Attachment title (optional)
+        alt_text: Alternative text (optional)
+        caption: Caption (optional)
+        description: Description (optional)
+        post_id: Post to attach the file to (optional)
+        optimize: Resize, strip EXIF and re-encode images before uploading
+        image_format: Encoding when optimizing: webp, avif or jpeg
+        quality: Encoder quality when optimizing (1-100)
+        max_size: Longest edge in pixels when optimizing
+        dedupe: Return the existing attachment if the library already has this file
+    """
+    try:
+        from image_optimize import OptimizeOptions
+        from media_upload import UploadItem
+        item = UploadItem.from_dict({
+            "source": source, "filename": filename, "title": title, "alt_text": alt_text,
+            "caption": caption, "description": description, "post_id": post_id,
+            "optimize": OptimizeOptions(image_format, quality, max_size) if optimize else None,
+            "dedupe": dedupe
+        })
+        result = await get_uploader().upload(item)
+        return dumps({"success": True, "media": result})
+    except Exception as e:
+        return dumps({"success": False, "message": str(e)})
+
+@mcp.tool()
+async def upload_media_batch(items: List[Dict[str, Any]]) -> str:
+    """Upload many files concurrently (WP_UPLOAD_CONCURRENCY at a time)
+    
+    Args:
+        items: Uploads, each with "source" (path or URL) and optional filename,
+            title, alt_text, caption, description, post_id, dedupe (default true)
+            and optimize (true, or {"format": "webp", "quality": 82, "max_size": 2560})
+    """
+    try:
+        from media_upload import UploadItem
+        report = await get_uploader().upload_many([UploadItem.from_dict(item) for item in items])
+        return dumps({"success": report["failed"] == 0, **report})
+    except Exception as e:
+        return dumps({"success": False, "message": str(e)})
+
+@mcp.tool()
+async def find_duplicate_media() -> str:
+    """Scan the whole media library for files with identical content
+    
+    Only files sharing a size are downloaded and hashed; hashes are kept in
+    the media index (WP_MEDIA_INDEX_PATH), so later scans are fast.
+    """
+    try:
+        index = get_media_index()
+        if index is None:
+            return dumps({"success": False, "message": "Media index is disabled (set WP_MEDIA_INDEX_PATH)"})
+        groups = await index.duplicates()
+        return dumps({
+            "success": True,
+            "groups": groups,
+            "duplicates": sum(len(g["media"]) - 1 for g in groups),
+            "wasted_bytes": sum(g["wasted_bytes"] for g in groups),
+            "index": index.stats()
+        })
+    except Exception as e:
+        return dumps({"success": False, "message": str(e)})
 
 # ==================== USER MANAGEMENT ====================
 
 @mcp.tool()
-async def get_users(per_page: int = 10) -> str:
+async def get_users(
+    per_page: int = 10,
+    fields: List[str] = None,
+    all: bool = False,
+    max_age: float = None
+) -> str:
     """Get list of WordPress users
     
     Args:
         per_page: Number of users to retrieve
+        fields: WordPress fields to return (optional, default: id, name, slug, email, roles)
+        all: Fetch every user, ignoring per_page
+        max_age: Answer from the local mirror if it synced within this many seconds (optional)
     """
     try:
-        data = await get_wp_client().request("GET", f"users?per_page={per_page}")
-        users = [
-            {
-                "id": user["id"],
-                "name": user["name"],
-                "username": user["slug"],
-                "email": user.get("email", ""),
-                "roles": user.get("roles", [])
-            }
-            for user in data
-        ]
-        return json.dumps({"success": True, "users": users})
-    except Exception as e:
-        return json.dumps({"success": False, "message": str(e)})
+        params = {"per_page": per_page, "_fields": fields_param(USER_FIELDS, fields)}
+        mirror = mirror_for("users", max_age)
+        if mirror is not None:
+            data, _ = mirror.list("users", per_page=None if all else per_page)
+        elif all:
+            data = await fetch_all(get_wp_client(), "users", params)
+        else:
+            data = await get_wp_client().request("GET", "users", params=params)
+        users = [project(user, USER_FIELDS, fields) for user in data]
+        return dumps({"success": True, "users": users})
+    except Exception as e:
+        return dumps({"success": False, "message": str(e)})
 
 # ==================== COMMENTS MANAGEMENT ====================
 
 @mcp.tool()
-async def get_comments(post_id: int = None, per_page: int = 10) -> str:
+async def get_comments(
+    post_id: int = None,
+    per_page: int = 10,
+    fields: List[str] = None,
+    all: bool = False,
+    format: str = "html"
+) -> str:
     """Get list of comments
     
     Args:
         post_id: Filter by post ID (optional)
         per_page: Number of comments to retrieve
+        fields: WordPress fields to return (optional, default: id, post, author_name, content, date, status)
+        all: Fetch every matching comment, ignoring per_page
+        format: Content format: html (as rendered), markdown or text
     """
     try:
-        endpoint = f"comments?per_page={per_page}"
+        check_format(format)
+        params = {"per_page": per_page, "_fields": fields_param(COMMENT_FIELDS, fields)}
         if post_id:
-            endpoint += f"&post={post_id}"
+            params["post"] = post_id
         
-        data = await get_wp_client().request("GET", endpoint)
-        comments = [
-            {
-                "id": c["id"],
-                "post_id": c["post"],
-                "author": c["author_name"],
-                "content": c["content"]["rendered"],
-                "date": c["date"],
-                "status": c["status"]
-            }
-            for c in data
-        ]
-        return json.dumps({"success": True, "comments": comments})
-    except Exception as e:
-        return json.dumps({"success": False, "message": str(e)})
+        if all:
+            data = await fetch_all(get_wp_client(), "comments", params)
+        else:
+            data = await get_wp_client().request("GET", "comments", params=params)
+        comments = await format_items("comments", data, [project(c, COMMENT_FIELDS, fields) for c in data], format)
+        return dumps({"success": True, "comments": comments})
+    except Exception as e:
+        return dumps({"success": False, "message": str(e)})
 
 @mcp.tool()
 async def approve_comment(comment_id: int) -> str:
@@ -695,13 +1354,13 @@ async def approve_comment(comment_id: int) -> str:
     """
     try:
         data = await get_wp_client().request("POST", f"comments/{comment_id}", json={"status": "approved"})
-        return json.dumps({
+        return dumps({
             "success": True,
             "comment_id": data["id"],
             "message": f"Comment {comment_id} approved"
         })
     except Exception as e:
-        return json.dumps({"success": False, "message": str(e)})
+        return dumps({"success": False, "message": str(e)})
 
 @mcp.tool()
 async def delete_comment(comment_id: int, force: bool = True) -> str:
@@ -715,13 +1374,42 @@ async def delete_comment(comment_id: int, force: bool = True) -> str:
         params = {"force": "true" if force else "false"}
         await get_wp_client().request("DELETE", f"comments/{comment_id}", params=params)
         action = "deleted permanently" if force else "moved to trash"
-        return json.dumps({
+        return dumps({
             "success": True,
             "comment_id": comment_id,
             "message": f"Comment {comment_id} {action}"
         })
     except Exception as e:
-        return json.dumps({"success": False, "message": str(e)})
+        return dumps({"success": False, "message": str(e)})
+
+# Moderation action -> comment status sent to WordPress
+COMMENT_ACTIONS = {"approve": "approved", "hold": "hold", "spam": "spam", "trash": "trash"}
+
+@mcp.tool()
+async def bulk_moderate_comments(
+    comment_ids: List[int],
+    action: str = "approve",
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> str:
+    """Approve, hold, spam, trash or delete many comments through the batch API
+    
+    Args:
+        comment_ids: Comment IDs to moderate
+        action: approve, hold, spam, trash or delete (permanent)
+        batch_size: Comments per batch request (WordPress allows 25 by default)
+    """
+    try:
+        if action == "delete":
+            requests = [batch_request("DELETE", f"comments/{cid}?force=true") for cid in comment_ids]
+        elif action in COMMENT_ACTIONS:
+            status = COMMENT_ACTIONS[action]
+            requests = [batch_request("POST", f"comments/{cid}", {"status": status}) for cid in comment_ids]
+        else:
+            return dumps({"success": False, "message": f"Unknown action: {action}"})
+        results = await run_batch(get_wp_client(), requests, batch_size=batch_size)
+        return _bulk_summary(results, "comment_id")
+    except Exception as e:
+        return dumps({"success": False, "message": str(e)})
 
 # ==================== SITE INFORMATION ====================
 
@@ -729,28 +1417,190 @@ async def delete_comment(comment_id: int, force: bool = True) -> str:
 async def get_site_info() -> str:
     """Get WordPress site information"""
     try:
-        response = await get_wp_client().client.get(f"{get_wp_client().base_url}/wp-json")
-        response.raise_for_status()
-        data = response.json()
+        # The index also lists every route; projecting it away saves most of the payload
+        params = {"_fields": fields_param(SITE_FIELDS)}
+        data = await get_wp_client().request("GET", "", namespace="", params=params)
         
-        return json.dumps({
+        return dumps({
             "success": True,
-            "site": {
-                "name": data.get("name", ""),
-                "description": data.get("description", ""),
-                "url": data.get("url", ""),
-                "home": data.get("home", ""),
-                "gmt_offset": data.get("gmt_offset", 0),
-                "timezone_string": data.get("timezone_string", "")
-            }
+            "site": project(data, SITE_FIELDS)
         })
     except Exception as e:
-        return json.dumps({"success": False, "message": str(e)})
+        return dumps({"success": False, "message": str(e)})
+
+# ==================== DIAGNOSTICS ====================
+
+@mcp.tool()
+async def get_cache_stats() -> str:
+    """Get response cache and request coalescing counters"""
+    try:
+        client = get_wp_client()
+        return dumps({
+            "success": True,
+            "cache": client.cache.stats(),
+            "singleflight": client.flights.stats(),
+            "taxonomy": taxonomy_index.stats() if taxonomy_index else None,
+            "content_cursors": content_cursors.stats(),
+            "conversions": conversion_cache.stats()
+        })
+    except Exception as e:
+        return dumps({"success": False, "message": str(e)})
+
+@mcp.tool()
+async def sync_mirror(kinds: List[str] = None, reconcile: bool = False) -> str:
+    """Run a sync pass of the local content mirror now
+    
+    Args:
+        kinds: Kinds to sync: posts, pages, media, categories, tags, users (optional, default: all)
+        reconcile: Also remove objects deleted upstream (optional)
+    """
+    try:
+        mirror = get_mirror()
+        if mirror is None:
+            return dumps({"success": False, "message": "Content mirror is disabled (set WP_MIRROR_PATH)"})
+        report = await mirror.sync(kinds, reconcile=reconcile)
+        return dumps({"success": True, "sync": report, "mirror": mirror.stats()})
+    except Exception as e:
+        return dumps({"success": False, "message": str(e)})
+
+@mcp.tool()
+async def get_mirror_status() -> str:
+    """Get local content mirror object counts and sync age per kind"""
+    try:
+        mirror = get_mirror()
+        if mirror is None:
+            return dumps({"success": False, "message": "Content mirror is disabled (set WP_MIRROR_PATH)"})
+        return dumps({"success": True, "mirror": mirror.stats()})
+    except Exception as e:
+        return dumps({"success": False, "message": str(e)})
+
+# ==================== METRICS ====================
+
+def collect_metrics():
+    """Cache counters, read at scrape time"""
+    if wp_client is not None:
+        yield from cache_samples("response", wp_client.cache.stats())
+        yield ("wp_mcp_singleflight_shared_total", "counter",
+               "GETs that joined an identical in-flight request", {}, wp_client.flights.stats()["shared"])
+    yield from cache_samples("conversions", conversion_cache.stats())
+    if content_hashes is not None:
+        yield from cache_samples("content_hashes", content_hashes.stats())
+
+instrument_tools(mcp._tool_manager)
+trace_tools(
+    mcp._tool_manager,
+    debug=DEBUG_TIMINGS,
+    slow_ms=SLOW_CALL_MS,
+    slow_logger=slow_call_logger(SLOW_CALL_LOG) if SLOW_CALL_LOG else None
+)
+REGISTRY.add_collector(collect_metrics)
+
+# ==================== TRANSPORT SECURITY & SSE PATCH ====================
+# The MCP SDK includes DNS rebinding protection that rejects Cloudflare Tunnel URLs.
+# We apply a definitive patch to disable security checks and ADD AGGRESSIVE LOGGING.
+# Only the network transports need it: network_app() applies it, stdio sessions never do.
+
+def patch_transport_security():
+    try:
+        import mcp.server.transport_security as ts
+        from starlette.requests import Request
+        from starlette.responses import Response
+
+        # 1. Patch TransportSecurityMiddleware (The Gatekeeper)
+        if hasattr(ts, "TransportSecurityMiddleware"):
+            async def mock_validate(self, request: Request, is_post: bool = False) -> Response | None:
+                path = request.url.path
+                access_logger.debug("Security bypass for %s %s", request.method, path, extra={"path": path})
+                return None
+            ts.TransportSecurityMiddleware.validate_request = mock_validate
+            logger.debug("Patched TransportSecurityMiddleware.validate_request")
+
+        # 2. Patch SseServerTransport.connect_sse (The Entrance) - This section is now handled by mcp.sse_app()
+        #    The original patching logic for SseServerTransport.connect_sse is removed
+        #    as mcp.sse_app() provides a more robust integration.
+        #    The CloudflareOptimizationMiddleware and RequestDiagnosticMiddleware will be applied directly to the sse_app.
+
+        # 3. Disable DNS rebinding in Settings
+        if hasattr(ts, "TransportSecuritySettings"):
+            try:
+                ts.TransportSecuritySettings.model_fields['enable_dns_rebinding_protection'].default = False
+            except:
+                pass
+    except Exception as e:
+        logger.error(f"Critical patch failure: {e}")
+
+# 4. Functional ASGI Middleware (v1.3.0 Ngrok Edition)
+def diagnostic_middleware(app, padding: Optional[SsePadding] = None):
+    async def asgi_app(scope, receive, send):
+        if scope["type"] != "http":
+            return await app(scope, receive, send)
+
+        path = scope.get("path", "")
+        method = scope.get("method", "")
+        policy = padding if padding is not None else SSE_PADDING
+        
+        # Per-request state for padding
+        request_state = {"padded": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                if path == "/sse":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"cache-control", b"no-cache, no-transform, no-store, must-revalidate"))
+                    headers.append((b"x-accel-buffering", b"no"))
+                    headers.append((b"x-content-type-options", b"nosniff"))
+                    headers.append((b"connection", b"keep-alive"))
+                    headers.append((b"content-encoding", b"identity"))
+                    # Force chunked encoding
+                    headers = [h for h in headers if h[0].lower() != b"content-length"]
+                    message["headers"] = headers
+                
+                access_logger.debug("<-- %s %s", message.get("status"), path, extra={"path": path})
+            
+            # PADDING in front of the first event so a buffering proxy flushes it (see sse_padding)
+            if message["type"] == "http.response.body" and path == "/sse" and method == "GET":
+                if not request_state["padded"]:
+                    request_state["padded"] = True
+                    mode = policy.resolve(scope.get("headers", []))
+                    sent = await policy.send_first(send, message, mode)
+                    if sent:
+                        access_logger.debug("Sent %d bytes of %s padding to %s %s", sent, mode, method, path,
+                                            extra={"path": path})
+                    return
+
+            await send(message)
+
+        access_logger.debug("--> %s %s%s", method, path, " (MCP Message)" if "/messages/" in path else "",
+                            extra={"path": path})
+        return await app(scope, receive, send_wrapper)
+    return asgi_app
 
 # ==================== MAIN ENTRY POINT ====================
 
+def network_app(transport: str):
+    """ASGI app served for the "sse" or "streamable-http" transport"""
+    patch_transport_security()
+    if transport == "sse":
+        # Use the official sse_app() from FastMCP
+        # This is more robust than manual transport management
+        app = mcp.sse_app()
+        # Wrap with diagnostic_middleware for SSE headers and padding (SSE_PADDING)
+        app = diagnostic_middleware(app)
+    else:
+        # Same as mcp.run(), plus /metrics
+        app = mcp.streamable_http_app()
+    # Outermost, so /metrics skips the diagnostics and SSE sessions are counted
+    return asgi_middleware(app)
+
 async def cleanup():
     """Cleanup resources on shutdown"""
+    if content_mirror is not None:
+        await content_mirror.stop()
+        content_mirror.close()
+    if media_uploader is not None:
+        await media_uploader.close()
+    if media_index is not None:
+        await media_index.close()
     await get_wp_client().close()
 
 if __name__ == "__main__":
@@ -765,40 +1615,37 @@ if __name__ == "__main__":
         elif sys.argv[1] == "--sse":
             transport = "sse"
     
-    # Enable DEBUG logging to stderr for both stdio and network transports
-    # This will help us see exactly what's failing in the SSE handshake
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        stream=sys.stderr,
-        force=True
-    )
+    # Queued logging at the transport's level (WP_LOG_LEVEL=DEBUG or SIGUSR1 for
+    # the SSE handshake diagnostics)
+    start_logging(transport)
     
     logger.info(f"Starting WordPress MCP Server with {transport} transport")
     
+    metrics_writer = None
     try:
         if transport == "sse":
             import uvicorn
 
-            # Use the official sse_app() from FastMCP
-            # This is more robust than manual transport management
-            app = mcp.sse_app()
-            
-            # Wrap with diagnostic_middleware for pulsed padding (v1.2.3)
-            app = diagnostic_middleware(app)
-            
             logger.info("Starting FastMCP SSE server on 0.0.0.0:8000")
-            print("DEBUG: Server listening on 0.0.0.0:8000 for SSE transport", file=sys.stderr)
-            uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
+            # log_config=None: uvicorn's loggers propagate to the queued root handler
+            uvicorn.run(network_app(transport), host="0.0.0.0", port=8000, log_config=None)
+        elif transport == "streamable-http":
+            import uvicorn
+
+            uvicorn.run(network_app(transport), host=mcp.settings.host, port=mcp.settings.port, log_config=None)
         else:
+            metrics_writer = start_metrics_textfile()
             mcp.run(transport=transport)
 
     except Exception as e:
         logger.error(f"Server crashed: {e}", exc_info=True)
         sys.exit(1)
     finally:
+        if metrics_writer is not None:
+            metrics_writer.stop()
         if transport == "stdio":
             import asyncio
             asyncio.run(cleanup())
+        stop_logging()
 
 
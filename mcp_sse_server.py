@@ -4,21 +4,26 @@ WordPress MCP SSE Server for OpenAI and ChatGPT
 """
 
 import asyncio
-import json
 import logging
 import os
+import socket
+import time
 from contextlib import asynccontextmanager
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 
 import httpx
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from mcp.server import Server
 from mcp.types import Tool, TextContent
-from sse_starlette.sse import EventSourceResponse
 import uvicorn
 
+from metrics import asgi_middleware, is_failure, record_tool, upstream_event_hooks
+from serialization import JSONDecodeError, JSONResponse, dumpb, dumps, loads
+from sse_sessions import SessionRegistry, SessionStream, encode_event
+from tool_registry import ToolArgumentError, ToolRegistry
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -28,6 +33,17 @@ WORDPRESS_URL = os.getenv("WORDPRESS_URL", "https://your-wordpress-site.com/")
 WORDPRESS_USERNAME = os.getenv("WORDPRESS_USERNAME", "your-username")
 WORDPRESS_PASSWORD = os.getenv("WORDPRESS_PASSWORD", "your-password")
 
+# One ticker sends SSE heartbeats to all clients; streams that take no data for
+# SSE_STALE_AFTER seconds (default: four heartbeats) are closed
+SSE_HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_INTERVAL", "15"))
+SSE_STALE_AFTER = float(os.getenv("SSE_STALE_AFTER", "0")) or None
+
+# Messages of one JSON-RPC batch on /mcp that run at the same time
+MCP_BATCH_CONCURRENCY = int(os.getenv("MCP_BATCH_CONCURRENCY", "8"))
+
+# "all": also serve every tool of mcp_server.py (its FastMCP instance and WordPress client)
+MCP_SSE_TOOLS = os.getenv("MCP_SSE_TOOLS", "posts").lower()
+
 # ==================== LOGGING SETUP ====================
 logging.basicConfig(
     level=logging.INFO,
@@ -54,7 +70,8 @@ class WordPressMCP:
         self.client = httpx.AsyncClient(
             auth=(username, password),
             timeout=30.0,
-            headers={"Content-Type": "application/json"}
+            headers={"Content-Type": "application/json"},
+            event_hooks=upstream_event_hooks(f"{self.base_url}/wp-json")
         )
         logger.info(f"WordPressMCP initialized for {base_url}")
     
@@ -308,114 +325,150 @@ class WordPressMCP:
 # ==================== GLOBAL INSTANCES ====================
 wordpress_mcp: Optional[WordPressMCP] = None
 mcp_server = Server("wordpress-mcp-server")
+sse_registry = SessionRegistry(SSE_HEARTBEAT_INTERVAL, SSE_STALE_AFTER)
+# Fallback host for the SSE endpoint event when a request has no Host header (resolved at startup)
+default_host = "localhost:8000"
+# Pre-encoded endpoint events by (scheme, host)
+endpoint_events: Dict[tuple, bytes] = {}
 
 # ==================== MCP TOOLS DEFINITION ====================
-@mcp_server.list_tools()
-async def list_tools() -> List[Tool]:
-    """List all available MCP tools"""
-    return [
-        Tool(
-            name="create_post",
-            description="Create a new WordPress post on your site",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "title": {
-                        "type": "string",
-                        "description": "Post title"
-                    },
-                    "content": {
-                        "type": "string",
-                        "description": "Post content in HTML"
-                    },
-                    "excerpt": {
-                        "type": "string",
-                        "description": "Post excerpt",
-                        "default": ""
-                    },
-                    "status": {
-                        "type": "string",
-                        "enum": ["publish", "draft", "private"],
-                        "default": "publish",
-                        "description": "Post status"
-                    }
-                },
-                "required": ["title", "content"]
+# Schemas, argument validators and the tools/list body are built once here
+TOOLS = ToolRegistry()
+
+def wordpress_tool(method: str):
+    """Handler calling a WordPressMCP method with the validated arguments"""
+    async def handler(**arguments):
+        return await getattr(wordpress_mcp, method)(**arguments)
+    return handler
+
+TOOLS.add(
+    "create_post",
+    "Create a new WordPress post on your site",
+    {
+        "type": "object",
+        "properties": {
+            "title": {
+                "type": "string",
+                "description": "Post title"
+            },
+            "content": {
+                "type": "string",
+                "description": "Post content in HTML"
+            },
+            "excerpt": {
+                "type": "string",
+                "description": "Post excerpt",
+                "default": ""
+            },
+            "status": {
+                "type": "string",
+                "enum": ["publish", "draft", "private"],
+                "default": "publish",
+                "description": "Post status"
             }
-        ),
-        Tool(
-            name="update_post",
-            description="Update an existing WordPress post",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "post_id": {
-                        "type": "integer",
-                        "description": "Post ID to update"
-                    },
-                    "title": {
-                        "type": "string",
-                        "description": "New post title"
-                    },
-                    "content": {
-                        "type": "string",
-                        "description": "New post content in HTML"
-                    },
-                    "excerpt": {
-                        "type": "string",
-                        "description": "New post excerpt"
-                    }
-                },
-                "required": ["post_id"]
+        },
+        "required": ["title", "content"]
+    },
+    wordpress_tool("create_post")
+)
+
+TOOLS.add(
+    "update_post",
+    "Update an existing WordPress post",
+    {
+        "type": "object",
+        "properties": {
+            "post_id": {
+                "type": "integer",
+                "description": "Post ID to update"
+            },
+            "title": {
+                "type": "string",
+                "description": "New post title"
+            },
+            "content": {
+                "type": "string",
+                "description": "New post content in HTML"
+            },
+            "excerpt": {
+                "type": "string",
+                "description": "New post excerpt"
             }
-        ),
-        Tool(
-            name="get_posts",
-            description="Get list of WordPress posts",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "per_page": {
-                        "type": "integer",
-                        "description": "Number of posts per page (1-100)",
-                        "default": 10,
-                        "minimum": 1,
-                        "maximum": 100
-                    },
-                    "page": {
-                        "type": "integer",
-                        "description": "Page number",
-                        "default": 1,
-                        "minimum": 1
-                    }
-                }
+        },
+        "required": ["post_id"]
+    },
+    wordpress_tool("update_post")
+)
+
+TOOLS.add(
+    "get_posts",
+    "Get list of WordPress posts",
+    {
+        "type": "object",
+        "properties": {
+            "per_page": {
+                "type": "integer",
+                "description": "Number of posts per page (1-100)",
+                "default": 10,
+                "minimum": 1,
+                "maximum": 100
+            },
+            "page": {
+                "type": "integer",
+                "description": "Page number",
+                "default": 1,
+                "minimum": 1
             }
-        ),
-        Tool(
-            name="delete_post",
-            description="Delete a WordPress post",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "post_id": {
-                        "type": "integer",
-                        "description": "Post ID to delete"
-                    }
-                },
-                "required": ["post_id"]
+        }
+    },
+    wordpress_tool("get_posts")
+)
+
+TOOLS.add(
+    "delete_post",
+    "Delete a WordPress post",
+    {
+        "type": "object",
+        "properties": {
+            "post_id": {
+                "type": "integer",
+                "description": "Post ID to delete"
             }
-        )
-    ]
+        },
+        "required": ["post_id"]
+    },
+    wordpress_tool("delete_post")
+)
+
+@mcp_server.list_tools()
+async def list_tools() -> List[Tool]:
+    """List all available MCP tools"""
+    return TOOLS.mcp_tools()
 
 @mcp_server.call_tool()
 async def call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
-    """Handle tool calls"""
+    """Handle tool calls, recording count, errors and latency per tool"""
+    started = time.perf_counter()
+    results = await run_tool(name, arguments)
+    spec = TOOLS.tools.get(name)
+    if spec is not None and spec.instrumented:
+        # mcp_server's ToolManager has recorded the call already
+        return results
+    record_tool(
+        name if name in TOOLS else "unknown",
+        time.perf_counter() - started,
+        any(is_failure(result.text) for result in results)
+    )
+    return results
+
+async def run_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
+    """Dispatch a tool call to the WordPress client"""
     global wordpress_mcp
     
     if wordpress_mcp is None:
         return [TextContent(
             type="text",
-            text=json.dumps({
+            text=dumps({
                 "success": False,
                 "message": "WordPress MCP client not initialized"
             })
@@ -424,29 +477,8 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
     try:
         logger.info(f"Tool call: {name} with args: {arguments}")
         
-        if name == "create_post":
-            result = await wordpress_mcp.create_post(
-                title=arguments["title"],
-                content=arguments["content"],
-                excerpt=arguments.get("excerpt", ""),
-                status=arguments.get("status", "publish")
-            )
-        elif name == "update_post":
-            result = await wordpress_mcp.update_post(
-                post_id=arguments["post_id"],
-                title=arguments.get("title"),
-                content=arguments.get("content"),
-                excerpt=arguments.get("excerpt")
-            )
-        elif name == "get_posts":
-            result = await wordpress_mcp.get_posts(
-                per_page=arguments.get("per_page", 10),
-                page=arguments.get("page", 1)
-            )
-        elif name == "delete_post":
-            result = await wordpress_mcp.delete_post(
-                post_id=arguments["post_id"]
-            )
+        if name in TOOLS:
+            result = await TOOLS.call(name, arguments)
         else:
             result = {
                 "success": False,
@@ -455,14 +487,23 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
         
         return [TextContent(
             type="text",
-            text=json.dumps(result)
+            text=result if isinstance(result, str) else dumps(result)
         )]
         
+    except ToolArgumentError as e:
+        logger.error(f"Invalid arguments for {name}: {str(e)}")
+        return [TextContent(
+            type="text",
+            text=dumps({
+                "success": False,
+                "message": str(e)
+            })
+        )]
     except KeyError as e:
         logger.error(f"Missing required argument: {str(e)}")
         return [TextContent(
             type="text",
-            text=json.dumps({
+            text=dumps({
                 "success": False,
                 "message": f"Missing required argument: {str(e)}"
             })
@@ -471,7 +512,7 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
         logger.error(f"Error calling tool {name}: {str(e)}")
         return [TextContent(
             type="text",
-            text=json.dumps({
+            text=dumps({
                 "success": False,
                 "message": f"Error: {str(e)}"
             })
@@ -481,7 +522,7 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for FastAPI"""
-    global wordpress_mcp
+    global wordpress_mcp, default_host
     
     # Startup
     logger.info("Starting WordPress MCP SSE Server...")
@@ -490,17 +531,36 @@ async def lifespan(app: FastAPI):
         WORDPRESS_USERNAME,
         WORDPRESS_PASSWORD
     )
+    try:
+        # Resolved once, off the event loop; a lookup per connection used to block it
+        local_ip = await asyncio.get_running_loop().run_in_executor(
+            None, socket.gethostbyname, socket.gethostname()
+        )
+        default_host = f"{local_ip}:8000"
+    except OSError as e:
+        logger.warning(f"Could not resolve the local address, using {default_host}: {e}")
+    if MCP_SSE_TOOLS == "all":
+        import mcp_server as fastmcp_server
+        # One site for every tool: mcp_server's own settings are not ours
+        fastmcp_server.configure_wordpress(WORDPRESS_URL, WORDPRESS_USERNAME, WORDPRESS_PASSWORD)
+        added = TOOLS.add_fastmcp(fastmcp_server.mcp)
+        logger.info(f"Added {len(added)} tools from mcp_server.py")
+    sse_registry.start()
     logger.info("WordPress MCP Server started successfully")
     
     yield
     
     # Shutdown
     logger.info("Shutting down WordPress MCP SSE Server...")
+    await sse_registry.stop()
     if wordpress_mcp:
         await wordpress_mcp.close()
     logger.info("WordPress MCP SSE Server stopped")
 
-app = FastAPI(title="WordPress MCP SSE Server", lifespan=lifespan)
+app = FastAPI(title="WordPress MCP SSE Server", lifespan=lifespan, default_response_class=JSONResponse)
+
+# /metrics, in-flight requests and open SSE sessions
+app.add_middleware(asgi_middleware)
 
 # Add CORS middleware
 app.add_middleware(
@@ -515,7 +575,6 @@ app.add_middleware(
 @app.get("/")
 async def root():
     """Server information endpoint"""
-    tools = await list_tools()
     return {
         "name": "WordPress MCP SSE Server",
         "version": "1.0.0",
@@ -523,15 +582,16 @@ async def root():
         "endpoints": {
             "/": "Server information",
             "/health": "Health check",
+            "/metrics": "Prometheus metrics",
             "/sse": "SSE endpoint for ChatGPT",
             "/mcp": "MCP JSON-RPC endpoint"
         },
         "tools": [
             {
-                "name": tool.name,
-                "description": tool.description
+                "name": tool["name"],
+                "description": tool["description"]
             }
-            for tool in tools
+            for tool in TOOLS.listing()
         ]
     }
 
@@ -540,59 +600,50 @@ async def health():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "service": "wordpress-mcp-sse-server"
+        "service": "wordpress-mcp-sse-server",
+        "sse_sessions": sse_registry.stats()
     }
 
+def endpoint_event(scheme: str, host: str) -> bytes:
+    """The "endpoint" event for a client, encoded once per scheme and host"""
+    key = (scheme, host)
+    event = endpoint_events.get(key)
+    if event is None:
+        if len(endpoint_events) >= 256:  # arbitrary Host headers must not grow this forever
+            endpoint_events.clear()
+        event = endpoint_events[key] = encode_event("endpoint", dumps({"url": f"{scheme}://{host}/mcp"}))
+    return event
+
 @app.get("/sse")
 async def sse_endpoint(request: Request):
-    """SSE endpoint for ChatGPT"""
-    async def event_generator():
-        # Send endpoint information
-        import socket
-        hostname = socket.gethostname()
-        local_ip = socket.gethostbyname(hostname)
-        
-        # Try to get the actual request host
-        host = request.headers.get("host", f"{local_ip}:8000")
-        protocol = "https" if request.url.scheme == "https" else "http"
-        mcp_url = f"{protocol}://{host}/mcp"
-        
-        yield {
-            "event": "endpoint",
-            "data": json.dumps({"url": mcp_url})
-        }
-        
-        # Send heartbeat every 15 seconds
-        heartbeat_count = 0
-        while True:
-            if await request.is_disconnected():
-                logger.info("SSE client disconnected")
-                break
-            
-            heartbeat_count += 1
-            yield {
-                "event": "heartbeat",
-                "data": json.dumps({"status": "alive", "count": heartbeat_count})
-            }
-            
-            await asyncio.sleep(15)
-    
-    return EventSourceResponse(
-        event_generator(),
+    """SSE endpoint for ChatGPT: the MCP endpoint URL, then shared heartbeats"""
+    host = request.headers.get("host", default_host)
+    protocol = "https" if request.url.scheme == "https" else "http"
+    return SessionStream(
+        sse_registry,
+        endpoint_event(protocol, host),
         headers={
             "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
             "X-Accel-Buffering": "no"
         }
     )
 
-@app.post("/mcp")
-async def mcp_endpoint(request: Request):
-    """MCP JSON-RPC endpoint"""
+async def handle_message(body: Any) -> Union[Dict[str, Any], bytes]:
+    """Answer one JSON-RPC message (a dict, or bytes already encoded)"""
+    if not isinstance(body, dict):
+        return {
+            "jsonrpc": "2.0",
+            "id": None,
+            "error": {
+                "code": -32600,
+                "message": "Invalid Request"
+            }
+        }
+    request_id = body.get("id")
     try:
-        body = await request.json()
         method = body.get("method")
         params = body.get("params", {})
-        request_id = body.get("id")
         
         logger.info(f"MCP request: method={method}, id={request_id}")
         
@@ -613,21 +664,8 @@ async def mcp_endpoint(request: Request):
             }
         
         elif method == "tools/list":
-            tools = await list_tools()
-            return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "result": {
-                    "tools": [
-                        {
-                            "name": tool.name,
-                            "description": tool.description,
-                            "inputSchema": tool.inputSchema
-                        }
-                        for tool in tools
-                    ]
-                }
-            }
+            # Pre-serialized: only the id is encoded per request
+            return b'{"jsonrpc":"2.0","id":' + dumpb(request_id) + b',"result":' + TOOLS.list_body() + b'}'
         
         elif method == "tools/call":
             tool_name = params.get("name")
@@ -659,26 +697,70 @@ async def mcp_endpoint(request: Request):
                 }
             }
     
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON decode error: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error processing MCP request: {str(e)}")
         return {
             "jsonrpc": "2.0",
-            "id": None,
+            "id": request_id,
             "error": {
-                "code": -32700,
-                "message": "Parse error"
+                "code": -32603,
+                "message": f"Internal error: {str(e)}"
             }
         }
-    except Exception as e:
-        logger.error(f"Error processing MCP request: {str(e)}")
+
+async def handle_batch(messages: List[Any], concurrency: Optional[int] = None) -> List[Union[Dict[str, Any], bytes]]:
+    """Answer a JSON-RPC batch, at most `concurrency` (MCP_BATCH_CONCURRENCY) messages at a time
+
+    Responses keep the order of the requests; notifications (no "id") get none.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency or MCP_BATCH_CONCURRENCY))
+    
+    async def limited(message: Any) -> Union[Dict[str, Any], bytes]:
+        async with semaphore:
+            return await handle_message(message)
+    
+    responses = await asyncio.gather(*(limited(message) for message in messages))
+    return [
+        response for message, response in zip(messages, responses)
+        if not (isinstance(message, dict) and "id" not in message)
+    ]
+
+def json_body(response: Union[Dict[str, Any], bytes]) -> Any:
+    """Send a pre-encoded answer as is"""
+    if isinstance(response, bytes):
+        return Response(response, media_type="application/json")
+    return response
+
+@app.post("/mcp")
+async def mcp_endpoint(request: Request):
+    """MCP JSON-RPC endpoint: one message or a batch array"""
+    try:
+        body = loads(await request.body())
+    except JSONDecodeError as e:
+        logger.error(f"JSON decode error: {str(e)}")
         return {
             "jsonrpc": "2.0",
-            "id": request_id if 'request_id' in locals() else None,
+            "id": None,
             "error": {
-                "code": -32603,
-                "message": f"Internal error: {str(e)}"
+                "code": -32700,
+                "message": "Parse error"
             }
         }
+    
+    if not isinstance(body, list):
+        return json_body(await handle_message(body))
+    if not body:
+        return await handle_message(None)  # an empty batch is an Invalid Request
+    
+    logger.info(f"MCP batch of {len(body)} messages")
+    responses = await handle_batch(body)
+    if not responses:
+        # Only notifications: nothing to return
+        return Response(status_code=202)
+    return Response(
+        b"[" + b",".join(r if isinstance(r, bytes) else dumpb(r) for r in responses) + b"]",
+        media_type="application/json"
+    )
 
 # ==================== MAIN ====================
 if __name__ == "__main__":
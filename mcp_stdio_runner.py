@@ -33,6 +33,10 @@ if __name__ == "__main__":
     # sys.__stdout__ is the true underlying stdout
     sys.stdout = sys.__stdout__
     
+    # Queued logging to stderr at the stdio level (WP_LOG_LEVEL_STDIO, default WARNING)
+    mcp_server.start_logging("stdio")
+    # WP_METRICS_TEXTFILE: stdio has no /metrics endpoint to scrape
+    metrics_writer = mcp_server.start_metrics_textfile()
     try:
         # FastMCP.run(transport="stdio") will take over stdin/stdout
         mcp_server.mcp.run(transport="stdio")
@@ -41,3 +45,7 @@ if __name__ == "__main__":
         # Make sure we don't print to the now-restored stdout on failure
         sys.stdout = sys.stderr
         sys.exit(1)
+    finally:
+        if metrics_writer is not None:
+            metrics_writer.stop()
+        mcp_server.stop_logging()
@@ -0,0 +1,319 @@
+"""
+Content-hash index of the media library, persisted in SQLite.
+
+The index keeps id, file URL, size and modification time of every
+attachment (synced incrementally like the content mirror) and the SHA-256 of
+its original file. Hashes are computed on first need only: a lookup for an
+upload downloads just the attachments whose size matches, and a duplicate
+scan hashes only files that share a size with another one. WordPress keeps
+the uploaded file byte-for-byte (big images get an extra "-scaled" copy and
+the original is listed in media_details.original_image), so the hash of what
+we upload matches the hash of the original on the server.
+
+The REST API reports the size of the "-scaled" copy only (and no size for
+media from before WordPress 6.0), so the size of such originals is learned
+once with a HEAD request and stored. Files whose size still cannot be
+learned are never downloaded for an upload lookup; only the explicit
+duplicate scan hashes them.
+"""
+
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from pagination import fetch_all
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 8
+# Lookups re-sync the index when it is older than this (seconds)
+SYNC_INTERVAL = 300.0
+HASH_CHUNK = 256 * 1024
+# Stored size of a file whose HEAD reported no usable Content-Length
+UNKNOWN_SIZE = -1
+MEDIA_FIELDS = "id,modified,source_url,media_details.filesize,media_details.original_image"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    size INTEGER,
+    modified TEXT,
+    sha256 TEXT
+);
+CREATE INDEX IF NOT EXISTS media_sha256 ON media (sha256);
+CREATE INDEX IF NOT EXISTS media_size ON media (size);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def original_file(item: Dict[str, Any]):
+    """(URL, size) of the file that was uploaded; size is None when unknown"""
+    url = item.get("source_url") or ""
+    details = item.get("media_details") or {}
+    if details.get("original_image") and "/" in url:
+        # source_url is the "-scaled" copy; its filesize is not the original's
+        return f"{url.rsplit('/', 1)[0]}/{details['original_image']}", None
+    return url, details.get("filesize")
+
+
+class MediaIndex:
+    """Map content hashes to attachment IDs
+
+    Args:
+        path: SQLite database file (":memory:" for a throwaway index)
+        client: WordPressClient for listing the library
+        http: Client for downloading media files; a plain one is created when omitted
+        concurrency: Maximum number of files downloaded at once
+    """
+
+    def __init__(
+        self,
+        path: str,
+        client,
+        http: Optional[httpx.AsyncClient] = None,
+        concurrency: int = DEFAULT_CONCURRENCY
+    ):
+        self.path = path
+        self.client = client
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self._http = http
+        self._own_http = http is None
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._lock = asyncio.Lock()
+        # Concurrent lookups share the download of a candidate
+        self._flights = SingleFlight()
+        self.downloads = 0
+        self.probes = 0
+        client.on_write(self.apply_write)
+
+    # ---------- state ----------
+
+    def _get_state(self, key: str, default: Any = None) -> Any:
+        row = self.db.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_state(self, **values) -> None:
+        self.db.executemany(
+            "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)",
+            [(k, None if v is None else str(v)) for k, v in values.items()]
+        )
+        self.db.commit()
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM media").fetchone()[0]
+
+    # ---------- writes ----------
+
+    def upsert(self, items: List[Dict[str, Any]]) -> None:
+        """Store attachment metadata, dropping hashes of files that changed"""
+        for item in items:
+            if "id" not in item:
+                continue
+            url, size = original_file(item)
+            row = self.db.execute("SELECT url, sha256, size FROM media WHERE id = ?", (item["id"],)).fetchone()
+            # Editing attachment fields bumps modified; a new file gets a new URL
+            sha = None
+            if row and row[0] == url:
+                sha, size = row[1], size if size is not None else row[2]
+            self.db.execute(
+                "INSERT OR REPLACE INTO media (id, url, size, modified, sha256) VALUES (?, ?, ?, ?, ?)",
+                (item["id"], url, size, item.get("modified"), sha)
+            )
+        self.db.commit()
+
+    def record(self, item: Dict[str, Any], sha256: str, size: int) -> None:
+        """Remember the hash of a file we just uploaded"""
+        self.upsert([item])
+        self.db.execute(
+            "UPDATE media SET sha256 = ?, size = CASE WHEN size IS NULL OR size < 0 THEN ? ELSE size END WHERE id = ?",
+            (sha256, size, item["id"])
+        )
+        self.db.commit()
+
+    def remove(self, ids: List[int]) -> None:
+        self.db.executemany("DELETE FROM media WHERE id = ?", [(i,) for i in ids])
+        self.db.commit()
+
+    def apply_write(self, method: str, resource: str, data: Any) -> None:
+        """Client write listener: track uploaded, edited and deleted attachments"""
+        if resource != "wp/v2/media" or not isinstance(data, dict):
+            return
+        if method == "DELETE":
+            previous = data.get("previous") or {}
+            if "id" in previous:
+                self.remove([previous["id"]])
+        elif "id" in data and data.get("source_url"):
+            self.upsert([data])
+
+    # ---------- sync ----------
+
+    async def sync(self, reconcile: bool = False) -> Dict[str, int]:
+        """Pull attachments modified since the last sync (and drop deleted ones)"""
+        async with self._lock:
+            cursor = self._get_state("cursor")
+            params: Dict[str, Any] = {"orderby": "modified", "order": "asc", "_fields": MEDIA_FIELDS}
+            if cursor:
+                # Same one-second step back as the content mirror cursor
+                params["modified_after"] = (datetime.fromisoformat(cursor) - timedelta(seconds=1)).isoformat()
+            synced = 0
+            async for item in self.client.paginate("media", params):
+                self.upsert([item])
+                synced += 1
+                if item.get("modified") and (cursor is None or item["modified"] > cursor):
+                    cursor = item["modified"]
+            report = {"synced": synced}
+            if reconcile:
+                remote = {item["id"] for item in await fetch_all(self.client, "media", {"_fields": "id"})}
+                local = {row[0] for row in self.db.execute("SELECT id FROM media")}
+                self.remove(sorted(local - remote))
+                report["removed"] = len(local - remote)
+            self._set_state(cursor=cursor, last_sync=time.time())
+            return report
+
+    def is_fresh(self, max_age: float = SYNC_INTERVAL) -> bool:
+        return time.time() - float(self._get_state("last_sync", 0)) <= max_age
+
+    # ---------- hashing ----------
+
+    def _downloader(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=60.0, follow_redirects=True)
+        return self._http
+
+    async def _hash(self, media_id: int, url: str) -> Optional[str]:
+        """Download and hash one attachment; None if the file is unavailable"""
+        async with self._semaphore:
+            digest, size = hashlib.sha256(), 0
+            try:
+                async with self._downloader().stream("GET", url) as response:
+                    response.raise_for_status()
+                    async for chunk in response.aiter_bytes(HASH_CHUNK):
+                        digest.update(chunk)
+                        size += len(chunk)
+            except httpx.HTTPError as e:
+                logger.warning(f"Cannot hash media {media_id}: {e}")
+                return None
+            self.downloads += 1
+        sha = digest.hexdigest()
+        self.db.execute("UPDATE media SET sha256 = ?, size = ? WHERE id = ?", (sha, size, media_id))
+        self.db.commit()
+        return sha
+
+    async def _probe(self, media_id: int, url: str) -> None:
+        """Learn the size of a file from a HEAD request"""
+        async with self._semaphore:
+            size = UNKNOWN_SIZE
+            try:
+                response = await self._downloader().head(url)
+                response.raise_for_status()
+                length = response.headers.get("content-length", "")
+                if "content-encoding" not in response.headers and length.isdigit():
+                    size = int(length)
+            except httpx.HTTPError as e:
+                logger.warning(f"Cannot get the size of media {media_id}: {e}")
+            self.probes += 1
+        self.db.execute("UPDATE media SET size = ? WHERE id = ? AND size IS NULL", (size, media_id))
+        self.db.commit()
+
+    async def _probe_sizes(self) -> None:
+        """HEAD the files whose size the REST API did not report (scaled originals, old media)"""
+        rows = self.db.execute("SELECT id, url FROM media WHERE size IS NULL AND sha256 IS NULL").fetchall()
+        await asyncio.gather(*(
+            self._flights.do(f"size:{media_id}", lambda m=media_id, u=url: self._probe(m, u))
+            for media_id, url in rows
+        ))
+
+    async def prepare(self) -> None:
+        """Sync if stale and learn unknown sizes; lookups call it themselves"""
+        if not self.is_fresh():
+            await self.sync()
+        await self._probe_sizes()
+
+    async def may_contain(self, size: int) -> bool:
+        """Whether an attachment of this size exists, i.e. an upload could be a duplicate"""
+        await self.prepare()
+        return self.db.execute("SELECT 1 FROM media WHERE size = ? LIMIT 1", (size,)).fetchone() is not None
+
+    async def _hash_rows(self, rows) -> None:
+        await asyncio.gather(*(
+            self._flights.do(f"hash:{media_id}", lambda m=media_id, u=url: self._hash(m, u))
+            for media_id, url in rows
+        ))
+
+    async def _exists(self, media_id: int) -> bool:
+        try:
+            await self.client.request("GET", f"media/{media_id}", params={"_fields": "id"})
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in (404, 410):
+                self.remove([media_id])
+                return False
+            raise
+        return True
+
+    async def find(self, sha256: str, size: int) -> Optional[Dict[str, Any]]:
+        """Return {"id", "url"} of an attachment with this content, if any"""
+        await self.prepare()
+        candidates = self.db.execute(
+            "SELECT id, url FROM media WHERE sha256 IS NULL AND size = ?", (size,)
+        ).fetchall()
+        await self._hash_rows(candidates)
+        for media_id, url in self.db.execute(
+            "SELECT id, url FROM media WHERE sha256 = ? ORDER BY id", (sha256,)
+        ).fetchall():
+            if await self._exists(media_id):
+                return {"id": media_id, "url": url}
+        return None
+
+    async def duplicates(self) -> List[Dict[str, Any]]:
+        """Sync the whole library and group attachments with identical content"""
+        await self.sync(reconcile=True)
+        await self._probe_sizes()
+        # Only files that share a size (or whose size is unknown) can be duplicates
+        await self._hash_rows(self.db.execute(
+            "SELECT id, url FROM media WHERE sha256 IS NULL AND (size IS NULL OR size < 0 OR size IN "
+            "(SELECT size FROM media WHERE size >= 0 GROUP BY size HAVING COUNT(*) > 1))"
+        ).fetchall())
+        groups = []
+        for sha, size, ids, urls in self.db.execute(
+            "SELECT sha256, MAX(size), GROUP_CONCAT(id, char(10)), GROUP_CONCAT(url, char(10)) FROM "
+            "(SELECT * FROM media WHERE sha256 IS NOT NULL ORDER BY id) "
+            "GROUP BY sha256 HAVING COUNT(*) > 1 ORDER BY MAX(size) * COUNT(*) DESC"
+        ):
+            media = [{"id": int(i), "url": u} for i, u in zip(ids.split("\n"), urls.split("\n"))]
+            groups.append({
+                "sha256": sha,
+                "size": size,
+                "media": media,
+                "wasted_bytes": (size or 0) * (len(media) - 1),
+            })
+        return groups
+
+    def stats(self) -> Dict[str, Any]:
+        hashed = self.db.execute("SELECT COUNT(*) FROM media WHERE sha256 IS NOT NULL").fetchone()[0]
+        last_sync = float(self._get_state("last_sync", 0))
+        return {
+            "path": self.path,
+            "media": len(self),
+            "hashed": hashed,
+            "downloads": self.downloads,
+            "size_probes": self.probes,
+            "last_sync_age": round(time.time() - last_sync, 1) if last_sync else None,
+        }
+
+    async def close(self) -> None:
+        if self._own_http and self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        self.db.close()
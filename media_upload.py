@@ -0,0 +1,389 @@
+"""
+Streaming media uploads to /wp/v2/media.
+
+Files are read from disk (or downloaded from a URL) in fixed-size chunks and
+sent as the raw request body, so memory use stays at a few chunks per upload
+no matter how large the file is. alt_text, caption, title and description go
+in the query string of the same request, which WordPress applies when it
+creates the attachment. Several uploads run concurrently behind a semaphore.
+
+Items may ask for image optimization first (see image_optimize); encoding
+happens before an upload slot is taken, so CPU and network work overlap.
+With a media index (see media_index) files already in the library are not
+uploaded again. A URL source is spooled to disk to be hashed only when the
+library holds an attachment of its Content-Length; otherwise the same
+response is streamed straight into the upload.
+
+Sources are untrusted input from MCP clients. Local paths are refused unless
+a media root is configured, and only files inside it are read. URLs must be
+http(s), may be limited to an allowlist of hosts, and may not resolve to a
+private, loopback or link-local address (checked again on every redirect),
+so a client cannot make the server fetch from its internal network. httpx
+resolves the host again when it connects, so the address of the connected
+peer is checked too before any of the body is read: a host whose DNS answer
+changes in between (DNS rebinding) is refused.
+"""
+
+import asyncio
+import ipaddress
+import mimetypes
+import os
+import socket
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+from urllib.parse import quote, unquote, urljoin, urlparse
+
+import httpx
+
+from image_optimize import ImageOptimizer, OptimizeOptions, file_digest, is_image
+
+CHUNK_SIZE = 256 * 1024
+DEFAULT_CONCURRENCY = 3
+UPLOAD_TIMEOUT = httpx.Timeout(120.0, connect=15.0)
+META_FIELDS = ("title", "alt_text", "caption", "description", "post")
+MAX_REDIRECTS = 5
+
+
+@dataclass
+class UploadItem:
+    """One file to upload and the attachment fields to set on it"""
+
+    source: str
+    filename: Optional[str] = None
+    meta: Dict[str, Any] = field(default_factory=dict)
+    optimize: Optional[OptimizeOptions] = None
+    dedupe: bool = True
+
+    @classmethod
+    def from_dict(cls, item: Dict[str, Any]) -> "UploadItem":
+        if not item.get("source"):
+            raise ValueError("Each item needs a 'source' path or URL")
+        meta = {k: item[k] for k in META_FIELDS if item.get(k) is not None}
+        if item.get("post_id") is not None:
+            meta["post"] = item["post_id"]
+        optimize = item.get("optimize")
+        if optimize is True:
+            optimize = OptimizeOptions()
+        elif isinstance(optimize, dict):
+            optimize = OptimizeOptions(**optimize)
+        return cls(item["source"], item.get("filename"), meta, optimize or None, item.get("dedupe", True))
+
+
+def is_url(source: str) -> bool:
+    return source.startswith(("http://", "https://"))
+
+
+def content_disposition(filename: str) -> str:
+    """attachment header with an ASCII fallback and the RFC 5987 UTF-8 name"""
+    fallback = filename.encode("ascii", "replace").decode().replace("?", "_").replace('"', "")
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+
+def guess_type(filename: str) -> str:
+    return mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+
+async def resolve_host(host: str) -> List[str]:
+    """Addresses a host name resolves to"""
+    infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    return [info[4][0] for info in infos]
+
+
+def is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def host_allowed(host: str, hosts: Iterable[str]) -> bool:
+    """host is one of `hosts` or a subdomain of one"""
+    return any(host == allowed or host.endswith("." + allowed) for allowed in hosts)
+
+
+async def read_chunks(path: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Yield a file in chunks, reading off the event loop"""
+    f = await asyncio.to_thread(open, path, "rb")
+    try:
+        while True:
+            chunk = await asyncio.to_thread(f.read, chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        f.close()
+
+
+class MediaUploader:
+    """Upload files or URLs to the media library with bounded concurrency
+
+    Args:
+        client: WordPressClient used for the upload requests
+        concurrency: Maximum number of uploads in flight
+        chunk_size: Bytes read (and sent) per chunk
+        http: Client for downloading URL sources; a plain one (without the
+            WordPress credentials) is created when omitted
+        root: Directory local paths must resolve inside; without it local
+            paths are refused
+        url_hosts: If set, URL sources must be on these hosts (or their
+            subdomains); listed hosts may also be private addresses
+        resolve: Coroutine returning the addresses of a host (DNS by default)
+        optimizer: ImageOptimizer for items that request optimization
+        media_index: MediaIndex used to skip files already in the library
+    """
+
+    def __init__(
+        self,
+        client,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        chunk_size: int = CHUNK_SIZE,
+        http: Optional[httpx.AsyncClient] = None,
+        root: str = "",
+        optimizer: Optional[ImageOptimizer] = None,
+        media_index=None,
+        url_hosts: Optional[Iterable[str]] = None,
+        resolve: Callable[[str], Awaitable[List[str]]] = resolve_host
+    ):
+        self.client = client
+        self.chunk_size = chunk_size
+        self.root = os.path.realpath(root) if root else ""
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._http = http
+        self._own_http = http is None
+        self.optimizer = optimizer
+        self.media_index = media_index
+        self.url_hosts = [h.strip().lower().rstrip(".") for h in url_hosts or () if h.strip()]
+        self.resolve = resolve
+
+    def local_path(self, source: str) -> str:
+        if not self.root:
+            raise ValueError("Uploading local files is disabled: no media directory is configured (WP_MEDIA_ROOT)")
+        path = os.path.realpath(os.path.expanduser(source))
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise ValueError(f"{source} is outside the allowed media directory")
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"No such file: {source}")
+        return path
+
+    async def upload(self, item: UploadItem) -> Dict[str, Any]:
+        """Upload one item; returns the attachment summary plus bytes and seconds
+
+        With a media index, a file whose content is already in the library is
+        not sent again: the existing attachment comes back with duplicate=True.
+        """
+        started = time.perf_counter()
+        dedupe = self.media_index is not None and item.dedupe
+        downloaded = None
+        try:
+            path, filename, mime_type = None, item.filename, None
+            if not is_url(item.source):
+                path = self.local_path(item.source)
+                filename = filename or os.path.basename(path)
+            elif item.optimize is not None:
+                # Encoding needs the whole file; spool it to disk
+                async with self._open(item.source) as response:
+                    filename = filename or url_filename(response)
+                    downloaded = path = await self._spool(response, filename)
+            else:
+                if dedupe:
+                    # Sync the index now rather than while the source connection waits
+                    await self.media_index.prepare()
+                async with self._semaphore, self._open(item.source) as response:
+                    filename = filename or url_filename(response)
+                    if dedupe and await self._may_be_duplicate(response):
+                        # Hashing needs the whole file; spool it to disk
+                        downloaded = path = await self._spool(response, filename)
+                    else:
+                        # Nothing to compare with: the one GET is streamed straight into the upload
+                        data, sent = await self._stream(response, filename, item.meta)
+                if path is None:
+                    return self._finish(_summary(data, sent), started, None)
+
+            optimized = None
+            if item.optimize is not None and is_image(filename):
+                if self.optimizer is None:
+                    raise RuntimeError("Image optimization is not configured")
+                optimized = await self.optimizer.optimize(path, item.optimize)
+                path, filename = optimized.path, _renamed(filename, item.optimize)
+                mime_type = optimized.mime_type
+
+            digest = None
+            size = os.path.getsize(path)
+            mime_type = mime_type or guess_type(filename)
+            if dedupe:
+                digest = await asyncio.to_thread(file_digest, path)
+                existing = await self.media_index.find(digest, size)
+                if existing is not None:
+                    result = {"id": existing["id"], "url": existing["url"], "mime_type": mime_type,
+                              "bytes": 0, "duplicate": True}
+                    return self._finish(result, started, optimized)
+
+            async with self._semaphore:
+                data, sent = await self._send(read_chunks(path, self.chunk_size), filename, mime_type, size, item.meta)
+            if digest is not None:
+                self.media_index.record(data, digest, size)
+        finally:
+            if downloaded is not None:
+                os.unlink(downloaded)
+
+        return self._finish(_summary(data, sent), started, optimized)
+
+    @staticmethod
+    def _finish(result: Dict[str, Any], started: float, optimized) -> Dict[str, Any]:
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        if optimized is not None:
+            result["optimized"] = {
+                "original_bytes": optimized.original_bytes,
+                "bytes": optimized.bytes,
+                "cached": optimized.cached,
+            }
+        return result
+
+    async def check_url(self, url: str) -> None:
+        """Raise ValueError unless a URL source may be fetched"""
+        parts = urlparse(url)
+        host = (parts.hostname or "").lower().rstrip(".")
+        if parts.scheme not in ("http", "https") or not host:
+            raise ValueError(f"Unsupported media URL: {url}")
+        if self.url_hosts:
+            if not host_allowed(host, self.url_hosts):
+                raise ValueError(f"Media URLs from {host} are not allowed (WP_MEDIA_URL_HOSTS)")
+            return
+        try:
+            addresses = await self.resolve(host)
+        except OSError as e:
+            raise ValueError(f"Cannot resolve {host}: {e}")
+        if not addresses or not all(is_public_address(a) for a in addresses):
+            raise ValueError(f"Media URL {url} points to a private or local address")
+
+    def check_peer(self, response: httpx.Response, url: str) -> None:
+        """Raise ValueError if the connection for a URL source ended at a non-public address"""
+        if self.url_hosts:
+            return
+        stream = response.extensions.get("network_stream")
+        peer = stream.get_extra_info("server_addr") if stream is not None else None
+        if peer and not is_public_address(str(peer[0])):
+            raise ValueError(f"Media URL {url} points to a private or local address")
+
+    @asynccontextmanager
+    async def _open(self, url: str):
+        """GET a URL source, checking the URL and every redirect target"""
+        http = self._downloader()
+        for _ in range(MAX_REDIRECTS + 1):
+            await self.check_url(url)
+            async with http.stream("GET", url, follow_redirects=False) as response:
+                self.check_peer(response, url)
+                if not response.is_redirect:
+                    response.raise_for_status()
+                    yield response
+                    return
+                url = urljoin(str(response.url), response.headers["location"])
+        raise ValueError(f"Too many redirects for {url}")
+
+    async def _may_be_duplicate(self, response: httpx.Response) -> bool:
+        """Whether the library holds an attachment of this response's size"""
+        size = response_size(response)
+        return size is None or await self.media_index.may_contain(size)
+
+    async def _spool(self, response: httpx.Response, filename: str) -> str:
+        """Stream a URL source into a temporary file (next to the image cache if any)"""
+        temp_dir = self.optimizer.cache_dir if self.optimizer is not None else None
+        if temp_dir:
+            os.makedirs(temp_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=os.path.splitext(filename)[1], dir=temp_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in response.aiter_bytes(self.chunk_size):
+                    await asyncio.to_thread(f.write, chunk)
+        except BaseException:
+            os.unlink(path)
+            raise
+        return path
+
+    async def upload_many(self, items: List[UploadItem]) -> Dict[str, Any]:
+        """Upload items concurrently; results keep the input order"""
+        started = time.perf_counter()
+
+        async def run(index: int, item: UploadItem) -> Dict[str, Any]:
+            try:
+                return {"index": index, "success": True, **await self.upload(item)}
+            except Exception as e:
+                return {"index": index, "success": False, "source": item.source, "message": str(e)}
+
+        results = await asyncio.gather(*(run(i, item) for i, item in enumerate(items)))
+        return {"results": list(results), **throughput(results, time.perf_counter() - started)}
+
+    def _downloader(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=UPLOAD_TIMEOUT)
+        return self._http
+
+    async def _stream(self, response: httpx.Response, filename: str, meta: Dict[str, Any]):
+        """Send the body of an open URL source as it arrives"""
+        mime_type = response.headers.get("content-type", "").split(";")[0].strip()
+        if not mime_type or mime_type == "application/octet-stream":
+            mime_type = guess_type(filename)
+        return await self._send(response.aiter_bytes(self.chunk_size), filename, mime_type,
+                                response_size(response), meta)
+
+    async def _send(self, chunks: AsyncIterator[bytes], filename: str, mime_type: str,
+                    size: Optional[int], meta: Dict[str, Any]):
+        sent = 0
+
+        async def counted():
+            nonlocal sent
+            async for chunk in chunks:
+                sent += len(chunk)
+                yield chunk
+
+        headers = {"Content-Type": mime_type, "Content-Disposition": content_disposition(filename)}
+        if size is not None:
+            headers["Content-Length"] = str(size)
+        data = await self.client.request(
+            "POST", "media", content=counted(), headers=headers, params=meta or None, timeout=UPLOAD_TIMEOUT
+        )
+        return data, sent
+
+    async def close(self):
+        if self._own_http and self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        if self.optimizer is not None:
+            self.optimizer.close()
+
+
+def _summary(data: Dict[str, Any], sent: int) -> Dict[str, Any]:
+    return {"id": data["id"], "url": data.get("source_url"), "mime_type": data.get("mime_type"), "bytes": sent}
+
+
+def response_size(response: httpx.Response) -> Optional[int]:
+    """Length of the body aiter_bytes() yields, if the headers tell it"""
+    # aiter_bytes() decodes Content-Encoding, so the length is only known without it
+    length = response.headers.get("content-length", "")
+    if "content-encoding" in response.headers or not length.isdigit():
+        return None
+    return int(length)
+
+
+def url_filename(response: httpx.Response) -> str:
+    return unquote(os.path.basename(urlparse(str(response.url)).path)) or "upload"
+
+
+def _renamed(filename: str, options: OptimizeOptions) -> str:
+    return os.path.splitext(filename)[0] + options.extension
+
+
+def throughput(results: List[Dict[str, Any]], seconds: float) -> Dict[str, Any]:
+    """Totals for a batch: files, bytes, wall time and MB/s"""
+    uploaded = [r for r in results if r.get("success")]
+    total = sum(r["bytes"] for r in uploaded)
+    return {
+        "uploaded": len(uploaded),
+        "failed": len(results) - len(uploaded),
+        "bytes": total,
+        "seconds": round(seconds, 3),
+        "mb_per_s": round(total / 1e6 / seconds, 2) if seconds > 0 else None,
+    }
@@ -0,0 +1,338 @@
+"""
+Prometheus metrics without a client library.
+
+Counters, gauges and histograms are plain dicts keyed by label values, so
+recording a sample is a dict lookup and an addition (a bisect for
+histograms); nothing is formatted until /metrics is scraped. Values that
+live elsewhere (cache counters and the like) are read at scrape time by
+collector callbacks instead of being mirrored on every hit.
+
+Exposition uses the Prometheus text format 0.0.4:
+
+    asgi_middleware(app)        serves GET /metrics, tracks in-flight requests and SSE sessions
+    instrument_tools(manager)   per-tool counts, errors and latency for a FastMCP ToolManager
+    observe_upstream(...)       WordPress REST latency by method, resource and status
+    upstream_event_hooks(root)  the same for a plain httpx client
+    TextfileWriter(path)        periodic dump for stdio mode (node_exporter textfile collector)
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds; tool calls and upstream requests range from cache hits to uploads
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DEFAULT_INTERVAL = 15.0
+# Tool results are JSON strings; failures are reported in-band
+FAILED_PREFIXES = ('{"success":false', '{"success": false')
+
+# A collector sample: (name, type, help, labels, value)
+Sample = Tuple[str, str, str, Dict[str, str], float]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, Any] = {}
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, value in list(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def clear(self) -> None:
+        self._values.clear()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        if not self.labelnames:
+            self._values[()] = 0
+
+    def set(self, value: float, *labels) -> None:
+        self._values[labels] = value
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+
+class Histogram(Metric):
+    """Cumulative-on-render histogram: observe() bumps a single bucket"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels) -> None:
+        state = self._values.get(labels)
+        if state is None:
+            # [per-bucket counts (+Inf last), sum]
+            state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def count(self, *labels) -> int:
+        state = self._values.get(labels)
+        return sum(state[0]) if state else 0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, (counts, total) in list(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), list(counts)):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """Register a callback read at scrape time"""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        families: Dict[str, Tuple[str, str, List[str]]] = {}
+        for collector in self.collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+                continue
+            for name, kind, help, labels, value in samples:
+                family = families.setdefault(name, (kind, help, []))
+                family[2].append(f"{name}{_labels(list(labels), list(labels.values()))} {_number(value)}")
+        for name, (kind, help, samples) in families.items():
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}", *samples]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+TOOL_CALLS = REGISTRY.counter("wp_mcp_tool_calls_total", "MCP tool calls", ("tool",))
+TOOL_ERRORS = REGISTRY.counter("wp_mcp_tool_errors_total", "MCP tool calls that failed", ("tool",))
+TOOL_DURATION = REGISTRY.histogram("wp_mcp_tool_duration_seconds", "MCP tool call latency", ("tool",))
+TOOLS_IN_FLIGHT = REGISTRY.gauge("wp_mcp_tool_calls_in_flight", "MCP tool calls running")
+UPSTREAM_DURATION = REGISTRY.histogram(
+    "wp_mcp_upstream_request_duration_seconds",
+    "WordPress REST request latency including the body", ("method", "resource", "status")
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge("wp_mcp_http_requests_in_flight", "HTTP requests being served (SSE streams excluded)")
+SSE_SESSIONS = REGISTRY.gauge("wp_mcp_sse_sessions_active", "Open SSE sessions")
+
+
+def observe_upstream(method: str, resource: str, status: Any, seconds: float) -> None:
+    UPSTREAM_DURATION.observe(seconds, method, resource or "/", str(status))
+
+
+def upstream_event_hooks(api_root: str) -> Dict[str, list]:
+    """httpx event hooks for clients that bypass WordPressClient (latency up to the headers)"""
+    from response_cache import resource_of
+
+    async def on_request(request):
+        request.extensions["metrics_started"] = time.perf_counter()
+
+    async def on_response(response):
+        started = response.request.extensions.get("metrics_started")
+        if started is not None:
+            observe_upstream(response.request.method, resource_of(str(response.request.url), api_root),
+                             response.status_code, time.perf_counter() - started)
+
+    return {"request": [on_request], "response": [on_response]}
+
+
+def record_tool(name: str, seconds: float, failed: bool) -> None:
+    TOOL_CALLS.inc(name)
+    if failed:
+        TOOL_ERRORS.inc(name)
+    TOOL_DURATION.observe(seconds, name)
+
+
+def is_failure(result: Any) -> bool:
+    """A tool result string, or its converted (content, structured) form, reporting success=false"""
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    if isinstance(result, list) and result:
+        result = getattr(result[0], "text", None)
+    return isinstance(result, str) and result.startswith(FAILED_PREFIXES)
+
+
+def instrument_tools(manager) -> None:
+    """Time every call made through a FastMCP ToolManager"""
+    call_tool = manager.call_tool
+
+    async def timed_call_tool(name: str, arguments: Dict[str, Any], *args, **kwargs) -> Any:
+        started = time.perf_counter()
+        failed = True
+        TOOLS_IN_FLIGHT.inc()
+        try:
+            result = await call_tool(name, arguments, *args, **kwargs)
+            failed = is_failure(result)
+            return result
+        finally:
+            TOOLS_IN_FLIGHT.dec()
+            # Unknown names would grow the label set without bound
+            label = name if manager.get_tool(name) is not None else "unknown"
+            record_tool(label, time.perf_counter() - started, failed)
+
+    manager.call_tool = timed_call_tool
+
+
+def cache_samples(name: str, stats: Dict[str, Any]) -> List[Sample]:
+    """Collector samples for a stats() dict with hits/misses (and optional entries)"""
+    labels = {"cache": name}
+    hits, misses = stats.get("hits", 0), stats.get("misses", 0)
+    samples = [
+        ("wp_mcp_cache_hits_total", "counter", "Cache hits", labels, hits),
+        ("wp_mcp_cache_misses_total", "counter", "Cache misses", labels, misses),
+        ("wp_mcp_cache_hit_ratio", "gauge", "Cache hit ratio since start",
+         labels, stats["hit_ratio"] if "hit_ratio" in stats else (hits / (hits + misses) if hits + misses else 0.0)),
+    ]
+    if "entries" in stats:
+        samples.append(("wp_mcp_cache_entries", "gauge", "Cache entries", labels, stats["entries"]))
+    return samples
+
+
+def asgi_middleware(app, registry: Registry = REGISTRY, sse_path: str = "/sse"):
+    """Serve GET /metrics and count in-flight requests and open SSE sessions"""
+    async def metrics_app(scope, receive, send):
+        if scope["type"] != "http":
+            return await app(scope, receive, send)
+        path = scope.get("path", "")
+        if path == "/metrics" and scope.get("method") == "GET":
+            body = registry.render().encode("utf-8")
+            await send({"type": "http.response.start", "status": 200, "headers": [
+                (b"content-type", CONTENT_TYPE.encode()), (b"content-length", str(len(body)).encode()),
+            ]})
+            await send({"type": "http.response.body", "body": body})
+            return
+        gauge = SSE_SESSIONS if path == sse_path else HTTP_IN_FLIGHT
+        gauge.inc()
+        try:
+            return await app(scope, receive, send)
+        finally:
+            gauge.dec()
+    return metrics_app
+
+
+class TextfileWriter:
+    """Periodically write the registry to a file, replacing it atomically
+
+    For stdio mode, where there is no HTTP listener to scrape: point
+    node_exporter's textfile collector (or anything else) at the file.
+    """
+
+    def __init__(self, path: str, interval: float = DEFAULT_INTERVAL, registry: Registry = REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            f.write(self.registry.render())
+        os.replace(temp, self.path)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except Exception as e:
+                logger.warning(f"Cannot write metrics to {self.path}: {e}")
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="metrics-textfile", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the thread and write a final snapshot"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+        try:
+            self.write()
+        except Exception as e:
+            logger.warning(f"Cannot write metrics to {self.path}: {e}")
@@ -0,0 +1,79 @@
+"""
+Concurrent full-collection pagination for the WordPress REST API.
+
+The first page is fetched on its own to learn X-WP-TotalPages; the remaining
+pages are then requested concurrently (bounded by a semaphore) while items
+are yielded strictly in page order.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+# WordPress refuses per_page values above 100
+MAX_PER_PAGE = 100
+DEFAULT_CONCURRENCY = 6
+
+
+async def iter_collection(
+    client,
+    endpoint: str,
+    params: Optional[Dict[str, Any]] = None,
+    per_page: int = MAX_PER_PAGE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    max_items: Optional[int] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Yield every item of a collection endpoint in order
+
+    Args:
+        client: WordPressClient to fetch with
+        endpoint: Collection endpoint (e.g. "posts", "categories")
+        params: Extra query parameters (filters, _fields, ...)
+        per_page: Page size (1-100)
+        concurrency: Maximum number of pages requested at once
+        max_items: Stop after this many items (optional)
+    """
+    base = {k: v for k, v in (params or {}).items() if k != "page"}
+    base["per_page"] = max(1, min(MAX_PER_PAGE, per_page))
+
+    first, headers = await client.request_with_headers("GET", endpoint, params={**base, "page": 1})
+    total_pages = int(headers.get("X-WP-TotalPages", 1) or 1)
+    if max_items is not None:
+        total_pages = min(total_pages, -(-max_items // base["per_page"]))
+
+    yielded = 0
+    for item in first:
+        if max_items is not None and yielded >= max_items:
+            return
+        yielded += 1
+        yield item
+    if total_pages <= 1:
+        return
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def fetch(page: int) -> List[Dict[str, Any]]:
+        async with semaphore:
+            return await client.request("GET", endpoint, params={**base, "page": page})
+
+    tasks = [asyncio.ensure_future(fetch(page)) for page in range(2, total_pages + 1)]
+    try:
+        for task in tasks:
+            for item in await task:
+                if max_items is not None and yielded >= max_items:
+                    return
+                yielded += 1
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def fetch_all(
+    client,
+    endpoint: str,
+    params: Optional[Dict[str, Any]] = None,
+    **kwargs
+) -> List[Dict[str, Any]]:
+    """Collect every item of a collection endpoint into a list"""
+    return [item async for item in iter_collection(client, endpoint, params, **kwargs)]
@@ -0,0 +1,156 @@
+"""
+Diff-aware post/page updates.
+
+An update that sends byte-identical content still makes WordPress store a
+revision, purge caches and reindex. Before writing, the fields of the update
+are compared with the live object and only the changed ones are sent; when
+nothing changed, no write is made at all.
+
+Comparison uses hashes of the raw (context=edit) values. Hashes of the last
+known state of each object are kept keyed by its `modified` timestamp, fed
+by write responses (which WordPress returns in edit context), so a typical
+check costs one tiny `_fields=modified,...` read; the raw content is fetched
+only when the object changed since we last saw it. Values we sent are
+remembered next to what WordPress stored, so content that WordPress
+normalizes on save (kses, line endings) still counts as unchanged when it is
+sent again. A write replaces the hashes even when `modified` stays the same
+(it has one-second resolution), so a quick A -> B -> A edit is not lost.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Fields compared through their raw value; large, fetched only when needed
+RAW_FIELDS = ("title", "content", "excerpt")
+# Term lists compare as sets
+SET_FIELDS = ("categories", "tags")
+KINDS = ("posts", "pages")
+DEFAULT_MAX_ENTRIES = 2048
+
+
+def fingerprint(field: str, value: Any) -> str:
+    """Hash of a field value; accepts {"raw": ...} objects as returned in edit context"""
+    if isinstance(value, dict) and "raw" in value:
+        value = value["raw"]
+    if field in SET_FIELDS and isinstance(value, list):
+        value = sorted(set(value))
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+class ContentHashes:
+    """Bounded LRU of field hashes per (kind, id) at a given `modified`"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def remember(
+        self,
+        kind: str,
+        item: Dict[str, Any],
+        sent: Optional[Dict[str, Any]] = None,
+        replace: bool = False
+    ) -> None:
+        """Record field hashes of an object (and of the values sent to produce it)
+
+        Reads add to what is known at the same `modified`; a write response
+        (`replace`) drops the older hashes, which may describe values the
+        write has just overwritten within the same second.
+        """
+        if "id" not in item or not item.get("modified"):
+            return
+        key = (kind, item["id"])
+        entry = self._entries.get(key)
+        if replace or entry is None or entry["modified"] != item["modified"]:
+            entry = {"modified": item["modified"], "fields": {}}
+        for field, value in item.items():
+            if field in RAW_FIELDS and not (isinstance(value, dict) and "raw" in value):
+                continue  # rendered-only values say nothing about the raw one
+            if field in RAW_FIELDS or field in SET_FIELDS or field == "status":
+                entry["fields"].setdefault(field, set()).add(fingerprint(field, value))
+        for field, value in (sent or {}).items():
+            entry["fields"].setdefault(field, set()).add(fingerprint(field, value))
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def known(self, kind: str, object_id: int, modified: str) -> Dict[str, Set[str]]:
+        """Field hashes recorded for an object at exactly this `modified`"""
+        entry = self._entries.get((kind, object_id))
+        if entry is None or entry["modified"] != modified:
+            self.misses += 1
+            return {}
+        self.hits += 1
+        return entry["fields"]
+
+    def forget(self, kind: str, object_id: int) -> None:
+        self._entries.pop((kind, object_id), None)
+
+    def apply_write(self, method: str, resource: str, data: Any) -> None:
+        """Client write listener: write responses come in edit context"""
+        kind = resource.rsplit("/", 1)[-1]
+        if resource != f"wp/v2/{kind}" or kind not in KINDS or not isinstance(data, dict):
+            return
+        if method == "DELETE":
+            previous = data.get("previous") or {}
+            if "id" in previous:
+                self.forget(kind, previous["id"])
+        else:
+            self.remember(kind, data, replace=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses}
+
+
+async def diff_update(
+    client,
+    hashes: ContentHashes,
+    kind: str,
+    object_id: int,
+    payload: Dict[str, Any]
+) -> Tuple[Dict[str, Any], List[str], Dict[str, Any]]:
+    """Split an update payload into changed fields and unchanged ones
+
+    Returns:
+        (changes, unchanged field names, live object with at least id, link, modified)
+    """
+    endpoint = f"{kind}/{object_id}"
+    # The whole point is to compare with the live object: skip fresh cache hits
+    headers = {"Cache-Control": "no-cache"}
+    cheap = [f for f in payload if f not in RAW_FIELDS]
+    live = await client.request("GET", endpoint, headers=headers, params={
+        "context": "edit", "_fields": ",".join(["id", "link", "modified", *cheap])
+    })
+    known = hashes.known(kind, object_id, live.get("modified"))
+
+    missing = [f for f in payload if f in RAW_FIELDS and f not in known]
+    if missing:
+        raw = await client.request("GET", endpoint, headers=headers, params={
+            "context": "edit", "_fields": ",".join(["modified", *(f"{f}.raw" for f in missing)])
+        })
+        if raw.get("modified") == live.get("modified"):
+            hashes.remember(kind, {**live, **raw})
+            known = hashes.known(kind, object_id, live.get("modified"))
+        else:
+            # Edited between the two reads: compare against the newer values only
+            live = {**live, **raw}
+            known = {}
+
+    changes, unchanged = {}, []
+    for field, value in payload.items():
+        current = known.get(field) or ({fingerprint(field, live[field])} if field in live else set())
+        if fingerprint(field, value) in current:
+            unchanged.append(field)
+        else:
+            changes[field] = value
+    return changes, unchanged, live
@@ -0,0 +1,193 @@
+"""
+Conditional-GET response cache for the WordPress REST client.
+
+Entries are bounded by count (LRU eviction) and by age (TTL). Once an entry
+is older than the TTL it is not discarded: its ETag / Last-Modified
+validators are replayed as If-None-Match / If-Modified-Since so WordPress can
+answer with a cheap 304 instead of re-rendering the resource.
+
+Every resource has a generation number that invalidate() bumps. A GET takes
+generation() before it is sent and passes it to store()/revalidated(): if a
+write happened meanwhile, the response may predate it and is not cached.
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+# Response headers worth keeping alongside the body (pagination info etc.)
+KEPT_HEADERS = ("x-wp-total", "x-wp-totalpages", "etag", "last-modified")
+
+
+@dataclass
+class CacheEntry:
+    """A cached GET response"""
+    data: Any
+    headers: Dict[str, str]
+    resource: str
+    stored_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get("etag")
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.headers.get("last-modified")
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers for revalidating this entry"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def make_key(method: str, url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """Build a stable cache key from method, URL and query parameters"""
+    key = f"{method.upper()} {url}"
+    if params:
+        key += ("&" if "?" in url else "?") + urlencode(sorted(params.items()), doseq=True)
+    return key
+
+
+def resource_of(url: str, api_root: str) -> str:
+    """Return the top-level REST resource of a URL (e.g. 'wp/v2/posts')
+
+    Writes invalidate every cached entry that shares the resource, so that
+    both the item (posts/12) and the listings (posts?page=2) are dropped.
+    """
+    path = urlsplit(url).path
+    root_path = urlsplit(api_root).path.rstrip("/")
+    if path.startswith(root_path):
+        path = path[len(root_path):]
+    parts = [p for p in path.split("/") if p]
+    # namespace (e.g. wp/v2) + collection name
+    return "/".join(parts[:3])
+
+
+def normalize_headers(headers: Any) -> Dict[str, str]:
+    """Keep only the headers we care about, with lowercase names"""
+    return {name: headers[name] for name in KEPT_HEADERS if name in headers}
+
+
+class ResponseCache:
+    """Bounded TTL + LRU cache of GET responses with validator support"""
+
+    def __init__(self, max_entries: int = 512, ttl: float = 30.0):
+        """
+        Args:
+            max_entries: Maximum number of cached responses (0 disables caching)
+            ttl: Seconds an entry is served without asking WordPress
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.revalidations = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, key: str) -> Tuple[Optional[CacheEntry], bool]:
+        """Find an entry
+
+        Returns:
+            (entry, fresh) - entry is None on a miss; fresh is False when the
+            entry must be revalidated before use
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, False
+        self._entries.move_to_end(key)
+        if time.monotonic() - entry.stored_at < self.ttl:
+            self.hits += 1
+            return entry, True
+        if not entry.validators():
+            # Nothing to revalidate with - treat as a plain miss
+            del self._entries[key]
+            self.misses += 1
+            return None, False
+        self.stale += 1
+        return entry, False
+
+    def generation(self, resource: str) -> int:
+        """Number of invalidations of a resource so far (taken before a GET is sent)"""
+        return self._generations.get(resource, 0)
+
+    def store(self, key: str, data: Any, headers: Any, resource: str, generation: Optional[int] = None) -> None:
+        """Insert or replace an entry, evicting the least recently used ones
+
+        Nothing is stored when `generation` is given and the resource has been
+        invalidated since: the response may predate the write.
+        """
+        if not self.enabled:
+            return
+        if "no-store" in headers.get("cache-control", ""):
+            return
+        if generation is not None and generation != self.generation(resource):
+            return
+        self._entries[key] = CacheEntry(data, normalize_headers(headers), resource)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def revalidated(self, key: str, headers: Any, generation: Optional[int] = None) -> Optional[CacheEntry]:
+        """Mark an entry as fresh again after a 304 Not Modified
+
+        Returns None when the entry is gone or its resource was invalidated
+        since `generation` was taken.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if generation is not None and generation != self.generation(entry.resource):
+            del self._entries[key]
+            return None
+        entry.headers.update(normalize_headers(headers))
+        entry.stored_at = time.monotonic()
+        self.revalidations += 1
+        return entry
+
+    def invalidate(self, resource: str) -> int:
+        """Drop every entry belonging to a resource; returns the count removed"""
+        self._generations[resource] = self.generation(resource) + 1
+        doomed = [key for key, entry in self._entries.items() if entry.resource == resource]
+        for key in doomed:
+            del self._entries[key]
+        self.invalidations += len(doomed)
+        return len(doomed)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for sizing the cache"""
+        lookups = self.hits + self.misses + self.stale
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "revalidations": self.revalidations,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.revalidations) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,401 @@
+"""
+In-process BM25 full-text index over posts and pages.
+
+Documents are tokenized from title, excerpt and tag-stripped content, with
+Snowball-style stemming for Russian (and a light suffix stripper for Latin
+words), so "путешествия" and "путешествие" match each other. The index is
+built from paginated fetches and kept current through WordPressClient write
+listeners.
+"""
+
+import heapq
+import html
+import math
+import re
+import zlib
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pagination import iter_collection
+
+TAG_RE = re.compile(r"<[^>]+>")
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+CYRILLIC_RE = re.compile(r"[а-я]")
+
+# Title terms count this many times, a cheap approximation of BM25F
+TITLE_WEIGHT = 3
+K1 = 1.2
+B = 0.75
+
+INDEX_FIELDS = "id,type,title,excerpt,content,status,date,link,categories,tags"
+
+# ==================== RUSSIAN STEMMER ====================
+# Snowball Russian algorithm. Group 1 endings only match after "а" or "я".
+
+VOWELS = set("аеиоуыэюя")
+
+
+def _endings(*words: str) -> Tuple[Tuple[int, frozenset], ...]:
+    """Group endings by length, longest first, for fast longest-match lookup"""
+    lengths = sorted({len(w) for w in words}, reverse=True)
+    return tuple((n, frozenset(w for w in words if len(w) == n)) for n in lengths)
+
+
+PERFECTIVE_GERUND = (_endings("в", "вши", "вшись"), _endings("ив", "ивши", "ившись", "ыв", "ывши", "ывшись"))
+ADJECTIVE = _endings(
+    "ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем", "им", "ым", "ом",
+    "его", "ого", "ему", "ому", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+)
+PARTICIPLE = (_endings("ем", "нн", "вш", "ющ", "щ"), _endings("ивш", "ывш", "ующ"))
+REFLEXIVE = _endings("ся", "сь")
+VERB = (
+    _endings("ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет", "ют", "ны", "ть", "ешь", "нно"),
+    _endings("ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй", "ил", "ыл", "им", "ым", "ен",
+             "ило", "ыло", "ено", "ят", "ует", "уют", "ит", "ыт", "ены", "ить", "ыть", "ишь", "ую", "ю"),
+)
+NOUN = _endings(
+    "а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии", "и", "ией", "ей", "ой", "ий", "й",
+    "иям", "ям", "ием", "ем", "ам", "ом", "о", "у", "ах", "иях", "ях", "ы", "ь", "ию", "ью", "ю", "ия", "ья", "я",
+)
+SUPERLATIVE = _endings("ейше", "ейш")
+DERIVATIONAL = _endings("ость", "ост")
+
+
+def _longest(word: str, endings: Tuple[Tuple[int, frozenset], ...]) -> str:
+    for n, group in endings:
+        if n <= len(word) and word[-n:] in group:
+            return word[-n:]
+    return ""
+
+
+def _strip_grouped(word: str, groups: Tuple[Tuple, Tuple]) -> Optional[str]:
+    """Remove the longest group ending; group 1 must follow а/я (which stays)"""
+    g1 = _longest(word, groups[0])
+    if g1 and len(word) > len(g1) and word[-len(g1) - 1] in "ая":
+        candidate1 = word[:-len(g1)]
+    else:
+        g1, candidate1 = "", None
+    g2 = _longest(word, groups[1])
+    if g2 and len(g2) >= len(g1):
+        return word[:-len(g2)]
+    return candidate1
+
+
+def _regions(word: str) -> Tuple[int, int]:
+    """Start offsets of RV and R2"""
+    rv = next((i + 1 for i, ch in enumerate(word) if ch in VOWELS), len(word))
+
+    def after_vc(start: int) -> int:
+        for i in range(start + 1, len(word)):
+            if word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = after_vc(0)
+    return rv, after_vc(r1)
+
+
+def stem_russian(word: str) -> str:
+    rv, r2 = _regions(word)
+    prefix, rest = word[:rv], word[rv:]
+
+    # Step 1
+    stripped = _strip_grouped(rest, PERFECTIVE_GERUND)
+    if stripped is not None:
+        rest = stripped
+    else:
+        reflexive = _longest(rest, REFLEXIVE)
+        if reflexive:
+            rest = rest[:-len(reflexive)]
+        adjective = _longest(rest, ADJECTIVE)
+        if adjective:
+            rest = rest[:-len(adjective)]
+            participle = _strip_grouped(rest, PARTICIPLE)
+            if participle is not None:
+                rest = participle
+        else:
+            verb = _strip_grouped(rest, VERB)
+            if verb is not None:
+                rest = verb
+            else:
+                noun = _longest(rest, NOUN)
+                if noun:
+                    rest = rest[:-len(noun)]
+
+    # Step 2
+    if rest.endswith("и"):
+        rest = rest[:-1]
+
+    # Step 3 (derivational endings must lie in R2)
+    derivational = _longest(rest, DERIVATIONAL)
+    if derivational and len(prefix) + len(rest) - len(derivational) >= r2:
+        rest = rest[:-len(derivational)]
+
+    # Step 4
+    if rest.endswith("нн"):
+        rest = rest[:-1]
+    else:
+        superlative = _longest(rest, SUPERLATIVE)
+        if superlative:
+            rest = rest[:-len(superlative)]
+            if rest.endswith("нн"):
+                rest = rest[:-1]
+        elif rest.endswith("ь"):
+            rest = rest[:-1]
+    return prefix + rest
+
+
+def stem_latin(word: str) -> str:
+    """Very light English suffix stripping"""
+    if len(word) <= 3:
+        return word
+    for suffix, replacement in (("ies", "y"), ("ing", ""), ("ed", ""), ("es", ""), ("s", "")):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)] + replacement
+    return word
+
+
+def strip_html(text: str) -> str:
+    return html.unescape(TAG_RE.sub(" ", text or ""))
+
+
+@lru_cache(maxsize=200_000)
+def _stem_lower(token: str) -> str:
+    if CYRILLIC_RE.search(token):
+        return stem_russian(token.replace("ё", "е"))
+    return stem_latin(token)
+
+
+def stem(token: str) -> str:
+    """Stem one word; memoized since vocabularies are far smaller than corpora"""
+    return _stem_lower(token.lower())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, stemmed tokens of plain text"""
+    return [_stem_lower(t) for t in TOKEN_RE.findall(text.lower()) if len(t) > 1 or t.isdigit()]
+
+
+def _rendered(value: Any) -> str:
+    if isinstance(value, dict):
+        return value.get("rendered", "") or value.get("raw", "")
+    return value or ""
+
+
+# ==================== INDEX ====================
+
+@dataclass
+class Document:
+    """Indexed document metadata; body text is stored zlib-compressed"""
+    key: Tuple[str, int]
+    title: str
+    url: str
+    status: str
+    date: str
+    categories: List[int]
+    tags: List[int]
+    length: int
+    terms: Dict[str, int] = field(repr=False)
+    body: bytes = field(repr=False)
+
+    @property
+    def text(self) -> str:
+        return zlib.decompress(self.body).decode()
+
+
+class SearchIndex:
+    """Inverted index with BM25 ranking"""
+
+    def __init__(self):
+        self.docs: Dict[Tuple[str, int], Document] = {}
+        self.postings: Dict[str, Dict[Tuple[str, int], int]] = {}
+        # Document lengths kept apart from Document for a tight scoring loop
+        self.lengths: Dict[Tuple[str, int], int] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add(self, kind: str, item: Dict[str, Any]) -> None:
+        """Index (or re-index) a post/page REST object"""
+        key = (kind, item["id"])
+        self.remove(kind, item["id"])
+
+        title = strip_html(_rendered(item.get("title")))
+        excerpt = strip_html(_rendered(item.get("excerpt")))
+        content = strip_html(_rendered(item.get("content")))
+        body = " ".join(" ".join(part.split()) for part in (excerpt, content) if part)
+
+        terms: Dict[str, int] = {}
+        for term in tokenize(title):
+            terms[term] = terms.get(term, 0) + TITLE_WEIGHT
+        for term in tokenize(body):
+            terms[term] = terms.get(term, 0) + 1
+        length = sum(terms.values())
+
+        self.docs[key] = Document(
+            key=key,
+            title=title.strip(),
+            url=item.get("link", ""),
+            status=item.get("status", ""),
+            date=item.get("date", ""),
+            categories=list(item.get("categories", [])),
+            tags=list(item.get("tags", [])),
+            length=length,
+            terms=terms,
+            body=zlib.compress(body.encode()),
+        )
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[key] = tf
+        self.lengths[key] = length
+        self.total_length += length
+
+    def remove(self, kind: str, object_id: int) -> None:
+        doc = self.docs.pop((kind, object_id), None)
+        if doc is None:
+            return
+        del self.lengths[doc.key]
+        for term in doc.terms:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(doc.key, None)
+                if not posting:
+                    del self.postings[term]
+        self.total_length -= doc.length
+
+    def apply_write(self, method: str, resource: str, data: Any) -> None:
+        """Client write listener: keep posts/pages current"""
+        kind = resource.rsplit("/", 1)[-1]
+        if resource not in ("wp/v2/posts", "wp/v2/pages") or not isinstance(data, dict):
+            return
+        if method == "DELETE" and data.get("deleted"):
+            previous = data.get("previous") or {}
+            if "id" in previous:
+                self.remove(kind, previous["id"])
+        elif data.get("status") == "trash" and "id" in data:
+            # DELETE without force (or an update) moves the post to the trash
+            self.remove(kind, data["id"])
+        elif "id" in data:
+            self.add(kind, data)
+
+    async def build(self, client, kinds: Iterable[str] = ("posts", "pages"), concurrency: int = 6) -> int:
+        """Index every post/page by paginating the REST API"""
+        count = 0
+        for kind in kinds:
+            params = {"_fields": INDEX_FIELDS, "status": "publish,future,draft,pending,private"}
+            async for item in iter_collection(client, kind, params, concurrency=concurrency):
+                self.add(kind, item)
+                count += 1
+        return count
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        kind: Optional[str] = None,
+        status: Optional[str] = "publish",
+        categories: Optional[List[int]] = None,
+        tags: Optional[List[int]] = None,
+        after: Optional[str] = None,
+        before: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Rank documents against a query
+
+        Args:
+            query: Free-text query
+            limit: Maximum number of results
+            kind: "posts" or "pages" (optional)
+            status: Post status, comma-separated statuses, or "any" (default: publish)
+            categories: Require any of these category IDs (optional)
+            tags: Require any of these tag IDs (optional)
+            after: Only documents dated on/after this ISO date (optional)
+            before: Only documents dated before this ISO date (optional)
+        """
+        statuses = set(status.split(",")) if status and status != "any" else None
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.docs:
+            return []
+        n = len(self.docs)
+        avg_length = self.total_length / n
+
+        docs = self.docs
+        lengths = self.lengths
+        base = K1 * (1 - B)
+        norm = K1 * B / avg_length
+        scores: Dict[Tuple[str, int], float] = {}
+        for term in terms:
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for key, tf in posting.items():
+                scores[key] = scores.get(key, 0.0) + idf * tf * (K1 + 1) / (
+                    tf + base + norm * lengths[key]
+                )
+
+        def allowed(doc: Document) -> bool:
+            if kind and doc.key[0] != kind:
+                return False
+            if statuses and doc.status not in statuses:
+                return False
+            if categories and not set(categories) & set(doc.categories):
+                return False
+            if tags and not set(tags) & set(doc.tags):
+                return False
+            if after and doc.date < after:
+                return False
+            if before and doc.date >= before:
+                return False
+            return True
+
+        filtered = any((kind, statuses, categories, tags, after, before))
+        candidates = (kv for kv in scores.items() if not filtered or allowed(docs[kv[0]]))
+        ranked = heapq.nlargest(limit, candidates, key=lambda kv: kv[1])
+        results = []
+        stems = set(terms)
+        for key, score in ranked:
+            doc = docs[key]
+            results.append({
+                "kind": key[0],
+                "id": key[1],
+                "title": highlight(doc.title, stems) or doc.title,
+                "url": doc.url,
+                "status": doc.status,
+                "date": doc.date,
+                "score": round(score, 4),
+                "snippet": snippet(doc.text, stems),
+            })
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {"documents": len(self.docs), "terms": len(self.postings)}
+
+
+def highlight(text: str, stems: set) -> str:
+    """Wrap words whose stem matches in **bold**; empty string if none match"""
+    found = False
+
+    def mark(match: re.Match) -> str:
+        nonlocal found
+        if stem(match.group(0)) in stems:
+            found = True
+            return f"**{match.group(0)}**"
+        return match.group(0)
+
+    marked = TOKEN_RE.sub(mark, text)
+    return marked if found else ""
+
+
+def snippet(text: str, stems: set, width: int = 240) -> str:
+    """Highlighted window of text around the first matching word"""
+    for match in TOKEN_RE.finditer(text):
+        if stem(match.group(0)) in stems:
+            start = max(0, match.start() - width // 3)
+            # Start on a word boundary
+            if start:
+                space = text.find(" ", start)
+                start = space + 1 if 0 <= space < match.start() else start
+            window = text[start:start + width]
+            return ("…" if start else "") + highlight(window, stems) + ("…" if start + width < len(text) else "")
+    return text[:width] + ("…" if len(text) > width else "")
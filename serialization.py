@@ -0,0 +1,84 @@
+"""
+JSON encoding and decoding in one place.
+
+Tool results and upstream WordPress bodies are large (a page of posts with
+rendered content is easily a megabyte), and the stdlib json module spends
+noticeable time on both. orjson is used when it is installed; otherwise the
+stdlib does the work with the same output shape: compact separators and
+UTF-8 text instead of \\u escapes, which also keeps Cyrillic content at a
+third of the size.
+
+    dumps(obj)    -> str    tool results, SSE data lines
+    dumpb(obj)    -> bytes  HTTP bodies
+    loads(data)   -> Any    str or bytes
+    decode(resp)  -> Any    httpx response body ({} when empty)
+
+A leading UTF-8 byte order mark is skipped: a WordPress plugin file saved
+with one prints it in front of every REST response, and neither orjson nor
+json.loads(str) accepts it.
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised by forcing the fallback in tests
+    orjson = None
+
+from starlette.responses import JSONResponse as _StarletteJSONResponse
+
+BACKEND = "orjson" if orjson is not None else "json"
+JSONDecodeError = json.JSONDecodeError  # orjson.JSONDecodeError subclasses it
+_BOM = b"\xef\xbb\xbf"
+
+
+def _strip_bom(data: Union[str, bytes, bytearray, memoryview]) -> Union[str, bytes, bytearray, memoryview]:
+    if isinstance(data, str):
+        return data[1:] if data.startswith("\ufeff") else data
+    return data[3:] if data[:3] == _BOM else data
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=repr)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumpb(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+    def dumps(obj: Any) -> str:
+        return orjson.dumps(obj, default=_default, option=_OPTIONS).decode("utf-8")
+
+    def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+        return orjson.loads(_strip_bom(data))
+else:
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_default)
+
+    def dumps(obj: Any) -> str:
+        return _encoder.encode(obj)
+
+    def dumpb(obj: Any) -> bytes:
+        return _encoder.encode(obj).encode("utf-8")
+
+    def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+        if isinstance(data, memoryview):
+            data = bytes(data)
+        return json.loads(_strip_bom(data))
+
+
+def decode(response) -> Any:
+    """Body of an httpx response; decodes the bytes directly, skipping response.text"""
+    content = _strip_bom(response.content)
+    return loads(content) if content.strip() else {}
+
+
+class JSONResponse(_StarletteJSONResponse):
+    """FastAPI/Starlette response rendered with the fast encoder (ORJSONResponse equivalent)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumpb(content)
@@ -0,0 +1,69 @@
+"""
+Single-flight coalescing of identical concurrent calls.
+
+While a call for a key is in flight, further callers with the same key await
+the same task instead of starting their own, so N simultaneous identical
+reads cost one upstream request and share one parsed result.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class SingleFlight:
+    """Share one in-flight task between concurrent callers of the same key"""
+
+    def __init__(self):
+        self._calls: Dict[str, Tuple[asyncio.Task, Optional[str]]] = {}
+        self.executed = 0
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]], tag: Optional[str] = None) -> Any:
+        """Run fn() once for all concurrent callers of key
+
+        Args:
+            key: Identity of the call (e.g. method + URL + params)
+            fn: Coroutine factory performing the actual work
+            tag: Optional group name used by discard()
+
+        The shared task is shielded, so a cancelled caller does not cancel
+        the work other callers are waiting on.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = (task, tag)
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self.executed += 1
+        else:
+            task = call[0]
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def discard(self, tag: str) -> None:
+        """Stop handing out in-flight calls of a tag to new callers
+
+        Callers already waiting still get their result; later callers start
+        a fresh call. Used after writes so nobody joins a read that started
+        before the write.
+        """
+        for key in [k for k, (_, t) in self._calls.items() if t == tag]:
+            del self._calls[key]
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        call = self._calls.get(key)
+        if call is not None and call[0] is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every caller went away
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._calls),
+            "executed": self.executed,
+            "shared": self.shared,
+        }
@@ -0,0 +1,92 @@
+"""
+Padding at the start of an SSE stream, for proxies that buffer responses.
+
+A buffering proxy (Cloudflare, some tunnels) holds back the first small
+events of a stream until it has collected enough bytes, so the client never
+sees the `endpoint` event. Sending an SSE comment block (":" + spaces) in
+front of it pushes the proxy past its buffer. Modes:
+
+- none: nothing, for direct connections
+- single: one `size`-byte block sent together with the first event
+- pulsed: `size` bytes in `chunk`-byte pieces, `interval` seconds apart
+  (for proxies that also wait for several writes)
+- auto: `auto_mode` when the request came through a proxy (a Cf-Ray, Via,
+  Forwarded or X-Forwarded-For/-Host header, as Cloudflare and tunnels
+  like ngrok add), none otherwise
+
+Configured with WP_SSE_PADDING (mode), WP_SSE_PADDING_BYTES,
+WP_SSE_PADDING_CHUNK and WP_SSE_PADDING_INTERVAL.
+"""
+
+import asyncio
+import os
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Tuple
+
+MODES = ("none", "single", "pulsed", "auto")
+# Request headers that mean a proxy is in front of us
+PROXY_HEADERS = (b"cf-ray", b"via", b"forwarded", b"x-forwarded-for", b"x-forwarded-host")
+
+
+@dataclass(frozen=True)
+class SsePadding:
+    mode: str = "auto"
+    size: int = 16384
+    chunk: int = 1024
+    interval: float = 0.01
+    auto_mode: str = "single"
+
+    def __post_init__(self):
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown SSE padding mode: {self.mode} (use one of {', '.join(MODES)})")
+        if self.auto_mode not in ("none", "single", "pulsed"):
+            raise ValueError(f"Unknown SSE padding auto mode: {self.auto_mode}")
+
+    @classmethod
+    def from_env(cls) -> "SsePadding":
+        return cls(
+            mode=os.getenv("WP_SSE_PADDING", "auto").lower(),
+            size=int(os.getenv("WP_SSE_PADDING_BYTES", "16384")),
+            chunk=int(os.getenv("WP_SSE_PADDING_CHUNK", "1024")),
+            interval=float(os.getenv("WP_SSE_PADDING_INTERVAL", "0.01")),
+            auto_mode=os.getenv("WP_SSE_PADDING_AUTO", "single").lower(),
+        )
+
+    def resolve(self, headers: Iterable[Tuple[bytes, bytes]]) -> str:
+        """Mode for a request with these (lowercase) ASGI headers"""
+        if self.mode != "auto":
+            return self.mode
+        behind_proxy = any(name in PROXY_HEADERS for name, _ in headers)
+        return self.auto_mode if behind_proxy else "none"
+
+    def blocks(self, mode: str) -> List[bytes]:
+        """The comment blocks sent before the first event"""
+        if mode == "none" or self.size <= 0:
+            return []
+        if mode == "single":
+            return [comment(self.size)]
+        count = max(1, -(-self.size // self.chunk))
+        return [comment(self.chunk)] * count
+
+    async def send_first(self, send: Callable, message: dict, mode: str) -> int:
+        """Send the first body message of a stream with the padding in front
+
+        Returns the number of padding bytes sent.
+        """
+        blocks = self.blocks(mode)
+        if not blocks:
+            await send(message)
+            return 0
+        for block in blocks[:-1]:
+            await send({"type": "http.response.body", "body": block, "more_body": True})
+            if self.interval > 0:
+                await asyncio.sleep(self.interval)
+        # The last block travels with the event, so a proxy flushing on this write delivers both
+        message = dict(message, body=blocks[-1] + (message.get("body") or b""))
+        await send(message)
+        return sum(len(b) for b in blocks)
+
+
+def comment(size: int) -> bytes:
+    """An SSE comment of exactly `size` bytes (at least 3)"""
+    return b":" + b" " * max(0, size - 3) + b"\n\n"
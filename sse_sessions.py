@@ -0,0 +1,198 @@
+"""
+Registry of open SSE streams with one shared heartbeat ticker.
+
+Each /sse connection used to run its own loop: a 15 s sleep, a disconnect
+check and a JSON encode per client, so thousands of idle clients meant
+thousands of timers. Here a connection is a SseSession with a small queue
+of pre-encoded events: a single ticker task encodes the heartbeat once per
+interval and puts the same bytes on every queue, and each stream just
+writes what arrives.
+
+Sessions that stop taking events (half-open TCP, a client that stopped
+reading so our writes block) are reaped: when a session has not completed a
+write for `stale_after` seconds its stream is cancelled and the connection
+closed. Clean disconnects end the stream right away.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from typing import Dict, Optional
+
+from starlette.responses import Response
+
+from serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# Events queued per session before new ones are skipped for it
+QUEUE_SIZE = 8
+# Time a reaped stream gets to end its response cleanly
+CLOSE_TIMEOUT = 1.0
+
+
+def encode_event(event: str, data: str) -> bytes:
+    """One SSE event, framed like sse_starlette does"""
+    lines = "".join(f"data: {line}\r\n" for line in data.splitlines() or [""])
+    return f"event: {event}\r\n{lines}\r\n".encode("utf-8")
+
+
+class SseSession:
+    __slots__ = ("id", "queue", "opened", "last_write", "task", "reaped")
+
+    def __init__(self, session_id: int):
+        self.id = session_id
+        self.queue: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+        self.opened = self.last_write = time.monotonic()
+        self.task: Optional[asyncio.Task] = None
+        self.reaped = False
+
+    def push(self, data: Optional[bytes]) -> bool:
+        """Queue pre-encoded bytes (None ends the stream); False if the queue is full"""
+        try:
+            self.queue.put_nowait(data)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+
+class SessionRegistry:
+    """Open SSE sessions and the ticker that sends their heartbeats
+
+    Args:
+        interval: Seconds between heartbeats
+        stale_after: Reap sessions that completed no write for this long
+            (default: four intervals)
+    """
+
+    def __init__(self, interval: float = 15.0, stale_after: Optional[float] = None):
+        self.interval = interval
+        self.stale_after = stale_after if stale_after is not None else interval * 4
+        self.sessions: Dict[int, SseSession] = {}
+        self.ticks = 0
+        self.opened = 0
+        self.reaped = 0
+        self.skipped = 0
+        self._ids = itertools.count(1)
+        self._ticker: Optional[asyncio.Task] = None
+
+    def open(self) -> SseSession:
+        session = SseSession(next(self._ids))
+        session.task = asyncio.current_task()
+        self.sessions[session.id] = session
+        self.opened += 1
+        return session
+
+    def close(self, session: SseSession) -> None:
+        self.sessions.pop(session.id, None)
+
+    def heartbeat(self) -> bytes:
+        self.ticks += 1
+        return encode_event("heartbeat", dumps({"status": "alive", "count": self.ticks}))
+
+    def tick(self) -> None:
+        """Send one heartbeat to every session and reap the stale ones"""
+        data = self.heartbeat()
+        cutoff = time.monotonic() - self.stale_after
+        for session in list(self.sessions.values()):
+            if session.last_write < cutoff:
+                self.reap(session)
+            elif not session.push(data):
+                self.skipped += 1
+
+    def reap(self, session: SseSession) -> None:
+        if session.reaped:
+            return
+        session.reaped = True
+        self.reaped += 1
+        self.close(session)
+        if session.task is not None:
+            session.task.cancel()
+        logger.info(f"Reaped stale SSE session {session.id} (open {time.monotonic() - session.opened:.0f}s)")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"SSE heartbeat failed: {e}")
+
+    def start(self) -> None:
+        if self._ticker is None:
+            self._ticker = asyncio.create_task(self._run(), name="sse-heartbeat")
+
+    async def stop(self) -> None:
+        """Stop the ticker and end every open stream"""
+        if self._ticker is not None:
+            self._ticker.cancel()
+            try:
+                await self._ticker
+            except asyncio.CancelledError:
+                pass
+            self._ticker = None
+        for session in list(self.sessions.values()):
+            if not session.push(None):
+                self.reap(session)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active": len(self.sessions),
+            "opened": self.opened,
+            "reaped": self.reaped,
+            "heartbeats": self.ticks,
+            "skipped": self.skipped,
+        }
+
+
+class SessionStream(Response):
+    """Streaming response for one SSE session
+
+    Writes `first` (pre-encoded events), then whatever the registry queues
+    for the session until the client disconnects or the session is reaped.
+    """
+
+    media_type = "text/event-stream"
+    charset = "utf-8"
+
+    def __init__(self, registry: SessionRegistry, first: bytes = b"", headers: Optional[Dict[str, str]] = None):
+        self.registry = registry
+        self.first = first
+        self.status_code = 200
+        self.background = None
+        self.init_headers(headers)
+
+    async def __call__(self, scope, receive, send) -> None:
+        session = self.registry.open()
+
+        async def watch_disconnect() -> None:
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            session.push(None)
+
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            data = self.first
+            while data is not None:
+                if data:
+                    await send({"type": "http.response.body", "body": data, "more_body": True})
+                    session.last_write = time.monotonic()
+                data = await session.queue.get()
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        except asyncio.CancelledError:
+            if not session.reaped:
+                raise
+            # Cancelled by reap(): try to end the response, the connection goes either way
+            asyncio.current_task().uncancel()
+            try:
+                await asyncio.wait_for(send({"type": "http.response.body", "body": b"", "more_body": False}),
+                                       CLOSE_TIMEOUT)
+            except (asyncio.TimeoutError, OSError):
+                pass
+        except OSError:
+            pass  # the client went away mid-write
+        finally:
+            watcher.cancel()
+            self.registry.close(session)
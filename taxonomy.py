@@ -0,0 +1,199 @@
+"""
+Name-to-ID resolver for categories and tags.
+
+Terms are loaded lazily with full pagination and indexed by name, slug and
+(for categories) parent path such as "Европа/Италия". The index follows
+writes made through the same WordPressClient, so terms created by
+create_category/create_tag are known without a reload.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Union
+
+from pagination import fetch_all
+
+TAXONOMIES = ("categories", "tags")
+TERM_NOUNS = {"categories": "category", "tags": "tag"}
+TERM_FIELDS = "id,name,slug,parent"
+
+# A miss triggers a reload only if the index is older than this (seconds)
+RELOAD_AFTER = 30.0
+
+TermRef = Union[int, str]
+
+
+def _key(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+class TermSet:
+    """Lookup tables of one taxonomy"""
+
+    def __init__(self):
+        self.by_id: Dict[int, Dict[str, Any]] = {}
+        self.by_name: Dict[str, int] = {}
+        self.by_slug: Dict[str, int] = {}
+        self.loaded_at = 0.0
+
+    def add(self, term: Dict[str, Any]) -> None:
+        old = self.by_id.get(term["id"])
+        if old is not None:
+            self.by_name.pop(_key(old["name"]), None)
+            self.by_slug.pop(old["slug"], None)
+        self.by_id[term["id"]] = term
+        self.by_name[_key(term["name"])] = term["id"]
+        self.by_slug[term["slug"]] = term["id"]
+
+    def remove(self, term_id: int) -> None:
+        term = self.by_id.pop(term_id, None)
+        if term is not None:
+            self.by_name.pop(_key(term["name"]), None)
+            self.by_slug.pop(term["slug"], None)
+
+    def path(self, term_id: int) -> str:
+        """Parent path of a term, e.g. "Европа/Италия" """
+        names, seen = [], set()
+        while term_id in self.by_id and term_id not in seen:
+            seen.add(term_id)
+            term = self.by_id[term_id]
+            names.append(term["name"])
+            term_id = term.get("parent", 0)
+        return "/".join(reversed(names))
+
+    def find(self, ref: str, parent: int = 0) -> Optional[int]:
+        """Find a term by slug or name (or "A/B" path when there is no parent)"""
+        if "/" in ref and not parent:
+            wanted = _key(ref.replace(" / ", "/"))
+            for term_id in self.by_id:
+                if _key(self.path(term_id)) == wanted:
+                    return term_id
+            return None
+        if parent:
+            for term in self.by_id.values():
+                if term.get("parent", 0) == parent and _key(term["name"]) == _key(ref):
+                    return term["id"]
+            return None
+        if ref in self.by_slug:
+            return self.by_slug[ref]
+        return self.by_name.get(_key(ref))
+
+
+class TaxonomyIndex:
+    """Resolve category/tag names to IDs, creating missing terms on request"""
+
+    def __init__(self, client):
+        self.client = client
+        self.terms = {taxonomy: TermSet() for taxonomy in TAXONOMIES}
+        self._locks = {taxonomy: asyncio.Lock() for taxonomy in TAXONOMIES}
+        client.on_write(self.apply_write)
+
+    async def load(self, taxonomy: str, force: bool = False) -> TermSet:
+        """Load every term of a taxonomy (once, unless forced)"""
+        terms = self.terms[taxonomy]
+        async with self._locks[taxonomy]:
+            if force or not terms.loaded_at:
+                fresh = TermSet()
+                for term in await fetch_all(self.client, taxonomy, {"_fields": TERM_FIELDS}):
+                    fresh.add(term)
+                fresh.loaded_at = time.monotonic()
+                self.terms[taxonomy] = terms = fresh
+        return terms
+
+    def apply_write(self, method: str, resource: str, data: Any) -> None:
+        """Client write listener: track created, renamed and deleted terms"""
+        taxonomy = resource.rsplit("/", 1)[-1]
+        if resource != f"wp/v2/{taxonomy}" or taxonomy not in TAXONOMIES or not isinstance(data, dict):
+            return
+        terms = self.terms[taxonomy]
+        if method == "DELETE":
+            previous = data.get("previous") or {}
+            if "id" in previous:
+                terms.remove(previous["id"])
+        elif {"id", "name", "slug"} <= set(data):
+            terms.add({k: data.get(k, 0) for k in ("id", "name", "slug", "parent")})
+
+    async def resolve(self, taxonomy: str, refs: List[TermRef], create_missing: bool = False) -> List[int]:
+        """Turn IDs, names, slugs or "Parent/Child" paths into term IDs
+
+        Args:
+            taxonomy: "categories" or "tags"
+            refs: Integers are taken as IDs; strings are looked up
+            create_missing: Create terms that do not exist yet
+
+        Raises:
+            ValueError: A name is unknown and create_missing is False
+        """
+        names = [r for r in refs if isinstance(r, str)]
+        if not names:
+            return [int(r) for r in refs]
+
+        terms = await self.load(taxonomy)
+        missing = [n for n in names if self._lookup(terms, n) is None]
+        if missing and time.monotonic() - terms.loaded_at > RELOAD_AFTER:
+            # Someone may have added terms in wp-admin since we loaded
+            terms = await self.load(taxonomy, force=True)
+
+        ids = []
+        for ref in refs:
+            if not isinstance(ref, str):
+                ids.append(int(ref))
+                continue
+            term_id = self._lookup(terms, ref)
+            if term_id is None:
+                if not create_missing:
+                    raise ValueError(f"Unknown {TERM_NOUNS[taxonomy]}: {ref}")
+                term_id = await self._create(taxonomy, ref)
+            if term_id not in ids:
+                ids.append(term_id)
+        return ids
+
+    def _lookup(self, terms: TermSet, ref: str) -> Optional[int]:
+        return terms.find(ref.strip())
+
+    async def _create(self, taxonomy: str, ref: str) -> int:
+        """Create a term (and missing parents for category paths)"""
+        async with self._locks[taxonomy]:
+            terms = self.terms[taxonomy]
+            # Another caller may have created it while we waited
+            existing = self._lookup(terms, ref)
+            if existing is not None:
+                return existing
+            parts = [p.strip() for p in ref.split("/")] if taxonomy == "categories" else [ref.strip()]
+            parent = 0
+            for name in parts:
+                term_id = terms.find(name, parent)
+                if term_id is None:
+                    payload: Dict[str, Any] = {"name": name}
+                    if parent:
+                        payload["parent"] = parent
+                    data = await self._post_term(taxonomy, payload)
+                    term_id = data["id"]
+                    # The write listener has already indexed it; keep the parent link
+                    terms.add({"id": term_id, "name": data.get("name", name),
+                               "slug": data.get("slug", ""), "parent": parent})
+                parent = term_id
+            return parent
+
+    async def _post_term(self, taxonomy: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return await self.client.request("POST", taxonomy, json=payload)
+        except Exception as e:
+            # WordPress answers 400 term_exists (with the ID) for duplicates
+            response = getattr(e, "response", None)
+            try:
+                body = response.json() if response is not None else {}
+            except ValueError:
+                body = {}
+            if isinstance(body, dict) and body.get("code") == "term_exists":
+                return {"id": body["data"]["term_id"], "name": payload["name"]}
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            taxonomy: {
+                "terms": len(terms.by_id),
+                "age": round(time.monotonic() - terms.loaded_at, 1) if terms.loaded_at else None,
+            }
+            for taxonomy, terms in self.terms.items()
+        }
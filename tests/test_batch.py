@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mcp_server
+from mcp_server import WordPressClient
+from batch import batch_request, run_batch
+from response_cache import ResponseCache
+
+
+class BatchWordPress:
+    """Fake /batch/v1 that creates posts and rejects empty titles"""
+
+    def __init__(self):
+        self.batch_sizes = []
+        self.get_calls = 0
+        self.next_id = 100
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "GET":
+            self.get_calls += 1
+            return httpx.Response(200, json=[])
+        assert request.url.path == "/wp-json/batch/v1"
+        sub_requests = json.loads(request.content)["requests"]
+        self.batch_sizes.append(len(sub_requests))
+        responses = []
+        for sub in sub_requests:
+            body = sub.get("body", {})
+            if sub["method"] == "DELETE":
+                post_id = int(sub["path"].split("/")[-1].split("?")[0])
+                responses.append({"status": 200, "body": {"deleted": True, "previous": {"id": post_id}}})
+            elif not body.get("title", "x"):
+                responses.append({"status": 400, "body": {"code": "empty_title", "message": "Title is empty"}})
+            else:
+                self.next_id += 1
+                responses.append({"status": 201, "body": {"id": self.next_id, "link": f"https://example.com/{self.next_id}"}})
+        return httpx.Response(207, json={"responses": responses})
+
+
+class TestBatch(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.origin = BatchWordPress()
+        self.wp = WordPressClient(
+            "https://example.com", "user", "pass",
+            cache=ResponseCache(max_entries=16, ttl=60),
+            transport=httpx.MockTransport(self.origin)
+        )
+        self.patcher = patch.object(mcp_server, "wp_client", self.wp)
+        self.patcher.start()
+
+    async def asyncTearDown(self):
+        self.patcher.stop()
+        await self.wp.close()
+
+    async def test_chunks_and_keeps_order(self):
+        requests = [batch_request("POST", "posts", {"title": f"Post {i}"}) for i in range(60)]
+        results = await run_batch(self.wp, requests, batch_size=25)
+
+        self.assertEqual(sorted(self.origin.batch_sizes), [10, 25, 25])
+        self.assertEqual([r["index"] for r in results], list(range(60)))
+        self.assertTrue(all(r["success"] for r in results))
+
+    async def test_bulk_create_reports_per_item_failures(self):
+        posts = [{"title": "One"}, {"title": ""}, {"title": "Three"}]
+        result = json.loads(await mcp_server.bulk_create_posts(posts))
+
+        self.assertFalse(result["success"])
+        self.assertEqual(result["succeeded"], 2)
+        self.assertEqual(result["results"][1]["message"], "Title is empty")
+        self.assertEqual(result["results"][2]["url"], f"https://example.com/{result['results'][2]['post_id']}")
+
+    async def test_bulk_delete_invalidates_cached_reads(self):
+        await self.wp.request("GET", "posts")
+        result = json.loads(await mcp_server.bulk_delete_posts([1, 2]))
+        await self.wp.request("GET", "posts")
+
+        self.assertTrue(result["success"])
+        self.assertEqual([r["post_id"] for r in result["results"]], [1, 2])
+        self.assertEqual(self.origin.get_calls, 2)
+
+    async def test_bulk_moderate_unknown_action(self):
+        result = json.loads(await mcp_server.bulk_moderate_comments([1], action="burn"))
+        self.assertFalse(result["success"])
+        self.assertEqual(self.origin.batch_sizes, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
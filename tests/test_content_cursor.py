@@ -0,0 +1,115 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mcp_server
+from mcp_server import WordPressClient
+from content_cursor import ContentCursors, make_slices, split_blocks
+from response_cache import ResponseCache
+
+
+def long_read(paragraphs: int = 400) -> str:
+    blocks = []
+    for i in range(paragraphs):
+        blocks.append(f"<p>Абзац {i}: " + "озеро Байкал зимой " * 40 + "</p>\n")
+        if i % 50 == 0:
+            blocks.append(f"<blockquote><p>Цитата {i}</p><p>Вторая строка</p></blockquote>\n")
+    return "".join(blocks)
+
+
+class TestSlicing(unittest.TestCase):
+    def test_blocks_rejoin_and_keep_nesting(self):
+        html = "<h2>Заголовок</h2>\n<blockquote><p>a</p><p>b</p></blockquote><p>c<br>d</p><hr/><p>e"
+        blocks = split_blocks(html)
+        self.assertEqual("".join(blocks), html)
+        self.assertEqual(blocks[1], "<blockquote><p>a</p><p>b</p></blockquote>")
+        self.assertEqual(blocks[-1], "<p>e")
+
+    def test_gutenberg_comments_and_text(self):
+        raw = "<!-- wp:paragraph -->\n<p>a</p>\n<!-- /wp:paragraph -->\n\n<!-- wp:list --><ul><li>x</li></ul><!-- /wp:list -->"
+        self.assertEqual(len(split_blocks(raw)), 2)
+        self.assertEqual(split_blocks("one\n\ntwo\nthree\n\n", html=False), ["one\n\n", "two\nthree\n\n"])
+
+    def test_slices_respect_size_and_boundaries(self):
+        html = long_read()
+        slices = make_slices(html, 16 * 1024)
+
+        self.assertEqual("".join(slices), html)
+        for piece in slices:
+            self.assertLessEqual(len(piece.encode("utf-8")), 16 * 1024)
+            self.assertTrue(piece.startswith(("<p>", "<blockquote>")))
+            self.assertEqual(piece.count("<blockquote>"), piece.count("</blockquote>"))
+
+    def test_oversized_block_is_cut_outside_tags(self):
+        html = "<p>" + "слово <b>жирное</b> " * 2000 + "</p>"
+        slices = make_slices(html, 4096)
+        self.assertEqual("".join(slices), html)
+        for piece in slices:
+            self.assertLessEqual(len(piece.encode("utf-8")), 4096)
+            self.assertGreaterEqual(piece.rfind(">"), piece.rfind("<"))
+
+
+class TestCursors(unittest.TestCase):
+    def test_walk_and_expire(self):
+        cursors = ContentCursors(ttl=60)
+        page = cursors.open(long_read(100), 8192, id=5)
+        parts = [page["content"]]
+        while page["next_cursor"]:
+            page = cursors.next(page["next_cursor"])
+            parts.append(page["content"])
+        self.assertEqual("".join(parts), long_read(100))
+        self.assertEqual(page["slice"], page["slices"] - 1)
+
+        with self.assertRaisesRegex(LookupError, "expired"):
+            cursors.next("nope.1")
+
+    def test_short_content_opens_no_cursor(self):
+        cursors = ContentCursors()
+        page = cursors.open("<p>short</p>", 8192)
+        self.assertIsNone(page["next_cursor"])
+        self.assertEqual(len(cursors), 0)
+
+
+class TestGetPostCursor(unittest.IsolatedAsyncioTestCase):
+    async def test_next_slices_come_from_memory(self):
+        html = long_read()
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request.url.path)
+            return httpx.Response(200, json={
+                "id": 9, "title": {"rendered": "Лонгрид"}, "content": {"rendered": html},
+                "status": "publish", "link": "https://example.com/?p=9"
+            })
+
+        wp = WordPressClient("https://example.com", "user", "pass",
+                             cache=ResponseCache(max_entries=0), transport=httpx.MockTransport(handler))
+        with patch.object(mcp_server, "wp_client", wp), \
+                patch.object(mcp_server, "content_cursors", ContentCursors()):
+            first = json.loads(await mcp_server.get_post(9, max_bytes=32 * 1024))
+            parts = [first["post"]["content"]]
+            cursor = first["content_slice"]["next_cursor"]
+            while cursor:
+                page = json.loads(await mcp_server.get_post(cursor=cursor))
+                self.assertEqual(page["post"]["id"], 9)
+                parts.append(page["post"]["content"])
+                cursor = page["content_slice"]["next_cursor"]
+            bad = json.loads(await mcp_server.get_page(cursor="missing.1"))
+        await wp.close()
+
+        self.assertEqual(first["post"]["title"], "Лонгрид")
+        self.assertEqual(first["content_slice"]["total_bytes"], len(html.encode("utf-8")))
+        self.assertGreater(first["content_slice"]["slices"], 10)
+        self.assertEqual("".join(parts), html)
+        self.assertEqual(calls, ["/wp-json/wp/v2/posts/9"])
+        self.assertFalse(bad["success"])
+
+
+if __name__ == "__main__":
+    unittest.main()
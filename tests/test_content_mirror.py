@@ -0,0 +1,131 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mcp_server
+from mcp_server import WordPressClient
+from content_mirror import ContentMirror
+from response_cache import ResponseCache
+
+
+class SyncWordPress:
+    """Fake collections supporting modified_after/orderby=modified paging"""
+
+    def __init__(self):
+        self.posts = {
+            i: {
+                "id": i, "slug": f"post-{i}", "status": "publish",
+                "date": f"2024-01-{i:02d}T10:00:00", "modified": f"2024-01-{i:02d}T10:00:00",
+                "title": {"rendered": f"Пост {i}"}, "content": {"rendered": f"<p>{i}</p>"},
+                "link": f"https://example.com/post-{i}",
+            }
+            for i in range(1, 6)
+        }
+        self.terms = [{"id": 1, "name": "Новости", "slug": "news", "count": 3}]
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        self.requests.append((request.method, request.url.path, dict(params)))
+        kind = request.url.path.rsplit("/", 1)[-1]
+        if kind == "posts":
+            items = sorted(self.posts.values(), key=lambda p: p["modified"])
+            if "modified_after" in params:
+                items = [p for p in items if p["modified"] > params["modified_after"]]
+        elif kind in ("categories", "tags"):
+            items = self.terms
+        else:
+            items = []
+        if "_fields" in params:
+            names = params["_fields"].split(",")
+            items = [{k: v for k, v in p.items() if k in names} for p in items]
+        per_page = int(params.get("per_page", 10))
+        page = int(params.get("page", 1))
+        total_pages = max(1, -(-len(items) // per_page))
+        return httpx.Response(
+            200,
+            json=items[(page - 1) * per_page:page * per_page],
+            headers={"X-WP-Total": str(len(items)), "X-WP-TotalPages": str(total_pages)}
+        )
+
+
+class TestContentMirror(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.origin = SyncWordPress()
+        self.wp = WordPressClient(
+            "https://example.com", "user", "pass",
+            cache=ResponseCache(max_entries=0),
+            transport=httpx.MockTransport(self.origin)
+        )
+        self.mirror = ContentMirror(":memory:", self.wp)
+
+    async def asyncTearDown(self):
+        await self.mirror.stop()
+        self.mirror.close()
+        await self.wp.close()
+
+    async def test_incremental_sync_uses_modified_cursor(self):
+        report = await self.mirror.sync(["posts"])
+        self.assertEqual(report["posts"]["synced"], 5)
+
+        self.origin.posts[2]["modified"] = "2024-02-01T00:00:00"
+        self.origin.posts[2]["title"] = {"rendered": "Изменён"}
+        report = await self.mirror.sync(["posts"])
+
+        last = self.origin.requests[-1][2]
+        self.assertEqual(last["orderby"], "modified")
+        self.assertEqual(last["modified_after"], "2024-01-05T09:59:59")
+        # The item sharing the cursor second is re-read, plus the changed one
+        self.assertEqual(report["posts"]["synced"], 2)
+        self.assertEqual(self.mirror.get("posts", 2)["title"]["rendered"], "Изменён")
+
+    async def test_reconcile_removes_deleted_posts(self):
+        await self.mirror.sync(["posts"])
+        del self.origin.posts[3]
+
+        report = await self.mirror.sync(["posts"], reconcile=True)
+
+        self.assertEqual(report["posts"]["removed"], 1)
+        self.assertIsNone(self.mirror.get("posts", 3))
+        self.assertEqual(self.mirror.list("posts", per_page=None)[1], 4)
+
+    async def test_writes_through_client_update_mirror(self):
+        await self.mirror.sync(["posts"])
+        self.wp.notify_write("POST", "/wp/v2/posts/9", {"id": 9, "slug": "new", "status": "draft"})
+        self.wp.notify_write("DELETE", "/wp/v2/posts/1", {"deleted": True, "previous": {"id": 1}})
+
+        self.assertEqual(self.mirror.get("posts", slug="new")["id"], 9)
+        self.assertIsNone(self.mirror.get("posts", 1))
+
+    async def test_tools_answer_from_fresh_mirror(self):
+        await self.mirror.sync()
+        calls = len(self.origin.requests)
+
+        with patch.object(mcp_server, "content_mirror", self.mirror), \
+                patch.object(mcp_server, "wp_client", self.wp), \
+                patch.object(self.mirror, "start"):
+            posts = json.loads(await mcp_server.get_posts(per_page=2, max_age=60))
+            post = json.loads(await mcp_server.get_post(slug="post-4", max_age=60))
+            cats = json.loads(await mcp_server.get_categories(max_age=60))
+
+        self.assertEqual([p["id"] for p in posts["posts"]], [5, 4])
+        self.assertEqual(posts["total"], 5)
+        self.assertEqual(post["post"]["title"], "Пост 4")
+        self.assertEqual(cats["categories"][0]["name"], "Новости")
+        self.assertEqual(len(self.origin.requests), calls)
+
+    async def test_stale_mirror_falls_back_to_rest(self):
+        with patch.object(mcp_server, "content_mirror", self.mirror), \
+                patch.object(self.mirror, "start"):
+            self.assertIsNone(mcp_server.mirror_for("posts", 60))
+            self.assertIsNone(mcp_server.mirror_for("posts", None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+import unittest
+import sys
+import os
+import asyncio
+import tempfile
+import time
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import batch_request, run_batch
+from fake_wordpress import FakeWordPress, filter_fields
+from media_index import MediaIndex
+from media_upload import MediaUploader, UploadItem
+from pagination import fetch_all
+from response_cache import ResponseCache
+from taxonomy import TaxonomyIndex
+
+
+class TestFakeWordPress(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.fake = FakeWordPress(posts=45, pages=4, comments=30)
+        self.client = self.fake.client(cache=ResponseCache())
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    def published(self):
+        return [p for p in self.fake.data["posts"].values() if p["status"] == "publish"]
+
+    async def test_paging_headers(self):
+        data, headers = await self.client.request_with_headers("GET", "posts", params={"per_page": 10, "page": 2})
+        total = len(self.published())
+        self.assertEqual(len(data), 10)
+        self.assertEqual(headers["X-WP-Total"], str(total))
+        self.assertEqual(headers["X-WP-TotalPages"], str(-(-total // 10)))
+        self.assertIn('rel="next"', headers["Link"])
+        posts = await fetch_all(self.client, "posts", per_page=7)
+        self.assertEqual(sorted(p["id"] for p in posts), sorted(p["id"] for p in self.published()))
+        with self.assertRaises(httpx.HTTPStatusError) as ctx:
+            await self.client.request("GET", "posts", params={"page": 99})
+        self.assertEqual(ctx.exception.response.json()["code"], "rest_post_invalid_page_number")
+
+    async def test_fields_and_contexts(self):
+        post = self.published()[0]
+        view = await self.client.request("GET", f"posts/{post['id']}", params={"_fields": "id,title,link"})
+        self.assertEqual(set(view), {"id", "title", "link"})
+        self.assertEqual(view["title"], {"rendered": post["title"]})
+        edit = await self.client.request("GET", f"posts/{post['id']}",
+                                         params={"context": "edit", "_fields": "modified,content.raw"})
+        self.assertEqual(edit, {"modified": edit["modified"], "content": {"raw": post["content"]}})
+        self.assertEqual(filter_fields({"a": {"b": 1, "c": 2}, "d": 3}, "a.b,d,x.y"), {"a": {"b": 1}, "d": 3})
+
+    async def test_filters(self):
+        category = next(iter(self.fake.data["categories"]))
+        posts = await self.client.request("GET", "posts", params={"categories": category, "per_page": 100})
+        self.assertTrue(posts)
+        self.assertTrue(all(category in p["categories"] for p in posts))
+        comments = await self.client.request("GET", "comments", params={"per_page": 100})
+        self.assertTrue(all(c["status"] == "approved" for c in comments))
+        pages = await self.client.request("GET", "pages", params={"orderby": "title", "order": "asc",
+                                                                  "status": "publish,draft"})
+        titles = [p["title"]["rendered"] for p in pages]
+        self.assertEqual(titles, sorted(titles))
+
+    async def test_etag_revalidation(self):
+        client = self.fake.client(cache=ResponseCache(ttl=0))
+        try:
+            first = await client.request("GET", "categories")
+            again = await client.request("GET", "categories")
+        finally:
+            await client.close()
+        self.assertEqual(first, again)
+        self.assertEqual(client.cache.stats()["revalidations"], 1)
+
+    async def test_writes_and_site_index(self):
+        created = await self.client.request("POST", "posts", json={"title": "Новый", "status": "publish"})
+        self.assertEqual(created["title"]["raw"], "Новый")
+        updated = await self.client.request("POST", f"posts/{created['id']}", json={"title": "Другой"})
+        self.assertGreater(updated["modified"], created["modified"])
+        trashed = await self.client.request("DELETE", f"posts/{created['id']}")
+        self.assertEqual(trashed["status"], "trash")
+        deleted = await self.client.request("DELETE", f"posts/{created['id']}", params={"force": "true"})
+        self.assertTrue(deleted["deleted"])
+        site = await self.client.request("GET", "", namespace="")
+        self.assertIn("wp/v2", site["namespaces"])
+
+    async def test_auth(self):
+        async with httpx.AsyncClient(transport=self.fake.transport(), base_url=self.fake.base_url) as anonymous:
+            read = await anonymous.get("/wp-json/wp/v2/posts")
+            write = await anonymous.post("/wp-json/wp/v2/posts", json={"title": "x"})
+            wrong = await anonymous.get("/wp-json/wp/v2/posts", auth=("admin", "nope"))
+        self.assertEqual(read.status_code, 200)
+        self.assertEqual(write.status_code, 401)
+        self.assertEqual(wrong.json()["code"], "incorrect_password")
+
+    async def test_batch(self):
+        ids = [p["id"] for p in self.published()[:2]]
+        requests = [batch_request("POST", f"posts/{ids[0]}", {"status": "draft"}),
+                    batch_request("DELETE", f"posts/{ids[1]}?force=true"),
+                    batch_request("POST", "posts/999999", {"status": "draft"})]
+        results = await run_batch(self.client, requests)
+        self.assertEqual([r["status"] for r in results], [200, 200, 404])
+        self.assertEqual(self.fake.data["posts"][ids[0]]["status"], "draft")
+        self.assertNotIn(ids[1], self.fake.data["posts"])
+        too_many = [batch_request("GET", "posts")] * 26
+        results = await run_batch(self.client, too_many, batch_size=26)
+        self.assertFalse(any(r["success"] for r in results))
+
+    async def test_terms(self):
+        name = next(iter(self.fake.data["tags"].values()))["name"]
+        with self.assertRaises(httpx.HTTPStatusError) as ctx:
+            await self.client.request("POST", "tags", json={"name": name})
+        self.assertEqual(ctx.exception.response.json()["code"], "term_exists")
+        taxonomy = TaxonomyIndex(self.client)
+        ids = await taxonomy.resolve("tags", [name, "Совсем новый"], create_missing=True)
+        self.assertEqual(len(ids), 2)
+        self.assertEqual(self.fake.data["tags"][ids[1]]["name"], "Совсем новый")
+
+    async def test_media_upload_and_dedupe(self):
+        http = self.fake.http_client()
+        index = MediaIndex(":memory:", self.client, http=http)
+        uploader = MediaUploader(self.client, http=http, media_index=index, root=self.tmp.name)
+        existing = next(iter(self.fake.data["media"].values()))
+        content = self.fake.files[existing["path"]][0]
+        try:
+            with open(os.path.join(self.tmp.name, "same.jpg"), "wb") as f:
+                f.write(content)
+            duplicate = await uploader.upload(UploadItem(f.name))
+            with open(os.path.join(self.tmp.name, "new.png"), "wb") as f:
+                f.write(b"\x89PNG new file")
+            uploaded = await uploader.upload(UploadItem(f.name, meta={"alt_text": "Байкал"}))
+        finally:
+            await index.close()
+            await http.aclose()
+        self.assertTrue(duplicate["duplicate"])
+        self.assertEqual(duplicate["id"], existing["id"])
+        self.assertEqual(self.fake.data["media"][uploaded["id"]]["alt_text"], "Байкал")
+        async with self.fake.http_client() as http:
+            served = await http.get(uploaded["url"])
+        self.assertEqual(served.content, b"\x89PNG new file")
+
+class TestFaults(unittest.IsolatedAsyncioTestCase):
+    async def test_latency_and_errors(self):
+        fake = FakeWordPress(posts=5, comments=0)
+        fake.configure("posts", latency=0.05)
+        fake.configure("tags", error_rate=1.0, error_status=503)
+        client = fake.client(cache=ResponseCache(0))
+        try:
+            started = time.perf_counter()
+            await asyncio.gather(*(client.request("GET", "posts", params={"page": 1, "n": i}) for i in range(5)))
+            elapsed = time.perf_counter() - started
+            await client.request("GET", "categories")  # other routes are unaffected
+            with self.assertRaises(httpx.HTTPStatusError) as ctx:
+                await client.request("GET", "tags")
+        finally:
+            await client.close()
+        # Concurrent requests wait in parallel
+        self.assertGreaterEqual(elapsed, 0.05)
+        self.assertLess(elapsed, 0.2)
+        self.assertEqual(fake.max_in_flight, 5)
+        self.assertEqual(ctx.exception.response.status_code, 503)
+        self.assertEqual(fake.calls[("GET", "posts")], 5)
+
+    async def test_error_rate_is_seeded(self):
+        outcomes = []
+        for _ in range(2):
+            fake = FakeWordPress(posts=1, comments=0, seed=7)
+            fake.configure("*", error_rate=0.5)
+            async with fake.http_client() as http:
+                outcomes.append([(await http.get("/wp-json/wp/v2/posts")).status_code for _ in range(20)])
+        self.assertEqual(outcomes[0], outcomes[1])
+        self.assertIn(500, outcomes[0])
+        self.assertIn(200, outcomes[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mcp_server
+from mcp_server import WordPressClient, project, POST_FIELDS
+from response_cache import ResponseCache
+
+
+def make_post(i: int) -> dict:
+    body = f"<p>Paragraph {i}</p>" * 400
+    return {
+        "id": i,
+        "date": "2024-01-01T00:00:00",
+        "modified": "2024-01-02T00:00:00",
+        "slug": f"post-{i}",
+        "status": "publish",
+        "link": f"https://example.com/post-{i}",
+        "title": {"rendered": f"Post {i}"},
+        "content": {"rendered": body, "protected": False},
+        "excerpt": {"rendered": body[:500], "protected": False},
+        "yoast_head": "<meta>" * 300,
+        "_links": {"self": [{"href": f"https://example.com/wp-json/wp/v2/posts/{i}"}]},
+    }
+
+
+class FakeWordPress:
+    """Serves 100 full posts and honours `_fields` like WordPress does"""
+
+    def __init__(self):
+        self.posts = [make_post(i) for i in range(1, 101)]
+        self.bytes_sent = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        items = self.posts
+        fields = request.url.params.get("_fields")
+        if fields:
+            names = fields.split(",")
+            items = [{k: v for k, v in p.items() if k in names} for p in items]
+        body = json.dumps(items).encode()
+        self.bytes_sent.append(len(body))
+        return httpx.Response(200, content=body, headers={"X-WP-Total": str(len(items))})
+
+
+class TestFieldsProjection(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.origin = FakeWordPress()
+        self.wp = WordPressClient(
+            "https://example.com", "user", "pass",
+            cache=ResponseCache(max_entries=0),
+            transport=httpx.MockTransport(self.origin)
+        )
+        self.patcher = patch.object(mcp_server, "wp_client", self.wp)
+        self.patcher.start()
+
+    async def asyncTearDown(self):
+        self.patcher.stop()
+        await self.wp.close()
+
+    async def test_payload_size_before_and_after(self):
+        await self.wp.request("GET", "posts", params={"per_page": 100})
+        before = self.origin.bytes_sent[-1]
+
+        result = json.loads(await mcp_server.get_posts(per_page=100))
+        after = self.origin.bytes_sent[-1]
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["count"], 100)
+        self.assertEqual(set(result["posts"][0]), {"id", "title", "status", "date", "url"})
+        self.assertEqual(result["posts"][0]["title"], "Post 1")
+        # The full listing is ~1.5 MB, the projected one a few KB
+        self.assertLess(after * 50, before)
+
+    async def test_fields_argument_narrows_and_widens(self):
+        narrow = json.loads(await mcp_server.get_posts(fields=["id", "slug"]))
+        self.assertEqual(narrow["posts"][0], {"id": 1, "slug": "post-1"})
+
+        wide = json.loads(await mcp_server.get_posts(fields=["id", "link", "modified", "excerpt"]))
+        post = wide["posts"][0]
+        self.assertEqual(post["url"], "https://example.com/post-1")
+        self.assertEqual(post["modified"], "2024-01-02T00:00:00")
+        self.assertTrue(post["excerpt"].startswith("<p>Paragraph 1</p>"))
+
+    def test_project_uses_defaults_for_missing_fields(self):
+        user = project({"id": 1, "name": "A", "slug": "a"}, mcp_server.USER_FIELDS)
+        self.assertEqual(user, {"id": 1, "name": "A", "username": "a", "email": "", "roles": []})
+
+    def test_project_unwraps_rendered(self):
+        post = project(make_post(3), POST_FIELDS)
+        self.assertEqual(post["title"], "Post 3")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import html_convert
+import mcp_server
+from mcp_server import WordPressClient
+from html_convert import ConversionCache, to_markdown, to_text
+from response_cache import ResponseCache
+
+ARTICLE = (
+    '<div class="wp-block-group" style="padding:2em"><h2 class="wp-block-heading">Как добраться</h2>\n'
+    '<p style="color:#333">Едем на <strong>поезде</strong> из <a href="https://rzd.ru">Москвы</a> &mdash; '
+    'двое&nbsp;суток.</p>\n<ul class="wp-block-list"><li>Билеты<li>Жильё<ul><li>хостел</li></ul></li></ul>\n'
+    '<figure class="wp-block-image"><img src="https://example.com/b.jpg" alt="Байкал"/>'
+    '<figcaption>Лёд</figcaption></figure><pre><code>if x:\n    go()</code></pre>'
+    '<script>track()</script></div>'
+)
+
+
+class TestConversion(unittest.TestCase):
+    def test_markdown(self):
+        self.assertEqual(to_markdown(ARTICLE), (
+            "## Как добраться\n\n"
+            "Едем на **поезде** из [Москвы](https://rzd.ru) — двое суток.\n\n"
+            "- Билеты\n- Жильё\n  - хостел\n\n"
+            "![Байкал](https://example.com/b.jpg)\n\n*Лёд*\n\n"
+            "```\nif x:\n    go()\n```"
+        ))
+
+    def test_text(self):
+        text = to_text(ARTICLE)
+        self.assertTrue(text.startswith("Как добраться\n\nЕдем на поезде из Москвы — двое суток."))
+        self.assertNotIn("<", text)
+        self.assertNotIn("track", text)
+        self.assertIn("    go()", text)
+
+    def test_tables_and_quotes(self):
+        html = "<table><tr><th>Город</th><th>Цена</th></tr><tr><td>Иркутск</td><td>100</td></tr></table>" \
+               "<blockquote><p>Первая</p><p>Вторая</p></blockquote>"
+        self.assertEqual(to_markdown(html),
+                         "| Город | Цена |\n| --- | --- |\n| Иркутск | 100 |\n\n> Первая\n>\n> Вторая")
+
+    def test_cache_is_keyed_by_modified(self):
+        cache = ConversionCache(max_entries=2)
+        with patch.object(html_convert, "convert", wraps=html_convert.convert) as convert:
+            cache.convert(ARTICLE, "text", "posts", 1, "2024-01-01T00:00:00")
+            cache.convert(ARTICLE, "text", "posts", 1, "2024-01-01T00:00:00")
+            cache.convert(ARTICLE, "text", "posts", 1, "2024-02-01T00:00:00")
+            cache.convert("<p>a</p>", "markdown")
+            cache.convert("<p>a</p>", "markdown")
+        self.assertEqual(convert.call_count, 3)
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(len(cache), 2)
+
+
+class TestFormatTools(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.params = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.params.append(dict(request.url.params))
+            if request.url.path.endswith("/comments"):
+                return httpx.Response(200, json=[
+                    {"id": i, "post": 9, "author_name": "Аня", "content": {"rendered": f"<p>Спасибо, <em>{i}</em>!</p>\n"},
+                     "date": "2024-01-01T00:00:00", "status": "approved"}
+                    for i in range(20)
+                ])
+            return httpx.Response(200, json={
+                "id": 9, "title": {"rendered": "Байкал &#8212; зимой"}, "content": {"rendered": ARTICLE},
+                "status": "publish", "link": "https://example.com/?p=9", "modified": "2024-01-01T00:00:00",
+            })
+
+        self.wp = WordPressClient("https://example.com", "user", "pass",
+                                  cache=ResponseCache(max_entries=0), transport=httpx.MockTransport(handler))
+        self.patchers = [patch.object(mcp_server, "wp_client", self.wp),
+                         patch.object(mcp_server, "conversion_cache", ConversionCache())]
+        for p in self.patchers:
+            p.start()
+
+    async def asyncTearDown(self):
+        for p in self.patchers:
+            p.stop()
+        await self.wp.close()
+
+    async def test_get_post_markdown_is_smaller_and_memoized(self):
+        html = await mcp_server.get_post(9)
+        markdown = await mcp_server.get_post(9, format="markdown")
+        await mcp_server.get_post(9, format="markdown")
+        post = json.loads(markdown)["post"]
+
+        self.assertLess(len(post["content"]), len(json.loads(html)["post"]["content"]) / 2)
+        self.assertEqual(post["title"], "Байкал — зимой")
+        self.assertTrue(post["content"].startswith("## Как добраться"))
+        self.assertIn("modified", self.params[-1]["_fields"])
+        self.assertEqual(mcp_server.conversion_cache.stats()["hits"], 1)
+
+    async def test_comment_listing_converts_in_a_thread(self):
+        with patch("asyncio.to_thread", wraps=__import__("asyncio").to_thread) as to_thread:
+            result = json.loads(await mcp_server.get_comments(post_id=9, per_page=20, format="text"))
+        self.assertEqual(to_thread.call_count, 1)
+        self.assertEqual(result["comments"][3]["content"], "Спасибо, 3!")
+
+    async def test_unknown_format(self):
+        result = json.loads(await mcp_server.get_page(9, format="pdf"))
+        self.assertFalse(result["success"])
+        self.assertEqual(self.params, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import sys
+import os
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_optimize import ImageOptimizer, OptimizeOptions, available, encode_image
+from media_upload import MediaUploader, UploadItem
+from mcp_server import WordPressClient
+from response_cache import ResponseCache
+from test_media_upload import MediaSink
+
+
+def make_photo(path: str, size=(1200, 800)) -> None:
+    from PIL import Image
+
+    image = Image.linear_gradient("L").resize(size).convert("RGB")
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 CW
+    exif[0x010F] = "Camera maker"
+    image.save(path, "JPEG", quality=95, exif=exif)
+
+
+@unittest.skipUnless(available(), "Pillow is not installed")
+class TestEncodeImage(unittest.TestCase):
+    def test_resizes_rotates_and_strips_exif(self):
+        from PIL import Image
+
+        with tempfile.TemporaryDirectory() as tmp:
+            source, target = os.path.join(tmp, "in.jpg"), os.path.join(tmp, "out.webp")
+            make_photo(source)
+
+            size = encode_image(source, target, "webp", 80, 600)
+
+            with Image.open(target) as out:
+                self.assertEqual(out.format, "WEBP")
+                self.assertEqual(out.size, (400, 600))
+                self.assertEqual(size, out.size)
+                self.assertEqual(len(out.getexif()), 0)
+
+    def test_rejects_unknown_format(self):
+        with self.assertRaises(ValueError):
+            OptimizeOptions(format="gif")
+
+
+@unittest.skipUnless(available(), "Pillow is not installed")
+class TestImageOptimizer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.optimizer = ImageOptimizer(os.path.join(self.tmp.name, "cache"), workers=1)
+        self.source = os.path.join(self.tmp.name, "Байкал.jpg")
+        make_photo(self.source, (3000, 2000))
+
+    async def asyncTearDown(self):
+        self.optimizer.close()
+        self.tmp.cleanup()
+
+    async def test_cache_skips_reencoding(self):
+        options = OptimizeOptions("jpeg", 70, 1000)
+        first = await self.optimizer.optimize(self.source, options)
+        second = await self.optimizer.optimize(self.source, options)
+        other = await self.optimizer.optimize(self.source, OptimizeOptions("jpeg", 50, 1000))
+
+        self.assertFalse(first.cached)
+        self.assertTrue(second.cached)
+        self.assertEqual(first.path, second.path)
+        self.assertNotEqual(first.path, other.path)
+        self.assertEqual(self.optimizer.stats()["encoded"], 2)
+        self.assertLess(first.bytes, first.original_bytes)
+
+    async def test_uploader_sends_optimized_file(self):
+        sink = MediaSink()
+        wp = WordPressClient("https://example.com", "user", "pass",
+                             cache=ResponseCache(max_entries=0), transport=sink)
+        uploader = MediaUploader(wp, optimizer=self.optimizer, root=self.tmp.name)
+        text = os.path.join(self.tmp.name, "notes.txt")
+        with open(text, "w") as f:
+            f.write("не картинка")
+
+        report = await uploader.upload_many([
+            UploadItem.from_dict({"source": self.source, "optimize": {"format": "webp", "max_size": 800}}),
+            UploadItem.from_dict({"source": text, "optimize": True}),
+        ])
+        await wp.close()
+
+        image, plain = report["results"]
+        sent = {u["headers"]["content-type"]: u["headers"] for u in sink.uploads}
+        self.assertEqual(sorted(sent), ["image/webp", "text/plain"])
+        self.assertIn("filename*=UTF-8''%D0%91%D0%B0%D0%B9%D0%BA%D0%B0%D0%BB.webp",
+                      sent["image/webp"]["content-disposition"])
+        self.assertEqual(image["bytes"], image["optimized"]["bytes"])
+        self.assertNotIn("optimized", plain)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+import asyncio
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mcp_sse_server
+
+
+class SlowWordPress:
+    """Stands in for WordPressMCP: each call takes `delay` seconds, post 0 does not exist"""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.running = 0
+        self.peak = 0
+
+    async def get_posts(self, per_page=10, page=1):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            return {"success": True, "posts": [], "count": 0, "page": page}
+        finally:
+            self.running -= 1
+
+    async def create_post(self, title, content, excerpt="", status="publish"):
+        return {"success": True, "post_id": 1}
+
+    async def delete_post(self, post_id):
+        await asyncio.sleep(self.delay)
+        if post_id == 0:
+            raise RuntimeError("404 Not Found")
+        return {"success": True, "post_id": post_id, "message": "Post deleted successfully"}
+
+
+def call(request_id, name, **arguments):
+    message = {"jsonrpc": "2.0", "method": "tools/call", "params": {"name": name, "arguments": arguments}}
+    if request_id is not None:
+        message["id"] = request_id
+    return message
+
+
+class TestBatch(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.wordpress = SlowWordPress()
+        patcher = patch.object(mcp_sse_server, "wordpress_mcp", self.wordpress)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        transport = httpx.ASGITransport(app=mcp_sse_server.app)
+        self.client = httpx.AsyncClient(transport=transport, base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def post(self, body):
+        return await self.client.post("/mcp", content=json.dumps(body))
+
+    async def test_mixed_batch(self):
+        response = await self.post([
+            call(1, "get_posts", page=2),
+            call(2, "delete_post", post_id=0),
+            call(None, "get_posts"),  # notification
+            call(3, "create_post", title="no content"),
+            {"jsonrpc": "2.0", "id": "x", "method": "nope"},
+            42,
+            {"jsonrpc": "2.0", "id": 4, "method": "tools/list"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([r["id"] for r in body], [1, 2, 3, "x", None, 4])
+        texts = [json.loads(r["result"]["content"][0]["text"]) for r in body[:3]]
+        self.assertEqual(texts[0]["page"], 2)
+        self.assertEqual(texts[1], {"success": False, "message": "Error: 404 Not Found"})
+        self.assertEqual(texts[2]["message"], "Missing required argument: 'content'")
+        self.assertEqual(body[3]["error"]["code"], -32601)
+        self.assertEqual(body[4]["error"]["code"], -32600)
+        self.assertEqual(len(body[5]["result"]["tools"]), 4)
+
+    async def test_calls_run_concurrently_up_to_the_cap(self):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        responses = await mcp_sse_server.handle_batch([call(i, "get_posts") for i in range(12)], 4)
+        elapsed = loop.time() - started
+        self.assertEqual([r["id"] for r in responses], list(range(12)))
+        self.assertEqual(self.wordpress.peak, 4)
+        # Three waves of 50 ms instead of twelve calls in a row
+        self.assertLess(elapsed, 0.4)
+        self.assertGreaterEqual(elapsed, 0.15)
+
+    async def test_only_notifications(self):
+        response = await self.post([call(None, "get_posts"), call(None, "get_posts")])
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.content, b"")
+
+    async def test_invalid_batches(self):
+        empty = (await self.post([])).json()
+        self.assertEqual(empty["error"]["code"], -32600)
+        self.assertIsNone(empty["id"])
+        broken = await self.client.post("/mcp", content=b"[{")
+        self.assertEqual(broken.json()["error"]["code"], -32700)
+
+    async def test_single_message_unchanged(self):
+        body = (await self.post(call(7, "get_posts"))).json()
+        self.assertEqual(body["id"], 7)
+        self.assertTrue(json.loads(body["result"]["content"][0]["text"])["success"])
+
+
+if __name__ == "__main__":
+    unittest.main()
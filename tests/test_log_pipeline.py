@@ -0,0 +1,190 @@
+import unittest
+import sys
+import os
+import io
+import logging
+import queue
+import threading
+import tempfile
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import log_pipeline
+from log_pipeline import (NonBlockingQueueHandler, SamplingFilter, file_logger, parse_level, parse_sample,
+                          set_level, setup_logging, stop_logging)
+
+
+def record(level=logging.DEBUG, name="wordpress_mcp.access", path=None, msg="x"):
+    rec = logging.LogRecord(name, level, __file__, 1, msg, None, None)
+    if path is not None:
+        rec.path = path
+    return rec
+
+
+class SlowStream(io.StringIO):
+    """A stderr that blocks until released, and remembers the writing thread"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.threads = set()
+
+    def write(self, text):
+        self.threads.add(threading.current_thread().name)
+        self.release.wait(5)
+        return super().write(text)
+
+
+class TestParsing(unittest.TestCase):
+    def test_levels_and_samples(self):
+        self.assertEqual(parse_level("debug"), logging.DEBUG)
+        self.assertEqual(parse_level(30), logging.WARNING)
+        with self.assertRaises(ValueError):
+            parse_level("loud")
+        self.assertEqual(parse_sample("/messages/=0.01, uvicorn.access=0.5,bad"),
+                         {"/messages/": 0.01, "uvicorn.access": 0.5})
+        self.assertEqual(parse_sample(""), {})
+
+
+class TestSamplingFilter(unittest.TestCase):
+    def test_sampling_by_path_prefix(self):
+        f = SamplingFilter({"/messages/": 0.25, "/messages/keep": 1.0, "/sse": 0})
+        kept = [f.filter(record(path=f"/messages/?session_id={i}")) for i in range(8)]
+        self.assertEqual(kept, [True, False, False, False, True, False, False, False])
+        self.assertTrue(all(f.filter(record(path="/messages/keep")) for _ in range(3)))
+        self.assertFalse(f.filter(record(path="/sse")))
+        # Not sampled: other paths, and warnings on sampled ones
+        self.assertTrue(f.filter(record(path="/mcp")))
+        self.assertTrue(f.filter(record(logging.ERROR, path="/sse")))
+
+    def test_rate_limit_reports_suppressed(self):
+        f = SamplingFilter(rate=2)
+        with patch.object(log_pipeline.time, "monotonic", return_value=100.0):
+            kept = [f.filter(record()) for _ in range(5)]
+        self.assertEqual(kept, [True, True, False, False, False])
+        self.assertTrue(f.filter(record(logging.WARNING)))
+        # Other keys have their own budget
+        self.assertTrue(f.filter(record(name="uvicorn.access")))
+        with patch.object(log_pipeline.time, "monotonic", return_value=101.0):
+            rec = record()
+            self.assertTrue(f.filter(rec))
+        self.assertEqual(rec.suppressed, 3)
+
+
+class TestQueueHandler(unittest.TestCase):
+    def test_full_queue_drops_only_debug_and_info(self):
+        q = queue.Queue(2)
+        handler = NonBlockingQueueHandler(q)
+        for _ in range(4):
+            handler.handle(record(logging.INFO))
+        self.assertEqual(handler.dropped, 2)
+        q.get_nowait()
+        error = record(logging.ERROR)
+        handler.handle(error)  # there is room again
+        self.assertEqual(error.dropped, 2)
+        self.assertEqual(handler.dropped, 0)
+
+        done = threading.Event()
+
+        def log_error():
+            handler.handle(record(logging.ERROR, msg="must not be lost"))
+            done.set()
+
+        thread = threading.Thread(target=log_error)
+        thread.start()
+        self.assertFalse(done.wait(0.1))  # waits for room instead of dropping
+        q.get_nowait()
+        thread.join(5)
+        self.assertTrue(done.is_set())
+        self.assertEqual([q.get_nowait().msg for _ in range(2)][-1], "must not be lost")
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        root = logging.getLogger()
+        self.saved = (root.level, list(root.handlers))
+        self.addCleanup(self.restore)
+
+    def restore(self):
+        stop_logging()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.setLevel(self.saved[0])
+        for handler in self.saved[1]:
+            root.addHandler(handler)
+
+    def test_writes_happen_off_the_calling_thread(self):
+        stream = SlowStream()
+        setup_logging("INFO", stream=stream)
+        log = logging.getLogger("wordpress_mcp.test")
+        done = threading.Event()
+
+        def emit():
+            for i in range(50):
+                log.info("request %d", i)
+            done.set()
+
+        threading.Thread(target=emit, name="event-loop").start()
+        # The writer is blocked, the logging thread is not
+        self.assertTrue(done.wait(2))
+        stream.release.set()
+        stop_logging()
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 50)
+        self.assertIn("wordpress_mcp.test - INFO - request 49", lines[-1])
+        self.assertNotIn("event-loop", stream.threads)
+
+    def test_file_logger_is_queued_and_survives_setup(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "slow.jsonl")
+            log = file_logger("wordpress_mcp.test_file", path)
+            log.setLevel(logging.INFO)
+            self.assertIs(file_logger("wordpress_mcp.test_file", path), log)
+            self.assertEqual(len(log.handlers), 1)
+            # Switching the root pipeline leaves the file logger running
+            stream = io.StringIO()
+            setup_logging("INFO", stream=stream)
+            writers = []
+            emit = logging.FileHandler.emit
+
+            def tracked(handler, rec):
+                writers.append(threading.current_thread())
+                emit(handler, rec)
+
+            with patch("logging.FileHandler.emit", tracked):
+                log.info('{"tool":"a"}')
+                stop_logging()
+            with open(path) as f:
+                self.assertEqual(f.read(), '{"tool":"a"}\n')
+        self.assertEqual(len(writers), 1)
+        self.assertIsNot(writers[0], threading.current_thread())
+        self.assertEqual(stream.getvalue(), "")
+        self.assertEqual(log.handlers, [])
+
+    def test_levels_sampling_and_errors(self):
+        stream = io.StringIO()
+        setup_logging("WARNING", stream=stream, sample={"/messages/": 0.5})
+        access = logging.getLogger("wordpress_mcp.access")
+        access.debug("hidden at WARNING", extra={"path": "/messages/"})
+        set_level("DEBUG")
+        for i in range(4):
+            access.debug("--> POST /messages/ %d", i, extra={"path": "/messages/"})
+        access.error("boom", extra={"path": "/messages/"})
+        try:
+            raise RuntimeError("traceback text")
+        except RuntimeError:
+            logging.getLogger("wordpress_mcp").exception("failed")
+        stop_logging()
+        text = stream.getvalue()
+        self.assertNotIn("hidden", text)
+        self.assertIn("/messages/ 0\n", text)
+        self.assertNotIn("/messages/ 1", text)
+        self.assertIn("/messages/ 2 (1 similar suppressed)", text)
+        self.assertIn("boom", text)
+        self.assertIn("RuntimeError: traceback text", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,211 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+import tempfile
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mcp_server
+from mcp_server import WordPressClient
+from media_index import MediaIndex
+from media_upload import MediaUploader, UploadItem
+from response_cache import ResponseCache
+
+
+class MediaLibrary:
+    """Fake media collection plus the uploaded files behind it"""
+
+    def __init__(self):
+        self.files = {}
+        self.media = {}
+        self.downloads = []
+        self.heads = []
+        # Whether HEAD answers carry Content-Length
+        self.head_lengths = True
+        self.uploads = 0
+        for media_id, name, body in [(1, "hero.jpg", b"A" * 1000), (2, "copy.jpg", b"A" * 1000),
+                                     (3, "other.jpg", b"B" * 1000), (4, "logo.png", b"C" * 50)]:
+            self.add(media_id, name, body)
+
+    def add(self, media_id, name, body, original=None):
+        url = f"https://example.com/uploads/{name}"
+        details = {"filesize": len(body)}
+        if original:
+            details["original_image"] = original
+            self.files[f"https://example.com/uploads/{original}"] = body
+            self.files[url] = body[: len(body) // 2]
+        else:
+            self.files[url] = body
+        self.media[media_id] = {"id": media_id, "source_url": url, "modified": f"2024-01-0{media_id % 9}T00:00:00",
+                                "media_details": details}
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path.startswith("/uploads/"):
+            body = self.files.get(str(request.url))
+            if request.method == "HEAD":
+                self.heads.append(path.rsplit("/", 1)[-1])
+                headers = {"Content-Length": str(len(body))} if body is not None and self.head_lengths else {}
+                return httpx.Response(200 if body is not None else 404, headers=headers)
+            self.downloads.append(path.rsplit("/", 1)[-1])
+            return httpx.Response(200, content=body) if body is not None else httpx.Response(404)
+        if request.method == "POST" and path == "/wp-json/wp/v2/media":
+            self.uploads += 1
+            media_id = 100 + self.uploads
+            name = request.headers["content-disposition"].split('filename="')[1].split('"')[0]
+            self.add(media_id, f"{media_id}-{name}", request.content)
+            return httpx.Response(201, json=self.media[media_id])
+        if path.startswith("/wp-json/wp/v2/media/"):
+            media_id = int(path.rsplit("/", 1)[-1])
+            if media_id not in self.media:
+                return httpx.Response(404, json={"code": "rest_post_invalid_id"})
+            return httpx.Response(200, json={"id": media_id})
+        if path == "/wp-json/wp/v2/media":
+            items = list(self.media.values())
+            return httpx.Response(200, json=items, headers={"X-WP-Total": str(len(items)), "X-WP-TotalPages": "1"})
+        return httpx.Response(404)
+
+
+class TestMediaIndex(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.library = MediaLibrary()
+        transport = httpx.MockTransport(self.library)
+        self.wp = WordPressClient("https://example.com", "user", "pass",
+                                  cache=ResponseCache(max_entries=0), transport=transport)
+        self.http = httpx.AsyncClient(transport=transport)
+        self.index_path = os.path.join(self.tmp.name, "media.sqlite3")
+        self.index = MediaIndex(self.index_path, self.wp, http=self.http)
+        self.uploader = MediaUploader(self.wp, http=self.http, media_index=self.index, root=self.tmp.name)
+
+    async def asyncTearDown(self):
+        await self.index.close()
+        await self.http.aclose()
+        await self.wp.close()
+        self.tmp.cleanup()
+
+    def make_file(self, name: str, body: bytes) -> str:
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(body)
+        return path
+
+    async def test_returns_existing_attachment_instead_of_uploading(self):
+        result = await self.uploader.upload(UploadItem(self.make_file("photo.jpg", b"B" * 1000)))
+
+        self.assertTrue(result["duplicate"])
+        self.assertEqual(result["id"], 3)
+        self.assertEqual(self.library.uploads, 0)
+        # Only same-size files are downloaded, logo.png never
+        self.assertEqual(sorted(self.library.downloads), ["copy.jpg", "hero.jpg", "other.jpg"])
+
+    async def test_uploaded_files_are_remembered(self):
+        path = self.make_file("new.jpg", b"N" * 777)
+        first = await self.uploader.upload(UploadItem(path))
+        downloads = len(self.library.downloads)
+        second = await self.uploader.upload(UploadItem(path))
+
+        self.assertNotIn("duplicate", first)
+        self.assertTrue(second["duplicate"])
+        self.assertEqual(second["id"], first["id"])
+        self.assertEqual(self.library.uploads, 1)
+        self.assertEqual(len(self.library.downloads), downloads)
+
+    async def test_dedupe_can_be_disabled(self):
+        await self.uploader.upload(UploadItem(self.make_file("photo.jpg", b"B" * 1000), dedupe=False))
+        self.assertEqual(self.library.uploads, 1)
+        self.assertEqual(self.library.downloads, [])
+
+    async def test_deleted_attachment_is_not_reused(self):
+        path = self.make_file("photo.jpg", b"C" * 50)
+        await self.index.sync()
+        del self.library.media[4]
+
+        result = await self.uploader.upload(UploadItem(path))
+
+        self.assertNotIn("duplicate", result)
+        self.assertEqual(self.library.uploads, 1)
+
+    async def test_scaled_images_are_matched_by_original(self):
+        self.library.add(5, "big-scaled.jpg", b"O" * 4000, original="big.jpg")
+        result = await self.uploader.upload(UploadItem(self.make_file("big.jpg", b"O" * 4000)))
+
+        self.assertEqual(result["id"], 5)
+        self.assertIn("big.jpg", self.library.downloads)
+        self.assertNotIn("big-scaled.jpg", self.library.downloads)
+
+    async def test_scaled_originals_are_sized_not_downloaded(self):
+        for media_id in range(10, 30):
+            self.library.add(media_id, f"photo{media_id}-scaled.jpg", bytes([media_id]) * (3000 + media_id),
+                             original=f"photo{media_id}.jpg")
+        result = await self.uploader.upload(UploadItem(self.make_file("photo21.jpg", b"\x15" * 3021)))
+
+        self.assertEqual(result["id"], 21)
+        # Every original is sized once with HEAD, only the one of matching size is downloaded
+        self.assertEqual(len(self.library.heads), 20)
+        self.assertEqual(self.library.downloads, ["photo21.jpg"])
+
+        await self.uploader.upload(UploadItem(self.make_file("new.jpg", b"N" * 2999)))
+        self.assertEqual(len(self.library.heads), 20)
+        self.assertEqual(self.library.downloads, ["photo21.jpg"])
+        self.assertEqual(self.index.stats()["size_probes"], 20)
+
+    async def test_files_of_unknown_size_are_left_to_the_scan(self):
+        self.library.head_lengths = False
+        self.library.add(5, "big-scaled.jpg", b"O" * 4000, original="big.jpg")
+        self.library.add(6, "again-scaled.jpg", b"O" * 4000, original="again.jpg")
+        result = await self.uploader.upload(UploadItem(self.make_file("big.jpg", b"O" * 4000)))
+
+        self.assertNotIn("duplicate", result)
+        self.assertEqual(self.library.downloads, [])
+        groups = await self.index.duplicates()
+        self.assertEqual([m["id"] for m in groups[0]["media"]], [5, 6, 101])
+
+    async def test_url_sources_are_spooled_only_when_a_size_matches(self):
+        async def public(host):
+            return ["93.184.215.14"]
+
+        uploader = MediaUploader(self.wp, http=self.http, media_index=self.index, resolve=public)
+        self.library.files["https://example.com/uploads/remote.jpg"] = b"R" * 1234
+        self.library.files["https://example.com/uploads/same.jpg"] = b"B" * 1000
+        with patch("media_upload.tempfile.mkstemp", wraps=tempfile.mkstemp) as mkstemp:
+            fresh = await uploader.upload(UploadItem("https://example.com/uploads/remote.jpg"))
+            self.assertEqual(mkstemp.call_count, 0)
+            duplicate = await uploader.upload(UploadItem("https://example.com/uploads/same.jpg"))
+            self.assertEqual(mkstemp.call_count, 1)
+
+        self.assertEqual(fresh["bytes"], 1234)
+        self.assertEqual(duplicate["id"], 3)
+        self.assertEqual(self.library.uploads, 1)
+        # Each source is fetched once, streamed into the upload or spooled
+        self.assertEqual(self.library.downloads.count("remote.jpg"), 1)
+        self.assertEqual(self.library.downloads.count("same.jpg"), 1)
+
+    async def test_find_duplicate_groups_and_persistence(self):
+        groups = await self.index.duplicates()
+
+        self.assertEqual(len(groups), 1)
+        self.assertEqual([m["id"] for m in groups[0]["media"]], [1, 2])
+        self.assertEqual(groups[0]["wasted_bytes"], 1000)
+        self.assertNotIn("logo.png", self.library.downloads)
+
+        reopened = MediaIndex(self.index_path, self.wp, http=self.http)
+        downloads = len(self.library.downloads)
+        self.assertEqual(len(await reopened.duplicates()), 1)
+        self.assertEqual(len(self.library.downloads), downloads)
+        await reopened.close()
+
+    async def test_find_duplicate_media_tool(self):
+        with patch.object(mcp_server, "media_index", self.index):
+            result = json.loads(await mcp_server.find_duplicate_media())
+        self.assertTrue(result["success"])
+        self.assertEqual(result["duplicates"], 1)
+        self.assertEqual(result["index"]["media"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,243 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+import asyncio
+import tempfile
+import tracemalloc
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mcp_server
+from mcp_server import WordPressClient
+from media_upload import MediaUploader, UploadItem, content_disposition
+from response_cache import ResponseCache
+
+
+async def public(host):
+    return ["93.184.216.34"]
+
+
+class MediaSink(httpx.AsyncBaseTransport):
+    """Fake /wp/v2/media that consumes the body chunk by chunk without keeping it"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.uploads = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            received, chunks = 0, 0
+            async for chunk in request.stream:
+                received += len(chunk)
+                chunks += 1
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        media_id = 500 + len(self.uploads)
+        self.uploads.append({
+            "headers": request.headers, "params": dict(request.url.params),
+            "received": received, "chunks": chunks,
+        })
+        return httpx.Response(201, json={
+            "id": media_id, "source_url": f"https://example.com/uploads/{media_id}.jpg",
+            "mime_type": request.headers["content-type"], "slug": f"m{media_id}", "status": "inherit",
+        })
+
+
+class TestMediaUploader(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.sink = MediaSink()
+        self.wp = WordPressClient(
+            "https://example.com", "user", "pass",
+            cache=ResponseCache(max_entries=0), transport=self.sink
+        )
+
+    async def asyncTearDown(self):
+        await self.wp.close()
+        self.tmp.cleanup()
+
+    def make_file(self, name: str, size: int) -> str:
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(os.urandom(1024) * (size // 1024))
+        return path
+
+    async def test_streams_file_with_metadata_in_one_request(self):
+        path = self.make_file("фото.jpg", 1024 * 1024)
+        uploader = MediaUploader(self.wp, chunk_size=64 * 1024, root=self.tmp.name)
+
+        result = await uploader.upload(UploadItem(path, meta={"alt_text": "Байкал", "caption": "Зима"}))
+
+        upload = self.sink.uploads[0]
+        self.assertEqual(result["id"], 500)
+        self.assertEqual(result["bytes"], 1024 * 1024)
+        self.assertEqual(upload["received"], 1024 * 1024)
+        self.assertGreaterEqual(upload["chunks"], 16)
+        self.assertEqual(upload["headers"]["content-type"], "image/jpeg")
+        self.assertEqual(upload["headers"]["content-length"], str(1024 * 1024))
+        self.assertIn("filename*=UTF-8''%D1%84%D0%BE%D1%82%D0%BE.jpg", upload["headers"]["content-disposition"])
+        self.assertEqual(upload["params"], {"alt_text": "Байкал", "caption": "Зима"})
+
+    async def test_memory_stays_flat_for_large_files(self):
+        path = self.make_file("big.jpg", 16 * 1024 * 1024)
+        uploader = MediaUploader(self.wp, root=self.tmp.name)
+
+        tracemalloc.start()
+        try:
+            await uploader.upload(UploadItem(path))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(self.sink.uploads[0]["received"], 16 * 1024 * 1024)
+        self.assertLess(peak, 4 * 1024 * 1024)
+
+    async def test_batch_is_bounded_and_ordered(self):
+        self.sink.delay = 0.02
+        paths = [self.make_file(f"{i}.png", 8192) for i in range(6)]
+        uploader = MediaUploader(self.wp, concurrency=2, root=self.tmp.name)
+
+        report = await uploader.upload_many(
+            [UploadItem(p) for p in paths] + [UploadItem(os.path.join(self.tmp.name, "missing.png"))]
+        )
+
+        self.assertEqual(self.sink.max_in_flight, 2)
+        self.assertEqual([r["index"] for r in report["results"]], list(range(7)))
+        self.assertEqual(report["uploaded"], 6)
+        self.assertEqual(report["failed"], 1)
+        self.assertEqual(report["bytes"], 6 * 8192)
+        self.assertIn("No such file", report["results"][-1]["message"])
+
+    async def test_root_restricts_local_paths(self):
+        uploader = MediaUploader(self.wp, root=self.tmp.name)
+        with self.assertRaisesRegex(ValueError, "outside"):
+            await uploader.upload(UploadItem("/etc/hostname"))
+        self.assertEqual(self.sink.uploads, [])
+
+    async def test_local_paths_need_a_root(self):
+        path = self.make_file("a.jpg", 1024)
+        report = await MediaUploader(self.wp).upload_many([UploadItem(path), UploadItem("/etc/passwd")])
+        self.assertEqual(report["failed"], 2)
+        self.assertIn("WP_MEDIA_ROOT", report["results"][1]["message"])
+        self.assertEqual(self.sink.uploads, [])
+
+    async def test_private_urls_are_refused(self):
+        fetched = []
+
+        def origin(request: httpx.Request) -> httpx.Response:
+            fetched.append(str(request.url))
+            if request.url.host == "cdn.example.org":
+                return httpx.Response(302, headers={"Location": "http://metadata.internal/latest/"})
+            return httpx.Response(200, content=b"secret")
+
+        async def resolve(host):
+            return {"cdn.example.org": ["93.184.216.34"], "metadata.internal": ["169.254.169.254"],
+                    "mapped.example": ["::ffff:127.0.0.1", "93.184.216.34"]}.get(host, ["10.0.0.5"])
+
+        http = httpx.AsyncClient(transport=httpx.MockTransport(origin))
+        uploader = MediaUploader(self.wp, http=http, resolve=resolve)
+        report = await uploader.upload_many([UploadItem(url) for url in (
+            "http://127.0.0.1:8000/admin", "http://[::1]/x", "http://intranet/x", "http://mapped.example/x",
+            "file:///etc/passwd", "https://cdn.example.org/photo.jpg",
+        )])
+        await http.aclose()
+        messages = [r["message"] for r in report["results"]]
+        self.assertEqual(report["failed"], 6)
+        self.assertIn("Uploading local files is disabled", messages[4])  # not a URL, so a local path
+        self.assertTrue(all("private or local" in m for m in messages[:4] + messages[5:]))
+        # The redirect target was checked before it was requested
+        self.assertEqual(fetched, ["https://cdn.example.org/photo.jpg"])
+        self.assertEqual(self.sink.uploads, [])
+
+        limited = MediaUploader(self.wp, url_hosts=["example.org"], resolve=resolve)
+        await limited.check_url("https://cdn.example.org/a.jpg")
+        with self.assertRaisesRegex(ValueError, "not allowed"):
+            await limited.check_url("https://example.com/a.jpg")
+        with self.assertRaisesRegex(ValueError, "Unsupported"):
+            await limited.check_url("ftp://cdn.example.org/a.jpg")
+        await limited.close()
+
+    async def test_rebound_dns_is_refused_at_connect(self):
+        # The resolver says public, the connection ends up on loopback (DNS rebinding)
+        served = []
+
+        async def serve(reader, writer):
+            await reader.readuntil(b"\r\n\r\n")
+            served.append(True)
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 6\r\nConnection: close\r\n\r\nsecret")
+            await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(serve, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        uploader = MediaUploader(self.wp, resolve=public)
+        try:
+            report = await uploader.upload_many([UploadItem(f"http://127.0.0.1:{port}/photo.jpg")])
+        finally:
+            await uploader.close()
+            server.close()
+            await server.wait_closed()
+        self.assertEqual(len(served), 1)
+        self.assertIn("private or local", report["results"][0]["message"])
+        self.assertEqual(self.sink.uploads, [])
+
+    async def test_streams_url_source(self):
+        payload = b"\x89PNG" + b"0" * 300000
+
+        def origin(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=payload, headers={"Content-Type": "image/png"})
+
+        http = httpx.AsyncClient(transport=httpx.MockTransport(origin))
+        uploader = MediaUploader(self.wp, http=http, resolve=public)
+        result = await uploader.upload(UploadItem("https://cdn.example.org/img/%D0%BC%D0%BE%D1%80%D0%B5.png"))
+        await http.aclose()
+
+        upload = self.sink.uploads[0]
+        self.assertEqual(result["bytes"], len(payload))
+        self.assertEqual(upload["headers"]["content-type"], "image/png")
+        self.assertEqual(upload["headers"]["content-length"], str(len(payload)))
+        self.assertNotIn("authorization", http.headers)
+        self.assertIn("%D0%BC%D0%BE%D1%80%D0%B5.png", upload["headers"]["content-disposition"])
+
+    def test_content_disposition_ascii_fallback(self):
+        self.assertEqual(
+            content_disposition("моё фото.jpg").split(";")[1].strip(),
+            'filename="___ ____.jpg"'
+        )
+
+
+class TestUploadTools(unittest.IsolatedAsyncioTestCase):
+    async def test_batch_tool(self):
+        sink = MediaSink()
+        wp = WordPressClient("https://example.com", "user", "pass", cache=ResponseCache(max_entries=0), transport=sink)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "a.gif")
+            with open(path, "wb") as f:
+                f.write(b"GIF89a" + b"\0" * 100)
+            with patch.object(mcp_server, "wp_client", wp), patch.object(mcp_server, "media_uploader", None), \
+                    patch.object(mcp_server, "MEDIA_INDEX_PATH", ""), patch.object(mcp_server, "MEDIA_ROOT", tmp):
+                result = json.loads(await mcp_server.upload_media_batch([
+                    {"source": path, "alt_text": "Гифка", "post_id": 12}
+                ]))
+                single = json.loads(await mcp_server.upload_media(path, title="Тест"))
+                invalid = json.loads(await mcp_server.upload_media_batch([{"alt_text": "нет файла"}]))
+        await wp.close()
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["results"][0]["id"], 500)
+        self.assertEqual(sink.uploads[0]["params"], {"alt_text": "Гифка", "post": "12"})
+        self.assertEqual(single["media"]["id"], 501)
+        self.assertFalse(invalid["success"])
+
+
+if __name__ == "__main__":
+    unittest.main()
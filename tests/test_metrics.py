@@ -0,0 +1,180 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import tempfile
+import runpy
+
+import httpx
+from mcp.server.fastmcp import FastMCP
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+import mcp_server
+from metrics import Registry, TextfileWriter, asgi_middleware, instrument_tools
+from mcp_server import WordPressClient
+from response_cache import ResponseCache
+from serialization import dumps
+
+
+class TestExposition(unittest.TestCase):
+    def test_histogram_is_cumulative(self):
+        registry = Registry()
+        hist = registry.histogram("latency_seconds", "Latency", ("tool",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 3.0):
+            hist.observe(value, "get_posts")
+        text = registry.render()
+        self.assertIn('latency_seconds_bucket{tool="get_posts",le="0.1"} 1\n', text)
+        self.assertIn('latency_seconds_bucket{tool="get_posts",le="1"} 3\n', text)
+        self.assertIn('latency_seconds_bucket{tool="get_posts",le="+Inf"} 4\n', text)
+        self.assertIn('latency_seconds_count{tool="get_posts"} 4\n', text)
+        self.assertIn('latency_seconds_sum{tool="get_posts"} 4.25\n', text)
+        self.assertIn("# TYPE latency_seconds histogram", text)
+
+    def test_counters_gauges_and_escaping(self):
+        registry = Registry()
+        counter = registry.counter("calls_total", "Calls", ("tool",))
+        counter.inc('we"ird\\name')
+        gauge = registry.gauge("in_flight", "Running")
+        text = registry.render()
+        self.assertIn('calls_total{tool="we\\"ird\\\\name"} 1\n', text)
+        # Unlabelled gauges are exported before their first change
+        self.assertIn("in_flight 0\n", text)
+
+    def test_collectors(self):
+        registry = Registry()
+        registry.add_collector(lambda: metrics.cache_samples("response", {"hits": 3, "misses": 1, "entries": 2}))
+        registry.add_collector(lambda: 1 / 0)  # a broken collector does not break the scrape
+        text = registry.render()
+        self.assertIn('wp_mcp_cache_hits_total{cache="response"} 3\n', text)
+        self.assertIn('wp_mcp_cache_hit_ratio{cache="response"} 0.75\n', text)
+        self.assertIn('wp_mcp_cache_entries{cache="response"} 2\n', text)
+
+    def test_textfile_writer(self):
+        registry = Registry()
+        registry.counter("calls_total", "Calls").inc()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sub", "wp_mcp.prom")
+            writer = TextfileWriter(path, interval=60, registry=registry)
+            writer.start()
+            writer.stop()
+            with open(path) as f:
+                self.assertIn("calls_total 1\n", f.read())
+            self.assertEqual(os.listdir(os.path.dirname(path)), ["wp_mcp.prom"])
+
+
+class TestStdioRunner(unittest.TestCase):
+    def test_runner_writes_the_metrics_textfile(self):
+        runner = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mcp_stdio_runner.py")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "wp_mcp.prom")
+            with patch.object(mcp_server, "METRICS_TEXTFILE", path), \
+                    patch.object(mcp_server.mcp, "run") as run, \
+                    patch.object(mcp_server, "start_logging"), patch.object(mcp_server, "stop_logging"), \
+                    patch("logging.basicConfig"), patch.object(sys, "stdout", sys.stdout):
+                runpy.run_path(runner, run_name="__main__")
+            run.assert_called_once_with(transport="stdio")
+            with open(path, encoding="utf-8") as f:
+                self.assertIn("wp_mcp_tool_calls_total", f.read())
+
+
+class TestInstrumentation(unittest.IsolatedAsyncioTestCase):
+    async def test_tool_calls(self):
+        server = FastMCP("test")
+
+        @server.tool()
+        async def ok_tool() -> str:
+            return dumps({"success": True})
+
+        @server.tool()
+        async def failing_tool() -> str:
+            return dumps({"success": False, "message": "nope"})
+
+        instrument_tools(server._tool_manager)
+        calls = metrics.TOOL_CALLS.value("ok_tool")
+        errors = metrics.TOOL_ERRORS.value("failing_tool")
+        await server.call_tool("ok_tool", {})
+        await server.call_tool("failing_tool", {})
+        with self.assertRaises(Exception):
+            await server.call_tool("no_such_tool", {})
+
+        self.assertEqual(metrics.TOOL_CALLS.value("ok_tool"), calls + 1)
+        self.assertEqual(metrics.TOOL_ERRORS.value("ok_tool"), 0)
+        self.assertEqual(metrics.TOOL_ERRORS.value("failing_tool"), errors + 1)
+        self.assertGreaterEqual(metrics.TOOL_ERRORS.value("unknown"), 1)
+        self.assertGreaterEqual(metrics.TOOL_DURATION.count("ok_tool"), 1)
+        self.assertEqual(metrics.TOOLS_IN_FLIGHT.value(), 0)
+
+    async def test_upstream_latency_by_resource_and_status(self):
+        def handler(request):
+            if request.url.path.endswith("/999"):
+                return httpx.Response(404, json={"code": "rest_post_invalid_id"})
+            return httpx.Response(200, json={"id": 5})
+
+        client = WordPressClient("https://example.com", "u", "p", cache=ResponseCache(0),
+                                 transport=httpx.MockTransport(handler))
+        ok = metrics.UPSTREAM_DURATION.count("GET", "wp/v2/posts", "200")
+        missing = metrics.UPSTREAM_DURATION.count("GET", "wp/v2/posts", "404")
+        try:
+            await client.request("GET", "posts/5")
+            with self.assertRaises(httpx.HTTPStatusError):
+                await client.request("GET", "posts/999")
+        finally:
+            await client.close()
+        self.assertEqual(metrics.UPSTREAM_DURATION.count("GET", "wp/v2/posts", "200"), ok + 1)
+        self.assertEqual(metrics.UPSTREAM_DURATION.count("GET", "wp/v2/posts", "404"), missing + 1)
+
+    async def test_event_hooks(self):
+        before = metrics.UPSTREAM_DURATION.count("POST", "wp/v2/posts", "201")
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda r: httpx.Response(201, json={})),
+            event_hooks=metrics.upstream_event_hooks("https://example.com/wp-json")
+        ) as client:
+            await client.post("https://example.com/wp-json/wp/v2/posts", json={})
+        self.assertEqual(metrics.UPSTREAM_DURATION.count("POST", "wp/v2/posts", "201"), before + 1)
+
+    async def test_asgi_middleware(self):
+        seen = {}
+
+        async def app(scope, receive, send):
+            seen["in_flight"] = metrics.HTTP_IN_FLIGHT.value()
+            seen["sse"] = metrics.SSE_SESSIONS.value()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        transport = httpx.ASGITransport(app=asgi_middleware(app))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post("/messages/")
+            self.assertEqual(seen, {"in_flight": 1, "sse": 0})
+            await client.get("/sse")
+            self.assertEqual(seen, {"in_flight": 0, "sse": 1})
+            response = await client.get("/metrics")
+
+        self.assertEqual(response.headers["content-type"], metrics.CONTENT_TYPE)
+        self.assertIn("wp_mcp_http_requests_in_flight 0\n", response.text)
+        self.assertIn("wp_mcp_sse_sessions_active 0\n", response.text)
+
+    async def test_server_metrics(self):
+        """The server's tools are instrumented and its caches are exported"""
+        client = WordPressClient("https://example.com", "u", "p", cache=ResponseCache(),
+                                 transport=httpx.MockTransport(lambda r: httpx.Response(200, json=[])))
+        before = metrics.TOOL_CALLS.value("get_categories")
+        with patch.object(mcp_server, "wp_client", client):
+            await mcp_server.mcp.call_tool("get_categories", {})
+            text = metrics.REGISTRY.render()
+        await client.close()
+        self.assertEqual(metrics.TOOL_CALLS.value("get_categories"), before + 1)
+        self.assertIn('wp_mcp_cache_misses_total{cache="response"} 1\n', text)
+        self.assertIn('wp_mcp_cache_hit_ratio{cache="conversions"}', text)
+
+    async def test_sse_server_tool_metrics(self):
+        import mcp_sse_server
+        before = metrics.TOOL_ERRORS.value("unknown")
+        with patch.object(mcp_sse_server, "wordpress_mcp", object()):
+            await mcp_sse_server.call_tool("no_such_tool", {})
+        self.assertEqual(metrics.TOOL_ERRORS.value("unknown"), before + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
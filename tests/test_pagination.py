@@ -0,0 +1,89 @@
+import unittest
+from unittest.mock import patch
+import asyncio
+import sys
+import os
+import json
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mcp_server
+from mcp_server import WordPressClient
+from pagination import fetch_all, iter_collection
+from response_cache import ResponseCache
+
+
+class PagedWordPress:
+    """Serves a collection of numbered terms with WordPress paging headers"""
+
+    def __init__(self, total: int):
+        self.items = [{"id": i, "name": f"Term {i}", "slug": f"term-{i}", "count": i} for i in range(1, total + 1)]
+        self.active = 0
+        self.max_active = 0
+        self.pages = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        per_page = int(request.url.params.get("per_page", 10))
+        page = int(request.url.params.get("page", 1))
+        self.pages.append(page)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        # Later pages answer faster, so out-of-order completion is exercised
+        await asyncio.sleep(0.002 * (10 - min(page, 9)))
+        self.active -= 1
+        chunk = self.items[(page - 1) * per_page:page * per_page]
+        total_pages = -(-len(self.items) // per_page)
+        return httpx.Response(
+            200,
+            content=json.dumps(chunk).encode(),
+            headers={"X-WP-Total": str(len(self.items)), "X-WP-TotalPages": str(total_pages)}
+        )
+
+
+class TestPagination(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.origin = PagedWordPress(1050)
+        self.wp = WordPressClient(
+            "https://example.com", "user", "pass",
+            cache=ResponseCache(max_entries=0),
+            transport=httpx.MockTransport(self.origin)
+        )
+
+    async def asyncTearDown(self):
+        await self.wp.close()
+
+    async def test_yields_every_item_in_order(self):
+        items = await fetch_all(self.wp, "tags", concurrency=4)
+        self.assertEqual([i["id"] for i in items], list(range(1, 1051)))
+        self.assertEqual(sorted(self.origin.pages), list(range(1, 12)))
+
+    async def test_concurrency_is_bounded(self):
+        await fetch_all(self.wp, "tags", concurrency=3)
+        self.assertLessEqual(self.origin.max_active, 3)
+        self.assertGreater(self.origin.max_active, 1)
+
+    async def test_max_items_limits_pages(self):
+        items = await fetch_all(self.wp, "tags", per_page=100, max_items=150)
+        self.assertEqual(len(items), 150)
+        self.assertEqual(sorted(self.origin.pages), [1, 2])
+
+    async def test_early_exit_cancels_pending_pages(self):
+        seen = []
+        async for item in iter_collection(self.wp, "tags", per_page=10, concurrency=2):
+            seen.append(item["id"])
+            if len(seen) == 15:
+                break
+        self.assertEqual(seen, list(range(1, 16)))
+        self.assertLess(len(self.origin.pages), 20)
+
+    async def test_tool_all_mode(self):
+        with patch.object(mcp_server, "wp_client", self.wp):
+            result = json.loads(await mcp_server.get_tags(all=True))
+        self.assertTrue(result["success"])
+        self.assertEqual(len(result["tags"]), 1050)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+import re
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mcp_server
+from mcp_server import WordPressClient
+from post_diff import ContentHashes, fingerprint
+from response_cache import ResponseCache
+
+
+class EditableWordPress:
+    """Fake posts endpoint with edit context, nested _fields and kses-like filtering"""
+
+    def __init__(self):
+        self.posts = {
+            7: {"id": 7, "link": "https://example.com/?p=7", "modified": "2024-01-01T00:00:00",
+                "title": "Байкал", "content": "<p>Озеро</p>", "excerpt": "", "status": "publish",
+                "categories": [1, 2], "tags": []},
+        }
+        self.reads = []
+        self.writes = []
+        self.clock = 0
+        # Seconds `modified` advances per write (WordPress stores whole seconds)
+        self.step = 1
+
+    def edit_view(self, post):
+        return {k: ({"raw": v, "rendered": v} if k in ("title", "content", "excerpt") else v)
+                for k, v in post.items()}
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        post = self.posts[int(request.url.path.rsplit("/", 1)[-1])]
+        if request.method == "POST":
+            body = json.loads(request.content)
+            self.writes.append(body)
+            if "content" in body:
+                body["content"] = re.sub(r"<script.*?</script>", "", body["content"])
+            self.clock += self.step
+            post.update(body, modified=f"2024-02-01T00:00:{self.clock:02d}")
+            return httpx.Response(200, json=self.edit_view(post))
+        self.reads.append(request.url.params["_fields"])
+        data = self.edit_view(post)
+        out = {}
+        for name in request.url.params["_fields"].split(","):
+            top, _, sub = name.partition(".")
+            if sub:
+                out.setdefault(top, {})[sub] = data[top][sub]
+            else:
+                out[top] = data[top]
+        return httpx.Response(200, json=out)
+
+
+class TestDiffUpdates(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.origin = EditableWordPress()
+        self.wp = WordPressClient(
+            "https://example.com", "user", "pass",
+            cache=ResponseCache(max_entries=64, ttl=60),
+            transport=httpx.MockTransport(self.origin)
+        )
+        self.patchers = [
+            patch.object(mcp_server, "wp_client", self.wp),
+            patch.object(mcp_server, "content_hashes", None),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    async def asyncTearDown(self):
+        for p in self.patchers:
+            p.stop()
+        await self.wp.close()
+
+    async def update(self, **kwargs):
+        return json.loads(await mcp_server.update_post(7, **kwargs))
+
+    async def test_identical_update_makes_no_write(self):
+        result = await self.update(title="Байкал", content="<p>Озеро</p>", categories=[2, 1])
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["written"], [])
+        self.assertEqual(sorted(result["unchanged"]), ["categories", "content", "title"])
+        self.assertEqual(result["url"], "https://example.com/?p=7")
+        self.assertEqual(self.origin.writes, [])
+
+    async def test_only_changed_fields_are_sent(self):
+        result = await self.update(title="Байкал", content="<p>Зимой</p>", status="publish")
+
+        self.assertEqual(result["written"], ["content"])
+        self.assertEqual(self.origin.writes, [{"content": "<p>Зимой</p>"}])
+
+    async def test_repeat_uses_hashes_from_the_write(self):
+        await self.update(content="<p>Зимой</p>")
+        self.origin.reads.clear()
+
+        result = await self.update(content="<p>Зимой</p>")
+
+        self.assertEqual(result["written"], [])
+        # Only the cheap modified check, no content.raw download
+        self.assertEqual(self.origin.reads, ["id,link,modified"])
+
+    async def test_content_normalized_by_wordpress_counts_as_unchanged(self):
+        content = "<p>Текст</p><script>x()</script>"
+        await self.update(content=content)
+        result = await self.update(content=content)
+
+        self.assertEqual(result["written"], [])
+        self.assertEqual(len(self.origin.writes), 1)
+
+    async def test_revert_within_the_same_second_is_written(self):
+        # Both writes land in the second the post was last modified in
+        self.origin.step = 0
+        self.origin.posts[7]["modified"] = "2024-02-01T00:00:00"
+        await self.update(content="<p>Зимой</p>")
+        result = await self.update(content="<p>Озеро</p>")
+
+        self.assertEqual(result["written"], ["content"])
+        self.assertEqual(self.origin.posts[7]["content"], "<p>Озеро</p>")
+
+    async def test_external_edit_is_detected_despite_cache(self):
+        # A no-op update leaves its reads in the response cache
+        self.assertEqual((await self.update(content="<p>Озеро</p>"))["written"], [])
+        # Edited in wp-admin: our hashes no longer match `modified`
+        self.origin.posts[7].update(content="<p>Летом</p>", modified="2024-03-01T00:00:00")
+
+        result = await self.update(content="<p>Озеро</p>")
+
+        self.assertEqual(result["written"], ["content"])
+
+    async def test_force_and_empty_updates(self):
+        forced = await self.update(title="Байкал", force=True)
+        empty = await self.update()
+
+        self.assertEqual(forced["written"], ["title"])
+        self.assertEqual(self.origin.reads, [])
+        self.assertFalse(empty["success"])
+        self.assertEqual(empty["message"], "No fields to update")
+
+
+class TestContentHashes(unittest.TestCase):
+    def test_rendered_only_values_are_ignored(self):
+        hashes = ContentHashes(max_entries=1)
+        hashes.remember("posts", {"id": 1, "modified": "m", "title": {"rendered": "A"}, "status": "draft"})
+        self.assertEqual(set(hashes.known("posts", 1, "m")), {"status"})
+        self.assertEqual(hashes.known("posts", 1, "other"), {})
+
+        hashes.remember("posts", {"id": 2, "modified": "m", "status": "draft"})
+        self.assertEqual(len(hashes), 1)
+        self.assertEqual(fingerprint("tags", [3, 1]), fingerprint("tags", [1, 3, 3]))
+
+
+if __name__ == "__main__":
+    unittest.main()
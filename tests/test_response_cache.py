@@ -0,0 +1,166 @@
+import unittest
+import sys
+import os
+import time
+import asyncio
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_server import WordPressClient
+from response_cache import ResponseCache
+
+
+class FakeWordPress:
+    """Minimal origin that honours If-None-Match"""
+
+    def __init__(self):
+        self.calls = []
+        self.etag = '"v1"'
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append((request.method, request.url.path, request.headers.get("if-none-match")))
+        if request.method != "GET":
+            self.etag = '"v2"'
+            return httpx.Response(200, json={"id": 1, "link": "https://example.com/1"})
+        if request.headers.get("if-none-match") == self.etag:
+            return httpx.Response(304, headers={"ETag": self.etag})
+        return httpx.Response(
+            200,
+            json=[{"id": 1, "etag": self.etag}],
+            headers={"ETag": self.etag, "X-WP-Total": "1"}
+        )
+
+
+class TestResponseCache(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.origin = FakeWordPress()
+        self.cache = ResponseCache(max_entries=2, ttl=60)
+        self.wp = WordPressClient(
+            "https://example.com", "user", "pass",
+            cache=self.cache,
+            transport=httpx.MockTransport(self.origin)
+        )
+
+    async def asyncTearDown(self):
+        await self.wp.close()
+
+    async def test_fresh_hit_skips_origin(self):
+        first = await self.wp.request("GET", "posts", params={"per_page": 5})
+        second = await self.wp.request("GET", "posts", params={"per_page": 5})
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.origin.calls), 1)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    async def test_cached_headers_are_returned(self):
+        await self.wp.request("GET", "posts")
+        _, headers = await self.wp.request_with_headers("GET", "posts")
+        self.assertEqual(headers.get("X-WP-Total"), "1")
+
+    async def test_stale_entry_is_revalidated_with_304(self):
+        await self.wp.request("GET", "posts")
+        self.cache.ttl = 0
+
+        data = await self.wp.request("GET", "posts")
+
+        self.assertEqual(data, [{"id": 1, "etag": '"v1"'}])
+        self.assertEqual(self.origin.calls[-1][2], '"v1"')
+        self.assertEqual(self.cache.stats()["revalidations"], 1)
+
+    async def test_write_invalidates_resource(self):
+        await self.wp.request("GET", "posts")
+        await self.wp.request("GET", "categories")
+        await self.wp.request("POST", "posts/1", json={"title": "New"})
+
+        data = await self.wp.request("GET", "posts")
+        await self.wp.request("GET", "categories")
+
+        self.assertEqual(data, [{"id": 1, "etag": '"v2"'}])
+        self.assertEqual(self.cache.stats()["invalidations"], 1)
+        get_calls = [c for c in self.origin.calls if c[0] == "GET"]
+        self.assertEqual(len(get_calls), 3)
+
+    async def test_lru_eviction(self):
+        await self.wp.request("GET", "posts?page=1")
+        await self.wp.request("GET", "posts?page=2")
+        await self.wp.request("GET", "posts?page=1")
+        await self.wp.request("GET", "posts?page=3")
+
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+        await self.wp.request("GET", "posts?page=1")
+        self.assertEqual(len(self.origin.calls), 3)
+
+    async def test_entry_without_validators_expires(self):
+        self.cache.store("GET x", {"a": 1}, httpx.Headers({}), "wp/v2/posts")
+        self.cache._entries["GET x"].stored_at = time.monotonic() - 120
+        entry, fresh = self.cache.lookup("GET x")
+        self.assertIsNone(entry)
+        self.assertFalse(fresh)
+
+
+class SlowReadWordPress:
+    """Origin whose GETs wait for `release`, so a write can land while one is in flight"""
+
+    def __init__(self):
+        self.title = "old"
+        self.release = asyncio.Event()
+        self.get_started = asyncio.Event()
+        self.etag = '"v1"'
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.method != "GET":
+            self.title, self.etag = "new", '"v2"'
+            return httpx.Response(200, json={"id": 1, "title": self.title})
+        body = {"id": 1, "title": self.title}
+        etag = self.etag
+        self.get_started.set()
+        await self.release.wait()
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, json=body, headers={"ETag": etag})
+
+
+class TestWriteDuringRead(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.origin = SlowReadWordPress()
+        self.cache = ResponseCache(max_entries=10, ttl=60)
+        self.wp = WordPressClient("https://example.com", "user", "pass", cache=self.cache,
+                                  transport=httpx.MockTransport(self.origin))
+
+    async def asyncTearDown(self):
+        await self.wp.close()
+
+    async def read_across_write(self):
+        """Start a GET, complete a POST while it waits, then let the GET finish"""
+        self.origin.get_started.clear()
+        self.origin.release.clear()
+        read = asyncio.create_task(self.wp.request("GET", "posts/1"))
+        await self.origin.get_started.wait()
+        await self.wp.request("POST", "posts/1", json={"title": "new"})
+        self.origin.release.set()
+        return await read
+
+    async def test_in_flight_read_is_not_cached_after_a_write(self):
+        self.assertEqual(await self.read_across_write(), {"id": 1, "title": "old"})
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(await self.wp.request("GET", "posts/1"), {"id": 1, "title": "new"})
+        self.assertEqual(len(self.cache), 1)
+
+    async def test_revalidation_across_a_write_is_not_refreshed(self):
+        self.origin.release.set()
+        await self.wp.request("GET", "posts/1")
+        self.cache.ttl = 0
+        # The 304 answers the pre-write validators; the entry must not be renewed
+        self.origin.title, self.origin.etag = "old", '"v1"'
+        await self.read_across_write()
+        self.cache.ttl = 60
+        self.origin.release.set()
+        self.assertEqual(await self.wp.request("GET", "posts/1"), {"id": 1, "title": "new"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mcp_server
+from mcp_server import WordPressClient
+from response_cache import ResponseCache
+from search_index import SearchIndex, stem, tokenize
+
+
+def post(i, title, content, **extra):
+    return {
+        "id": i, "title": {"rendered": title}, "excerpt": {"rendered": ""},
+        "content": {"rendered": content}, "status": "publish",
+        "date": f"2024-0{i}-01T00:00:00", "link": f"https://example.com/{i}",
+        "categories": [], "tags": [], **extra,
+    }
+
+
+class TestStemming(unittest.TestCase):
+    def test_russian_word_forms_share_a_stem(self):
+        self.assertEqual(stem("путешествия"), stem("путешествие"))
+        self.assertEqual(stem("красивая"), stem("красивые"))
+        self.assertEqual(stem("ёлка"), stem("елка"))
+
+    def test_tokenize_strips_nothing_but_words(self):
+        self.assertEqual(tokenize("Hotels & моря!"), ["hotel", "мор"])
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex()
+        self.index.add("posts", post(1, "Путешествие на Байкал", "<p>Озеро Байкал зимой.</p>", categories=[3]))
+        self.index.add("posts", post(2, "Отели Сочи", "<p>Лучшие отели у моря для путешествий.</p>", tags=[7]))
+        self.index.add("pages", post(3, "Контакты", "<p>Пишите нам.</p>"))
+
+    def test_ranks_title_matches_first(self):
+        results = self.index.search("путешествия")
+        self.assertEqual([r["id"] for r in results], [1, 2])
+        self.assertIn("**Путешествие**", results[0]["title"])
+        self.assertIn("**путешествий**", results[1]["snippet"])
+
+    def test_filters(self):
+        self.assertEqual([r["id"] for r in self.index.search("путешествие", categories=[3])], [1])
+        self.assertEqual([r["id"] for r in self.index.search("путешествие", tags=[7])], [2])
+        self.assertEqual(self.index.search("контакты", kind="posts"), [])
+        self.assertEqual([r["id"] for r in self.index.search("путешествие", after="2024-02-01")], [2])
+
+    def test_write_listener_updates_and_removes(self):
+        self.index.apply_write("POST", "wp/v2/posts", post(2, "Отели Анапы", "<p>Пляжи.</p>"))
+        self.assertEqual(self.index.search("сочи"), [])
+        self.assertEqual(self.index.search("анапы")[0]["id"], 2)
+
+        self.index.apply_write("DELETE", "wp/v2/posts", {"deleted": True, "previous": {"id": 2}})
+        self.assertEqual(self.index.search("анапы"), [])
+        self.assertEqual(len(self.index), 2)
+        self.assertNotIn("анап", self.index.postings)
+
+    def test_trashed_posts_are_removed(self):
+        # DELETE without force=true answers with the post, now in the trash
+        self.index.apply_write("DELETE", "wp/v2/posts", post(2, "Отели Сочи", "<p>Пляжи.</p>", status="trash"))
+        self.assertEqual(self.index.search("сочи", status="any"), [])
+        self.assertEqual(len(self.index), 2)
+
+    def test_searches_published_content_by_default(self):
+        self.index.add("posts", post(4, "Черновик про Байкал", "<p>Скоро.</p>", status="draft"))
+        self.assertEqual([r["id"] for r in self.index.search("байкал")], [1])
+        self.assertEqual([r["id"] for r in self.index.search("байкал", status="draft")], [4])
+        self.assertEqual(sorted(r["id"] for r in self.index.search("байкал", status="any")), [1, 4])
+        self.assertEqual(sorted(r["id"] for r in self.index.search("байкал", status="publish,draft")), [1, 4])
+
+
+class TestSearchTool(unittest.IsolatedAsyncioTestCase):
+    async def test_builds_index_lazily_from_rest(self):
+        posts = [post(1, "Горный Алтай", "<p>Маршруты по Алтаю.</p>")]
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            items = posts if request.url.path.endswith("/posts") else []
+            return httpx.Response(200, json=items, headers={"X-WP-TotalPages": "1"})
+
+        wp = WordPressClient(
+            "https://example.com", "user", "pass",
+            cache=ResponseCache(max_entries=0),
+            transport=httpx.MockTransport(handler)
+        )
+        with patch.object(mcp_server, "wp_client", wp), \
+                patch.object(mcp_server, "search_index", None), \
+                patch.object(mcp_server, "MIRROR_PATH", ""):
+            result = json.loads(await mcp_server.search_content("алтай"))
+        await wp.close()
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["indexed"], 1)
+        self.assertEqual(result["results"][0]["title"], "Горный **Алтай**")
+
+
+if __name__ == "__main__":
+    unittest.main()
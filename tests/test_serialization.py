@@ -0,0 +1,102 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import importlib
+import json
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serialization
+from mcp_server import WordPressClient
+from response_cache import ResponseCache
+
+POST = {
+    "id": 7,
+    "title": {"rendered": "Байкал зимой &#8212; гид"},
+    "content": {"rendered": "<p>Лёд, \"кавычки\" и \\ слэш</p>\n", "protected": False},
+    "categories": [3, 5],
+    "meta": {},
+    "sticky": False,
+    "score": 1.5,
+    "parent": None,
+}
+
+
+class TestSerialization(unittest.TestCase):
+    def test_round_trip(self):
+        self.assertEqual(serialization.loads(serialization.dumps(POST)), POST)
+        self.assertEqual(serialization.loads(serialization.dumpb(POST)), POST)
+
+    def test_compact_utf8_output(self):
+        text = serialization.dumps({"title": "Байкал", "ids": [1, 2]})
+        self.assertEqual(text, '{"title":"Байкал","ids":[1,2]}')
+        self.assertEqual(serialization.dumpb({"a": "ё"}), '{"a":"ё"}'.encode("utf-8"))
+
+    def test_sets_and_int_keys(self):
+        self.assertEqual(json.loads(serialization.dumps({"tags": {2, 1}})), {"tags": [1, 2]})
+        self.assertEqual(json.loads(serialization.dumps({1: "a"})), {"1": "a"})
+        with self.assertRaises(TypeError):
+            serialization.dumps({"x": object()})
+
+    def test_decode_errors_are_json_errors(self):
+        with self.assertRaises(json.JSONDecodeError):
+            serialization.loads(b"{not json")
+
+    def test_decode_response(self):
+        response = httpx.Response(200, content=serialization.dumpb([POST]))
+        self.assertEqual(serialization.decode(response), [POST])
+        self.assertEqual(serialization.decode(httpx.Response(204)), {})
+
+    def test_leading_bom_is_skipped(self):
+        body = b"\xef\xbb\xbf" + serialization.dumpb([POST])
+        self.assertEqual(serialization.loads(body), [POST])
+        self.assertEqual(serialization.loads(body.decode("utf-8")), [POST])
+        self.assertEqual(serialization.decode(httpx.Response(200, content=body)), [POST])
+        self.assertEqual(serialization.decode(httpx.Response(200, content=b"\xef\xbb\xbf")), {})
+
+    def test_response_class(self):
+        response = serialization.JSONResponse({"title": "Байкал"})
+        self.assertEqual(response.body, '{"title":"Байкал"}'.encode("utf-8"))
+        self.assertEqual(response.headers["content-type"], "application/json")
+
+    def test_stdlib_fallback(self):
+        try:
+            with patch.dict(sys.modules, {"orjson": None}):
+                fallback = importlib.reload(serialization)
+            self.assertEqual(fallback.BACKEND, "json")
+            self.assertEqual(fallback.dumps({"title": "Байкал", "ids": [1, 2]}), '{"title":"Байкал","ids":[1,2]}')
+            self.assertEqual(fallback.loads(fallback.dumpb(POST)), POST)
+            self.assertEqual(fallback.loads(memoryview(b"[1]")), [1])
+            self.assertEqual(fallback.loads("\ufeff[1]"), [1])
+            self.assertEqual(fallback.loads(b"\xef\xbb\xbf[1]"), [1])
+        finally:
+            importlib.reload(serialization)
+
+
+class TestClientSerialization(unittest.IsolatedAsyncioTestCase):
+    async def test_request_bodies_use_fast_encoder(self):
+        seen = []
+
+        def handler(request):
+            seen.append(request)
+            return httpx.Response(201, content=serialization.dumpb({**POST, "status": "draft"}))
+
+        client = WordPressClient(
+            "https://example.com", "user", "pass",
+            cache=ResponseCache(), transport=httpx.MockTransport(handler)
+        )
+        try:
+            data = await client.request("POST", "posts", json={"title": "Байкал", "status": "draft"})
+        finally:
+            await client.close()
+
+        self.assertEqual(data["title"], POST["title"])
+        self.assertEqual(seen[0].content, '{"title":"Байкал","status":"draft"}'.encode("utf-8"))
+        self.assertEqual(seen[0].headers["content-type"], "application/json")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import asyncio
+import sys
+import os
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_server import WordPressClient
+from response_cache import ResponseCache
+from singleflight import SingleFlight
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_calls_share_one_execution(self):
+        flights = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"value": 42}
+
+        results = await asyncio.gather(*[flights.do("k", work) for _ in range(10)])
+
+        self.assertEqual(calls, 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual(flights.stats(), {"in_flight": 0, "executed": 1, "shared": 9})
+
+    async def test_errors_are_shared_and_not_remembered(self):
+        flights = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(flights.do("k", fail), flights.do("k", fail), return_exceptions=True)
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+
+        async def ok():
+            return "ok"
+
+        self.assertEqual(await flights.do("k", ok), "ok")
+
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        flights = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        first = asyncio.ensure_future(flights.do("k", work))
+        second = asyncio.ensure_future(flights.do("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        self.assertEqual(await second, "done")
+
+
+class TestClientCoalescing(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.calls = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            self.calls += 1
+            await asyncio.sleep(0.02)
+            return httpx.Response(200, json=[{"id": 1}])
+
+        self.wp = WordPressClient(
+            "https://example.com", "user", "pass",
+            cache=ResponseCache(max_entries=0),
+            transport=httpx.MockTransport(handler)
+        )
+
+    async def asyncTearDown(self):
+        await self.wp.close()
+
+    async def test_identical_gets_hit_origin_once(self):
+        results = await asyncio.gather(*[
+            self.wp.request("GET", "categories", params={"per_page": 100})
+            for _ in range(5)
+        ])
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results[0], [{"id": 1}])
+
+    async def test_different_params_are_not_coalesced(self):
+        await asyncio.gather(
+            self.wp.request("GET", "posts", params={"slug": "a"}),
+            self.wp.request("GET", "posts", params={"slug": "b"}),
+        )
+        self.assertEqual(self.calls, 2)
+
+    async def test_writes_are_never_coalesced(self):
+        await asyncio.gather(*[
+            self.wp.request("POST", "posts", json={"title": "x"})
+            for _ in range(3)
+        ])
+        self.assertEqual(self.calls, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import asyncio
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_server import diagnostic_middleware
+from sse_padding import SsePadding, comment
+
+EVENT = b"event: endpoint\r\ndata: /messages/?session_id=abc\r\n\r\n"
+CLOUDFLARE = [(b"host", b"mcp.example.com"), (b"cf-ray", b"8a1b2c3d4e5f-AMS")]
+
+
+async def sse_app(scope, receive, send):
+    """Stands in for mcp.sse_app(): the endpoint event, then an open stream"""
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"text/event-stream")]})
+    await send({"type": "http.response.body", "body": EVENT, "more_body": True})
+    await asyncio.sleep(10)
+
+
+class BufferingProxy:
+    """Forwards the response only once `threshold` bytes have piled up, like a buffering proxy"""
+
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self.buffer = b""
+        self.delivered = b""
+        self.first_event = asyncio.Event()
+        self.first_event_at = None
+
+    async def send(self, message):
+        if message["type"] != "http.response.body":
+            return
+        self.buffer += message.get("body", b"")
+        if len(self.buffer) >= self.threshold or not message.get("more_body"):
+            self.delivered += self.buffer
+            self.buffer = b""
+            if b"event: endpoint" in self.delivered and not self.first_event.is_set():
+                self.first_event_at = time.perf_counter()
+                self.first_event.set()
+
+
+async def time_to_first_event(policy, headers=(), threshold=1, timeout=0.5):
+    """Seconds until the client behind the proxy sees the endpoint event (None: never)"""
+    proxy = BufferingProxy(threshold)
+    app = diagnostic_middleware(sse_app, padding=policy)
+    scope = {"type": "http", "method": "GET", "path": "/sse", "headers": list(headers)}
+
+    async def receive():
+        await asyncio.sleep(10)
+        return {"type": "http.disconnect"}
+
+    started = time.perf_counter()
+    task = asyncio.create_task(app(scope, receive, proxy.send))
+    try:
+        await asyncio.wait_for(proxy.first_event.wait(), timeout)
+        return proxy.first_event_at - started, proxy.delivered
+    except asyncio.TimeoutError:
+        return None, proxy.delivered
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+class TestPolicy(unittest.TestCase):
+    def test_blocks(self):
+        self.assertEqual(len(comment(1024)), 1024)
+        self.assertTrue(comment(1024).startswith(b":") and comment(1024).endswith(b"\n\n"))
+        policy = SsePadding(size=4096, chunk=1000)
+        self.assertEqual(policy.blocks("none"), [])
+        self.assertEqual([len(b) for b in policy.blocks("single")], [4096])
+        self.assertEqual([len(b) for b in policy.blocks("pulsed")], [1000] * 5)
+
+    def test_auto_detects_proxies(self):
+        policy = SsePadding("auto", auto_mode="pulsed")
+        self.assertEqual(policy.resolve([(b"host", b"localhost:8000")]), "none")
+        self.assertEqual(policy.resolve(CLOUDFLARE), "pulsed")
+        self.assertEqual(policy.resolve([(b"via", b"1.1 vegur")]), "pulsed")
+        # ngrok sends X-Forwarded-* only
+        ngrok = [(b"host", b"abc.ngrok-free.app"), (b"x-forwarded-for", b"203.0.113.7"),
+                 (b"x-forwarded-host", b"abc.ngrok-free.app"), (b"x-forwarded-proto", b"https")]
+        self.assertEqual(policy.resolve(ngrok), "pulsed")
+        self.assertEqual(policy.resolve([(b"forwarded", b"for=203.0.113.7;proto=https")]), "pulsed")
+        self.assertEqual(SsePadding("single").resolve([]), "single")
+
+    def test_from_env(self):
+        env = {"WP_SSE_PADDING": "Pulsed", "WP_SSE_PADDING_BYTES": "8192", "WP_SSE_PADDING_INTERVAL": "0"}
+        with patch.dict(os.environ, env):
+            policy = SsePadding.from_env()
+        self.assertEqual((policy.mode, policy.size, policy.chunk, policy.interval), ("pulsed", 8192, 1024, 0.0))
+        with self.assertRaises(ValueError):
+            SsePadding("sometimes")
+
+
+class TestTimeToFirstEvent(unittest.IsolatedAsyncioTestCase):
+    async def test_direct_connection_is_not_padded(self):
+        elapsed, delivered = await time_to_first_event(SsePadding("auto"), [(b"host", b"localhost")])
+        self.assertLess(elapsed, 0.05)
+        self.assertEqual(delivered, EVENT)
+
+    async def test_buffering_proxy_needs_padding(self):
+        # 16 KB buffer, as in front of the server in production
+        never, delivered = await time_to_first_event(SsePadding("none"), CLOUDFLARE, threshold=16384)
+        self.assertIsNone(never)
+        self.assertEqual(delivered, b"")
+
+        single, delivered = await time_to_first_event(SsePadding("auto"), CLOUDFLARE, threshold=16384)
+        pulsed, _ = await time_to_first_event(SsePadding("pulsed"), CLOUDFLARE, threshold=16384)
+        self.assertLess(single, 0.05)
+        self.assertTrue(delivered.endswith(EVENT))
+        self.assertEqual(len(delivered), 16384 + len(EVENT))
+        # 16 x 1 KB with 10 ms pauses: same bytes, ~150 ms later
+        self.assertGreaterEqual(pulsed, 0.14)
+        self.assertLess(single, pulsed)
+
+    async def test_padding_smaller_than_the_buffer_stalls(self):
+        elapsed, _ = await time_to_first_event(SsePadding("single", size=2048), CLOUDFLARE, threshold=16384)
+        self.assertIsNone(elapsed)
+
+
+if __name__ == "__main__":
+    unittest.main()
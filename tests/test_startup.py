@@ -0,0 +1,52 @@
+import unittest
+import sys
+import os
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFERRED = ("content_mirror", "search_index", "media_upload", "image_optimize", "media_index", "sqlite3")
+
+
+def run(code: str) -> subprocess.CompletedProcess:
+    """Run code in a fresh interpreter, so imports start cold"""
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+class TestStartup(unittest.TestCase):
+    def test_stdio_import_is_lean(self):
+        proc = run(
+            "import sys, mcp_server\n"
+            "import mcp.server.transport_security as ts\n"
+            f"print([m for m in {DEFERRED!r} if m in sys.modules])\n"
+            "print(ts.TransportSecurityMiddleware.validate_request.__name__)\n"
+            "print(len(mcp_server.mcp._tool_manager.list_tools()))\n"
+        )
+        loaded, validate, tools = proc.stdout.split()
+        self.assertEqual(loaded, "[]")
+        # The transport security patch is left to the network transports
+        self.assertEqual(validate, "validate_request")
+        self.assertEqual(proc.stderr, "")
+        self.assertGreater(int(tools), 30)
+
+    def test_network_app_patches_transport_security(self):
+        proc = run(
+            "import mcp_server\n"
+            "import mcp.server.transport_security as ts\n"
+            "mcp_server.network_app('streamable-http')\n"
+            "print(ts.TransportSecurityMiddleware.validate_request.__name__)\n"
+        )
+        self.assertEqual(proc.stdout.strip(), "mock_validate")
+
+    def test_deferred_features_load_on_use(self):
+        proc = run(
+            "import asyncio, sys, mcp_server\n"
+            "mcp_server.MEDIA_INDEX_PATH = ':memory:'\n"
+            "mcp_server.get_uploader()\n"
+            "print(sorted(m for m in ('media_upload', 'image_optimize', 'media_index') if m in sys.modules))\n"
+        )
+        self.assertEqual(proc.stdout.strip(), "['image_optimize', 'media_index', 'media_upload']")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mcp_server
+from mcp_server import WordPressClient
+from response_cache import ResponseCache
+from taxonomy import TaxonomyIndex
+
+
+class TermsWordPress:
+    """Fake categories/tags endpoints that record every request"""
+
+    def __init__(self):
+        self.terms = {
+            "categories": [
+                {"id": 1, "name": "Европа", "slug": "europe", "parent": 0},
+                {"id": 2, "name": "Италия", "slug": "italy", "parent": 1},
+                {"id": 3, "name": "Азия", "slug": "asia", "parent": 0},
+            ],
+            "tags": [
+                {"id": 10 + i, "name": name, "slug": f"tag-{i}", "parent": 0}
+                for i, name in enumerate(["Море", "Горы", "Еда", "Отели", "Музеи"])
+            ],
+        }
+        self.next_id = 100
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append((request.method, request.url.path))
+        kind = request.url.path.rsplit("/", 1)[-1]
+        if request.method == "POST" and kind in self.terms:
+            body = json.loads(request.content)
+            if any(t["name"] == body["name"] and t["parent"] == body.get("parent", 0) for t in self.terms[kind]):
+                term_id = next(t["id"] for t in self.terms[kind] if t["name"] == body["name"])
+                return httpx.Response(400, json={"code": "term_exists", "data": {"status": 400, "term_id": term_id}})
+            term = {"id": self.next_id, "name": body["name"], "slug": body["name"].lower(),
+                    "parent": body.get("parent", 0)}
+            self.next_id += 1
+            self.terms[kind].append(term)
+            return httpx.Response(201, json=term)
+        if request.method == "POST" and kind == "posts":
+            return httpx.Response(201, json={"id": 7, "link": "https://example.com/?p=7", **json.loads(request.content)})
+        items = self.terms.get(kind, [])
+        return httpx.Response(200, json=items, headers={"X-WP-Total": str(len(items)), "X-WP-TotalPages": "1"})
+
+    def writes(self):
+        return [r for r in self.requests if r[0] != "GET"]
+
+
+class TestTaxonomyIndex(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.origin = TermsWordPress()
+        self.wp = WordPressClient(
+            "https://example.com", "user", "pass",
+            cache=ResponseCache(max_entries=0),
+            transport=httpx.MockTransport(self.origin)
+        )
+        self.index = TaxonomyIndex(self.wp)
+
+    async def asyncTearDown(self):
+        await self.wp.close()
+
+    async def test_resolves_ids_names_slugs_and_paths(self):
+        ids = await self.index.resolve("categories", [3, "италия", "europe", "Европа/Италия", "Азия"])
+        self.assertEqual(ids, [3, 2, 1])
+        calls = len(self.origin.requests)
+
+        self.assertEqual(await self.index.resolve("tags", ["горы", "tag-0"]), [11, 10])
+        self.assertEqual(await self.index.resolve("categories", ["Азия"]), [3])
+        # One load per taxonomy, nothing more
+        self.assertEqual(len(self.origin.requests), calls + 1)
+
+    async def test_ids_only_make_no_requests(self):
+        self.assertEqual(await self.index.resolve("tags", [5, 6]), [5, 6])
+        self.assertEqual(self.origin.requests, [])
+
+    async def test_unknown_name_is_an_error(self):
+        with self.assertRaisesRegex(ValueError, "Unknown tag: Пустыня"):
+            await self.index.resolve("tags", ["Пустыня"])
+        self.assertEqual(self.origin.writes(), [])
+
+    async def test_create_missing_terms_and_parents(self):
+        ids = await self.index.resolve("categories", ["Европа/Франция", "Африка/Египет"], create_missing=True)
+
+        self.assertEqual(len(self.origin.writes()), 3)
+        france = next(t for t in self.origin.terms["categories"] if t["name"] == "Франция")
+        self.assertEqual(france["parent"], 1)
+        self.assertEqual(ids[0], france["id"])
+        self.assertEqual(self.index.terms["categories"].path(ids[1]), "Африка/Египет")
+
+        # Known now, no further writes
+        self.assertEqual(await self.index.resolve("categories", ["Франция"]), [ids[0]])
+        self.assertEqual(len(self.origin.writes()), 3)
+
+    async def test_term_exists_reuses_upstream_id(self):
+        await self.index.load("tags")
+        self.origin.terms["tags"].append({"id": 50, "name": "Пляжи", "slug": "beach", "parent": 0})
+
+        self.assertEqual(await self.index.resolve("tags", ["Пляжи"], create_missing=True), [50])
+
+    async def test_write_listener_tracks_created_terms(self):
+        await self.index.load("tags")
+        with patch.object(mcp_server, "wp_client", self.wp):
+            created = json.loads(await mcp_server.create_tag("Пляжи"))
+        self.assertTrue(created["success"])
+        calls = len(self.origin.requests)
+
+        self.assertEqual(await self.index.resolve("tags", ["пляжи"]), [created["tag_id"]])
+        self.assertEqual(len(self.origin.requests), calls)
+
+
+class TestPostTermNames(unittest.IsolatedAsyncioTestCase):
+    async def test_create_post_with_tag_names_is_one_write(self):
+        origin = TermsWordPress()
+        wp = WordPressClient(
+            "https://example.com", "user", "pass",
+            cache=ResponseCache(max_entries=0),
+            transport=httpx.MockTransport(origin)
+        )
+        index = TaxonomyIndex(wp)
+        await index.load("tags")
+        await index.load("categories")
+        calls = len(origin.requests)
+
+        with patch.object(mcp_server, "wp_client", wp), patch.object(mcp_server, "taxonomy_index", index):
+            result = json.loads(await mcp_server.create_post(
+                "Заголовок", "<p>Текст</p>",
+                categories=["Европа/Италия"], tags=["Море", "Горы", "Еда", "Отели", "Музеи"]
+            ))
+            failed = json.loads(await mcp_server.create_post("Другой", "", tags=["Нет такой"]))
+        await wp.close()
+
+        self.assertTrue(result["success"])
+        self.assertEqual(origin.requests[calls:], [("POST", "/wp-json/wp/v2/posts")])
+        self.assertFalse(failed["success"])
+        self.assertIn("Unknown tag", failed["message"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+import unittest
+from unittest.mock import patch, AsyncMock
+import sys
+import os
+import json
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+import mcp_server
+import mcp_sse_server
+from mcp_server import WordPressClient
+from tool_registry import ToolArgumentError, ToolRegistry, compile_arguments, compile_schema
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "post_id": {"type": "integer"},
+        "per_page": {"type": "integer", "default": 10, "minimum": 1, "maximum": 100},
+        "status": {"type": "string", "enum": ["publish", "draft"], "default": "publish"},
+        "force": {"type": "boolean", "default": True},
+        "max_age": {"type": "number", "default": None},
+        "tags": {"type": "array", "items": {"type": "integer"}, "default": []},
+        "meta": {"anyOf": [{"type": "object", "additionalProperties": {"type": "string"}}, {"type": "null"}],
+                 "default": None},
+    },
+    "required": ["post_id"],
+}
+
+
+class TestValidator(unittest.TestCase):
+    def setUp(self):
+        self.validate = compile_arguments(SCHEMA)
+
+    def test_defaults_and_coercion(self):
+        args = self.validate({"post_id": "42", "per_page": 5.0, "force": "false", "tags": '["1", 2]',
+                              "meta": {"a": "b"}, "unknown": 1})
+        self.assertEqual(args, {"post_id": 42, "per_page": 5, "status": "publish", "force": False,
+                                "max_age": None, "tags": [1, 2], "meta": {"a": "b"}})
+        # Mutable defaults are not shared between calls
+        first = self.validate({"post_id": 1})
+        first["tags"].append(3)
+        self.assertEqual(self.validate({"post_id": 1})["tags"], [])
+        # None where the default is None (pydantic `int = None`)
+        self.assertIsNone(self.validate({"post_id": 1, "max_age": None})["max_age"])
+
+    def test_errors(self):
+        with self.assertRaisesRegex(ToolArgumentError, "Missing required argument: 'post_id'"):
+            self.validate({})
+        for bad, message in [
+            ({"post_id": "x"}, "'post_id': expected integer"),
+            ({"post_id": True}, "'post_id': expected integer"),
+            ({"post_id": 1, "per_page": 0}, "less than 1"),
+            ({"post_id": 1, "status": "trash"}, "not one of"),
+            ({"post_id": 1, "tags": [1, "a"]}, r"'tags\[1\]'"),
+            ({"post_id": 1, "meta": {"a": 1}}, "'meta'"),
+        ]:
+            with self.assertRaisesRegex(ToolArgumentError, message):
+                self.validate(bad)
+        with self.assertRaises(ToolArgumentError):
+            self.validate(["post_id"])
+
+    def test_reserved_arguments_pass_through(self):
+        validate = compile_arguments(SCHEMA, reserved=("_debug",))
+        self.assertIs(validate({"post_id": 1, "_debug": True})["_debug"], True)
+        self.assertNotIn("_debug", validate({"post_id": 1}))
+        self.assertNotIn("_debug", self.validate({"post_id": 1, "_debug": True}))
+
+    def test_any_of_prefers_exact_types(self):
+        coerce = compile_schema({"anyOf": [{"type": "integer"}, {"type": "string"}]})
+        self.assertEqual(coerce("5", "x"), "5")
+        self.assertEqual(coerce(5, "x"), 5)
+        self.assertEqual(compile_schema({"type": ["integer", "null"]})("7", "x"), 7)
+
+
+class TestRegistry(unittest.IsolatedAsyncioTestCase):
+    async def test_dispatch_and_cached_listing(self):
+        registry = ToolRegistry()
+        handler = AsyncMock(return_value={"success": True})
+        registry.add("delete_post", "Delete", SCHEMA, handler)
+        body = registry.list_body()
+        self.assertIs(registry.list_body(), body)
+        self.assertEqual(json.loads(body)["tools"][0]["inputSchema"], SCHEMA)
+        self.assertEqual(await registry.call("delete_post", {"post_id": "3"}), {"success": True})
+        self.assertEqual(handler.call_args.kwargs["post_id"], 3)
+        with self.assertRaises(KeyError):
+            await registry.call("nope", {})
+
+        registry.add("get_posts", "List", {"type": "object", "properties": {}}, handler)
+        self.assertIsNot(registry.list_body(), body)
+        self.assertEqual([t.name for t in registry.mcp_tools()], ["delete_post", "get_posts"])
+
+    async def test_exposes_every_fastmcp_tool(self):
+        registry = ToolRegistry()
+        added = registry.add_fastmcp(mcp_server.mcp)
+        fastmcp_tools = await mcp_server.mcp.list_tools()
+        self.assertEqual(sorted(added), sorted(tool.name for tool in fastmcp_tools))
+        listing = {tool["name"]: tool for tool in registry.listing()}
+        for tool in fastmcp_tools:
+            self.assertEqual(listing[tool.name]["inputSchema"], tool.inputSchema)
+
+        client = WordPressClient("https://example.com", "u", "p",
+                                 transport=httpx.MockTransport(lambda r: httpx.Response(200, json=[
+                                     {"id": 1, "name": "Travel", "slug": "travel", "count": 3, "parent": 0}
+                                 ])))
+        calls = metrics.TOOL_CALLS.value("get_categories")
+        with patch.object(mcp_server, "wp_client", client):
+            text = await registry.call("get_categories", {"per_page": "5"})
+        await client.close()
+        self.assertEqual(json.loads(text)["categories"][0]["name"], "Travel")
+        # Dispatched through mcp_server's ToolManager, so it is measured like any call
+        self.assertEqual(metrics.TOOL_CALLS.value("get_categories"), calls + 1)
+
+    async def test_debug_timings_reach_fastmcp_tools(self):
+        registry = ToolRegistry()
+        registry.add_fastmcp(mcp_server.mcp)
+        registry.add("delete_post", "Delete", SCHEMA, AsyncMock(return_value={"success": True}))
+
+        timed = json.loads(await registry.call("get_cache_stats", {"_debug": True}))
+        plain = json.loads(await registry.call("get_cache_stats", {}))
+        self.assertEqual(timed["_timings"]["name"], "tool")
+        self.assertNotIn("_timings", plain)
+        # Tools that do not take it never see it
+        await registry.call("delete_post", {"post_id": 1, "_debug": True})
+        self.assertNotIn("_debug", registry.tools["delete_post"].handler.call_args.kwargs)
+
+    async def test_sse_server_shares_its_site_with_fastmcp_tools(self):
+        settings = ("WORDPRESS_URL", "WORDPRESS_USERNAME", "WORDPRESS_PASSWORD")
+        with patch.object(mcp_sse_server, "MCP_SSE_TOOLS", "all"), \
+                patch.object(mcp_sse_server, "TOOLS", ToolRegistry()), \
+                patch.object(mcp_sse_server, "WORDPRESS_URL", "https://env-site.example"), \
+                patch.multiple(mcp_server, wp_client=None, **{name: getattr(mcp_server, name) for name in settings}):
+            async with mcp_sse_server.lifespan(mcp_sse_server.app):
+                self.assertIn("get_categories", mcp_sse_server.TOOLS)
+                self.assertEqual(mcp_server.WORDPRESS_URL, "https://env-site.example")
+                self.assertEqual(mcp_server.WORDPRESS_USERNAME, mcp_sse_server.WORDPRESS_USERNAME)
+                self.assertEqual(mcp_server.get_wp_client().base_url, "https://env-site.example")
+                await mcp_server.get_wp_client().close()
+
+
+class TestSseServerTools(unittest.IsolatedAsyncioTestCase):
+    async def test_tools_list_is_served_from_bytes(self):
+        transport = httpx.ASGITransport(app=mcp_sse_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/mcp", content=b'{"jsonrpc":"2.0","id":"a\\"b","method":"tools/list"}')
+            root = (await client.get("/")).json()
+        body = response.json()
+        self.assertEqual(body["id"], 'a"b')
+        self.assertEqual([t["name"] for t in body["result"]["tools"]],
+                         ["create_post", "update_post", "get_posts", "delete_post"])
+        self.assertEqual(body["result"]["tools"][2]["inputSchema"]["properties"]["per_page"]["maximum"], 100)
+        self.assertEqual([t["name"] for t in root["tools"]], [t["name"] for t in body["result"]["tools"]])
+
+    async def test_fastmcp_tool_calls_are_counted_once(self):
+        registry = ToolRegistry()
+        registry.add_fastmcp(mcp_server.mcp)
+        before = metrics.TOOL_CALLS.value("get_cache_stats")
+        transport = httpx.ASGITransport(app=mcp_sse_server.app)
+        with patch.object(mcp_sse_server, "TOOLS", registry), \
+                patch.object(mcp_sse_server, "wordpress_mcp", AsyncMock()):
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                response = await client.post("/mcp", json={
+                    "jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                    "params": {"name": "get_cache_stats", "arguments": {}},
+                })
+        self.assertTrue(json.loads(response.json()["result"]["content"][0]["text"])["success"])
+        self.assertEqual(metrics.TOOL_CALLS.value("get_cache_stats"), before + 1)
+
+    async def test_call_tool_validates_arguments(self):
+        with patch.object(mcp_sse_server, "wordpress_mcp", AsyncMock()) as wordpress:
+            wordpress.get_posts.return_value = {"success": True, "posts": []}
+            await mcp_sse_server.call_tool("get_posts", {"per_page": "5"})
+            wordpress.get_posts.assert_called_with(per_page=5, page=1)
+            result = await mcp_sse_server.call_tool("get_posts", {"per_page": 500})
+        self.assertEqual(json.loads(result[0].text)["success"], False)
+        self.assertIn("greater than 100", json.loads(result[0].text)["message"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+import unittest
+import sys
+import os
+import json
+import asyncio
+import tempfile
+import time
+
+from mcp.server.fastmcp import FastMCP
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tracing
+from log_pipeline import NonBlockingQueueHandler, stop_logging
+from mcp_server import WordPressClient
+from response_cache import ResponseCache
+from serialization import dumps
+from tracing import slow_call_logger, span, trace_tools, with_timings
+
+
+def names(node):
+    return [child["name"] for child in node.get("children", [])]
+
+
+async def serve_json(reader, writer):
+    """Minimal keep-alive HTTP/1.1 server answering every request with a JSON list"""
+    body = json.dumps([{"id": 1, "title": {"rendered": "Байкал"}}]).encode()
+    try:
+        while True:
+            await reader.readuntil(b"\r\n\r\n")
+            await asyncio.sleep(0.01)
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+class TestSpans(unittest.TestCase):
+    def test_noop_outside_a_trace(self):
+        with span("decode") as s:
+            self.assertIsNone(s)
+        self.assertIsNone(tracing.current())
+
+    def test_tree(self):
+        with span("tool", root=True, tool="get_posts") as root:
+            with span("upstream", method="GET"):
+                time.sleep(0.002)
+            with span("encode"):
+                pass
+        tree = root.to_dict()
+        self.assertEqual(tree["tool"], "get_posts")
+        self.assertEqual(names(tree), ["upstream", "encode"])
+        self.assertEqual(tree["children"][0]["method"], "GET")
+        self.assertGreaterEqual(tree["children"][0]["ms"], 2)
+        self.assertLessEqual(tree["self_ms"], tree["ms"] - tree["children"][0]["ms"] + 0.01)
+        self.assertIsNone(tracing.current())
+
+    def test_traced_function(self):
+        encode = tracing.traced("encode", dumps)
+        self.assertEqual(encode({"a": 1}), '{"a":1}')
+        with span("tool", root=True) as root:
+            encode({"a": 1})
+        self.assertEqual(names(root.to_dict()), ["encode"])
+
+    def test_with_timings(self):
+        self.assertEqual(json.loads(with_timings('{"success":true}', {"ms": 1})),
+                         {"success": True, "_timings": {"ms": 1}})
+        self.assertEqual(json.loads(with_timings("{}", {"ms": 1})), {"_timings": {"ms": 1}})
+        self.assertEqual(with_timings("[1]", {"ms": 1}), "[1]")
+
+
+class TestToolTracing(unittest.IsolatedAsyncioTestCase):
+    def make_server(self, **options):
+        server = FastMCP("test")
+
+        @server.tool()
+        async def slow_tool(text: str = "") -> str:
+            async def part(n):
+                with span("part", n=n):
+                    await asyncio.sleep(0.01)
+            await asyncio.gather(part(1), part(2))
+            return dumps({"success": True, "length": len(text)})
+
+        trace_tools(server._tool_manager, **options)
+        return server
+
+    async def test_debug_argument(self):
+        server = self.make_server()
+        plain = await server.call_tool("slow_tool", {})
+        self.assertNotIn("_timings", json.loads(plain[0][0].text))
+
+        result = await server.call_tool("slow_tool", {"text": "abc", "_debug": True})
+        data = json.loads(result[0][0].text)
+        self.assertEqual(data["length"], 3)
+        timings = data["_timings"]
+        self.assertEqual(timings["tool"], "slow_tool")
+        # Spans from gathered tasks belong to the call
+        self.assertEqual(names(timings), ["part", "part"])
+        self.assertGreaterEqual(timings["ms"], 10)
+
+    async def test_debug_for_every_call(self):
+        server = self.make_server(debug=True)
+        result = await server.call_tool("slow_tool", {})
+        self.assertIn("_timings", json.loads(result[0][0].text))
+
+    async def test_slow_call_log(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "slow.jsonl")
+            logger = slow_call_logger(path)
+            try:
+                fast = self.make_server(slow_ms=10_000, slow_logger=logger)
+                await fast.call_tool("slow_tool", {})
+                self.assertFalse(os.path.exists(path))
+
+                slow = self.make_server(slow_ms=1, slow_logger=logger)
+                await slow.call_tool("slow_tool", {"text": "x" * 500})
+                # Queued for the writer thread, not written on the event loop
+                self.assertIsInstance(logger.handlers[0], NonBlockingQueueHandler)
+            finally:
+                stop_logging()
+            with open(path) as f:
+                records = [json.loads(line) for line in f]
+
+        self.assertEqual(len(records), 1)
+        record = records[0]
+        self.assertEqual(record["tool"], "slow_tool")
+        self.assertFalse(record["failed"])
+        self.assertTrue(record["arguments"]["text"].endswith("..."))
+        self.assertLess(len(record["arguments"]["text"]), 210)
+        self.assertEqual(names(record["spans"]), ["part", "part"])
+
+    async def test_upstream_phases(self):
+        server = await asyncio.start_server(serve_json, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        client = WordPressClient(f"http://127.0.0.1:{port}", "u", "p", cache=ResponseCache(0))
+        try:
+            with span("tool", root=True) as root:
+                await client.request("GET", "posts")
+                await client.request("GET", "posts", params={"page": 2})
+        finally:
+            await client.close()
+            server.close()
+            await server.wait_closed()
+
+        tree = root.to_dict()
+        self.assertEqual(names(tree), ["upstream", "decode", "upstream", "decode"])
+        first, second = tree["children"][0], tree["children"][2]
+        self.assertEqual((first["method"], first["resource"], first["status"]), ("GET", "wp/v2/posts", 200))
+        self.assertEqual(names(first), ["queue", "connect", "send", "ttfb", "download"])
+        # The second request reuses the pooled connection
+        self.assertNotIn("connect", names(second))
+        ttfb = next(c for c in first["children"] if c["name"] == "ttfb")
+        self.assertGreaterEqual(ttfb["ms"], 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
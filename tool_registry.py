@@ -0,0 +1,350 @@
+"""
+Tool definitions compiled once: argument checks, dispatch and the tools/list body.
+
+mcp_sse_server used to rebuild its Tool objects on every tools/list and
+pick the handler with an if/elif chain reading arguments[...] by hand.
+A ToolRegistry keeps one ToolSpec per tool:
+
+- the input schema compiled into a validator that fills defaults, coerces
+  the lax forms clients send ("5" for an integer, "true" for a boolean, a
+  JSON string for an array) and rejects the rest with ToolArgumentError
+- the handler, called with the validated arguments as keywords (plus the
+  reserved arguments it accepts, like `_debug`)
+- the tools/list entries, serialized once into bytes
+
+Tools of a FastMCP server (mcp_server.mcp) can be added as they are, so the
+same registry can serve every tool of mcp_server.py. Their calls go through
+the server's ToolManager, so its tracing and metrics wrappers see them:
+
+    registry = ToolRegistry()
+    registry.add("delete_post", "Delete a post", schema, handler)
+    registry.add_fastmcp(mcp_server.mcp)
+    result = await registry.call("get_posts", {"per_page": "5"})
+"""
+
+import copy
+import math
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from mcp.types import Tool
+
+from serialization import JSONDecodeError, dumpb, loads
+from tracing import DEBUG_ARG
+
+Coercer = Callable[[Any, str], Any]
+
+
+class ToolArgumentError(ValueError):
+    """Arguments that do not match a tool's input schema"""
+
+
+def _invalid(path: str, expected: str, value: Any) -> ToolArgumentError:
+    return ToolArgumentError(f"Invalid argument '{path}': expected {expected}, got {value!r}"[:300])
+
+
+def _string(value: Any, path: str) -> str:
+    if isinstance(value, str):
+        return value
+    raise _invalid(path, "string", value)
+
+
+def _integer(value: Any, path: str) -> int:
+    if isinstance(value, bool):
+        raise _invalid(path, "integer", value)
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            pass
+    raise _invalid(path, "integer", value)
+
+
+def _number(value: Any, path: str) -> float:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        try:
+            number = float(value.strip())
+            if math.isfinite(number):
+                return number
+        except ValueError:
+            pass
+    raise _invalid(path, "number", value)
+
+
+_BOOLEANS = {"true": True, "1": True, "yes": True, "false": False, "0": False, "no": False}
+
+
+def _boolean(value: Any, path: str) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in _BOOLEANS:
+        return _BOOLEANS[value.strip().lower()]
+    raise _invalid(path, "boolean", value)
+
+
+def _null(value: Any, path: str) -> None:
+    if value is None:
+        return None
+    raise _invalid(path, "null", value)
+
+
+def _any(value: Any, path: str) -> Any:
+    return value
+
+
+def _parsed(value: Any, kind: type) -> Any:
+    """A JSON string where an array/object is expected, as some clients send them"""
+    if isinstance(value, str):
+        try:
+            parsed = loads(value)
+        except (JSONDecodeError, ValueError):
+            return value
+        if isinstance(parsed, kind):
+            return parsed
+    return value
+
+
+def _array(items: Coercer) -> Coercer:
+    def coerce(value: Any, path: str) -> list:
+        value = _parsed(value, list)
+        if not isinstance(value, (list, tuple)):
+            raise _invalid(path, "array", value)
+        return [items(item, f"{path}[{i}]") for i, item in enumerate(value)]
+    return coerce
+
+
+def _object(properties: Dict[str, Coercer], extra: Optional[Coercer]) -> Coercer:
+    def coerce(value: Any, path: str) -> dict:
+        value = _parsed(value, dict)
+        if not isinstance(value, dict):
+            raise _invalid(path, "object", value)
+        result = {}
+        for key, item in value.items():
+            check = properties.get(key, extra)
+            if check is not None:
+                result[key] = check(item, f"{path}.{key}")
+        return result
+    return coerce
+
+
+def _any_of(options: List[Coercer]) -> Coercer:
+    def coerce(value: Any, path: str) -> Any:
+        # Exact matches first, so "5" stays a string in string|integer
+        for strict in (True, False):
+            for option in options:
+                try:
+                    result = option(value, path)
+                except ToolArgumentError:
+                    continue
+                if not strict or result == value and type(result) is type(value):
+                    return result
+        raise ToolArgumentError(f"Invalid argument '{path}': {value!r} matches none of the allowed types"[:300])
+    return coerce
+
+
+def _constrained(coerce: Coercer, schema: Dict[str, Any]) -> Coercer:
+    """Adds enum and minimum/maximum checks when the schema has them"""
+    enum = schema.get("enum")
+    low, high = schema.get("minimum"), schema.get("maximum")
+    if enum is None and low is None and high is None:
+        return coerce
+
+    def check(value: Any, path: str) -> Any:
+        value = coerce(value, path)
+        if enum is not None and value not in enum:
+            raise ToolArgumentError(f"Invalid argument '{path}': {value!r} is not one of {enum}")
+        if isinstance(value, (int, float)):
+            if low is not None and value < low:
+                raise ToolArgumentError(f"Invalid argument '{path}': {value} is less than {low}")
+            if high is not None and value > high:
+                raise ToolArgumentError(f"Invalid argument '{path}': {value} is greater than {high}")
+        return value
+    return check
+
+
+_SCALARS = {"string": _string, "integer": _integer, "number": _number, "boolean": _boolean, "null": _null}
+
+
+def compile_schema(schema: Dict[str, Any]) -> Coercer:
+    """A function checking and coercing one value against a JSON schema
+
+    Covers what tool schemas use: type (or a list of types), anyOf/oneOf,
+    items, properties, additionalProperties, enum, minimum and maximum.
+    Anything else is accepted as is.
+    """
+    if not isinstance(schema, dict):
+        return _any
+    options = schema.get("anyOf") or schema.get("oneOf")
+    if options:
+        return _constrained(_any_of([compile_schema(option) for option in options]), schema)
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        return _constrained(_any_of([compile_schema({**schema, "type": k}) for k in kind]), schema)
+    if kind == "array":
+        coerce = _array(compile_schema(schema.get("items", {})))
+    elif kind == "object":
+        extra = schema.get("additionalProperties", True)
+        coerce = _object(
+            {name: compile_schema(prop) for name, prop in schema.get("properties", {}).items()},
+            _any if extra is True else (compile_schema(extra) if isinstance(extra, dict) else None)
+        )
+    else:
+        coerce = _SCALARS.get(kind, _any)
+    return _constrained(coerce, schema)
+
+
+def compile_arguments(
+    schema: Dict[str, Any],
+    reserved: Tuple[str, ...] = ()
+) -> Callable[[Optional[Dict[str, Any]]], Dict[str, Any]]:
+    """Validator for a tool's arguments object
+
+    Returns the keyword arguments for the handler: required ones present,
+    defaults filled in, values coerced. Arguments the schema does not list
+    are dropped, as FastMCP does, except the `reserved` ones, which are
+    passed on as they are. None is accepted where the default is None
+    (pydantic's `param: int = None`).
+    """
+    properties = schema.get("properties", {})
+    required = tuple(schema.get("required", ()))
+    checks = {name: compile_schema(prop) for name, prop in properties.items()}
+    defaults = {name: prop["default"] for name, prop in properties.items() if "default" in prop}
+    nullable = {name for name, value in defaults.items() if value is None}
+    mutable = {name for name, value in defaults.items() if isinstance(value, (list, dict))}
+
+    def validate(arguments: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if arguments is None:
+            arguments = {}
+        elif not isinstance(arguments, dict):
+            raise ToolArgumentError(f"Arguments must be an object, got {type(arguments).__name__}")
+        for name in required:
+            if name not in arguments:
+                raise ToolArgumentError(f"Missing required argument: '{name}'")
+        result = {}
+        for name, check in checks.items():
+            if name in arguments:
+                value = arguments[name]
+                result[name] = None if value is None and name in nullable else check(value, name)
+            elif name in defaults:
+                result[name] = copy.deepcopy(defaults[name]) if name in mutable else defaults[name]
+        for name in reserved:
+            if name in arguments:
+                result[name] = arguments[name]
+        return result
+
+    return validate
+
+
+@dataclass
+class ToolSpec:
+    name: str
+    description: str
+    input_schema: Dict[str, Any]
+    handler: Callable[..., Awaitable[Any]]
+    # The handler records its own tool metrics (FastMCP tools, see metrics.instrument_tools)
+    instrumented: bool = False
+    # Arguments outside the schema the handler understands (e.g. tracing's _debug)
+    reserved: Tuple[str, ...] = ()
+    validate: Callable[[Optional[Dict[str, Any]]], Dict[str, Any]] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.validate = compile_arguments(self.input_schema, self.reserved)
+
+    def listing(self) -> Dict[str, Any]:
+        return {"name": self.name, "description": self.description, "inputSchema": self.input_schema}
+
+
+class ToolRegistry:
+    """Tools by name, with the tools/list body built once"""
+
+    def __init__(self):
+        self.tools: Dict[str, ToolSpec] = {}
+        self._listing: Optional[List[Dict[str, Any]]] = None
+        self._list_body: Optional[bytes] = None
+        self._mcp_tools: Optional[List[Tool]] = None
+
+    def __contains__(self, name: Any) -> bool:
+        return name in self.tools
+
+    def __len__(self) -> int:
+        return len(self.tools)
+
+    def add(
+        self,
+        name: str,
+        description: str,
+        input_schema: Dict[str, Any],
+        handler: Callable[..., Awaitable[Any]],
+        instrumented: bool = False,
+        reserved: Tuple[str, ...] = ()
+    ) -> ToolSpec:
+        """Register (or replace) a tool; the handler gets the validated arguments as keywords"""
+        spec = self.tools[name] = ToolSpec(name, description, input_schema, handler, instrumented, reserved)
+        self._listing = self._list_body = self._mcp_tools = None
+        return spec
+
+    def add_fastmcp(self, server: Any, replace: bool = False) -> List[str]:
+        """Register the tools of a FastMCP server; returns the names added
+
+        Tools already registered here are kept unless `replace` is set.
+        `_debug` is passed through to the server's traced ToolManager.
+        """
+        added = []
+        for tool in server._tool_manager.list_tools():
+            if tool.name in self.tools and not replace:
+                continue
+            self.add(tool.name, tool.description or "", tool.parameters,
+                     _fastmcp_handler(server._tool_manager, tool.name, tool.parameters),
+                     instrumented=True, reserved=(DEBUG_ARG,))
+            added.append(tool.name)
+        return added
+
+    def listing(self) -> List[Dict[str, Any]]:
+        """tools/list entries (name, description, inputSchema)"""
+        if self._listing is None:
+            self._listing = [spec.listing() for spec in self.tools.values()]
+        return self._listing
+
+    def list_body(self) -> bytes:
+        """The tools/list result, serialized"""
+        if self._list_body is None:
+            self._list_body = dumpb({"tools": self.listing()})
+        return self._list_body
+
+    def mcp_tools(self) -> List[Tool]:
+        """The tools as mcp.types.Tool, for a low-level mcp Server"""
+        if self._mcp_tools is None:
+            self._mcp_tools = [
+                Tool(name=spec.name, description=spec.description, inputSchema=spec.input_schema)
+                for spec in self.tools.values()
+            ]
+        return self._mcp_tools
+
+    async def call(self, name: str, arguments: Optional[Dict[str, Any]]) -> Any:
+        """Validate the arguments and run the tool
+
+        Raises KeyError for an unknown tool and ToolArgumentError for bad arguments.
+        """
+        spec = self.tools[name]
+        return await spec.handler(**spec.validate(arguments))
+
+
+def _fastmcp_handler(manager: Any, name: str, schema: Dict[str, Any]) -> Callable[..., Awaitable[Any]]:
+    # pydantic rejects an explicit None for `param: int = None`; leave those to FastMCP's defaults
+    nullable = {key for key, prop in schema.get("properties", {}).items()
+                if "default" in prop and prop["default"] is None}
+
+    async def handler(**arguments):
+        arguments = {key: value for key, value in arguments.items() if value is not None or key not in nullable}
+        # manager.call_tool is looked up per call: tracing and metrics replace it
+        return await manager.call_tool(name, arguments)
+
+    return handler
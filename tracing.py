@@ -0,0 +1,241 @@
+"""
+Per-call timing breakdown.
+
+A tool call opens a root span; code on the hot path opens child spans with
+`with span("decode"):` and the tree follows the asyncio context, so spans
+opened in gathered tasks or worker threads land under the call that
+started them. Outside a traced call span() is a shared no-op, and calls are
+only traced when a debug flag or the slow-call log asks for it.
+
+Upstream requests get their phases from httpx's trace extension: queue
+(waiting for a pooled connection), connect (TCP + TLS), send, ttfb (waiting
+for the response headers) and download (the body).
+
+The tree can be appended to a tool result as "_timings" (per call with a
+`_debug: true` argument, or for every call with WP_DEBUG_TIMINGS=1), and
+calls slower than a threshold are written as JSON lines to a slow-call log.
+"""
+
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+from log_pipeline import file_logger
+from serialization import dumps
+
+SLOW_LOGGER = "wordpress_mcp.slow_calls"
+DEBUG_ARG = "_debug"
+# Logged argument values are cut to this many characters
+MAX_ARG_CHARS = 200
+
+# httpcore trace event -> phase
+UPSTREAM_PHASES = {
+    "connect_tcp": "connect",
+    "start_tls": "connect",
+    "send_request_headers": "send",
+    "send_request_body": "send",
+    "receive_response_headers": "ttfb",
+    "receive_response_body": "download",
+}
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start", "end", "children")
+
+    def __init__(self, name: str, attrs: Optional[Dict[str, Any]] = None, start: Optional[float] = None):
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter() if start is None else start
+        self.end: Optional[float] = None
+        self.children: List["Span"] = []
+
+    @property
+    def ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def add(self, name: str, start: float, end: float, **attrs) -> "Span":
+        child = Span(name, attrs or None, start)
+        child.end = end
+        self.children.append(child)
+        return child
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        """Tree with durations and offsets from the root, in milliseconds"""
+        origin = self.start if origin is None else origin
+        node: Dict[str, Any] = {
+            "name": self.name,
+            "at_ms": round((self.start - origin) * 1000, 3),
+            "ms": round(self.ms, 3),
+        }
+        if self.attrs:
+            node.update(self.attrs)
+        if self.children:
+            children = sorted(self.children, key=lambda c: c.start)
+            node["children"] = [c.to_dict(origin) for c in children]
+            # Time not covered by any child (argument validation, our own code)
+            covered, cursor = 0.0, self.start
+            for c in children:
+                end = c.end if c.end is not None else c.start
+                if end > cursor:
+                    covered += end - max(c.start, cursor)
+                    cursor = end
+            node["self_ms"] = round(max(0.0, self.ms - covered * 1000), 3)
+        return node
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("wordpress_mcp_span", default=None)
+
+
+def current() -> Optional[Span]:
+    return _current.get()
+
+
+class span:
+    """Context manager for a child span of the current one (no-op when not tracing)
+
+    With root=True it starts a new tree regardless of the current span.
+    """
+
+    __slots__ = ("name", "attrs", "root", "span", "token")
+
+    def __init__(self, name: str, root: bool = False, **attrs):
+        self.name = name
+        self.attrs = attrs or None
+        self.root = root
+        self.span: Optional[Span] = None
+
+    def __enter__(self) -> Optional[Span]:
+        parent = _current.get()
+        if parent is None and not self.root:
+            return None
+        self.span = Span(self.name, self.attrs)
+        if parent is not None and not self.root:
+            parent.children.append(self.span)
+        self.token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, *exc) -> None:
+        if self.span is not None:
+            if self.span.end is None:
+                self.span.end = time.perf_counter()
+            _current.reset(self.token)
+
+
+def traced(name: str, fn: Callable) -> Callable:
+    """Wrap a synchronous function in a span"""
+    def wrapper(*args, **kwargs):
+        if _current.get() is None:
+            return fn(*args, **kwargs)
+        with span(name):
+            return fn(*args, **kwargs)
+    wrapper.__name__ = getattr(fn, "__name__", name)
+    wrapper.__doc__ = fn.__doc__
+    return wrapper
+
+
+def upstream_trace(parent: Span) -> Callable:
+    """httpx "trace" extension callback that records request phases under parent"""
+    started: Dict[str, float] = {}
+
+    async def trace(event_name: str, info: Dict[str, Any]) -> None:
+        now = time.perf_counter()
+        step, _, status = event_name.rpartition(".")
+        phase = UPSTREAM_PHASES.get(step.rpartition(".")[2])
+        if phase is None:
+            return
+        if status == "started":
+            if not parent.children and not started:
+                # Time before the first event went to waiting for a pool connection
+                parent.add("queue", parent.start, now)
+            started[step] = now
+        elif step in started:
+            begin = started.pop(step)
+            last = parent.children[-1] if parent.children else None
+            if last is not None and last.name == phase and last.end is not None and begin - last.end < 0.001:
+                last.end = now  # headers + body, TCP + TLS: one phase
+            else:
+                parent.add(phase, begin, now, **({"failed": True} if status == "failed" else {}))
+
+    return trace
+
+
+def with_timings(result: Any, timings: Dict[str, Any]) -> Any:
+    """Append "_timings" to a JSON object result without decoding it"""
+    if isinstance(result, str) and result.startswith("{") and result.endswith("}"):
+        body = result[1:-1].strip()
+        return "{" + body + ("," if body else "") + '"_timings":' + dumps(timings) + "}"
+    return result
+
+
+def loggable(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Arguments for the slow-call log, with long values cut"""
+    out = {}
+    for key, value in arguments.items():
+        text = value if isinstance(value, str) else dumps(value)
+        out[key] = value if len(text) <= MAX_ARG_CHARS else text[:MAX_ARG_CHARS] + "..."
+    return out
+
+
+def slow_call_logger(path: str) -> logging.Logger:
+    """Logger writing one JSON object per line to path
+
+    Records are queued and written by log_pipeline's writer thread, never on
+    the event loop; stop_logging() flushes them.
+    """
+    logger = file_logger(SLOW_LOGGER, path)
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def trace_tools(
+    manager,
+    debug: bool = False,
+    slow_ms: Optional[float] = None,
+    slow_logger: Optional[logging.Logger] = None
+) -> None:
+    """Trace calls made through a FastMCP ToolManager
+
+    Args:
+        manager: The ToolManager whose call_tool is wrapped
+        debug: Append timings to every result (otherwise only with _debug: true)
+        slow_ms: Log calls taking at least this long to slow_logger
+        slow_logger: Logger for slow calls (see slow_call_logger)
+    """
+    call_tool = manager.call_tool
+    log_slow = slow_ms is not None and slow_logger is not None
+
+    async def traced_call_tool(name: str, arguments: Dict[str, Any], context=None, convert_result: bool = False):
+        want = debug
+        if DEBUG_ARG in arguments:
+            arguments = dict(arguments)
+            want = bool(arguments.pop(DEBUG_ARG)) or debug
+        if not want and not log_slow:
+            return await call_tool(name, arguments, context=context, convert_result=convert_result)
+
+        failed = True
+        with span("tool", root=True, tool=name) as root:
+            try:
+                # Convert after the timings are added to the string result
+                result = await call_tool(name, arguments, context=context, convert_result=False)
+                failed = False
+            finally:
+                root.end = time.perf_counter()
+                if log_slow and root.ms >= slow_ms:
+                    slow_logger.info(dumps({
+                        "ts": round(time.time(), 3),
+                        "tool": name,
+                        "ms": round(root.ms, 3),
+                        "failed": failed,
+                        "arguments": loggable(arguments),
+                        "spans": root.to_dict(),
+                    }))
+        if want:
+            result = with_timings(result, root.to_dict())
+        if convert_result:
+            tool = manager.get_tool(name)
+            result = tool.fn_metadata.convert_result(result)
+        return result
+
+    manager.call_tool = traced_call_tool